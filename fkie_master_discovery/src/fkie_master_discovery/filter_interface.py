@@ -32,6 +32,7 @@
 
 import re
 import sys
+import threading
 
 import rospy
 
@@ -49,9 +50,18 @@ class FilterInterface(object):
     :mod:`fkie_master_discovery.filter_interface.FilterInterface.load()` or
     :mod:`fkie_master_discovery.filter_interface.FilterInterface.from_list()`.
     Otherwise the object is invalid and the test methods return always `False`.
+    The results of the `is_ignored_publisher`, `is_ignored_subscriber` and
+    `is_ignored_service` calls are cached until the patterns are changed.
     '''
 
+    DECISION_CACHE_SIZE = 65536
+    ''' the count of filter decisions for publishers, subscribers and services each,
+      which are kept at least in the cache (Default: ``65536``)'''
+
     def __init__(self):
+        self._decisions_pub = _DecisionCache(self.DECISION_CACHE_SIZE)
+        self._decisions_sub = _DecisionCache(self.DECISION_CACHE_SIZE)
+        self._decisions_srv = _DecisionCache(self.DECISION_CACHE_SIZE)
         self.is_valid = False
         self._re_do_not_sync = EMPTY_PATTERN
         self._re_do_not_sync_from_list = EMPTY_PATTERN
@@ -102,11 +112,13 @@ class FilterInterface(object):
         else:
             self.read_do_not_sync()
         self.is_valid = True
+        self._clear_decisions()
 
     def set_hide_pattern(self, re_hide_nodes=EMPTY_PATTERN, re_hide_topics=EMPTY_PATTERN, re_hide_services=EMPTY_PATTERN):
         self._re_hide_nodes = re_hide_nodes
         self._re_hide_topics = re_hide_topics
         self._re_hide_services = re_hide_services
+        self._clear_decisions()
 
     def read_do_not_sync(self):
         _do_not_sync = get_ros_param('do_not_sync', [])
@@ -121,6 +133,7 @@ class FilterInterface(object):
             # remove empty values
             _do_not_sync = [val for val in _do_not_sync if val]
         self._re_do_not_sync = gen_pattern(_do_not_sync, 'do_not_sync', print_info=False)
+        self._clear_decisions()
 
     def update_sync_topics_pattern(self, topics=[]):
         '''
@@ -131,6 +144,7 @@ class FilterInterface(object):
         :type topics: list of strings
         '''
         self._re_sync_topics = create_pattern('sync_topics', self.__data, self.__interface_file, topics, self.__mastername)
+        self._clear_decisions()
 
     def sync_remote_nodes(self):
         '''
@@ -140,6 +154,11 @@ class FilterInterface(object):
             return False
         return self._sync_remote_nodes
 
+    def _clear_decisions(self):
+        self._decisions_pub.clear()
+        self._decisions_sub.clear()
+        self._decisions_srv.clear()
+
     def is_ignored_node(self, node):
         '''
         Searches the given node in `ignore_nodes` and `sync_nodes` lists.
@@ -236,13 +255,21 @@ class FilterInterface(object):
         :note: If the filter object is not initialized by load() or from_list() the
               returned value is `False`
         '''
+        key = (node, topic, topictype)
+        result = self._decisions_sub.get(key)
+        if result is None:
+            result = self._is_ignored_subscriber(node, topic, topictype)
+            self._decisions_sub.set(key, result)
+        return result
+
+    def _is_ignored_subscriber(self, node, topic, topictype):
         if self._re_hide_nodes.match(node):
             return True
         if self._re_hide_topics.match(topic):
             return True
         if self.do_not_sync([node, topic, topictype]):
             return True
-        return self._re_ignore_subscribers.match(topic) or self._is_ignored_topic(node, topic, topictype)
+        return bool(self._re_ignore_subscribers.match(topic) or self._is_ignored_topic(node, topic, topictype))
 
     def is_ignored_publisher(self, node, topic, topictype):
         '''
@@ -268,13 +295,21 @@ class FilterInterface(object):
         :note: If the filter object is not initialized by load() or from_list() the
               returned value is `False`
         '''
+        key = (node, topic, topictype)
+        result = self._decisions_pub.get(key)
+        if result is None:
+            result = self._is_ignored_publisher(node, topic, topictype)
+            self._decisions_pub.set(key, result)
+        return result
+
+    def _is_ignored_publisher(self, node, topic, topictype):
         if self._re_hide_nodes.match(node):
             return True
         if self._re_hide_topics.match(topic):
             return True
         if self.do_not_sync([node, topic, topictype]):
             return True
-        return self._re_ignore_publishers.match(topic) or self._is_ignored_topic(node, topic, topictype)
+        return bool(self._re_ignore_publishers.match(topic) or self._is_ignored_topic(node, topic, topictype))
 
     def is_ignored_service(self, node, service):
         '''
@@ -297,6 +332,14 @@ class FilterInterface(object):
         '''
         if not self.is_valid:
             return False
+        key = (node, service)
+        result = self._decisions_srv.get(key)
+        if result is None:
+            result = self._is_ignored_service(node, service)
+            self._decisions_srv.set(key, result)
+        return result
+
+    def _is_ignored_service(self, node, service):
         if self._re_hide_nodes.match(node):
             return True
         if self._re_hide_services.match(service):
@@ -395,6 +438,41 @@ class FilterInterface(object):
         return None
 
 
+class _DecisionCache(object):
+    '''
+    A dictionary with limited size. The entries are stored in two generations.
+    If the current generation is full, it replaces the old one. Entries found in
+    the old generation are moved to the current one, so only the least recently
+    used entries are dropped.
+    '''
+
+    def __init__(self, maxsize):
+        self._maxsize = max(1, maxsize)
+        self._current = {}
+        self._old = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._current.get(key)
+        if value is None:
+            value = self._old.get(key)
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._current) >= self._maxsize:
+                self._old = self._current
+                self._current = {}
+            self._current[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._current = {}
+            self._old = {}
+
+
 def _to_str(re_object):
     if is_empty_pattern(re_object):
         return ''
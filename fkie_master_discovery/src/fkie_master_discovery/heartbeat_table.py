@@ -0,0 +1,346 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+'''
+Stores the receive times of the heartbeats of all discovered masters in one
+table. Each master gets a row with a fixed-size ring buffer, so a new heartbeat
+never moves the old ones. The link quality and the offline state of all masters
+are calculated in one pass over the table.
+
+If NumPy is available the ring buffers are rows of one two-dimensional array and
+the calculation is vectorized. Otherwise the table falls back to a
+:class:`collections.deque` for each master with the same results.
+
+Usage::
+
+    table = HeartbeatTable(interval=5)
+    row = table.add(rate=1.)
+    table.add_heartbeat(row, 1., time.time())
+    qualities, offline = table.calculate(5, 10, rows=[row])
+'''
+
+import collections
+import math
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class HeartbeatTable(object):
+    '''
+    The receive times of the heartbeats and unanswered requests of all discovered masters.
+    The table is not thread-safe, the :class:`fkie_master_discovery.master_discovery.Discoverer`
+    accesses it while holding its lock.
+
+    :param interval: the measurement interval in seconds, used to size the ring buffers.
+
+    :type interval:  float (Default: ``5``)
+
+    :param min_rate: heartbeats with a lower rate are ignored for the quality calculation.
+
+    :type min_rate:  float (Default: ``0.3``)
+
+    :param use_numpy: use NumPy arrays if available.
+
+    :type use_numpy:  bool (Default: ``True``)
+    '''
+
+    MAX_RATE = 25.5
+    ''' the maximal rate of the heartbeats, the rate is sent as unsigned char in Hz*10. '''
+
+    MIN_CAPACITY = 16
+    ''' the count of rows allocated on start, the capacity is doubled if all rows are used. '''
+
+    def __init__(self, interval=5, min_rate=0.3, use_numpy=True):
+        # a rate below one extends the measurement duration, the count of
+        # expected heartbeats is never greater than MAX_RATE * interval. The
+        # double size leaves room for heartbeats received on more than one socket.
+        self.size = int(math.ceil(2 * self.MAX_RATE * max(interval, 1))) + 1
+        self.min_rate = min_rate
+        self.use_numpy = use_numpy and numpy is not None
+        self._capacity = 0
+        self._free = []
+        self._pending = set()  # rows with unanswered requests
+        self._requests = []
+        self.rates = []
+        self.last_heartbeats = []
+        self.creations = []
+        if self.use_numpy:
+            self._stamps = numpy.empty((0, self.size))
+            # heartbeats older than the floor of the row are removed
+            self._floors = numpy.empty(0)
+            self._heads = []
+        else:
+            self._stamps = []
+        self._grow(self.MIN_CAPACITY)
+
+    def __len__(self):
+        return self._capacity - len(self._free)
+
+    def _grow(self, capacity):
+        count = capacity - self._capacity
+        if self.use_numpy:
+            self._stamps = numpy.concatenate((self._stamps, numpy.full((count, self.size), -numpy.inf)))
+            self._floors = numpy.concatenate((self._floors, numpy.full(count, -numpy.inf)))
+            self._heads.extend([0] * count)
+        else:
+            self._stamps.extend(collections.deque(maxlen=self.size) for _ in range(count))
+        self.rates.extend([0.] * count)
+        self.last_heartbeats.extend([0.] * count)
+        self.creations.extend([0.] * count)
+        self._requests.extend([] for _ in range(count))
+        # use the lowest rows first
+        self._free.extend(reversed(range(self._capacity, capacity)))
+        self._capacity = capacity
+
+    def add(self, rate=1., timestamp=None):
+        '''
+        Adds a row for a new master.
+
+        :param rate: the heartbeat rate of the master.
+
+        :type rate:  float
+
+        :param timestamp: the creation time, used also as time of the last heartbeat.
+
+        :type timestamp:  float (Default: current time)
+
+        :return: the index of the row
+
+        :rtype: int
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+        if not self._free:
+            self._grow(self._capacity * 2)
+        row = self._free.pop()
+        self.rates[row] = rate
+        self.last_heartbeats[row] = timestamp
+        self.creations[row] = timestamp
+        return row
+
+    def remove(self, row):
+        '''
+        Clears the given row and makes it available for a new master.
+        '''
+        self._clear_heartbeats(row)
+        self.rates[row] = 0.
+        del self._requests[row][:]
+        self._pending.discard(row)
+        self._free.append(row)
+
+    def _clear_heartbeats(self, row):
+        if self.use_numpy:
+            self._stamps[row].fill(-numpy.inf)
+            self._floors[row] = -numpy.inf
+            self._heads[row] = 0
+        else:
+            self._stamps[row].clear()
+
+    def add_heartbeat(self, row, rate, timestamp):
+        '''
+        Stores the receive time of a heartbeat and resets the unanswered requests.
+        The stored heartbeats are removed if the rate is changed. Heartbeats with
+        a rate less than `min_rate` only update the time of the last heartbeat.
+
+        :param row: the row of the master
+
+        :type row:  int
+
+        :param rate: the rate of the received heartbeat
+
+        :type rate:  float
+
+        :param timestamp: the receive time
+
+        :type timestamp:  float
+        '''
+        self.last_heartbeats[row] = timestamp
+        if row in self._pending:
+            del self._requests[row][:]
+            self._pending.discard(row)
+        if rate >= self.min_rate:
+            if self.rates[row] != rate:
+                self.rates[row] = rate
+                self._clear_heartbeats(row)
+            if self.use_numpy:
+                head = self._heads[row]
+                self._stamps[row, head] = timestamp
+                self._heads[row] = (head + 1) % self.size
+            else:
+                self._stamps[row].append(timestamp)
+
+    def add_request(self, row, timestamp):
+        '''
+        Stores the time of an unanswered request.
+        '''
+        self._requests[row].append(timestamp)
+        self._pending.add(row)
+
+    def requests(self, row):
+        '''
+        :return: the times of the unanswered requests, the oldest first
+
+        :rtype: [float]
+        '''
+        return self._requests[row]
+
+    def heartbeats(self, row):
+        '''
+        :return: the receive times of the stored heartbeats, the oldest first
+
+        :rtype: [float]
+        '''
+        if self.use_numpy:
+            stamps = numpy.roll(self._stamps[row], -self._heads[row])
+            return stamps[stamps >= max(self._floors[row], -numpy.finfo(float).max)].tolist()
+        return list(self._stamps[row])
+
+    def remove_heartbeats(self, row, timestamp):
+        '''
+        Removes all heartbeats and requests, which are older than the given timestamp.
+
+        :return: the count of removed heartbeats
+
+        :rtype: int
+        '''
+        self._remove_requests(row, timestamp)
+        if self.use_numpy:
+            stamps = self._stamps[row]
+            removed = int(numpy.count_nonzero((stamps >= self._floors[row]) & (stamps < timestamp) & (stamps > -numpy.inf)))
+            self._floors[row] = max(self._floors[row], timestamp)
+            return removed
+        stamps = self._stamps[row]
+        removed = 0
+        while stamps and stamps[0] < timestamp:
+            stamps.popleft()
+            removed += 1
+        return removed
+
+    def _remove_requests(self, row, timestamp):
+        requests = self._requests[row]
+        while requests and requests[0] < timestamp:
+            del requests[0]
+        if not requests:
+            self._pending.discard(row)
+        return len(requests)
+
+    def calculate(self, interval, offline_after, rows=None, now=None):
+        '''
+        Calculates the link quality and the offline state for the given rows.
+        Heartbeats and requests outside of the measurement duration are removed.
+        The measurement duration is the `interval`, divided by the rate for rates
+        less than one and reduced to the lifetime of the row.
+
+        :param interval: the measurement interval in seconds
+
+        :type interval:  float
+
+        :param offline_after: a master is offline, if the last heartbeat is older
+                              than the measurement duration multiplied by this factor.
+
+        :type offline_after:  float
+
+        :param rows: the rows to calculate, all rows in use if ``None``
+
+        :type rows:  [int]
+
+        :param now: the current time
+
+        :type now:  float (Default: current time)
+
+        :return: the qualities in percent (-1 if not available) and the offline
+                 flags, in the order of the given rows
+
+        :rtype: ([float], [bool])
+        '''
+        if now is None:
+            now = time.time()
+        if rows is None:
+            rows = sorted(set(range(self._capacity)) - set(self._free))
+        if self.use_numpy:
+            return self._calculate_numpy(numpy.asarray(rows, dtype=int), interval, offline_after, now)
+        return self._calculate_python(rows, interval, offline_after, now)
+
+    def _calculate_numpy(self, rows, interval, offline_after, now):
+        rates = numpy.asarray(self.rates)[rows]
+        valid = rates >= self.min_rate
+        duration = numpy.where(rates < 1., interval / numpy.maximum(rates, self.min_rate), float(interval))
+        # reduce the measurement duration on start of the master
+        duration = numpy.minimum(duration, now - numpy.asarray(self.creations)[rows])
+        # remove all heartbeats, which are too old
+        floors = self._floors[rows]
+        floors[valid] = numpy.maximum(floors[valid], now - duration[valid])
+        self._floors[rows] = floors
+        beats = numpy.count_nonzero(self._stamps[rows] >= floors[:, None], axis=1)
+        requests = numpy.zeros(len(rows))
+        if self._pending:
+            for idx in numpy.flatnonzero(valid & numpy.isin(rows, list(self._pending))):
+                requests[idx] = self._remove_requests(rows[idx], now - duration[idx])
+        offline = valid & (now - numpy.asarray(self.last_heartbeats)[rows] > duration * offline_after)
+        expected = numpy.trunc(rates * duration + requests)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            qualities = numpy.minimum(beats / expected * 100.0, 100.0)
+        qualities[~valid | (expected <= 0)] = -1.0
+        return qualities.tolist(), offline.tolist()
+
+    def _calculate_python(self, rows, interval, offline_after, now):
+        qualities = []
+        offline = []
+        for row in rows:
+            quality = -1.0
+            is_offline = False
+            rate = self.rates[row]
+            if rate >= self.min_rate:
+                duration = interval
+                if rate < 1.:
+                    duration = duration / rate
+                # reduce the measurement duration on start of the master
+                if duration > now - self.creations[row]:
+                    duration = now - self.creations[row]
+                # remove all heartbeats, which are too old
+                oldest = now - duration
+                stamps = self._stamps[row]
+                while stamps and stamps[0] < oldest:
+                    stamps.popleft()
+                requests = self._remove_requests(row, oldest) if row in self._pending else 0
+                is_offline = now - self.last_heartbeats[row] > duration * offline_after
+                expected = int(rate * duration + requests)
+                if expected > 0:
+                    quality = min(float(len(stamps)) / float(expected) * 100.0, 100.0)
+            qualities.append(quality)
+            offline.append(is_offline)
+        return qualities, offline
@@ -43,15 +43,14 @@ import sys
 import threading
 import time
 import traceback
-try:
-    import xmlrpclib as xmlrpcclient  # python 2 compatibility
-except ImportError:
-    import xmlrpc.client as xmlrpcclient
 
 from rosgraph.network import get_local_addresses, get_local_address
 from .common import get_hostname
+from .heartbeat_table import HeartbeatTable
 from .master_monitor import MasterMonitor, MasterConnectionException
-from .udp import DiscoverSocket, QueueReceiveItem, SEND_ERRORS
+from .scheduler import Scheduler
+from .udp import DiscoverSocket, QueueReceiveItem, SEND_ERRORS, send_stats
+from .xmlrpc_pool import server_proxy
 
 
 try:  # to avoid the problems with autodoc on ros.org/wiki site
@@ -88,6 +87,10 @@ class DiscoveredMaster(object):
     :param callback_master_state: the callback method to publish the changes of the ROS masters
 
     :type callback_master_state: `fkie_master_discovery.msg.MasterState <http://www.ros.org/doc/api/fkie_master_discovery/html/msg/MasterState.html>`_}  (Default: ``None``)
+
+    :param heartbeat_table: the table to store the heartbeats, shared by all discovered masters
+
+    :type heartbeat_table: :class:`fkie_master_discovery.heartbeat_table.HeartbeatTable` (Default: ``None``, creates an own table)
     '''
 
     MIN_HZ_FOR_QUALILTY = 0.3
@@ -96,7 +99,7 @@ class DiscoveredMaster(object):
     ERR_SOCKET = 2
 
     def __init__(self, monitoruri, is_local=False, heartbeat_rate=1.,
-                 timestamp=0.0, timestamp_local=0.0, callback_master_state=None):
+                 timestamp=0.0, timestamp_local=0.0, callback_master_state=None, heartbeat_table=None):
         '''
         Initialize method for the DiscoveredMaster class.
 
@@ -123,6 +126,10 @@ class DiscoveredMaster(object):
         :param callback_master_state: the callback method to publish the changes of the ROS masters
 
         :type callback_master_state: `fkie_master_discovery.msg.MasterState <http://www.ros.org/doc/api/fkie_master_discovery/html/msg/MasterState.html>`_}  (Default: ``None``)
+
+        :param heartbeat_table: the table to store the heartbeats, shared by all discovered masters
+
+        :type heartbeat_table: :class:`fkie_master_discovery.heartbeat_table.HeartbeatTable` (Default: ``None``, creates an own table)
         '''
         self.__lock = threading.RLock()
         self.masteruri = None
@@ -132,11 +139,10 @@ class DiscoveredMaster(object):
         self.discoverername = None
         self.monitoruri = monitoruri
         self.is_local = is_local
-        self.heartbeat_rate = heartbeat_rate
-        self.heartbeats = list()
-        self.requests = list()
-        self.last_heartbeat_ts = time.time()
-        self.creation_ts = time.time()
+        if heartbeat_table is None:
+            heartbeat_table = HeartbeatTable(min_rate=self.MIN_HZ_FOR_QUALILTY)
+        self._heartbeat_table = heartbeat_table
+        self.heartbeat_row = heartbeat_table.add(heartbeat_rate)
         self.online = False
         self.callback_master_state = callback_master_state
         self.ts_last_request = 0
@@ -156,6 +162,36 @@ class DiscoveredMaster(object):
         except Exception:
             pass
 
+    def release(self):
+        '''
+        Finishes this master and releases its row in the heartbeat table. Called
+        if the master is removed from the list of discovered masters.
+        '''
+        self.finish()
+        if self.heartbeat_row is not None:
+            self._heartbeat_table.remove(self.heartbeat_row)
+            self.heartbeat_row = None
+
+    @property
+    def heartbeat_rate(self):
+        return float(self._heartbeat_table.rates[self.heartbeat_row])
+
+    @property
+    def heartbeats(self):
+        return self._heartbeat_table.heartbeats(self.heartbeat_row)
+
+    @property
+    def requests(self):
+        return self._heartbeat_table.requests(self.heartbeat_row)
+
+    @property
+    def last_heartbeat_ts(self):
+        return float(self._heartbeat_table.last_heartbeats[self.heartbeat_row])
+
+    @property
+    def creation_ts(self):
+        return float(self._heartbeat_table.creations[self.heartbeat_row])
+
     def add_heartbeat(self, timestamp, timestamp_local, rate):
         '''
         Adds a new heartbeat measurement. If it is a new timestamp a ROS message
@@ -181,9 +217,8 @@ class DiscoveredMaster(object):
         '''
         result = False
         cur_time = time.time()
-        self.last_heartbeat_ts = cur_time
         self.ts_last_request = 0
-        self.requests = list()
+        self._heartbeat_table.add_heartbeat(self.heartbeat_row, rate, cur_time)
         # publish new master state, if the timestamp is changed
         if (self.timestamp != timestamp or not self.online or self.timestamp_local != timestamp_local):
             self.timestamp = timestamp
@@ -201,12 +236,6 @@ class DiscoveredMaster(object):
                                                                      self.discoverername,
                                                                      self.monitoruri)))
                     result = True
-        if rate >= DiscoveredMaster.MIN_HZ_FOR_QUALILTY:
-            # reset the list, if the heartbeat is changed
-            if self.heartbeat_rate != rate:
-                self.heartbeat_rate = rate
-                self.heartbeats = list()
-            self.heartbeats.append(cur_time)
         return result
 
     def add_request(self, timestamp):
@@ -219,7 +248,7 @@ class DiscoveredMaster(object):
         :type timestamp:  float
         '''
         self.ts_last_request = timestamp
-        self.requests.append(timestamp)
+        self._heartbeat_table.add_request(self.heartbeat_row, timestamp)
         rospy.logdebug("Unanswered requests [%d] for %s: %s" % (len(self.requests), str(self.masteruri), str(self.requests)))
 
     def requests_count(self):
@@ -237,22 +266,7 @@ class DiscoveredMaster(object):
 
         :rtype: int
         '''
-        do_remove = True
-        # remove the requests
-        while do_remove:
-            if len(self.requests) > 0 and self.requests[0] < timestamp:
-                del self.requests[0]
-            else:
-                do_remove = False
-        do_remove = True
-        removed = 0
-        while do_remove:
-            if len(self.heartbeats) > 0 and self.heartbeats[0] < timestamp:
-                del self.heartbeats[0]
-                removed = removed + 1
-            else:
-                do_remove = False
-        return removed
+        return self._heartbeat_table.remove_heartbeats(self.heartbeat_row, timestamp)
 
     def set_offline(self):
         '''
@@ -272,32 +286,38 @@ class DiscoveredMaster(object):
 
     def get_quality(self, interval=5, offline_after=1.4):
         '''
-        Calculates the link quality to this master.
+        Calculates the link quality to this master. To calculate the quality of
+        all masters use :meth:`fkie_master_discovery.heartbeat_table.HeartbeatTable.calculate`
+        and :meth:`update_quality`.
         '''
-        quality = -1.0
-        if self.mastername is not None and self.heartbeat_rate >= self.MIN_HZ_FOR_QUALILTY:
-            current_time = time.time()
-            measurement_duration = interval
-            if self.heartbeat_rate < 1.:
-                measurement_duration = measurement_duration / self.heartbeat_rate
-            # reduce the mesurement duration on start of the master
-            if measurement_duration > current_time - self.creation_ts:
-                measurement_duration = current_time - self.creation_ts
-            # remove all heartbeats, which are to old
-            ts_oldest = current_time - measurement_duration
-            self.remove_heartbeats(ts_oldest)
-            # sets the master offline if the last received heartbeat is to old
-            if current_time - self.last_heartbeat_ts > (measurement_duration * offline_after):
-                self.set_offline()
-            # calculate the quality for online masters only
-            if self.online:
-                beats_count = len(self.heartbeats)
-                expected_count = int(self.heartbeat_rate * measurement_duration + len(self.requests))
-                if expected_count > 0:
-                    quality = float(beats_count) / float(expected_count) * 100.0
-                    if quality > 100.0:
-                        quality = 100.0
-        return quality
+        if self.mastername is None:
+            return -1.0
+        qualities, offline = self._heartbeat_table.calculate(interval, offline_after, rows=[self.heartbeat_row])
+        return self.update_quality(qualities[0], offline[0])
+
+    def update_quality(self, quality, offline):
+        '''
+        Applies the result of the quality calculation to this master.
+
+        :param quality: the calculated quality in percent
+
+        :type quality:  float
+
+        :param offline: ``True`` if the last received heartbeat is too old
+
+        :type offline:  bool
+
+        :return: the quality for online masters, otherwise -1
+
+        :rtype: float
+        '''
+        # sets the master offline if the last received heartbeat is to old
+        if offline:
+            self.set_offline()
+        # the quality is available for online masters only
+        if self.online:
+            return float(quality)
+        return -1.0
 
     @property
     def errors(self):
@@ -344,9 +364,8 @@ class DiscoveredMaster(object):
             if not rospy.is_shutdown() and self.mastername is None:
                 try:
                     rospy.logdebug("Get additional connection info from %s" % self.monitoruri)
-                    remote_monitor = xmlrpcclient.ServerProxy(self.monitoruri)
-                    socket.setdefaulttimeout(10)
-                    timestamp, masteruri, mastername, nodename, monitoruri = remote_monitor.masterContacts()
+                    with server_proxy(self.monitoruri, timeout=10) as remote_monitor:
+                        timestamp, masteruri, mastername, nodename, monitoruri = remote_monitor.masterContacts()
                     self._del_error(self.ERR_SOCKET)
                     rospy.logdebug("Got [%s, %s, %s, %s] from %s" % (timestamp, masteruri, mastername, nodename, monitoruri))
                     timetosleep = 0
@@ -402,8 +421,6 @@ class DiscoveredMaster(object):
                         msg = "Got timestamp=0 from %s, retry... " % self.monitoruri
                         rospy.logwarn(msg)
                         self._add_error(self.ERR_SOCKET, msg)
-                finally:
-                    socket.setdefaulttimeout(None)
                 if not self._on_finish and timetosleep > 0:
                     self.__start_get_info_timer(timetosleep)
 
@@ -508,6 +525,20 @@ class Discoverer(object):
 
     NETPACKET_SIZE = 68
 
+    CHANGE_WAKEUP_DELAY = 0.05
+    ''' the ROS master is checked after this time in [sec], if a change notification was received.
+      Notifications received in this time are merged into one check (Default: 0.05 sec). '''
+
+    SEND_RATE_LIMIT = 50
+    ''' the maximal count of UDP messages per second to each destination, zero disables the limit (Default: 50). '''
+
+    SEND_BATCH_WINDOW = 0.01
+    ''' the time in [sec] to collect UDP messages before they are sent in one batch. Identical messages to the same
+      destination in this time are sent only once (Default: 0.01 sec). '''
+
+    SCHEDULER_STATS_INTERVAL = 60
+    ''' the interval in [sec] to log the jitter statistics of the periodic jobs on debug level (Default: 60 sec). '''
+
     def __init__(self, mcast_port, mcast_group, monitor_port, rpc_addr=''):
         '''
         Initialize method for the Discoverer class
@@ -538,6 +569,8 @@ class Discoverer(object):
         self.HEARTBEAT_HZ = rospy.get_param('~heartbeat_hz', Discoverer.HEARTBEAT_HZ)
         self.MEASUREMENT_INTERVALS = rospy.get_param('~measurement_intervals', Discoverer.MEASUREMENT_INTERVALS)
         self.TIMEOUT_FACTOR = rospy.get_param('~timeout_factor', Discoverer.TIMEOUT_FACTOR)
+        # the heartbeats of all masters, the quality of all links is calculated in one pass
+        self._heartbeat_table = HeartbeatTable(self.MEASUREMENT_INTERVALS, DiscoveredMaster.MIN_HZ_FOR_QUALILTY)
         self.REMOVE_AFTER = rospy.get_param('~remove_after', Discoverer.REMOVE_AFTER)
         self.ACTIVE_REQUEST_AFTER = rospy.get_param('~active_request_after', Discoverer.ACTIVE_REQUEST_AFTER)
         if self.ACTIVE_REQUEST_AFTER <= 0:
@@ -548,6 +581,9 @@ class Discoverer(object):
         self._current_change_notification_count = 0
         self._send_mcast = rospy.get_param('~send_mcast', True)
         self._listen_mcast = rospy.get_param('~listen_mcast', True)
+        self.SEND_RATE_LIMIT = rospy.get_param('~send_rate_limit', Discoverer.SEND_RATE_LIMIT)
+        self.SEND_BATCH_WINDOW = rospy.get_param('~send_batch_window', Discoverer.SEND_BATCH_WINDOW)
+        self._send_dropped = 0
         # for cases with more then one master_discovery on the same host and
         # heartbeat rate is less then 0.1. In this case we have to send a multicast
         # request reply, because we are bind to the same port. Unicast replies are
@@ -595,29 +631,31 @@ class Discoverer(object):
         # create a thread to monitor the ROS master state
         mgroup = DiscoverSocket.normalize_mgroup(mcast_group)
         is_ip6 = self._is_ipv6_group(mgroup)
-        self.master_monitor = MasterMonitor(monitor_port, ipv6=is_ip6, rpc_addr=rpc_addr)
-        # create timer to check for ros master changes
-        self._timer_ros_changes = threading.Timer(0.1, self.checkROSMaster_loop)
+        # the check of the ROS master, heartbeats and statistics are run by one scheduler thread
+        self._scheduler = Scheduler()
+        self.master_monitor = MasterMonitor(monitor_port, ipv6=is_ip6, rpc_addr=rpc_addr,
+                                            param_update_callback=self._on_param_update)
         # init socket for discovering. Exit on errors!
         self._init_socket(True)
-        # create a timer monitor the offline ROS master and calculate the link qualities
-        self._timer_stats = threading.Timer(1, self.timed_stats_calculation)
-        # create timer and paramter for heartbeat notifications
+        # paramter for heartbeat notifications
         self._init_notifications = 0
         # disable parameter, if HEARTBEAT_HZ is active (> zero)
         if self.HEARTBEAT_HZ > DiscoveredMaster.MIN_HZ_FOR_QUALILTY:
             # send init requests in mixed szenario: self._init_notifications = self.INIT_NOTIFICATION_COUNT
             self._current_change_notification_count = self.CHANGE_NOTIFICATION_COUNT
-        self._timer_heartbeat = threading.Timer(1.0, self.send_heartbeat)
         # set the callback to finish all running threads
         rospy.on_shutdown(self.on_shutdown)
         self._recv_tread = threading.Thread(target=self._recv_loop_from_queue)
 
     def start(self):
         self._recv_tread.start()
-        self._timer_ros_changes.start()
-        self._timer_stats.start()
-        self._timer_heartbeat.start()
+        # the check of the ROS master can block, run it in the worker thread of the scheduler
+        self._scheduler.add('check_master', self.checkROSMaster_loop, 0.1, blocking=True)
+        # monitor the offline ROS master and calculate the link qualities
+        self._scheduler.add('stats', self.timed_stats_calculation, 1.)
+        self._scheduler.add('heartbeat', self.send_heartbeat, 1.)
+        self._scheduler.add('scheduler_stats', self._log_scheduler_stats, self.SCHEDULER_STATS_INTERVAL)
+        self._scheduler.start()
 
     def _is_ipv6_group(self, addr):
         try:
@@ -631,7 +669,8 @@ class Discoverer(object):
         # create discovery socket
         # if multicast messages are disabled only unicast socket is created
         # unicast socket is also created if ~interface is defined
-        self.socket = DiscoverSocket(self.mcast_port, self.mcast_group, send_mcast=self._send_mcast, listen_mcast=self._listen_mcast)
+        self.socket = DiscoverSocket(self.mcast_port, self.mcast_group, send_mcast=self._send_mcast, listen_mcast=self._listen_mcast,
+                                     rate_limit=self.SEND_RATE_LIMIT, batch_window=self.SEND_BATCH_WINDOW)
         if self._send_mcast or self._listen_mcast:
             if not self.socket.hasEnabledMulticastIface() and doexit_on_error:
                 sys.exit("No enabled multicast interfaces available!\nAdd multicast support e.g. sudo ifconfig eth0 multicast or disable multicast by settings 'send_mcast' and 'listen_mcast' to False.\nExit")
@@ -639,18 +678,28 @@ class Discoverer(object):
 #        self.socket.set_message_callback(self.recv_udp_msg)
 
     def _stop_timers(self):
-        try:
-            self._timer_ros_changes.cancel()
-        except:
-            pass
-        try:
-            self._timer_heartbeat.cancel()
-        except:
-            pass
-        try:
-            self._timer_stats.cancel()
-        except:
-            pass
+        self._scheduler.stop()
+
+    def _on_param_update(self, key):
+        # a new roslaunch registers its nodes soon, check the ROS master now
+        self._scheduler.wakeup('check_master', self.CHANGE_WAKEUP_DELAY)
+
+    def _log_scheduler_stats(self):
+        for key, stats in sorted(self._scheduler.stats().items()):
+            rospy.logdebug("Scheduled job '%s': runs: %d, wakeups: %d, jitter last/avg/max: %.1f/%.1f/%.1f ms, max runtime: %.1f ms" %
+                           (key, stats['runs'], stats['wakeups'], stats['jitter_last'] * 1000, stats['jitter_avg'] * 1000,
+                            stats['jitter_max'] * 1000, stats['runtime_max'] * 1000))
+        stats = send_stats()
+        rospy.logdebug("UDP messages sent: %d, merged: %d, dropped: %d, errors: %d" % (stats['sent'], stats['coalesced'], stats['dropped'], stats['errors']))
+        return self.SCHEDULER_STATS_INTERVAL
+
+    def scheduler_stats(self):
+        '''
+        :return: the scheduling statistics of the periodic jobs, see :mod:`fkie_master_discovery.scheduler.Scheduler.stats()`
+
+        :rtype: {str: {str: int or float}}
+        '''
+        return self._scheduler.stats()
 
     def on_shutdown(self, *arg):
         with self.__lock:
@@ -697,9 +746,16 @@ class Discoverer(object):
     def send_heartbeat(self, timer=True):
         '''
         Sends current state as heartbeat messages to defined multicast group. If the
-        Discoverer.HEARTBEAT_HZ is greather then zero a timer will be started to
-        send heartbeat messages periodically. This message will also send on start
-        of the discoverer.
+        Discoverer.HEARTBEAT_HZ is greather then zero the heartbeat is sent periodically
+        by the scheduler. This message will also send on start of the discoverer.
+
+        :param timer: ``True`` if called by the scheduler
+
+        :type timer: bool
+
+        :return: the time in seconds until the next heartbeat or ``None``
+
+        :rtype: float
         '''
         with self.__lock:
             # publish the current state
@@ -715,9 +771,9 @@ class Discoverer(object):
             if timer and not self.do_finish:
                 if (self.HEARTBEAT_HZ > 0. or self._init_notifications < self.INIT_NOTIFICATION_COUNT):
                     sleeptime = 1.0 / self.HEARTBEAT_HZ if self.HEARTBEAT_HZ > 0. else 1.0
-                    rospy.logdebug("Set timer to send heartbeat in %.2f sec" % sleeptime)
-                    self._timer_heartbeat = threading.Timer(sleeptime, self.send_heartbeat)
-                    self._timer_heartbeat.start()
+                    rospy.logdebug("Send heartbeat in %.2f sec" % sleeptime)
+                    return sleeptime
+        return None
 
     def _publish_current_state(self, address=None, msg=None):
         try:
@@ -792,6 +848,10 @@ class Discoverer(object):
         The method test periodically the state of the ROS master. The new state will
         be published as heartbeat messages.
         :mod:`fkie_master_discovery.master_monitor.MasterMonitor.checkState()`
+
+        :return: the time in seconds until the next check or ``None`` on shutdown
+
+        :rtype: float
         '''
         import os
         try_count = 0
@@ -825,10 +885,10 @@ class Discoverer(object):
                     rospy.logerr("Communication with ROS Master failed: %s", conn_err)
             # remove offline hosts or request updates
             self._remove_offline_hosts()
-            # setup timer for next ROS master state check
+            # the time for next ROS master state check
             if not rospy.is_shutdown():
-                self._timer_ros_changes = threading.Timer(1.0 / self.current_check_hz, self.checkROSMaster_loop)
-                self._timer_ros_changes.start()
+                return 1.0 / self.current_check_hz
+        return None
 
     def _remove_offline_hosts(self):
         with self.__lock:
@@ -866,7 +926,7 @@ class Discoverer(object):
             for r in to_remove:
                 rospy.loginfo("Remove master discovery: http://%s:%s" % (r[0][0], r[1]))
                 self._rem_address(r[0][0])
-                del self.masters[r]
+                self.masters.pop(r).release()
 
     def _recv_loop_from_queue(self):
         while not self.do_finish:
@@ -928,13 +988,16 @@ class Discoverer(object):
                                     self.publish_masterstate(state_remove)
                                 rospy.loginfo("Remove master discovery: http://%s:%s, with ROS_MASTER_URI=%s" % (address[0], monitor_port, master.masteruri))
                                 self._rem_address(address[0])
-                                del self.masters[master_key]
+                                self.masters.pop(master_key).release()
                         elif master_key in self.masters:
                             # update the timestamp of existing master
                             rospy.logdebug("Received a heartbeat from %s via %s socket" % (master_key[0], via))
                             changed = self.masters[master_key].add_heartbeat(float(secs) + float(nsecs) / 1000000000.0, float(secs_l) + float(nsecs_l) / 1000000000.0, float(rate) / 10.0,)
                             if not self._changed:
                                 self._changed = changed
+                            if changed:
+                                # the state of a remote master was changed, check own ROS master now
+                                self._scheduler.wakeup('check_master', self.CHANGE_WAKEUP_DELAY)
                         else:
                             rospy.logdebug("Received a NEW heartbeat from %s via %s socket" % (master_key[0], via))
                             # or create a new master
@@ -948,7 +1011,8 @@ class Discoverer(object):
                                                                         heartbeat_rate=float(rate) / 10.0,
                                                                         timestamp=float(secs) + float(nsecs) / 1000000000.0,
                                                                         timestamp_local=float(secs_l) + float(nsecs_l) / 1000000000.0,
-                                                                        callback_master_state=self.publish_masterstate)
+                                                                        callback_master_state=self.publish_masterstate,
+                                                                        heartbeat_table=self._heartbeat_table)
                             if via == QueueReceiveItem.LOOPBACK:
                                 self._publish_current_state(address[0])
                 except Exception as e:
@@ -956,10 +1020,8 @@ class Discoverer(object):
 
     def _check_timejump(self):
         if self._last_datetime > time.time():
-            self._stop_timers()
-            self.checkROSMaster_loop()
-            self.send_heartbeat(True)
-            self.timed_stats_calculation()
+            for key in ['check_master', 'heartbeat', 'stats']:
+                self._scheduler.wakeup(key)
         self._last_datetime = time.time()
 
     def _is_multi_address(self, address):
@@ -1010,27 +1072,37 @@ class Discoverer(object):
 
     def timed_stats_calculation(self):
         '''
-        This method will be called by a timer and has two jobs:
+        This method will be called by the scheduler and has two jobs:
          1. set the masters offline, if no heartbeat messages are received a long time
          2. calculate the quality of known links
+
+        :return: the time in seconds until the next calculation
+
+        :rtype: float
         '''
         result = LinkStatesStamped()
         result.header.stamp = rospy.Time.from_sec(time.time())
         with self.__lock:
-            for (_, v) in self.masters.items():
-                quality = v.get_quality(self.MEASUREMENT_INTERVALS, self.TIMEOUT_FACTOR)
-                if not (v.mastername is None) and v.online:
+            masters = list(self.masters.values())
+            named = [v for v in masters if v.mastername is not None]
+            qualities, offline = self._heartbeat_table.calculate(self.MEASUREMENT_INTERVALS, self.TIMEOUT_FACTOR,
+                                                                 rows=[v.heartbeat_row for v in named])
+            for v, quality, is_offline in zip(named, qualities, offline):
+                quality = v.update_quality(quality, is_offline)
+                if v.online:
                     result.links.append(LinkState(v.mastername, quality, rospy.Time.from_sec(v.last_heartbeat_ts)))
+            for v in masters:
                 if v.is_local:
                     result.header.frame_id = v.mastername
         # publish the results
         self.publish_stats(result)
-        try:
-            if not rospy.is_shutdown():
-                self._timer_stats = threading.Timer(1, self.timed_stats_calculation)
-                self._timer_stats.start()
-        except:
-            pass
+        stats = send_stats()
+        if stats['dropped'] > self._send_dropped:
+            rospy.logwarn_throttle(60, "UDP messages dropped by rate limit or full send queue: %d (sent: %d, merged: %d)" % (stats['dropped'], stats['sent'], stats['coalesced']))
+            self._send_dropped = stats['dropped']
+        if not rospy.is_shutdown():
+            return 1.
+        return None
 
     def publish_masterstate(self, master_state):
         '''
@@ -30,17 +30,111 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import array
 import socket
+import struct
+import sys
+import zlib
+from collections import OrderedDict
 try:
     import cStringIO as io  # python 2 compatibility
 except ImportError:
     import io
+try:
+    from sys import intern as _intern
+except ImportError:
+    from __builtin__ import intern as _intern  # python 2 compatibility
 import roslib
 import rospy
 
 from .common import get_hostname
 from .filter_interface import FilterInterface
 
+# the integer type with 4 bytes used for packed states
+_PACKED_INT = 'I' if array.array('I').itemsize == 4 else 'L'
+_PACKED_MAGIC = b'MIP'
+_PACKED_VERSION = 1
+_PACKED_ZLIB = 1
+# magic, version, flags, count of fields, count of strings, count of integers
+_PACKED_HEADER = struct.Struct('<3sBBBII')
+# insertion ordered container used as set for the names of topics, nodes and services
+_OrderedNames = dict if sys.version_info >= (3, 7) else OrderedDict
+# up to this count the names are stored in a tuple, which needs less memory than a dictionary
+_SMALL_NAMES = 8
+
+
+def _create_names(names):
+    '''
+    Creates the container for the names of topics, nodes or services. Duplicates are removed,
+    the order is kept. Small lists are stored as tuple, larger in an ``_OrderedNames``.
+
+    :param names: the names
+
+    :type names: list of strings
+    '''
+    result = _OrderedNames.fromkeys(names)
+    if len(result) <= _SMALL_NAMES:
+        return tuple(result)
+    return result
+
+
+def _add_name(names, name):
+    '''
+    Adds a name to the container created by :mod:`fkie_master_discovery.master_info._create_names`,
+    if it is not already in.
+
+    :return: the container with the name, it can be a new one.
+    '''
+    if name in names:
+        return names
+    if type(names) is tuple:
+        if len(names) < _SMALL_NAMES:
+            return names + (name,)
+        names = _OrderedNames.fromkeys(names)
+    names[name] = None
+    return names
+
+
+def _copy_names(names):
+    if type(names) is tuple:
+        return names
+    return _OrderedNames(names)
+
+
+def _names_differ(names, other):
+    '''
+    Compares two containers created by :mod:`fkie_master_discovery.master_info._create_names`
+    without creating temporary sets.
+
+    :rtype: bool
+    '''
+    if len(names) != len(other):
+        return True
+    for name in names:
+        if name not in other:
+            return True
+    return False
+
+
+def _intern_name(name):
+    if type(name) is str:
+        return _intern(name)
+    return name
+
+
+def _intern_state(l):
+    '''
+    Returns a copy of the listed state with interned names, types and master URIs.
+    '''
+    n = _intern_name
+    return (l[0], l[1], n(l[2]), n(l[3]),
+            [(n(topic), [n(node) for node in nodes]) for topic, nodes in l[4]],
+            [(n(topic), [n(node) for node in nodes]) for topic, nodes in l[5]],
+            [(n(srv), [n(node) for node in nodes]) for srv, nodes in l[6]],
+            [(n(topic), n(ttype)) for topic, ttype in l[7]],
+            [(n(node), uri, n(muri), pid, local) for node, uri, muri, pid, local in l[8]],
+            [(n(srv), uri, n(muri), n(stype), local) for srv, uri, muri, stype, local in l[9]])
+
 
 class NodeInfo(object):
     '''
@@ -56,6 +150,8 @@ class NodeInfo(object):
 
     :type masteruri: str
     '''
+    __slots__ = ('__name', '__masteruri', '__org_masteruri', '__uri', 'pid', '__local', '__local_master',
+                 '_published', '_subscribed', '_provided')
 
     def __init__(self, name, masteruri):
         '''
@@ -79,9 +175,9 @@ class NodeInfo(object):
         '''the process id of the node. Invalid id has a ``None`` value'''
         self.__local = False
         self.__local_master = True
-        self._publishedTopics = []
-        self._subscribedTopics = []
-        self._services = []
+        self._published = ()
+        self._subscribed = ()
+        self._provided = ()
 
     def __repr__(self):
         return "<NodeInfo name=%s, uri=%s, masteruri=%s, is_local=%s, pub_topics=%d, sub_topics=%d>" % (self.name, self.uri, self.masteruri, self.isLocal, len(self.publishedTopics), len(self.subscribedTopics))
@@ -155,29 +251,21 @@ class NodeInfo(object):
 
         :rtype: list of strings
         '''
-        return self._publishedTopics
+        return list(self._published)
 
     @publishedTopics.setter
     def publishedTopics(self, name):
         '''
-        Append a new published topic to this node.
+        Append a new published topic to this node. A list replaces all entries.
 
         :param name: the name of the topic
 
-        :type name: str
+        :type name: str or list of strings
         '''
-        try:
-            if isinstance(name, list):
-                del self._publishedTopics
-                self._publishedTopics = name
-            else:
-                self._publishedTopics.index(name)
-        except ValueError:
-            self._publishedTopics.append(name)
-
-#  @publishedTopics.deleter
-#  def publishedTopics(self):
-#    del self._publishedTopics
+        if isinstance(name, list):
+            self._published = _create_names(name)
+        else:
+            self._published = _add_name(self._published, name)
 
     @property
     def subscribedTopics(self):
@@ -186,29 +274,21 @@ class NodeInfo(object):
 
         :rtype: list of strings
         '''
-        return self._subscribedTopics
+        return list(self._subscribed)
 
     @subscribedTopics.setter
     def subscribedTopics(self, name):
         '''
-        Append a new subscribed topic to this node.
+        Append a new subscribed topic to this node. A list replaces all entries.
 
         :param name: the name of the topic
 
-        :type name: str
+        :type name: str or list of strings
         '''
-        try:
-            if isinstance(name, list):
-                del self._subscribedTopics
-                self._subscribedTopics = name
-            else:
-                self._subscribedTopics.index(name)
-        except ValueError:
-            self._subscribedTopics.append(name)
-
-#  @subscribedTopics.deleter
-#  def subscribedTopics(self):
-#    del self._subscribedTopics
+        if isinstance(name, list):
+            self._subscribed = _create_names(name)
+        else:
+            self._subscribed = _add_name(self._subscribed, name)
 
     @property
     def services(self):
@@ -217,29 +297,21 @@ class NodeInfo(object):
 
         :rtype: list of strings
         '''
-        return self._services
+        return list(self._provided)
 
     @services.setter
     def services(self, name):
         '''
-        Append a new service to this node.
+        Append a new service to this node. A list replaces all entries.
 
         :param name: the name of the topic
 
-        :type name: str
+        :type name: str or list of strings
         '''
-        try:
-            if isinstance(name, list):
-                del self._services
-                self._services = name
-            else:
-                self._services.index(name)
-        except ValueError:
-            self._services.append(name)
-
-#  @services.deleter
-#  def services(self):
-#    del self._services
+        if isinstance(name, list):
+            self._provided = _create_names(name)
+        else:
+            self._provided = _add_name(self._provided, name)
 
     def copy(self, new_masteruri=None):
         '''
@@ -254,9 +326,9 @@ class NodeInfo(object):
         result.uri = str(self.uri) if self.uri is not None else None
         result.masteruri = self.masteruri
         result.pid = self.pid
-        result._publishedTopics = list(self._publishedTopics)
-        result._subscribedTopics = list(self._subscribedTopics)
-        result._services = list(self._services)
+        result._published = _copy_names(self._published)
+        result._subscribed = _copy_names(self._subscribed)
+        result._provided = _copy_names(self._provided)
         return result
 
     @staticmethod
@@ -296,6 +368,7 @@ class TopicInfo(object):
 
     :type name: str
     '''
+    __slots__ = ('__name', 'type', '_publishers', '_subscribers')
 
     def __init__(self, name):
         '''
@@ -308,8 +381,8 @@ class TopicInfo(object):
         self.__name = name
         self.type = None
         '''the type of the topic. (Default: ``None``)'''
-        self._publisherNodes = []
-        self._subscriberNodes = []
+        self._publishers = ()
+        self._subscribers = ()
 
     @property
     def name(self):
@@ -327,25 +400,17 @@ class TopicInfo(object):
 
         :rtype: list of strings
         '''
-        return list(self._publisherNodes)
+        return list(self._publishers)
 
     @publisherNodes.setter
     def publisherNodes(self, name):
         '''
-        Append a new publishing node to this topic.
+        Append a new publishing node to this topic. A list replaces all entries.
         '''
-        try:
-            if isinstance(name, list):
-                del self._publisherNodes
-                self._publisherNodes = name
-            else:
-                self._publisherNodes.index(name)
-        except ValueError:
-            self._publisherNodes.append(name)
-
-#  @publisherNodes.deleter
-#  def publisherNodes(self):
-#    del self._publisherNodes
+        if isinstance(name, list):
+            self._publishers = _create_names(name)
+        else:
+            self._publishers = _add_name(self._publishers, name)
 
     @property
     def subscriberNodes(self):
@@ -354,25 +419,17 @@ class TopicInfo(object):
 
         :rtype: list of strings
         '''
-        return list(self._subscriberNodes)
+        return list(self._subscribers)
 
     @subscriberNodes.setter
     def subscriberNodes(self, name):
         '''
-        Append a new subscribing node to this topic.
+        Append a new subscribing node to this topic. A list replaces all entries.
         '''
-        try:
-            if isinstance(name, list):
-                del self._subscriberNodes
-                self._subscriberNodes = name
-            else:
-                self._subscriberNodes.index(name)
-        except ValueError:
-            self._subscriberNodes.append(name)
-
-#  @subscriberNodes.deleter
-#  def subscriberNodes(self):
-#    del self._subscriberNodes
+        if isinstance(name, list):
+            self._subscribers = _create_names(name)
+        else:
+            self._subscribers = _add_name(self._subscribers, name)
 
     def copy(self):
         '''
@@ -382,8 +439,8 @@ class TopicInfo(object):
         '''
         result = TopicInfo(self.name)
         result.type = self.type
-        result._publisherNodes = list(self._publisherNodes)
-        result._subscriberNodes = list(self._subscriberNodes)
+        result._publishers = _copy_names(self._publishers)
+        result._subscribers = _copy_names(self._subscribers)
         return result
 
 
@@ -401,6 +458,8 @@ class ServiceInfo(object):
 
     :type masteruri: str
     '''
+    __slots__ = ('__name', '__masteruri', '__org_masteruri', '__uri', '__local', '__local_master',
+                 'type', '__service_class', 'args', '_providers')
 
     def __init__(self, name, masteruri):
         '''
@@ -426,7 +485,7 @@ class ServiceInfo(object):
         '''the type of the service. (Default: ``None``)'''
         self.__service_class = None
         self.args = None
-        self._serviceProvider = []
+        self._providers = ()
 
     @property
     def name(self):
@@ -508,25 +567,25 @@ class ServiceInfo(object):
 
         :rtype: list of strings
         '''
-        return self._serviceProvider
+        return list(self._providers)
 
     @serviceProvider.setter
     def serviceProvider(self, name):
         '''
-        Adds a new service provider, if no one with given name exists.
+        Adds a new service provider, if no one with given name exists. A list replaces all entries.
 
         :param name: name of the new service provider
 
-        :type name: str
+        :type name: str or list of strings
         '''
-        try:
-            self._serviceProvider.index(name)
-        except ValueError:
-            self._serviceProvider.append(name)
+        if isinstance(name, list):
+            self._providers = _create_names(name)
+        else:
+            self._providers = _add_name(self._providers, name)
 
     @serviceProvider.deleter
     def serviceProvider(self):
-        del self._serviceProvider
+        self._providers = ()
 
     def get_service_class(self, allow_get_type=False):
         '''
@@ -607,7 +666,7 @@ class ServiceInfo(object):
         result.masteruri = self.masteruri
         result.type = self.type
         result.args = self.args
-        result._serviceProvider = list(self.serviceProvider)
+        result._providers = _copy_names(self._providers)
         return result
 
 
@@ -626,6 +685,10 @@ class MasterInfo(object):
     :type mastername: str or ``None`` (Default: ``None``)
     '''
 
+    INTERN_NAMES = False
+    '''intern the names, types and master URIs of instances created by from_list(). The strings of
+    topics and nodes known by many ROS masters are then stored only once.'''
+
     def __init__(self, masteruri, mastername=None):
         '''
         Creates a new instance of the MasterInfo. The mastername will be extracted
@@ -653,20 +716,32 @@ class MasterInfo(object):
         '''the last time, when the state of the ROS master retrieved'''
 
     @staticmethod
-    def from_list(l):
+    def from_list(l, base=None):
         '''
         Creates a new instance of the MasterInfo from given list.
 
         :param l: the list returned by :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`
+                  or by :mod:`fkie_master_discovery.master_info.MasterInfo.listedStateDelta()`
 
         :type l: list
 
+        :param base: the listed state the delta in ``l`` is related to. Only used
+                     if ``l`` is a delta.
+
+        :type base: list
+
         :return: the new instance of the MasterInfo filled from list.
 
         :rtype: :mod:`fkie_master_discovery.master_info.MasterInfo`
+
+        :raise: ``ValueError``, if ``l`` is a delta not related to ``base``.
         '''
         if l is None:
             return None
+        if len(l) > 10:
+            l = MasterInfo.merge_delta(base, l)
+        if MasterInfo.INTERN_NAMES:
+            l = _intern_state(l)
         result = MasterInfo(l[2], l[3])
         result.timestamp = float(l[0])
         result.timestamp_local = float(l[1])
@@ -715,6 +790,23 @@ class MasterInfo(object):
             result.getService(servicename).type = stype
         return result
 
+    def shallow_copy(self):
+        '''
+        Creates a new instance with own lists of nodes, topics and services, but
+        the :mod:`fkie_master_discovery.master_info.NodeInfo`, :mod:`fkie_master_discovery.master_info.TopicInfo`
+        and :mod:`fkie_master_discovery.master_info.ServiceInfo` instances are shared with this
+        instance. To change an entry in the copy, replace it by a new instance.
+
+        :rtype: :mod:`fkie_master_discovery.master_info.MasterInfo`
+        '''
+        result = MasterInfo(self.__masteruri, self.__mastername)
+        result.__nodelist = dict(self.__nodelist)
+        result.__topiclist = dict(self.__topiclist)
+        result.__servicelist = dict(self.__servicelist)
+        result.timestamp = self.timestamp
+        result.timestamp_local = self.timestamp_local
+        return result
+
     @property
     def mastername(self):
         '''
@@ -1012,11 +1104,11 @@ class MasterInfo(object):
                     return False
 #        if n1.uri != n2.uri:
 #          return False
-                if set(n1.publishedTopics) ^ set(n2.publishedTopics):
+                if _names_differ(n1._published, n2._published):
                     return False
-                if set(n1.subscribedTopics) ^ set(n2.subscribedTopics):
+                if _names_differ(n1._subscribed, n2._subscribed):
                     return False
-                if set(n1.services) ^ set(n2.services):
+                if _names_differ(n1._provided, n2._provided):
                     return False
         return True
 #    finally:
@@ -1058,11 +1150,11 @@ class MasterInfo(object):
                         return True
                     if n1.uri != n2.uri:
                         return True
-                    if set(n1.publishedTopics) ^ set(n2.publishedTopics):
+                    if _names_differ(n1._published, n2._published):
                         return True
-                    if set(n1.subscribedTopics) ^ set(n2.subscribedTopics):
+                    if _names_differ(n1._subscribed, n2._subscribed):
                         return True
-                    if set(n1.services) ^ set(n2.services):
+                    if _names_differ(n1._provided, n2._provided):
                         return True
                 # after local start of asynchronized node. The next check of master state return the local node.
                 elif n2.isLocal or n2.isLocalMaster:
@@ -1161,14 +1253,14 @@ class MasterInfo(object):
         # filter the topics
         for name, topic in self.topics.items():
             pn = []
-            for n in topic.publisherNodes:
+            for n in topic._publishers:
                 if not iffilter.is_ignored_publisher(n, name, topic.type):
                     pn.append(n)
                     nodes_last_check.add(n)
             if pn:
                 publishers.append((name, pn))
             sn = []
-            for n in topic.subscriberNodes:
+            for n in topic._subscribers:
                 if not iffilter.is_ignored_subscriber(n, name, topic.type):
                     sn.append(n)
                     nodes_last_check.add(n)
@@ -1180,7 +1272,7 @@ class MasterInfo(object):
         # filter the services
         for name, service in self.services.items():
             srv_prov = []
-            for sp in service.serviceProvider:
+            for sp in service._providers:
                 if not iffilter.is_ignored_service(sp, name):
                     srv_prov.append(sp)
                     nodes_last_check.add(sp)
@@ -1195,6 +1287,340 @@ class MasterInfo(object):
 
         return (stamp, stamp_local, self.masteruri, self.mastername, publishers, subscribers, services, topicTypes, nodes, serviceProvider)
 
+    def listedStateDelta(self, since, changed_nodes, changed_topics, changed_services, filter_interface=None):
+        '''
+        Returns only the part of the extended ROS Master State, which contains the
+        given nodes, topics and services. Use
+        :mod:`fkie_master_discovery.master_info.MasterInfo.merge_delta()` to apply
+        the result to a state returned by
+        :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`.
+
+        :param str since: the timestamp of the state the changes are related to.
+                          An empty string marks a complete state.
+
+        :param changed_nodes: names of added, changed or removed nodes
+
+        :type changed_nodes: set of strings
+
+        :param changed_topics: names of added, changed or removed topics
+
+        :type changed_topics: set of strings
+
+        :param changed_services: names of added, changed or removed services
+
+        :type changed_services: set of strings
+
+        :param filter_interface: The filter used to filter the nodes, topics or serivces out.
+
+        :type filter_interface: FilterInterface
+
+        :return: the result of :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`
+                 restricted to the changed entries extended by
+
+                 ``(since, removed_nodes, removed_topics, removed_services)``
+
+                 The entries for a changed topic or service replace all entries of
+                 this topic or service in the old state.
+
+        :rtype: (``float``, ..., ``str``, ``[str]``, ``[str]``, ``[str]``)
+        '''
+        iffilter = filter_interface
+        if iffilter is None:
+            iffilter = FilterInterface.from_list()
+        stamp = '%.9f' % self.timestamp
+        stamp_local = '%.9f' % self.timestamp_local
+        publishers = []
+        subscribers = []
+        services = []
+        topicTypes = []
+        nodes = []
+        serviceProvider = []
+        removed_nodes = []
+        removed_topics = []
+        removed_services = []
+        # the listing of a node depends on the filter result of its topics and services
+        nodes_to_check = set(changed_nodes)
+
+        # filter the changed topics
+        for name in changed_topics:
+            topic = self.__topiclist.get(name, None)
+            if topic is None:
+                removed_topics.append(name)
+                continue
+            pn = [n for n in topic._publishers if not iffilter.is_ignored_publisher(n, name, topic.type)]
+            if pn:
+                publishers.append((name, pn))
+            sn = [n for n in topic._subscribers if not iffilter.is_ignored_subscriber(n, name, topic.type)]
+            if sn:
+                subscribers.append((name, sn))
+            if pn or sn:
+                topicTypes.append((name, topic.type))
+            else:
+                removed_topics.append(name)
+            nodes_to_check.update(topic._publishers)
+            nodes_to_check.update(topic._subscribers)
+
+        # filter the changed services
+        for name in changed_services:
+            service = self.__servicelist.get(name, None)
+            if service is None:
+                removed_services.append(name)
+                continue
+            srv_prov = [sp for sp in service._providers if not iffilter.is_ignored_service(sp, name)]
+            if srv_prov:
+                services.append((name, srv_prov))
+                serviceProvider.append((name, service.uri, str(service.masteruri), service.type if service.type is not None else '', 'local' if service.isLocal else 'remote'))
+            else:
+                removed_services.append(name)
+            nodes_to_check.update(service._providers)
+
+        # creates the nodes list
+        for name in nodes_to_check:
+            node = self.__nodelist.get(name, None)
+            if node is not None and self._is_listed_node(node, iffilter):
+                nodes.append((name, node.uri, str(node.masteruri), node.pid, 'local' if node.isLocal else 'remote'))
+            else:
+                removed_nodes.append(name)
+
+        return (stamp, stamp_local, self.masteruri, self.mastername, publishers, subscribers, services, topicTypes, nodes, serviceProvider,
+                since, removed_nodes, removed_topics, removed_services)
+
+    def _is_listed_node(self, node, iffilter):
+        # a node is listed, if it has at least one not ignored topic or service
+        for t in node._published:
+            topic = self.__topiclist.get(t, None)
+            if not iffilter.is_ignored_publisher(node.name, t, topic.type if topic is not None else None):
+                return True
+        for t in node._subscribed:
+            topic = self.__topiclist.get(t, None)
+            if not iffilter.is_ignored_subscriber(node.name, t, topic.type if topic is not None else None):
+                return True
+        for s in node._provided:
+            if not iffilter.is_ignored_service(node.name, s):
+                return True
+        return False
+
+    def changed_names(self, other):
+        '''
+        Compares the master state with an older master state and returns the names
+        of all nodes, topics and services, which are added, changed or removed.
+        The timestamp will not be compared.
+
+        :param other: the older MasterInfo instance.
+
+        :type other: :mod:`fkie_master_discovery.master_info.MasterInfo`
+
+        :return: a tuple with names of changed (nodes, topics, services)
+
+        :rtype: (set, set, set)
+        '''
+        if other is None:
+            return (set(self.__nodelist.keys()), set(self.__topiclist.keys()), set(self.__servicelist.keys()))
+        nodes = set(self.__nodelist.keys()) ^ set(other.nodes.keys())
+        for name, n1 in self.__nodelist.items():
+            n2 = other.getNode(name)
+            if n2 is not None:
+                if (n1.uri != n2.uri or n1.masteruri != n2.masteruri or n1.pid != n2.pid or n1.isLocal != n2.isLocal or
+                        _names_differ(n1._published, n2._published) or
+                        _names_differ(n1._subscribed, n2._subscribed) or
+                        _names_differ(n1._provided, n2._provided)):
+                    nodes.add(name)
+        topics = set(self.__topiclist.keys()) ^ set(other.topics.keys())
+        for name, t1 in self.__topiclist.items():
+            t2 = other.getTopic(name)
+            if t2 is not None:
+                if (t1.type != t2.type or
+                        _names_differ(t1._publishers, t2._publishers) or
+                        _names_differ(t1._subscribers, t2._subscribers)):
+                    topics.add(name)
+        services = set(self.__servicelist.keys()) ^ set(other.services.keys())
+        for name, s1 in self.__servicelist.items():
+            s2 = other.getService(name)
+            if s2 is not None:
+                if (s1.uri != s2.uri or s1.masteruri != s2.masteruri or s1.type != s2.type or s1.isLocal != s2.isLocal or
+                        _names_differ(s1._providers, s2._providers)):
+                    services.add(name)
+        return (nodes, topics, services)
+
+    @staticmethod
+    def merge_delta(base, delta):
+        '''
+        Applies the result of :mod:`fkie_master_discovery.master_info.MasterInfo.listedStateDelta()`
+        to a state returned by :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`.
+
+        :param base: the listed state the delta is related to. Can be ``None``
+                     if the delta contains a complete state.
+
+        :type base: list
+
+        :param delta: the listed delta
+
+        :type delta: list
+
+        :return: the new state in format of :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`
+
+        :rtype: tuple
+
+        :raise: ``ValueError``, if the delta is not related to the given base state.
+        '''
+        if len(delta) <= 10 or not delta[10]:
+            # it is a complete state
+            return tuple(delta[:10])
+        if base is None or base[0] != delta[10]:
+            raise ValueError("delta since %s does not match the state %s" % (delta[10], base[0] if base is not None else None))
+        removed_nodes, removed_topics, removed_services = delta[11], delta[12], delta[13]
+        topics = set(removed_topics)
+        topics.update([name for name, _ in delta[7]])
+        services = set(removed_services)
+        services.update([name for name, _ in delta[6]])
+        nodes = set(removed_nodes)
+        nodes.update([n[0] for n in delta[8]])
+        publishers = [item for item in base[4] if item[0] not in topics] + list(delta[4])
+        subscribers = [item for item in base[5] if item[0] not in topics] + list(delta[5])
+        srv_list = [item for item in base[6] if item[0] not in services] + list(delta[6])
+        topicTypes = [item for item in base[7] if item[0] not in topics] + list(delta[7])
+        node_list = [item for item in base[8] if item[0] not in nodes] + list(delta[8])
+        serviceProvider = [item for item in base[9] if item[0] not in services] + list(delta[9])
+        return (delta[0], delta[1], delta[2], delta[3], publishers, subscribers, srv_list, topicTypes, node_list, serviceProvider)
+
+    @staticmethod
+    def pack_state(state, compress=True):
+        '''
+        Packs the listed state into a compact binary format. All names, URIs and
+        types are stored once in a string table and referenced by integers.
+
+        :param state: the state returned by :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`
+                      or by :mod:`fkie_master_discovery.master_info.MasterInfo.listedStateDelta()`
+
+        :type state: tuple
+
+        :param bool compress: compress the packed state using zlib
+
+        :return: the packed state, use :mod:`fkie_master_discovery.master_info.MasterInfo.unpack_state()` to restore it.
+
+        :rtype: bytes
+        '''
+        # reference 0 is reserved for None
+        strings = {}
+        values = []
+        append = values.append
+
+        def ref(value):
+            if value is None:
+                return 0
+            return strings.setdefault(value, len(strings) + 1)
+        for value in state[:4]:
+            append(ref(value))
+        # publishers, subscribers, services
+        for entries in state[4:7]:
+            append(len(entries))
+            for name, nodes in entries:
+                append(ref(name))
+                append(len(nodes))
+                values.extend([ref(n) for n in nodes])
+        append(len(state[7]))
+        for topic, ttype in state[7]:
+            append(ref(topic))
+            append(ref(ttype))
+        append(len(state[8]))
+        for name, uri, masteruri, pid, local in state[8]:
+            values.extend((ref(name), ref(uri), ref(masteruri), 0 if pid is None else int(pid) + 1, ref(local)))
+        append(len(state[9]))
+        for name, uri, masteruri, stype, local in state[9]:
+            values.extend((ref(name), ref(uri), ref(masteruri), ref(stype), ref(local)))
+        if len(state) > 10:
+            # delta: since, removed nodes, topics and services
+            append(ref(state[10]))
+            for removed in state[11:14]:
+                append(len(removed))
+                values.extend([ref(name) for name in removed])
+        table = [None] * len(strings)
+        for value, idx in strings.items():
+            table[idx - 1] = value if isinstance(value, bytes) else value.encode('utf-8')
+        ints = array.array(_PACKED_INT, values)
+        if sys.byteorder != 'little':
+            ints.byteswap()
+        ints = ints.tobytes() if hasattr(ints, 'tobytes') else ints.tostring()
+        body = b'\x00'.join(table) + ints
+        flags = 0
+        if compress:
+            body = zlib.compress(body, 1)
+            flags |= _PACKED_ZLIB
+        return _PACKED_HEADER.pack(_PACKED_MAGIC, _PACKED_VERSION, flags, len(state), len(table), len(values)) + body
+
+    @staticmethod
+    def unpack_state(data):
+        '''
+        Restores the listed state packed by :mod:`fkie_master_discovery.master_info.MasterInfo.pack_state()`.
+
+        :param bytes data: the packed state
+
+        :return: the state in format of :mod:`fkie_master_discovery.master_info.MasterInfo.listedState()`
+                 or :mod:`fkie_master_discovery.master_info.MasterInfo.listedStateDelta()`
+
+        :rtype: tuple
+
+        :raise: ``ValueError``, if the data has an unknown format.
+        '''
+        if len(data) < _PACKED_HEADER.size:
+            raise ValueError("packed state too short")
+        magic, version, flags, count_fields, count_strings, count_ints = _PACKED_HEADER.unpack_from(data)
+        if magic != _PACKED_MAGIC or version != _PACKED_VERSION:
+            raise ValueError("unknown format of the packed state: %s, version %d" % (magic, version))
+        body = data[_PACKED_HEADER.size:]
+        if flags & _PACKED_ZLIB:
+            body = zlib.decompress(body)
+        ints = array.array(_PACKED_INT)
+        ints_size = count_ints * ints.itemsize
+        ints_data = body[len(body) - ints_size:]
+        if hasattr(ints, 'frombytes'):
+            ints.frombytes(ints_data)
+        else:
+            ints.fromstring(ints_data)
+        if sys.byteorder != 'little':
+            ints.byteswap()
+        ints = ints.tolist()
+        table = [None]
+        if count_strings:
+            table.extend(body[:len(body) - ints_size].decode('utf-8').split('\x00'))
+        if len(table) != count_strings + 1:
+            raise ValueError("corrupt string table in packed state")
+        pos = 4
+        result = [table[idx] for idx in ints[:4]]
+        # publishers, subscribers, services
+        for _ in range(3):
+            entries = []
+            count = ints[pos]
+            pos += 1
+            for _ in range(count):
+                name = table[ints[pos]]
+                count_nodes = ints[pos + 1]
+                pos += 2
+                entries.append((name, [table[idx] for idx in ints[pos:pos + count_nodes]]))
+                pos += count_nodes
+            result.append(entries)
+        count = ints[pos]
+        pos += 1
+        result.append([(table[ints[i]], table[ints[i + 1]]) for i in range(pos, pos + 2 * count, 2)])
+        pos += 2 * count
+        count = ints[pos]
+        pos += 1
+        result.append([(table[ints[i]], table[ints[i + 1]], table[ints[i + 2]], ints[i + 3] - 1 if ints[i + 3] else None, table[ints[i + 4]]) for i in range(pos, pos + 5 * count, 5)])
+        pos += 5 * count
+        count = ints[pos]
+        pos += 1
+        result.append([tuple(table[idx] for idx in ints[i:i + 5]) for i in range(pos, pos + 5 * count, 5)])
+        pos += 5 * count
+        if count_fields > 10:
+            result.append(table[ints[pos]])
+            pos += 1
+            for _ in range(3):
+                count = ints[pos]
+                pos += 1
+                result.append([table[idx] for idx in ints[pos:pos + count]])
+                pos += count
+        return tuple(result)
+
 #  def __str__(self):
 #    return str(self.listedState())
 
@@ -1234,12 +1660,12 @@ class MasterInfo(object):
                 if own_topic.type != other_topic.type:
                     topics_changed.add(t)
                     own_topic.type = other_topic.type
-                if set(own_topic._publisherNodes) ^ set(other_topic.publisherNodes):
+                if _names_differ(own_topic._publishers, other_topic._publishers):
                     topics_changed.add(t)
-                    own_topic._publisherNodes = other_topic.publisherNodes
-                if set(own_topic._subscriberNodes) ^ set(other_topic.subscriberNodes):
+                    own_topic._publishers = _copy_names(other_topic._publishers)
+                if _names_differ(own_topic._subscribers, other_topic._subscribers):
                     topics_changed.add(t)
-                    own_topic._subscriberNodes = other_topic.subscriberNodes
+                    own_topic._subscribers = _copy_names(other_topic._subscribers)
             topics_added = other_topics_set - own_topics_set
             for t in topics_added:
                 self.__topiclist[t] = other.__topiclist[t]
@@ -1285,15 +1711,15 @@ class MasterInfo(object):
                         nodes_changed.add(n)
                         own_node.uri = other_node.uri
                     # update subscriptions of nodes
-                    if set(own_node._publishedTopics) ^ set(other_node.publishedTopics):
+                    if _names_differ(own_node._published, other_node._published):
                         nodes_changed.add(n)
-                        own_node._publishedTopics = other_node.publishedTopics
-                    if set(own_node._subscribedTopics) ^ set(other_node.subscribedTopics):
+                        own_node._published = _copy_names(other_node._published)
+                    if _names_differ(own_node._subscribed, other_node._subscribed):
                         nodes_changed.add(n)
-                        own_node._subscribedTopics = other_node.subscribedTopics
-                    if set(own_node._services) ^ set(other_node.services):
+                        own_node._subscribed = _copy_names(other_node._subscribed)
+                    if _names_differ(own_node._provided, other_node._provided):
                         nodes_changed.add(n)
-                        own_node._services = other_node.services
+                        own_node._provided = _copy_names(other_node._provided)
         # add new nodes
         nodes_added = set()
         if local_info:
@@ -1343,9 +1769,9 @@ class MasterInfo(object):
                         services_changed.add(s)
                         own_srv.args = other_srv.args
                     # update provider
-                    if set(own_srv._serviceProvider) ^ set(other_srv.serviceProvider):
+                    if _names_differ(own_srv._providers, other_srv._providers):
                         services_changed.add(s)
-                        own_srv._serviceProvider = other_srv.serviceProvider
+                        own_srv._providers = _copy_names(other_srv._providers)
         # add new services
         srvs_added = set()
         if local_info:
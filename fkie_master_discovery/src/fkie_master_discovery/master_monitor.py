@@ -32,15 +32,14 @@
 try:
     from SimpleXMLRPCServer import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
     from SocketServer import ThreadingMixIn
-    import cStringIO as io  # python 2 compatibility
 except ImportError:
     from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
     from socketserver import ThreadingMixIn
-    import io
 try:
     from urlparse import urlparse  # python 2 compatibility
 except ImportError:
     from urllib.parse import urlparse
+import collections
 from datetime import datetime
 import getpass
 import roslib.network
@@ -48,7 +47,6 @@ import roslib.message
 import rospy
 import socket
 import subprocess
-import sys
 import threading
 import time
 import traceback
@@ -62,7 +60,10 @@ from . import interface_finder
 from .common import masteruri_from_ros, get_hostname
 from .common import gen_pattern
 from .filter_interface import FilterInterface
-from .master_info import MasterInfo
+from .master_info import MasterInfo, NodeInfo, ServiceInfo, TopicInfo
+from . import prober
+from .worker_pool import WorkerPoolMixIn
+from .xmlrpc_pool import server_proxy
 
 
 try:  # to avoid the problems with autodoc on ros.org/wiki site
@@ -86,7 +87,108 @@ def _succeed(args):
     return val
 
 
-class RPCThreading(ThreadingMixIn, SimpleXMLRPCServer):
+def _changed_keys(new, old):
+    # returns the keys with different values in given dictionaries, includes added and removed keys
+    result = [key for key, value in new.items() if old.get(key, None) != value]
+    result.extend([key for key in old.keys() if key not in new])
+    return result
+
+
+class RPCRequestHandler(SimpleXMLRPCRequestHandler):
+    '''
+    Keeps the connections open for further requests (HTTP/1.1). Idle connections
+    are closed after `timeout` seconds to release the handler threads.
+    '''
+    protocol_version = 'HTTP/1.1'
+    timeout = 30
+
+    def log_message(self, format, *args):
+        # e.g. 'Request timed out' on closing of idle connections
+        rospy.logdebug("RPC server %s: %s", self.client_address[0], format % args)
+
+
+class RPCResponseCache(object):
+    '''
+    Caches the marshalled XML-RPC responses of methods whose result depends only on the
+    parameters of the request and the current state. Identical requests are answered
+    without calling the method and marshalling the result again. All entries are
+    dropped when the state changes.
+
+    :param methods: the names of the cached XML-RPC methods
+    :type methods: [str]
+    :param state_key: returns the key of the current state or `None` to bypass the cache
+    :type state_key: function()
+    '''
+
+    MAX_ENTRIES = 64
+    '''the maximal count of cached responses for one state (Default: ``64``)'''
+
+    def __init__(self, methods, state_key):
+        self._methods = set(methods)
+        self._state_key = state_key
+        self._lock = threading.Lock()
+        self._current_key = None
+        self._entries = collections.OrderedDict()  # (method, repr(params)): response
+        self.hits = 0
+        self.misses = 0
+
+    def dispatch(self, data, marshaled_dispatch):
+        '''
+        Returns the cached response for the request or the result of `marshaled_dispatch()`.
+
+        :param data: the XML-RPC request
+        :param marshaled_dispatch: creates the marshalled response
+        :type marshaled_dispatch: function()
+        '''
+        try:
+            params, method = xmlrpcclient.loads(data)
+        except Exception:
+            return marshaled_dispatch()
+        if method not in self._methods:
+            return marshaled_dispatch()
+        state_key = self._state_key()
+        if state_key is None:
+            return marshaled_dispatch()
+        key = (method, repr(params))
+        with self._lock:
+            if state_key == self._current_key:
+                response = self._entries.get(key, None)
+                if response is not None:
+                    self.hits += 1
+                    return response
+            self.misses += 1
+        # the state used by the method is equal to or newer than the state of `state_key`
+        response = marshaled_dispatch()
+        if b'<fault>' not in response:
+            with self._lock:
+                if state_key != self._current_key:
+                    self._entries.clear()
+                    self._current_key = state_key
+                self._entries[key] = response
+                if len(self._entries) > self.MAX_ENTRIES:
+                    self._entries.popitem(last=False)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_key = None
+
+
+class _ResponseCacheMixin(object):
+    '''
+    Answers the requests from :class:`RPCResponseCache` if `response_cache` is set.
+    '''
+
+    response_cache = None
+
+    def _marshaled_dispatch(self, data, dispatch_method=None, path=None):
+        if self.response_cache is None:
+            return SimpleXMLRPCServer._marshaled_dispatch(self, data, dispatch_method, path)
+        return self.response_cache.dispatch(data, lambda: SimpleXMLRPCServer._marshaled_dispatch(self, data, dispatch_method, path))
+
+
+class RPCThreading(_ResponseCacheMixin, ThreadingMixIn, SimpleXMLRPCServer):
     # When inheriting from ThreadingMixIn for threaded connection behavior, you should explicitly
     # declare how you want your threads to behave on an abrupt shutdown. The ThreadingMixIn class
     # defines an attribute daemon_threads, which indicates whether or not the server should wait
@@ -95,13 +197,13 @@ class RPCThreading(ThreadingMixIn, SimpleXMLRPCServer):
     # threads created by ThreadingMixIn have exited.
     daemon_threads = True
 
-    def __init__(self, addr, requestHandler=SimpleXMLRPCRequestHandler,
+    def __init__(self, addr, requestHandler=RPCRequestHandler,
                  logRequests=True, allow_none=False, encoding=None, bind_and_activate=True):
         SimpleXMLRPCServer.__init__(self, addr, requestHandler=requestHandler,
                  logRequests=logRequests, allow_none=allow_none, encoding=encoding, bind_and_activate=bind_and_activate)
 
 
-class RPCThreadingV6(ThreadingMixIn, SimpleXMLRPCServer):
+class RPCThreadingV6(_ResponseCacheMixin, ThreadingMixIn, SimpleXMLRPCServer):
     address_family = socket.AF_INET6
     # When inheriting from ThreadingMixIn for threaded connection behavior, you should explicitly
     # declare how you want your threads to behave on an abrupt shutdown. The ThreadingMixIn class
@@ -111,12 +213,33 @@ class RPCThreadingV6(ThreadingMixIn, SimpleXMLRPCServer):
     # threads created by ThreadingMixIn have exited.
     daemon_threads = True
 
-    def __init__(self, addr, requestHandler=SimpleXMLRPCRequestHandler,
+    def __init__(self, addr, requestHandler=RPCRequestHandler,
                  logRequests=True, allow_none=False, encoding=None, bind_and_activate=True):
         SimpleXMLRPCServer.__init__(self, addr, requestHandler=requestHandler,
                  logRequests=logRequests, allow_none=allow_none, encoding=encoding, bind_and_activate=bind_and_activate)
 
 
+class RPCWorkerPool(_ResponseCacheMixin, WorkerPoolMixIn, SimpleXMLRPCServer):
+    '''
+    XML-RPC server which handles the requests in a bounded pool of worker threads.
+    '''
+
+    def __init__(self, addr, requestHandler=RPCRequestHandler,
+                 logRequests=True, allow_none=False, encoding=None, bind_and_activate=True, workers=8, queue_size=64):
+        SimpleXMLRPCServer.__init__(self, addr, requestHandler=requestHandler,
+                 logRequests=logRequests, allow_none=allow_none, encoding=encoding, bind_and_activate=bind_and_activate)
+        self.idle_timeout = requestHandler.timeout
+        self.init_worker_pool(workers, queue_size)
+
+    def shutdown(self):
+        SimpleXMLRPCServer.shutdown(self)
+        self.stop_worker_pool()
+
+
+class RPCWorkerPoolV6(RPCWorkerPool):
+    address_family = socket.AF_INET6
+
+
 class MasterMonitor(object):
     '''
     This class provides methods to get the state from the ROS master using his
@@ -138,14 +261,43 @@ class MasterMonitor(object):
         :mod:`fkie_master_discovery.master_monitor.MasterMonitor.getListedMasterInfo()` or
         :mod:`fkie_master_discovery.master_monitor.MasterMonitor.getMasterContacts()` as RPC:
         ``masterInfo()`` and ``masterContacts()``
+
+        :mod:`fkie_master_discovery.master_monitor.MasterMonitor.getListedMasterInfoDelta()` as RPC:
+        ``masterInfoDelta()``
+
+        :mod:`fkie_master_discovery.master_monitor.MasterMonitor.getPackedMasterInfo()` as RPC:
+        ``masterInfoPacked()``
+
+        :mod:`fkie_master_discovery.master_monitor.MasterMonitor.getServerMetrics()` as RPC:
+        ``serverMetrics()``
     '''
 
     MAX_PING_SEC = 10.0
     ''' The time to update the node URI, ID or service URI (Default: ``10.0``)'''
 
+    STATE_JOURNAL_SIZE = 100
+    ''' The count of state changes stored to answer the ``masterInfoDelta()`` requests (Default: ``100``)'''
+
     INTERVAL_UPDATE_LAUNCH_URIS = 15.0
 
-    def __init__(self, rpcport=11611, do_retry=True, ipv6=False, rpc_addr=''):
+    INCREMENTAL_UPDATE = True
+    ''' Update only the changed entries of the master state instead of creating the whole state in each cycle (Default: ``True``)'''
+
+    SYNC_INFO_TIMEOUT = 3.0
+    ''' The timeout [sec] of the ``get_sync_info`` service call (Default: ``3.0``)'''
+
+    RPC_SERVER = 'threading'
+    ''' The backend of the XML-RPC server: ``threading`` creates a thread for each connection, ``pool`` handles the
+    requests in a bounded pool of worker threads (Default: ``threading``)'''
+
+    RPC_WORKERS = 8
+    ''' The count of worker threads of the ``pool`` backend (Default: ``8``)'''
+
+    RPC_QUEUE_SIZE = 64
+    ''' The maximal count of requests waiting for a worker of the ``pool`` backend. Further requests
+    are rejected (Default: ``64``)'''
+
+    def __init__(self, rpcport=11611, do_retry=True, ipv6=False, rpc_addr='', param_update_callback=None):
         '''
         Initialize method. Creates an XML-RPC server on given port and starts this
         in its own thread.
@@ -161,17 +313,32 @@ class MasterMonitor(object):
         :param ipv6: Use ipv6
 
         :type ipv6: bool
+
+        :param param_update_callback: called with the key of the parameter, if a parameter
+                                      in `/roslaunch/uris` was changed, e.g. by a new roslaunch.
+
+        :type param_update_callback: function(str)
         '''
+        self._param_update_callback = param_update_callback
         self._state_access_lock = threading.RLock()
         self._create_access_lock = threading.RLock()
         self._lock = threading.RLock()
         self.__masteruri = masteruri_from_ros()
         self.__new_master_state = None
+        # the system state of the ROS master as dictionaries (topic types, publishers, subscribers, services)
+        self.__raw_state = None
+        self.__new_raw_state = None
+        # changed names (nodes, topics, services) of the new master state, `None` if the state was created completely
+        self.__new_changes = None
+        self.INCREMENTAL_UPDATE = rospy.get_param('~incremental_update', MasterMonitor.INCREMENTAL_UPDATE)
         self.__masteruri_rpc = None
         self.__mastername = None
         self.__cached_nodes = dict()
         self.__cached_services = dict()
+        # (previous timestamp, timestamp, changed nodes, changed topics, changed services)
+        self._state_journal = collections.deque(maxlen=self.STATE_JOURNAL_SIZE)
         self.ros_node_name = str(rospy.get_name())
+        self._prober = prober.Prober(self.ros_node_name, budget=rospy.get_param('~probe_budget', prober.Prober.BUDGET))
         if rospy.has_param('~name'):
             self.__mastername = rospy.get_param('~name')
         self.__mastername = self.getMastername()
@@ -186,24 +353,44 @@ class MasterMonitor(object):
         self._last_clearup_ts = time.time()
 
         self._master_errors = list()
+        # the name of the get_sync_info service of the master_sync node and a persistent proxy
+        self._sync_info_service = None
+        self._sync_info_searched = False
+        self._sync_info_proxy = None
+        self._sync_info_uri = None
+        # answers identical requests for the unchanged state from cache
+        self.response_cache = RPCResponseCache(['masterInfo', 'masterInfoFiltered', 'masterInfoDelta', 'masterInfoPacked'], self._response_cache_key)
         # Create an XML-RPC server
+        self.rpc_server_backend = rospy.get_param('~rpc_server', self.RPC_SERVER)
+        rpc_args = dict()
+        if self.rpc_server_backend == 'pool':
+            rpc_args['workers'] = rospy.get_param('~rpc_workers', self.RPC_WORKERS)
+            rpc_args['queue_size'] = rospy.get_param('~rpc_queue_size', self.RPC_QUEUE_SIZE)
+        elif self.rpc_server_backend != 'threading':
+            rospy.logwarn("Unknown RPC server backend '%s', use 'threading'" % self.rpc_server_backend)
+            self.rpc_server_backend = 'threading'
         self.ready = False
         while not self.ready and not rospy.is_shutdown():
             try:
-                RPCClass = RPCThreading
-                if ipv6:
-                    RPCClass = RPCThreadingV6
-                self.rpcServer = RPCClass((rpc_addr, rpcport), logRequests=False, allow_none=True)
+                if self.rpc_server_backend == 'pool':
+                    RPCClass = RPCWorkerPoolV6 if ipv6 else RPCWorkerPool
+                else:
+                    RPCClass = RPCThreadingV6 if ipv6 else RPCThreading
+                self.rpcServer = RPCClass((rpc_addr, rpcport), logRequests=False, allow_none=True, **rpc_args)
+                self.rpcServer.response_cache = self.response_cache
                 rospy.loginfo("Start RPC-XML Server at %s", self.rpcServer.server_address)
                 self.rpcServer.register_introspection_functions()
                 self.rpcServer.register_function(self.getListedMasterInfo, 'masterInfo')
                 self.rpcServer.register_function(self.getListedMasterInfoFiltered, 'masterInfoFiltered')
+                self.rpcServer.register_function(self.getListedMasterInfoDelta, 'masterInfoDelta')
+                self.rpcServer.register_function(self.getPackedMasterInfo, 'masterInfoPacked')
                 self.rpcServer.register_function(self.getMasterContacts, 'masterContacts')
                 self.rpcServer.register_function(self.getMasterErrors, 'masterErrors')
                 self.rpcServer.register_function(self.getCurrentTime, 'getCurrentTime')
                 self.rpcServer.register_function(self.setTime, 'setTime')
                 self.rpcServer.register_function(self.getTopicsMd5sum, 'getTopicsMd5sum')
                 self.rpcServer.register_function(self.getUser, 'getUser')
+                self.rpcServer.register_function(self.getServerMetrics, 'serverMetrics')
                 self._rpcThread = threading.Thread(target=self.rpcServer.serve_forever)
                 self._rpcThread.setDaemon(True)
                 self._rpcThread.start()
@@ -251,6 +438,8 @@ class MasterMonitor(object):
                     del self.__launch_uris[key]
             except:
                 pass
+        if self._param_update_callback is not None:
+            self._param_update_callback(key)
 
     def shutdown(self):
         '''
@@ -268,6 +457,9 @@ class MasterMonitor(object):
                     self._master.unsubscribeParam(self.ros_node_name, rospy.get_node_uri(), '/roslaunch/uris')
                 except Exception as e:
                     rospy.logwarn("Error while unsubscribe from `/roslaunch/uris`: %s" % e)
+            if self._sync_info_proxy is not None:
+                self._sync_info_proxy.close()
+                self._sync_info_proxy = None
             rospy.loginfo("shutdown own RPC server")
             self.rpcServer.shutdown()
             del self.rpcServer.socket
@@ -301,108 +493,62 @@ class MasterMonitor(object):
                     self._timer_update_launch_uris = threading.Timer(self.INTERVAL_UPDATE_LAUNCH_URIS, self._update_launch_uris)
                     self._timer_update_launch_uris.start()
 
-    def _getNodePid(self, nodes):
+    def _probe(self, master_state, nodes, services):
         '''
-        Gets process id of the node.
-        This method blocks until the info is retrieved or socket timeout is reached (0.7 seconds).
-
-        :param nodename: the name of the node
-
-        :type nodename: str
-
-        :param uri: the uri of the node
-
-        :type uri: str
+        Gets the process ids of the nodes and the types of the services concurrently.
+        This method blocks until all probes are finished or the budget of the prober is consumed.
+        The URIs of the nodes which do not respond are updated from the ROS master.
+
+        :param master_state: the state to update
+        :type master_state: :mod:`fkie_master_discovery.master_info.MasterInfo`
+        :param nodes: the URIs of the nodes to probe {name: uri}
+        :type nodes: dict(str: str)
+        :param services: the URIs of the services to probe {name: uri}
+        :type services: dict(str: str)
         '''
-        for (nodename, uri) in nodes.items():
-            if uri is not None:
-                pid = None
-                try:
-                    with self._lock:
-                        if nodename in self.__cached_nodes:
-                            if time.time() - self.__cached_nodes[nodename][2] < self.MAX_PING_SEC:
-                                return
-                    socket.setdefaulttimeout(0.7)
-                    node = xmlrpcclient.ServerProxy(uri)
-                    pid = _succeed(node.getPid(self.ros_node_name))
-                except (Exception, socket.error) as e:
-                    with self._lock:
-                        self._limited_log(nodename, "can't get PID: %s" % str(e), level=rospy.DEBUG)
-                    master = xmlrpcclient.ServerProxy(self.getMasteruri())
-                    code, message, new_uri = master.lookupNode(self.ros_node_name, nodename)
-                    with self._lock:
-                        self.__new_master_state.getNode(nodename).uri = None if (code == -1) else new_uri
+        pids, types, failed = self._prober.run(nodes, services)
+        now = time.time()
+        lookup_nodes = []
+        with self._lock:
+            for nodename, pid in pids.items():
+                master_state.getNode(nodename).pid = pid
+                self.__cached_nodes[nodename] = (nodes[nodename], pid, now)
+            for service, stype in types.items():
+                master_state.getService(service).type = stype
+                self.__cached_services[service] = (services[service], stype, now)
+            for (kind, name), error in failed.items():
+                if kind == prober.NODE:
+                    self._limited_log(name, "can't get PID: %s" % error, level=rospy.DEBUG)
+                    self.__cached_nodes.pop(name, None)
+                    lookup_nodes.append(name)
+                else:
+                    self._limited_log(name, "can't get service type: %s" % error, level=rospy.DEBUG)
+                    self.__cached_services.pop(name, None)
+        if lookup_nodes:
+            try:
+                # the timeout of this call only, the default timeout is used by other threads
+                with server_proxy(self.getMasteruri(), timeout=5, use_gzip=False) as master:
+                    param_server_multi = xmlrpcclient.MultiCall(master)
+                    for nodename in lookup_nodes:
+                        param_server_multi.lookupNode(self.ros_node_name, nodename)
+                    r = param_server_multi()
+                with self._lock:
+                    for (code, message, new_uri), nodename in zip(r, lookup_nodes):
+                        node = master_state.getNode(nodename)
+                        if node is not None:
+                            node.uri = None if (code == -1) else new_uri
                         if code == -1:
                             self._limited_log(nodename, "can't update contact information. ROS master responds with: %s" % message)
-                        try:
-                            del self.__cached_nodes[nodename]
-                        except:
-                            pass
-                else:
-                    with self._lock:
-                        self.__new_master_state.getNode(nodename).pid = pid
-                        self.__cached_nodes[nodename] = (uri, pid, time.time())
-#          print "_getNodePid _lock RET", threading.current_thread()
-                finally:
-                    socket.setdefaulttimeout(None)
-
-    def _getServiceInfo(self, services):
-        '''
-        Gets service info through the RPC interface of the service.
-        This method blocks until the info is retrieved or socket timeout is reached (0.5 seconds).
-
-        :param service: the name of the service
-
-        :type service: str
+            except Exception as e:
+                with self._lock:
+                    self._limited_log('lookupNode', "can't update contact information of not responding nodes: %s" % e, level=rospy.DEBUG)
 
-        :param uri: the uri of the service
-
-        :type uri: str
-        '''
-        for (service, uri) in services.items():
-            with self._lock:
-                if service in self.__cached_services:
-                    if time.time() - self.__cached_services[service][2] < self.MAX_PING_SEC:
-                        return
-            if uri is not None:
-                dest_addr = dest_port = None
-                try:
-                    dest_addr, dest_port = rospy.parse_rosrpc_uri(uri)
-                except:
-                    continue
-        #      raise ROSServiceException("service [%s] has an invalid RPC URI [%s]"%(service, uri))
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                try:
-                    # connect to service and probe it to get the headers
-                    s.settimeout(0.5)
-                    s.connect((dest_addr, dest_port))
-                    header = {'probe': '1', 'md5sum': '*',
-                              'callerid': self.ros_node_name, 'service': service}
-                    roslib.network.write_ros_handshake_header(s, header)
-                    buf = io.StringIO() if sys.version_info < (3, 0) else io.BytesIO()
-                    stype = roslib.network.read_ros_handshake_header(s, buf, 2048)
-                    with self._lock:
-                        self.__new_master_state.getService(service).type = stype['type']
-                        self.__cached_services[service] = (uri, stype['type'], time.time())
-                except socket.error:
-                    with self._lock:
-                        try:
-                            del self.__cached_services[service]
-                        except:
-                            pass
-        #      raise ROSServiceIOException("Unable to communicate with service [%s], address [%s]"%(service, uri))
-                except:
-                    with self._lock:
-                        self._limited_log(service, "can't get service type: %s" % traceback.format_exc(), level=rospy.DEBUG)
-                    with self._lock:
-                        try:
-                            del self.__cached_services[service]
-                        except:
-                            pass
-                    pass
-                finally:
-                    if s is not None:
-                        s.close()
+    def _response_cache_key(self):
+        # the cached responses are valid until the master state is replaced
+        with self._state_access_lock:
+            if self.__master_state is None:
+                return None
+            return (self.__master_state.timestamp, self.__master_state.timestamp_local)
 
     def getListedMasterInfo(self):
         '''
@@ -438,6 +584,80 @@ class MasterMonitor(object):
                 print(traceback.format_exc())
         return result
 
+    def getListedMasterInfoDelta(self, since_timestamp, filter_list):
+        '''
+        Returns only the nodes, topics and services changed since the state with
+        given timestamp. If the changes since this state are not available any more
+        the complete state is returned.
+
+        :param str since_timestamp: the timestamp (first entry) of the last received
+                                    state. An empty string requests the complete state.
+
+        :param filter_list: the filter created by :mod:`fkie_master_discovery.filter_interface.FilterInterface.to_list()`.
+                            An empty list disables the filter.
+
+        :return: a extended ROS Master State delta. Use
+                 :mod:`fkie_master_discovery.master_info.MasterInfo.merge_delta()` to apply it.
+
+        :rtype:  :mod:`fkie_master_discovery.master_info.MasterInfo.listedStateDelta()` for result type
+        '''
+        t = str(time.time())
+        result = (t, t, self.getMasteruri(), str(self.getMastername()), [], [], [], [], [], [], '', [], [], [])
+        if not (self.__master_state is None):
+            try:
+                with self._state_access_lock:
+                    fi = None
+                    if filter_list:
+                        fi = FilterInterface.from_list(filter_list)
+                        fi.set_hide_pattern(self._re_hide_nodes, self._re_hide_topics, self._re_hide_services)
+                    changes = self._get_changes_since(since_timestamp)
+                    if changes is None:
+                        result = self.__master_state.listedState(fi) + ('', [], [], [])
+                    else:
+                        result = self.__master_state.listedStateDelta(since_timestamp, changes[0], changes[1], changes[2], fi)
+            except:
+                print(traceback.format_exc())
+        return result
+
+    def getPackedMasterInfo(self, since_timestamp, filter_list, compress):
+        '''
+        Returns the same state as :mod:`fkie_master_discovery.master_monitor.MasterMonitor.getListedMasterInfoDelta()`
+        in a compact binary format.
+
+        :param str since_timestamp: the timestamp (first entry) of the last received
+                                    state. An empty string requests the complete state.
+
+        :param filter_list: the filter created by :mod:`fkie_master_discovery.filter_interface.FilterInterface.to_list()`.
+                            An empty list disables the filter.
+
+        :param bool compress: compress the packed state using zlib
+
+        :return: the packed state delta. Use :mod:`fkie_master_discovery.master_info.MasterInfo.unpack_state()`
+                 to restore it.
+
+        :rtype:  xmlrpclib.Binary
+        '''
+        return xmlrpcclient.Binary(MasterInfo.pack_state(self.getListedMasterInfoDelta(since_timestamp, filter_list), compress))
+
+    def _get_changes_since(self, since_timestamp):
+        # returns the names of changed (nodes, topics, services) or None, if the timestamp is not in the journal
+        if not since_timestamp:
+            return None
+        nodes = set()
+        topics = set()
+        services = set()
+        if since_timestamp == '%.9f' % self.__master_state.timestamp:
+            return (nodes, topics, services)
+        found = False
+        for prev_ts, _ts, n, t, s in self._state_journal:
+            if not found and prev_ts == since_timestamp:
+                found = True
+            if found:
+                nodes.update(n)
+                topics.update(t)
+                services.update(s)
+        return (nodes, topics, services) if found else None
+
     def getCurrentState(self):
         '''
         :return: The current ROS Master State
@@ -464,14 +684,18 @@ class MasterMonitor(object):
         '''
         with self._create_access_lock:
             now = time.time()
-            threads = []
+            nodes = dict()
+            services = dict()
+            changes = None
+            refreshed_nodes = []
+            refreshed_services = []
             try:
                 self._lock.acquire(True)
                 if clear_cache:
                     self.__cached_nodes = dict()
                     self.__cached_services = dict()
+                    self._prober.clear_backoff()
                 socket.setdefaulttimeout(5)
-                self.__new_master_state = master_state = MasterInfo(self.getMasteruri(), self.getMastername())
                 # update master state
                 master = self._master
                 # master = xmlrpclib.ServerProxy(self.getMasteruri())
@@ -483,44 +707,37 @@ class MasterMonitor(object):
                     topicTypesDict[topic] = type
                 # get system state
                 code, message, state = master.getSystemState(self.ros_node_name)
-
-                # add published topics
-                for t, l in state[0]:
-                    master_state.topics = t
-                    for n in l:
-                        master_state.nodes = n
-                        master_state.getNode(n).publishedTopics = t
-                        master_state.getTopic(t).publisherNodes = n
-                        master_state.getTopic(t).type = topicTypesDict.get(t, 'None')
-                # add subscribed topics
-                for t, l in state[1]:
-                    master_state.topics = t
-                    for n in l:
-                        master_state.nodes = n
-                        master_state.getNode(n).subscribedTopics = t
-                        master_state.getTopic(t).subscriberNodes = n
-                        master_state.getTopic(t).type = topicTypesDict.get(t, 'None')
-
-                # add services
+                raw_state = (topicTypesDict, dict(state[0]), dict(state[1]), dict(state[2]))
+                with self._state_access_lock:
+                    base_state = self.__master_state
+                if self.INCREMENTAL_UPDATE and not clear_cache and base_state is not None and self.__raw_state is not None:
+                    master_state, changes, refreshed_nodes, refreshed_services = self._apply_raw_changes(base_state, self.__raw_state, raw_state)
+                    check_nodes = [node for node in master_state.nodes.values() if node.name in changes[0]]
+                    check_nodes.extend([node for node, _ in refreshed_nodes])
+                    check_services = [service for service in master_state.services.values() if service.name in changes[2]]
+                    check_services.extend([service for service, _ in refreshed_services])
+                else:
+                    master_state = self._create_state(topicTypesDict, state)
+                    check_nodes = list(master_state.nodes.values())
+                    check_services = list(master_state.services.values())
+                self.__new_master_state = master_state
+                self.__new_raw_state = raw_state
+                self.__new_changes = changes
+
+                # get the service URIs
                 services = dict()
                 tmp_slist = []
                 # multi-call style xmlrpc to lock up the service uri
                 param_server_multi = xmlrpcclient.MultiCall(master)
-                for t, l in state[2]:
-                    master_state.services = t
-                    for n in l:
-                        master_state.nodes = n
-                        master_state.getNode(n).services = t
-                        service = master_state.getService(t)
-                        service.serviceProvider = n
-                        if service.name in self.__cached_services:
-                            service.uri = self.__cached_services[service.name][0]
-                            service.type = self.__cached_services[service.name][1]
-                            if service.isLocal and time.time() - self.__cached_services[service.name][2] > self.MAX_PING_SEC:
-                                services[service.name] = service.uri
-                        else:
-                            tmp_slist.append(service)
-                            param_server_multi.lookupService(self.ros_node_name, t)
+                for service in check_services:
+                    if service.name in self.__cached_services:
+                        service.uri = self.__cached_services[service.name][0]
+                        service.type = self.__cached_services[service.name][1]
+                        if service.isLocal and time.time() - self.__cached_services[service.name][2] > self.MAX_PING_SEC:
+                            services[service.name] = service.uri
+                    else:
+                        tmp_slist.append(service)
+                        param_server_multi.lookupService(self.ros_node_name, service.name)
                 try:
                     r = param_server_multi()
                     for (code, msg, uri), service in zip(r, tmp_slist):
@@ -535,10 +752,6 @@ class MasterMonitor(object):
                                 self._limited_log(service.name, "can't get contact information. ROS master responds with: %s" % msg)
                 except:
                     traceback.print_exc()
-                if services:
-                    pidThread = threading.Thread(target=self._getServiceInfo, args=((services,)))
-                    pidThread.start()
-                    threads.append(pidThread)
 
                 # get additional node information
                 nodes = dict()
@@ -546,7 +759,7 @@ class MasterMonitor(object):
                     # multi-call style xmlrpc to loock up the node uri
                     param_server_multi = xmlrpcclient.MultiCall(master)
                     tmp_nlist = []
-                    for name, node in master_state.nodes.items():
+                    for node in check_nodes:
                         if node.name in self.__cached_nodes:
                             node.uri = self.__cached_nodes[node.name][0]
                             node.pid = self.__cached_nodes[node.name][1]
@@ -555,7 +768,7 @@ class MasterMonitor(object):
                         else:
                             # 'print "request node:", node.name
                             tmp_nlist.append(node)
-                            param_server_multi.lookupNode(self.ros_node_name, name)
+                            param_server_multi.lookupNode(self.ros_node_name, node.name)
                     r = param_server_multi()
                     for (code, msg, uri), node in zip(r, tmp_nlist):
                         if code == 1:
@@ -570,12 +783,6 @@ class MasterMonitor(object):
                 except:
                     traceback.print_exc()
 
-                if nodes:
-                    # get process id of the nodes
-                    pidThread = threading.Thread(target=self._getNodePid, args=((nodes,)))
-                    pidThread.start()
-                    threads.append(pidThread)
-
                 master_state.timestamp = now
             except socket.error as e:
                 if isinstance(e, tuple):
@@ -592,17 +799,165 @@ class MasterMonitor(object):
                 self._lock.release()
                 socket.setdefaulttimeout(None)
 
-            # wait for all threads are finished
-            while threads:
-                th = threads.pop()
-                if th.is_alive():
-                    th.join()
-                del th
+            # get process ids of the nodes and types of the services
+            if nodes or services:
+                self._probe(master_state, nodes, services)
+            # add the refreshed entries with changed URI, PID or type to the changes
+            for node, old_node in refreshed_nodes:
+                if node.uri != old_node.uri or node.pid != old_node.pid:
+                    changes[0].add(node.name)
+            for service, old_service in refreshed_services:
+                if service.uri != old_service.uri or service.type != old_service.type:
+                    changes[2].add(service.name)
             if time.time() - self._last_clearup_ts > 300:
                 self._last_clearup_ts = time.time()
                 self._clearup_cached_logs()
             return master_state
 
+    def _create_state(self, topic_types, state):
+        '''
+        Creates a new master state from the system state of the ROS master. The URIs
+        and PIDs are not set.
+
+        :param dict topic_types: the dictionary with topic names and their types
+        :param state: the system state returned by ``getSystemState()`` of the ROS master
+        :rtype: :mod:`fkie_master_discovery.master_info.MasterInfo`
+        '''
+        master_state = MasterInfo(self.getMasteruri(), self.getMastername())
+        # add published topics
+        for t, l in state[0]:
+            master_state.topics = t
+            for n in l:
+                master_state.nodes = n
+                master_state.getNode(n).publishedTopics = t
+                master_state.getTopic(t).publisherNodes = n
+                master_state.getTopic(t).type = topic_types.get(t, 'None')
+        # add subscribed topics
+        for t, l in state[1]:
+            master_state.topics = t
+            for n in l:
+                master_state.nodes = n
+                master_state.getNode(n).subscribedTopics = t
+                master_state.getTopic(t).subscriberNodes = n
+                master_state.getTopic(t).type = topic_types.get(t, 'None')
+        # add services
+        for t, l in state[2]:
+            master_state.services = t
+            for n in l:
+                master_state.nodes = n
+                master_state.getNode(n).services = t
+                master_state.getService(t).serviceProvider = n
+        return master_state
+
+    def _apply_raw_changes(self, base_state, old_raw, raw):
+        '''
+        Creates a new master state from the current state by comparing the system
+        state of the ROS master with the system state of the current master state.
+        Only the changed nodes, topics and services are created new, all other entries
+        are shared with the current state. Entries, which URIs or PIDs need to be
+        updated, are replaced by copies.
+
+        :param base_state: the current master state
+        :param old_raw: (topic types, publishers, subscribers, services) dictionaries of the current master state
+        :param raw: (topic types, publishers, subscribers, services) dictionaries of the new system state
+        :return: (new state, (changed nodes, changed topics, changed services), [(refreshed node, old node)], [(refreshed service, old service)])
+        '''
+        old_types, old_pubs, old_subs, old_srvs = old_raw
+        topic_types, pubs, subs, srvs = raw
+        changed_topics = set()
+        changed_services = set()
+        if pubs != old_pubs:
+            changed_topics.update(_changed_keys(pubs, old_pubs))
+        if subs != old_subs:
+            changed_topics.update(_changed_keys(subs, old_subs))
+        if topic_types != old_types:
+            changed_topics.update([t for t in _changed_keys(topic_types, old_types) if t in pubs or t in subs])
+        if srvs != old_srvs:
+            changed_services.update(_changed_keys(srvs, old_srvs))
+        master_state = base_state.shallow_copy()
+        topics = master_state.topics
+        services = master_state.services
+        # create the changed topics and services
+        node_pubs = dict()
+        node_subs = dict()
+        node_srvs = dict()
+        candidates = set()
+        for t in changed_topics:
+            candidates.update(old_pubs.get(t, []))
+            candidates.update(old_subs.get(t, []))
+            publishers = pubs.get(t, None)
+            subscribers = subs.get(t, None)
+            if publishers is None and subscribers is None:
+                topics.pop(t, None)
+                continue
+            topic = TopicInfo(t)
+            for n in publishers or []:
+                topic.publisherNodes = n
+                node_pubs.setdefault(n, []).append(t)
+            for n in subscribers or []:
+                topic.subscriberNodes = n
+                node_subs.setdefault(n, []).append(t)
+            if publishers or subscribers:
+                topic.type = topic_types.get(t, 'None')
+            topics[t] = topic
+        for name in changed_services:
+            candidates.update(old_srvs.get(name, []))
+            providers = srvs.get(name, None)
+            if providers is None:
+                services.pop(name, None)
+                continue
+            service = ServiceInfo(name, master_state.masteruri)
+            for n in providers:
+                service.serviceProvider = n
+                node_srvs.setdefault(n, []).append(name)
+            services[name] = service
+        # create the nodes with changed topics or services
+        changed_nodes = set()
+        nodes = master_state.nodes
+        candidates.update(node_pubs.keys())
+        candidates.update(node_subs.keys())
+        candidates.update(node_srvs.keys())
+        for n in candidates:
+            old_node = base_state.getNode(n)
+            published = node_pubs.get(n, [])
+            subscribed = node_subs.get(n, [])
+            provided = node_srvs.get(n, [])
+            if old_node is not None:
+                published = [t for t in old_node.publishedTopics if t not in changed_topics] + published
+                subscribed = [t for t in old_node.subscribedTopics if t not in changed_topics] + subscribed
+                provided = [s for s in old_node.services if s not in changed_services] + provided
+                if (set(published) == set(old_node.publishedTopics) and set(subscribed) == set(old_node.subscribedTopics) and
+                        set(provided) == set(old_node.services)):
+                    continue
+            changed_nodes.add(n)
+            if not (published or subscribed or provided):
+                nodes.pop(n, None)
+                continue
+            node = NodeInfo(n, master_state.masteruri)
+            node.publishedTopics = published
+            node.subscribedTopics = subscribed
+            node.services = provided
+            nodes[n] = node
+        # replace the entries by copies, if the URI or PID need to be updated
+        now = time.time()
+        refreshed_nodes = []
+        for name, node in nodes.items():
+            if name not in changed_nodes:
+                cached = self.__cached_nodes.get(name, None)
+                if cached is None or (node.isLocal and now - cached[2] > self.MAX_PING_SEC):
+                    refreshed_nodes.append((node.copy(master_state.masteruri), node))
+        for node, _ in refreshed_nodes:
+            nodes[node.name] = node
+        refreshed_services = []
+        for name, service in services.items():
+            if name not in changed_services:
+                cached = self.__cached_services.get(name, None)
+                if cached is None or (service.isLocal and now - cached[2] > self.MAX_PING_SEC):
+                    refreshed_services.append((service.copy(master_state.masteruri), service))
+        for service, _ in refreshed_services:
+            services[service.name] = service
+        return master_state, (changed_nodes, changed_topics, changed_services), refreshed_nodes, refreshed_services
+
     def _limited_log(self, provider, msg, level=rospy.WARN):
         if provider not in self._printed_errors:
             self._printed_errors[provider] = dict()
@@ -637,57 +992,142 @@ class MasterMonitor(object):
         for the service ending with ``get_sync_info``. The method will be called by
         :mod:`fkie_master_discovery.master_monitor.MasterMonitor.checkState()`.
         '''
-        # 'print "updateSyncInfo _create_access_lock try...", threading.current_thread()
-
-        def getNodeuri(nodename, publisher, subscriber, services):
-            for p in publisher:
-                if nodename == p.node:
-                    return p.nodeuri
-            for p in subscriber:
-                if nodename == p.node:
-                    return p.nodeuri
-            for s in services:
-                if nodename == s.node:
-                    return s.nodeuri
-            return None
-
         with self._create_access_lock:
             master_state = self.__new_master_state
             sync_info = None
             # get synchronization info, if sync node is running
             # to determine the origin ROS MASTER URI of the nodes
-            for name, service in master_state.services.items():
-                if service.name.endswith('get_sync_info'):
-                    if get_hostname(self.getMasteruri()) == get_hostname(service.uri):
-                        socket.setdefaulttimeout(3)
-                        get_sync_info = rospy.ServiceProxy(service.name, GetSyncInfo)
-                        try:
-                            sync_info = get_sync_info()
-                        except rospy.ServiceException as e:
-                            rospy.logwarn("ERROR Service call 'get_sync_info' failed: %s", str(e))
-                        finally:
-                            socket.setdefaulttimeout(None)
+            service = self._find_sync_info_service(master_state)
+            if service is not None:
+                try:
+                    sync_info = self._get_sync_info(service.name, service.uri)
+                except Exception as e:
+                    rospy.logwarn("ERROR Service call 'get_sync_info' failed: %s", str(e))
 
             # update the origin ROS MASTER URI of the nodes, if sync node is running
+            synced_nodes = set()
+            synced_services = set()
             if sync_info:
                 for m in sync_info.hosts:
+                    # index the URIs of the nodes, the first entry in publisher, subscriber and services is used
+                    nodeuris = dict()
+                    for entries in (m.publisher, m.subscriber, m.services):
+                        for entry in entries:
+                            nodeuris.setdefault(entry.node, entry.nodeuri)
+                    serviceuris = dict((s.service, s.serviceuri) for s in reversed(m.services))
                     for n in m.nodes:
                         try:
                             # TODO: add nodeuri to the nodes (needs changes in the MSG definitions)
                             # set the sync node only if it has the same uri
-                            nuri = getNodeuri(n, m.publisher, m.subscriber, m.services)
+                            nuri = nodeuris.get(n, None)
                             state_node = master_state.getNode(n)
                             if state_node is not None and (state_node.uri == nuri or nuri is None):
-                                state_node.masteruri = m.masteruri
+                                synced_nodes.add(n)
+                                if state_node.masteruri != m.masteruri:
+                                    state_node = self._own_node(master_state, state_node)
+                                    state_node.masteruri = m.masteruri
                         except:
                             pass
-                    for s in m.services:
+                    for service_name, serviceuri in serviceuris.items():
                         try:
-                            state_service = master_state.getService(s.service)
-                            if state_service is not None and state_service.uri == s.serviceuri:
-                                state_service.masteruri = m.masteruri
+                            state_service = master_state.getService(service_name)
+                            if state_service is not None and state_service.uri == serviceuri:
+                                synced_services.add(service_name)
+                                if state_service.masteruri != m.masteruri:
+                                    state_service = self._own_service(master_state, state_service)
+                                    state_service.masteruri = m.masteruri
                         except:
                             pass
+            # entries shared with the current state keep the origin ROS MASTER URI of the
+            # last synchronization, reset the entries without synchronization info
+            for name, state_node in list(master_state.nodes.items()):
+                if state_node.masteruri != master_state.masteruri and name not in synced_nodes:
+                    state_node = self._own_node(master_state, state_node)
+                    state_node.masteruri = master_state.masteruri
+            for name, state_service in list(master_state.services.items()):
+                if state_service.masteruri != master_state.masteruri and name not in synced_services:
+                    state_service = self._own_service(master_state, state_service)
+                    state_service.masteruri = master_state.masteruri
+
+    def _own_node(self, master_state, node):
+        '''
+        Replaces a node shared with the current master state by a copy and adds it to the changes.
+
+        :return: the node, which can be modified
+        :rtype: :mod:`fkie_master_discovery.master_info.NodeInfo`
+        '''
+        if self.__new_changes is not None and node.name not in self.__new_changes[0]:
+            node = node.copy(master_state.masteruri)
+            master_state.nodes[node.name] = node
+            self.__new_changes[0].add(node.name)
+        return node
+
+    def _own_service(self, master_state, service):
+        '''
+        Replaces a service shared with the current master state by a copy and adds it to the changes.
+
+        :return: the service, which can be modified
+        :rtype: :mod:`fkie_master_discovery.master_info.ServiceInfo`
+        '''
+        if self.__new_changes is not None and service.name not in self.__new_changes[2]:
+            service = service.copy(master_state.masteruri)
+            master_state.services[service.name] = service
+            self.__new_changes[2].add(service.name)
+        return service
+
+    def _find_sync_info_service(self, master_state):
+        '''
+        Returns the local service ending with ``get_sync_info``. The name of the found
+        service is cached, all services are searched only if the cached service is gone
+        or, after incremental updates, a service with this name was added.
+
+        :rtype: :mod:`fkie_master_discovery.master_info.ServiceInfo` or `None`
+        '''
+        if self._sync_info_service is not None:
+            service = master_state.getService(self._sync_info_service)
+            if service is not None:
+                return service
+        elif self._sync_info_searched and self.__new_changes is not None:
+            if not [name for name in self.__new_changes[2] if name.endswith('get_sync_info')]:
+                return None
+        self._sync_info_service = None
+        self._sync_info_searched = True
+        local_host = get_hostname(self.getMasteruri())
+        for name, service in master_state.services.items():
+            if name.endswith('get_sync_info') and service.uri is not None and local_host == get_hostname(service.uri):
+                self._sync_info_service = name
+                return service
+        return None
+
+    def _get_sync_info(self, service_name, service_uri):
+        '''
+        Calls the ``get_sync_info`` service of the master_sync node. The connection is kept
+        open for the next calls and each call is limited by
+        :mod:`fkie_master_discovery.master_monitor.MasterMonitor.SYNC_INFO_TIMEOUT`.
+
+        :raise: Exception on errors
+        '''
+        proxy = self._sync_info_proxy
+        if proxy is not None and (proxy.resolved_name != service_name or self._sync_info_uri != service_uri):
+            proxy.close()
+            proxy = None
+        if proxy is None:
+            proxy = rospy.ServiceProxy(service_name, GetSyncInfo, persistent=True)
+            # HACK: create the transport of the persistent proxy here to set a timeout for this
+            # connection instead of the global socket timeout. The socket keeps it for each call.
+            dest_addr, dest_port = rospy.parse_rosrpc_uri(service_uri)
+            transport = rospy.impl.tcpros_base.TCPROSTransport(proxy.protocol, proxy.resolved_name)
+            transport.buff_size = proxy.buff_size
+            transport.connect(dest_addr, dest_port, service_uri, timeout=self.SYNC_INFO_TIMEOUT)
+            proxy.transport = transport
+            self._sync_info_proxy = proxy
+            self._sync_info_uri = service_uri
+        try:
+            return proxy()
+        except Exception:
+            proxy.close()
+            self._sync_info_proxy = None
+            raise
 
     def getMasteruri(self):
         '''
@@ -796,6 +1236,21 @@ class MasterMonitor(object):
                 rospy.logwarn(err)
         return topic_list
 
+    def getServerMetrics(self):
+        '''
+        :return: the metrics of the XML-RPC server: the backend, the hits of the response cache and,
+                 for the ``pool`` backend, the queue length, the count of requests and their wait time
+                 and latency [sec], see :mod:`fkie_master_discovery.worker_pool.ServerMetrics`.
+        :rtype: dict(str: str, int or float)
+        '''
+        result = {'backend': self.rpc_server_backend,
+                  'cache_hits': self.response_cache.hits,
+                  'cache_misses': self.response_cache.misses}
+        metrics = getattr(self.rpcServer, 'metrics', None)
+        if metrics is not None:
+            result.update(metrics.to_dict())
+        return result
+
     def getUser(self):
         '''
         The RPC method called by XML-RPC server to request the user name used to launch the master_discovery.
@@ -805,7 +1260,6 @@ class MasterMonitor(object):
         '''
         return (str(self.getMasteruri()), getpass.getuser())
 
-
     def checkState(self, clear_cache=False):
         '''
         Gets the state from the ROS master and compares it to the stored state.
@@ -825,12 +1279,18 @@ class MasterMonitor(object):
         s = self.updateState(clear_cache)
         with self._create_access_lock:
             do_update = False
+            changes = self.__new_changes
             with self._state_access_lock:
-                if s != self.__master_state:
+                if changes is not None:
+                    # incremental update: the changes are already known
+                    do_update = any(changes)
+                elif s != self.__master_state:
                     do_update = True
                 if self.__master_state is not None and s.timestamp < self.__master_state.timestamp:
                     do_update = True
                     result = True
+                    # the journal is not valid after time jump
+                    self._state_journal.clear()
                     timejump_msg = "Timejump into past detected! Restart all ROS nodes, includes master_discovery, please!"
                     rospy.logwarn(timejump_msg)
                     if timejump_msg not in self._master_errors:
@@ -842,14 +1302,36 @@ class MasterMonitor(object):
                 with self._state_access_lock:
                     # test for local changes
                     ts_local = self.__new_master_state.timestamp_local
-                    if self.__master_state is not None and not self.__master_state.has_local_changes(s):
-                        ts_local = self.__master_state.timestamp_local
+                    if self.__master_state is not None:
+                        if changes is None:
+                            local_changes = self.__master_state.has_local_changes(s)
+                            changes = self.__new_master_state.changed_names(self.__master_state)
+                        else:
+                            local_changes = self._has_local_changes(self.__master_state, self.__new_master_state, changes)
+                        if not local_changes:
+                            ts_local = self.__master_state.timestamp_local
+                        # store the changes to answer delta requests
+                        self._state_journal.append(('%.9f' % self.__master_state.timestamp, '%.9f' % self.__new_master_state.timestamp) + tuple(changes))
                     self.__master_state = self.__new_master_state
+                    self.__raw_state = self.__new_raw_state
                     self.__master_state.timestamp_local = ts_local
                     result = True
             self.__master_state.check_ts = self.__new_master_state.timestamp
             return result
 
+    def _has_local_changes(self, old_state, new_state, changes):
+        # tests the changed nodes and services for local entries
+        nodes, _topics, services = changes
+        for name in nodes:
+            for node in (old_state.getNode(name), new_state.getNode(name)):
+                if node is not None and (node.isLocal or node.isLocalMaster):
+                    return True
+        for name in services:
+            for service in (old_state.getService(name), new_state.getService(name)):
+                if service is not None and (service.isLocal or service.isLocalMaster):
+                    return True
+        return False
+
     def _timejump_exit(self):
         rospy.logwarn('Shutdown yourself to avoid system instability because of time jump into past!\n')
         rospy.signal_shutdown('Shutdown yourself to avoid system instability because of time jump into past')
@@ -862,6 +1344,8 @@ class MasterMonitor(object):
             if self.__master_state is not None:
                 del self.__master_state
             self.__master_state = None
+            self.__raw_state = None
+            self._state_journal.clear()
 
     def update_master_errors(self, error_list):
         self._master_errors = list(error_list)
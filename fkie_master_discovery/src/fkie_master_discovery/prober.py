@@ -0,0 +1,386 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+'''
+Probes the process ids of nodes and the types of services concurrently. All
+probes of an update cycle run in one thread on non-blocking sockets: the
+``getPid`` XML-RPC calls are sent as plain HTTP requests and the services are
+asked for their connection header. Each probe has its own deadline and all
+probes of a cycle together are limited by a time budget. Entities which fail
+repeatedly are probed less often (exponential backoff).
+
+Usage::
+
+    prober = Prober('/master_discovery')
+    pids, types, failed = prober.run({'/talker': 'http://host:41234/'}, {'/talker/get_loggers': 'rosrpc://host:45678'})
+'''
+
+import errno
+import select
+import socket
+import struct
+import time
+try:
+    from urlparse import urlparse  # python 2 compatibility
+except ImportError:
+    from urllib.parse import urlparse
+try:
+    import xmlrpclib as xmlrpcclient  # python 2 compatibility
+except ImportError:
+    import xmlrpc.client as xmlrpcclient
+
+import roslib.network
+import rospy
+
+NODE = 'node'
+SERVICE = 'service'
+
+_CONNECTING = 0
+_SENDING = 1
+_RECEIVING = 2
+
+_IN_PROGRESS = (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+
+
+class _Probe(object):
+    '''
+    The state of one probe on a non-blocking socket.
+    '''
+
+    def __init__(self, kind, name, uri, deadline):
+        self.kind = kind
+        self.name = name
+        self.uri = uri
+        self.deadline = deadline
+        self.sock = None
+        self.state = _CONNECTING
+        self.request = b''
+        self.sent = 0
+        self.response = b''
+
+    @property
+    def key(self):
+        return (self.kind, self.name)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+
+
+class Prober(object):
+    '''
+    Runs the ``getPid`` calls of the nodes and the type requests of the services in parallel.
+
+    :param str caller_id: the name of the ROS node used as caller id in the requests.
+    :param float budget: the maximal time [sec] of one :meth:`run` call.
+    :param int max_parallel: the maximal count of open connections at the same time.
+    '''
+
+    NODE_TIMEOUT = 0.7
+    '''the deadline [sec] of one ``getPid`` call (Default: ``0.7``)'''
+    SERVICE_TIMEOUT = 0.5
+    '''the deadline [sec] of one service probe (Default: ``0.5``)'''
+    BUDGET = 2.0
+    '''the maximal time [sec] of all probes of one update cycle (Default: ``2.0``)'''
+    MAX_PARALLEL = 256
+    '''the maximal count of probes running at the same time (Default: ``256``)'''
+    BACKOFF_MIN = 1.0
+    '''the time [sec] to wait after the first failed probe of an entity (Default: ``1.0``)'''
+    BACKOFF_MAX = 60.0
+    '''the maximal time [sec] between the probes of an entity which keeps failing (Default: ``60.0``)'''
+    MAX_RESPONSE_SIZE = 65536
+    '''larger responses are treated as failure'''
+    ADDRESS_TIMEOUT = 60.0
+    '''the time [sec] to keep the resolved address of a host, also for hosts which can't be resolved (Default: ``60.0``)'''
+
+    def __init__(self, caller_id, budget=BUDGET, max_parallel=MAX_PARALLEL):
+        self.caller_id = caller_id
+        self.budget = budget
+        self.max_parallel = max(1, max_parallel)
+        # (kind, name): (uri, failure count, time of the next probe)
+        self._backoff = dict()
+        # (host, port): (address info or None if not resolved, time of the resolution)
+        self._addresses = dict()
+
+    def clear_backoff(self):
+        '''
+        Forgets all failures and resolved addresses, all entities are probed in the next cycle.
+        '''
+        self._backoff = dict()
+        self._addresses = dict()
+
+    def run(self, nodes={}, services={}):
+        '''
+        Probes the given nodes and services and blocks until all probes are finished,
+        failed or the budget is consumed. Entities in backoff and probes which are not
+        finished within the budget are not contained in the result.
+
+        :param nodes: the XML-RPC URIs of the nodes to probe for the process id {name: uri}
+        :type nodes: dict(str: str)
+        :param services: the URIs of the services to probe for the type {name: rosrpc-uri}
+        :type services: dict(str: str)
+        :return: the process ids of the nodes, the types of the services and the errors of failed probes
+        :rtype: ({str: int}, {str: str}, {(str, str): str})
+        '''
+        now = time.time()
+        budget_end = now + self.budget
+        pending = []
+        for kind, entities in ((SERVICE, services), (NODE, nodes)):
+            for name, uri in entities.items():
+                if uri is not None and not self._in_backoff((kind, name), uri, now):
+                    pending.append((kind, name, uri))
+        pids = dict()
+        types = dict()
+        failed = dict()
+        active = dict()  # fileno: _Probe
+        for key, (_addrinfo, ts) in list(self._addresses.items()):
+            if now - ts >= self.ADDRESS_TIMEOUT:
+                del self._addresses[key]
+        poller = SocketPoller()
+        try:
+            while (pending or active) and time.time() < budget_end:
+                while pending and len(active) < self.max_parallel:
+                    kind, name, uri = pending.pop()
+                    timeout = self.NODE_TIMEOUT if kind == NODE else self.SERVICE_TIMEOUT
+                    probe = _Probe(kind, name, uri, min(time.time() + timeout, budget_end))
+                    try:
+                        self._start(probe)
+                        active[probe.sock.fileno()] = probe
+                        poller.register(probe.sock.fileno(), True)
+                    except Exception as err:
+                        probe.close()
+                        failed[probe.key] = str(err)
+                if not active:
+                    continue
+                next_deadline = min(probe.deadline for probe in active.values())
+                for fileno, error in poller.poll(max(0., next_deadline - time.time())):
+                    probe = active[fileno]
+                    try:
+                        if error and probe.state != _RECEIVING:
+                            raise socket.error(probe.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) or errno.ECONNRESET, 'connection failed')
+                        result = self._handle(probe)
+                        if result is not None:
+                            if probe.kind == NODE:
+                                pids[probe.name] = result
+                            else:
+                                types[probe.name] = result
+                        elif probe.state == _RECEIVING:
+                            poller.modify(fileno, False)
+                            continue
+                        else:
+                            continue
+                    except Exception as err:
+                        failed[probe.key] = str(err)
+                    poller.unregister(fileno)
+                    del active[fileno]
+                    probe.close()
+                now = time.time()
+                for fileno, probe in list(active.items()):
+                    if probe.deadline <= now and probe.deadline < budget_end:
+                        failed[probe.key] = 'timed out'
+                        poller.unregister(fileno)
+                        del active[fileno]
+                        probe.close()
+        finally:
+            # probes interrupted by the budget are neither successful nor failed
+            for probe in active.values():
+                probe.close()
+        now = time.time()
+        for kind, results in ((NODE, pids), (SERVICE, types)):
+            for name in results.keys():
+                self._backoff.pop((kind, name), None)
+        for key in failed.keys():
+            uri = nodes.get(key[1], None) if key[0] == NODE else services.get(key[1], None)
+            _uri, count, _next_ts = self._backoff.get(key, (uri, 0, 0))
+            if _uri != uri:
+                count = 0
+            delay = min(self.BACKOFF_MAX, self.BACKOFF_MIN * (2 ** count))
+            self._backoff[key] = (uri, count + 1, now + delay)
+        return pids, types, failed
+
+    def _in_backoff(self, key, uri, now):
+        try:
+            backoff_uri, _count, next_ts = self._backoff[key]
+            # the entity was restarted if the URI was changed
+            return backoff_uri == uri and now < next_ts
+        except KeyError:
+            return False
+
+    def _start(self, probe):
+        if probe.kind == NODE:
+            url = urlparse(probe.uri)
+            host, port = url.hostname, url.port or 80
+            body = xmlrpcclient.dumps((self.caller_id,), 'getPid').encode('utf-8')
+            header = 'POST %s HTTP/1.0\r\nHost: %s\r\nContent-Type: text/xml\r\nContent-Length: %d\r\n\r\n' % (url.path or '/', url.netloc, len(body))
+            probe.request = header.encode('utf-8') + body
+        else:
+            host, port = rospy.parse_rosrpc_uri(probe.uri)
+            header = {'probe': '1', 'md5sum': '*', 'callerid': self.caller_id, 'service': probe.name}
+            probe.request = roslib.network.encode_ros_handshake_header(header)
+        family, socktype, proto, _, addr = self._resolve(host, port, probe.deadline)
+        probe.sock = socket.socket(family, socktype, proto)
+        probe.sock.setblocking(False)
+        code = probe.sock.connect_ex(addr)
+        if code not in _IN_PROGRESS:
+            raise socket.error(code, 'connection to %s failed' % probe.uri)
+
+    def _resolve(self, host, port, deadline):
+        '''
+        Returns the cached address info of the host. The blocking resolution runs
+        once for each host within :attr:`ADDRESS_TIMEOUT`, a probe waiting for it
+        longer than its deadline fails.
+
+        :raise: socket.error if the host can't be resolved
+        '''
+        try:
+            addrinfo, _ts = self._addresses[(host, port)]
+        except KeyError:
+            try:
+                addrinfo = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0]
+            except socket.error:
+                addrinfo = None
+            self._addresses[(host, port)] = (addrinfo, time.time())
+            if time.time() > deadline:
+                raise socket.timeout('resolution of %s timed out' % host)
+        if addrinfo is None:
+            raise socket.error(errno.EHOSTUNREACH, "can't resolve %s" % host)
+        return addrinfo
+
+    def _handle(self, probe):
+        '''
+        Continues the probe on a ready socket.
+
+        :return: the result if the probe is finished, otherwise `None`
+        :raise: Exception on errors
+        '''
+        if probe.state == _CONNECTING:
+            code = probe.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if code not in _IN_PROGRESS:
+                raise socket.error(code, 'connection to %s failed' % probe.uri)
+            probe.state = _SENDING
+        if probe.state == _SENDING:
+            probe.sent += probe.sock.send(probe.request[probe.sent:])
+            if probe.sent >= len(probe.request):
+                probe.state = _RECEIVING
+            return None
+        data = probe.sock.recv(self.MAX_RESPONSE_SIZE)
+        probe.response += data
+        if len(probe.response) > self.MAX_RESPONSE_SIZE:
+            raise Exception('response of %s is too large' % probe.uri)
+        if probe.kind == NODE:
+            return self._parse_pid(probe.response, not data)
+        return self._parse_service_type(probe.response, not data)
+
+    def _parse_pid(self, response, closed):
+        idx = response.find(b'\r\n\r\n')
+        if idx == -1:
+            if closed:
+                raise Exception('incomplete HTTP response')
+            return None
+        lines = response[:idx].decode('latin-1').split('\r\n')
+        status = lines[0].split()
+        if len(status) < 2 or status[1] != '200':
+            raise Exception('HTTP error: %s' % lines[0])
+        length = None
+        for line in lines[1:]:
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'content-length':
+                length = int(value.strip())
+        body = response[idx + 4:]
+        if length is not None and len(body) >= length:
+            body = body[:length]
+        elif not closed:
+            return None
+        params, _ = xmlrpcclient.loads(body)
+        code, msg, pid = params[0]
+        if code != 1:
+            raise Exception("remote call failed: %s" % msg)
+        return pid
+
+    def _parse_service_type(self, response, closed):
+        if len(response) >= 4:
+            (length,) = struct.unpack('<I', response[:4])
+            if len(response) >= length + 4:
+                header = roslib.network.decode_ros_handshake_header(response[:length + 4])
+                if 'error' in header:
+                    raise Exception(header['error'])
+                return header['type']
+        if closed:
+            raise Exception('incomplete connection header')
+        return None
+
+
+class SocketPoller(object):
+    '''
+    Waits for sockets to be writable while connecting and sending or readable while receiving.
+    Uses ``poll()`` if available to support file descriptors above ``FD_SETSIZE``.
+    '''
+
+    def __init__(self):
+        self._poll = select.poll() if hasattr(select, 'poll') else None
+        self._writing = dict()  # fileno: bool
+
+    def register(self, fileno, writing):
+        self._writing[fileno] = writing
+        if self._poll is not None:
+            self._poll.register(fileno, self._mask(writing))
+
+    def modify(self, fileno, writing):
+        self._writing[fileno] = writing
+        if self._poll is not None:
+            self._poll.modify(fileno, self._mask(writing))
+
+    def unregister(self, fileno):
+        del self._writing[fileno]
+        if self._poll is not None:
+            self._poll.unregister(fileno)
+
+    def poll(self, timeout):
+        '''
+        :return: the ready file descriptors and whether an error was reported [(fileno, error)]
+        :rtype: [(int, bool)]
+        '''
+        if self._poll is not None:
+            events = self._poll.poll(int(timeout * 1000) + 1)
+            return [(fileno, bool(event & (select.POLLERR | select.POLLHUP | select.POLLNVAL) and not event & select.POLLIN)) for fileno, event in events]
+        rlist = [fileno for fileno, writing in self._writing.items() if not writing]
+        wlist = [fileno for fileno, writing in self._writing.items() if writing]
+        readable, writable, errors = select.select(rlist, wlist, wlist, timeout)
+        return [(fileno, fileno in errors) for fileno in set(readable) | set(writable) | set(errors)]
+
+    def _mask(self, writing):
+        return select.POLLOUT if writing else select.POLLIN
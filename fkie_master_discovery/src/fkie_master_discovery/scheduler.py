@@ -0,0 +1,276 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+'''
+Runs the periodic jobs of the master discovery in one thread. The jobs are
+sorted by the time of their next run in a heap. A job returns the time in
+seconds until its next run or ``None`` to stop. Jobs can be triggered earlier,
+e.g. if a change notification was received.
+
+Usage::
+
+    scheduler = Scheduler()
+    scheduler.add('heartbeat', send_heartbeat, 1.0)
+    scheduler.start()
+    ...
+    scheduler.wakeup('heartbeat')
+'''
+
+import heapq
+import itertools
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python 2 compatibility
+import threading
+import time
+import traceback
+
+import rospy
+
+try:
+    _now = time.monotonic
+except AttributeError:
+    _now = time.time  # python 2 compatibility
+
+
+class _Job(object):
+    '''
+    A job of the :mod:`fkie_master_discovery.scheduler.Scheduler` with its scheduling statistics.
+    '''
+    __slots__ = ('key', 'func', 'blocking', 'interval', 'due', 'seq', 'woken', 'running', 'wakeup_pending',
+                 'runs', 'wakeups', 'jitter_last', 'jitter_sum', 'jitter_max', 'runtime_max')
+
+    def __init__(self, key, func, blocking, interval):
+        self.key = key
+        self.func = func
+        self.blocking = blocking
+        self.interval = interval
+        self.due = None
+        self.seq = None
+        self.woken = False
+        self.running = False
+        self.wakeup_pending = None
+        self.runs = 0
+        self.wakeups = 0
+        self.jitter_last = 0.
+        self.jitter_sum = 0.
+        self.jitter_max = 0.
+        self.runtime_max = 0.
+
+
+class Scheduler(object):
+    '''
+    Runs periodic jobs in one thread. Jobs which can block for a longer time, e.g.
+    requests to the ROS master, are executed by one persistent worker thread, so
+    they do not delay the other jobs.
+    '''
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []  # (due, seq, key)
+        self._jobs = {}  # key: _Job
+        self._seq = itertools.count()
+        self._do_finish = False
+        self._blocking_queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='scheduler')
+        self._thread.daemon = True
+        self._worker = threading.Thread(target=self._run_blocking, name='scheduler_worker')
+        self._worker.daemon = True
+
+    def start(self):
+        self._thread.start()
+        self._worker.start()
+
+    def stop(self):
+        '''
+        Stops the scheduler. Running jobs are not interrupted.
+        '''
+        with self._cond:
+            self._do_finish = True
+            self._heap = []
+            self._cond.notify_all()
+        self._blocking_queue.put(None)
+
+    def add(self, key, func, delay, blocking=False):
+        '''
+        Adds a new job or replaces the job with the same key.
+
+        :param key: the identifier of the job
+
+        :type key: str
+
+        :param func: the function without arguments. It returns the time in seconds until
+                     the next run or ``None`` to remove the job. On exceptions the last
+                     interval is used.
+
+        :param delay: the time in seconds until the first run
+
+        :type delay: float
+
+        :param blocking: run the job in the worker thread
+
+        :type blocking: bool
+        '''
+        with self._cond:
+            job = _Job(key, func, blocking, delay)
+            self._jobs[key] = job
+            self._push(job, _now() + delay)
+
+    def remove(self, key):
+        with self._cond:
+            self._jobs.pop(key, None)
+
+    def wakeup(self, key, delay=0.):
+        '''
+        Runs the job not later than after the given delay. If the job is currently
+        running, it will be repeated after it finished. Wakeups within the delay are
+        merged into one run.
+
+        :param key: the identifier of the job
+
+        :type key: str
+
+        :param delay: the maximal time in seconds until the next run
+
+        :type delay: float
+        '''
+        with self._cond:
+            job = self._jobs.get(key, None)
+            if job is None:
+                return
+            if job.running:
+                if job.wakeup_pending is None or delay < job.wakeup_pending:
+                    job.wakeup_pending = delay
+            elif job.due is not None:
+                due = _now() + delay
+                if due < job.due:
+                    self._push(job, due, True)
+
+    def stats(self):
+        '''
+        Returns for each job the count of runs and early wakeups, the delay of the timed
+        runs (jitter) and the maximal run time in seconds.
+
+        :rtype: {str: {str: int or float}}
+        '''
+        result = {}
+        with self._cond:
+            for key, job in self._jobs.items():
+                timed_runs = job.runs - job.wakeups
+                result[key] = {'runs': job.runs,
+                               'wakeups': job.wakeups,
+                               'jitter_last': job.jitter_last,
+                               'jitter_avg': job.jitter_sum / timed_runs if timed_runs > 0 else 0.,
+                               'jitter_max': job.jitter_max,
+                               'runtime_max': job.runtime_max}
+        return result
+
+    def _push(self, job, due, woken=False):
+        job.due = due
+        job.seq = next(self._seq)
+        job.woken = woken
+        heapq.heappush(self._heap, (due, job.seq, job.key))
+        if self._heap[0][1] == job.seq:
+            self._cond.notify()
+
+    def _next_job(self):
+        # waits for the next due job, returns None on stop
+        with self._cond:
+            while not self._do_finish:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, seq, key = self._heap[0]
+                job = self._jobs.get(key, None)
+                if job is None or job.seq != seq:
+                    # removed or rescheduled job
+                    heapq.heappop(self._heap)
+                    continue
+                now = _now()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                job.due = None
+                job.running = True
+                job.runs += 1
+                if job.woken:
+                    job.wakeups += 1
+                else:
+                    job.jitter_last = now - due
+                    job.jitter_sum += job.jitter_last
+                    job.jitter_max = max(job.jitter_max, job.jitter_last)
+                return job
+        return None
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if job.blocking:
+                self._blocking_queue.put(job)
+            else:
+                self._execute(job)
+
+    def _run_blocking(self):
+        while True:
+            job = self._blocking_queue.get()
+            if job is None:
+                return
+            self._execute(job)
+
+    def _execute(self, job):
+        start = _now()
+        try:
+            interval = job.func()
+        except Exception:
+            rospy.logwarn("Error while run scheduled job '%s': %s" % (job.key, traceback.format_exc()))
+            # retry with last interval
+            interval = job.interval
+        end = _now()
+        with self._cond:
+            job.running = False
+            job.runtime_max = max(job.runtime_max, end - start)
+            if self._do_finish or self._jobs.get(job.key, None) is not job:
+                return
+            if interval is None:
+                del self._jobs[job.key]
+                return
+            job.interval = interval
+            if job.wakeup_pending is not None:
+                self._push(job, end + min(job.wakeup_pending, interval), True)
+                job.wakeup_pending = None
+            else:
+                self._push(job, end + interval)
@@ -36,6 +36,8 @@ except ImportError:
     import Queue as queue  # python 2 compatibility
 
 import array
+import ctypes
+import ctypes.util
 import errno
 import fcntl
 import os
@@ -44,6 +46,7 @@ import rospy
 import socket
 import struct
 import threading
+import time
 
 try:
     import netifaces
@@ -54,6 +57,190 @@ except:
 from rosgraph.network import get_local_addresses
 
 SEND_ERRORS = {}
+SEND_STATS = {'sent': 0, 'coalesced': 0, 'dropped': 0, 'errors': 0}
+'''counters of sent messages, of identical messages merged into one and of messages dropped by the rate limit'''
+_send_stats_lock = threading.Lock()
+
+
+def _count(key, value=1):
+    with _send_stats_lock:
+        SEND_STATS[key] += value
+
+
+def send_stats():
+    '''
+    :return: a copy of the counters of the sent UDP messages.
+
+    :rtype: {str: int}
+    '''
+    with _send_stats_lock:
+        return dict(SEND_STATS)
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+
+class DatagramSender(object):
+    '''
+    Sends a batch of UDP datagrams with one ``sendmmsg()`` call, if it is available
+    (Linux). Otherwise each datagram is sent by ``sendto()``. The resolved addresses
+    of the destinations are cached for ``RESOLVE_TIMEOUT`` seconds.
+    '''
+
+    RESOLVE_TIMEOUT = 30.
+
+    def __init__(self):
+        self._sendmmsg = None
+        self._addresses = {}  # (host, port, family): (sockaddr, timestamp)
+        if platform.system() == 'Linux':
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                self._sendmmsg = libc.sendmmsg
+                self._sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+                self._sendmmsg.restype = ctypes.c_int
+            except (OSError, AttributeError):
+                self._sendmmsg = None
+
+    @property
+    def has_sendmmsg(self):
+        return self._sendmmsg is not None
+
+    def send(self, sock, datagrams):
+        '''
+        Sends the datagrams in the given order until the first error.
+
+        :param sock: the UDP socket
+
+        :type sock: socket.socket
+
+        :param datagrams: list with (message, host, port)
+
+        :type datagrams: [(bytes, str, int)]
+
+        :return: the count of sent datagrams. The datagram at this index caused an
+                 error and should be sent by ``sendto()`` to get the exception.
+
+        :rtype: int
+        '''
+        if self._sendmmsg is None or len(datagrams) < 2:
+            for msg, host, port in datagrams:
+                sock.sendto(msg, (host, port))
+            return len(datagrams)
+        # resolve all addresses, stop at the first unknown
+        names = []
+        for msg, host, port in datagrams:
+            sockaddr = self._sockaddr(sock.family, host, port)
+            if sockaddr is None:
+                break
+            names.append(sockaddr)
+        count = len(names)
+        if count == 0:
+            return 0
+        headers = (_MMsgHdr * count)()
+        iovecs = (_IOVec * count)()
+        buffers = []
+        for idx in range(count):
+            data = ctypes.create_string_buffer(datagrams[idx][0], len(datagrams[idx][0]))
+            name = ctypes.create_string_buffer(names[idx], len(names[idx]))
+            buffers.append((data, name))
+            iovecs[idx].iov_base = ctypes.cast(data, ctypes.c_void_p)
+            iovecs[idx].iov_len = len(datagrams[idx][0])
+            headers[idx].msg_hdr.msg_name = ctypes.cast(name, ctypes.c_void_p)
+            headers[idx].msg_hdr.msg_namelen = len(names[idx])
+            headers[idx].msg_hdr.msg_iov = ctypes.pointer(iovecs[idx])
+            headers[idx].msg_hdr.msg_iovlen = 1
+        sent = 0
+        while sent < count:
+            result = self._sendmmsg(sock.fileno(), ctypes.addressof(headers) + sent * ctypes.sizeof(_MMsgHdr), count - sent, 0)
+            if result <= 0:
+                break
+            sent += result
+        return sent
+
+    def _sockaddr(self, family, host, port):
+        key = (host, port, family)
+        now = time.time()
+        cached = self._addresses.get(key, None)
+        if cached is not None and now - cached[1] < self.RESOLVE_TIMEOUT:
+            return cached[0]
+        sockaddr = None
+        try:
+            addrinfo = socket.getaddrinfo(host, port, family, socket.SOCK_DGRAM)[0][4]
+            if family == socket.AF_INET:
+                sockaddr = struct.pack('=H', family) + struct.pack('!H', addrinfo[1]) + socket.inet_pton(family, addrinfo[0]) + b'\0' * 8
+            elif family == socket.AF_INET6:
+                sockaddr = (struct.pack('=H', family) + struct.pack('!HI', addrinfo[1], addrinfo[2]) +
+                            socket.inet_pton(family, addrinfo[0].split('%')[0]) + struct.pack('=I', addrinfo[3]))
+        except Exception:
+            sockaddr = None
+        self._addresses[key] = (sockaddr, now)
+        return sockaddr
+
+
+class _TokenBucket(object):
+    '''
+    Allows ``rate`` messages per second with bursts up to ``rate`` messages.
+    '''
+    __slots__ = ('rate', 'tokens', 'stamp')
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.stamp = time.time()
+
+    def consume(self, now):
+        self.tokens = min(float(self.rate), self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.:
+            self.tokens -= 1.
+            return True
+        return False
+
+    def is_full(self, now):
+        return self.tokens + (now - self.stamp) * self.rate >= self.rate
+
+
+class _TokenBuckets(object):
+    '''
+    The token buckets of the destinations. A bucket which is refilled is removed,
+    a new full bucket is created on the next message to its destination.
+    '''
+
+    EVICT_INTERVAL = 1.
+    '''the time [sec] between the checks for refilled buckets, an empty bucket is refilled within one second'''
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._buckets = {}  # destination: _TokenBucket
+        self._evicted = time.time()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def consume(self, addr):
+        now = time.time()
+        if now - self._evicted >= self.EVICT_INTERVAL:
+            self._evicted = now
+            for key, bucket in list(self._buckets.items()):
+                if bucket.is_full(now):
+                    del self._buckets[key]
+        bucket = self._buckets.get(addr, None)
+        if bucket is None:
+            bucket = _TokenBucket(self.rate)
+            self._buckets[addr] = bucket
+        return bucket.consume(now)
 
 
 class QueueReceiveItem():
@@ -98,9 +285,21 @@ class DiscoverSocket(socket.socket):
     :param ttl: time to leave
 
     :type ttl: int (Default: 20)
+
+    :param rate_limit: the maximal count of messages per second to each destination, zero disables the limit
+
+    :type rate_limit: float (Default: 0)
+
+    :param batch_window: the time in seconds to collect messages before they are sent in one batch.
+                         Identical messages to the same destination in one batch are sent only once.
+
+    :type batch_window: float (Default: 0)
     '''
 
-    def __init__(self, port, mgroup, ttl=20, send_mcast=True, listen_mcast=True):
+    MAX_BATCH = 256
+    '''the maximal count of queued messages sent in one batch'''
+
+    def __init__(self, port, mgroup, ttl=20, send_mcast=True, listen_mcast=True, rate_limit=0, batch_window=0):
         '''
         Creates a socket, bind it to a given port and join to a given multicast
         group. IPv4 and IPv6 are supported.
@@ -114,10 +313,18 @@ class DiscoverSocket(socket.socket):
         @type send_mcast: bool (Default: True)
         @param listen_mcast: listen to the multicast group
         @type listen_mcast: bool (Default: True)
+        @param rate_limit: the maximal count of messages per second to each destination, zero disables the limit
+        @type rate_limit: float (Default: 0)
+        @param batch_window: the time in seconds to collect messages before they are sent in one batch
+        @type batch_window: float (Default: 0)
         '''
         self.port = port
         self.receive_queue = queue.Queue()
         self._send_queue = queue.Queue()
+        self._rate_limit = rate_limit
+        self._batch_window = batch_window
+        self._buckets = _TokenBuckets(rate_limit)
+        self._sender = DatagramSender()
         self._lock = threading.RLock()
         self.send_mcast = send_mcast
         self.listen_mcast = listen_mcast
@@ -254,6 +461,8 @@ class DiscoverSocket(socket.socket):
         Unregister from the multicast group and close the socket.
         '''
         self._closed = True
+        # stop the send thread
+        self._send_queue.put(None)
         # Use the stored group_bin to de-register
         if not self.unicast_only:
             if self.listen_mcast:
@@ -277,92 +486,145 @@ class DiscoverSocket(socket.socket):
             import traceback
             print(traceback.format_exc())
             rospy.logwarn("Can't send message: %s" % full)
+            _count('dropped')
         except Exception as e:
             rospy.logwarn("Error while put message into queue: %s" % e)
 
-    def _get_next_queue_item(self):
+    def _get_next_queue_items(self):
         '''
-        Wait for next available QueueSendItem. This method cancel waiting on exit and return None.
+        Wait for next available QueueSendItem and collects all items received within
+        the batch window. This method returns an empty list on exit.
         '''
-        while not self._closed:
-            try:
-                send_item = self._send_queue.get(timeout=0.5)
-                return send_item
-            except queue.Empty:
-                pass
-            except Exception as e:
-                rospy.logwarn("Error while get send item from queue: %s" % e)
-        return None
+        items = []
+        try:
+            send_item = self._send_queue.get()
+            if send_item is None or self._closed:
+                return items
+            items.append(send_item)
+            deadline = time.time() + self._batch_window
+            while len(items) < self.MAX_BATCH:
+                timeout = deadline - time.time()
+                if timeout > 0:
+                    send_item = self._send_queue.get(timeout=timeout)
+                else:
+                    send_item = self._send_queue.get_nowait()
+                if send_item is None:
+                    break
+                items.append(send_item)
+        except queue.Empty:
+            pass
+        except Exception as e:
+            rospy.logwarn("Error while get send item from queue: %s" % e)
+        return items
 
     def _send_loop_from_queue(self):
         while not self._closed:
-            send_item = self._get_next_queue_item()
-            if send_item is not None and not self._closed:
-                msg = send_item.msg
-                if send_item.destinations:
-                    # send to given addresses
-                    for addr in send_item.destinations:
-                        try:
-                            if addr in self._locals:
-                                self.receive_queue.put(QueueReceiveItem(msg, (addr, self.port), QueueReceiveItem.LOOPBACK), timeout=1)
-                            elif self.unicast_socket is None:
-                                self.sendto(msg, (addr, self.getsockname()[1]))
-                            else:
-                                self.unicast_socket.send2addr(msg, addr)
-                            try:
-                                del SEND_ERRORS[addr]
-                            except:
-                                pass
-                        except socket.error as errobj:
-                            erro_msg = "Error while send to '%s': %s" % (addr, errobj)
-                            SEND_ERRORS[addr] = erro_msg
-                            # -2: Name or service not known
-                            if errobj.errno in [-5, -2]:
-                                if addr not in self.sock_5_error_printed:
-                                    rospy.logwarn(erro_msg)
-                                    self.sock_5_error_printed.append(addr)
-                            else:
-                                rospy.logwarn(erro_msg)
-                            if errobj.errno in [errno.ENETDOWN, errno.ENETUNREACH, errno.ENETRESET, errno]:
-                                self.SOKET_ERRORS_NEEDS_RECONNECT = True
-                        except Exception as e:
-                            erro_msg = "Send to robot host '%s' failed: %s" % (addr, e)
-                            rospy.logwarn(erro_msg)
-                            SEND_ERRORS[addr] = erro_msg
+            send_items = self._get_next_queue_items()
+            if send_items and not self._closed:
+                self._send_items(send_items)
+
+    def _send_items(self, send_items):
+        # merge identical messages to the same destination, a multicast message has the destination None
+        messages = []
+        known = set()
+        for send_item in send_items:
+            for addr in send_item.destinations or [None]:
+                key = (send_item.msg, addr)
+                if key in known:
+                    _count('coalesced')
                 else:
-                    # send a multicast message
-                    # simulate the reception of a message from local host
-                    addr = self.mgroup
-                    try:
-                        if not self.listen_mcast:
-                            self.receive_queue.put(QueueReceiveItem(msg, ('localhost', self.port), QueueReceiveItem.LOOPBACK), timeout=1)
-                        if self.unicast_only and self.unicast_socket:
-                            addr = self.unicast_socket.interface
-                            self.unicast_socket.send2addr(msg, self.unicast_socket.interface)
-                        elif self.send_mcast:
-                            # Send to the multicast group address as supplied
-                            # Default '226.0.0.0'
-                            self.sendto(msg, (self.mgroup, self.getsockname()[1]))
-                        try:
-                            del SEND_ERRORS[addr]
-                        except:
-                            pass
-                    except socket.error as errobj:
-                        erro_msg = "Error while send to '%s': %s" % (addr, errobj)
-                        SEND_ERRORS[addr] = erro_msg
-                        # -2: Name or service not known
-                        if errobj.errno in [-5, -2]:
-                            if addr not in self.sock_5_error_printed:
-                                rospy.logwarn(erro_msg)
-                                self.sock_5_error_printed.append(addr)
-                        else:
-                            rospy.logdebug(erro_msg)
-                        if errobj.errno in [errno.ENETDOWN, errno.ENETUNREACH, errno.ENETRESET]:
-                            self.SOKET_ERRORS_NEEDS_RECONNECT = True
-                    except Exception as e:
-                        erro_msg = "Send to robot host '%s' failed: %s" % (addr, e)
-                        rospy.logwarn(erro_msg)
-                        SEND_ERRORS[addr] = erro_msg
+                    known.add(key)
+                    messages.append(key)
+        # the datagrams for each socket: (msg, host, port, addr, multicast)
+        datagrams = {}
+        for msg, addr in messages:
+            if addr is None:
+                # send a multicast message
+                # simulate the reception of a message from local host
+                if not self.listen_mcast:
+                    self._put_loopback(msg, 'localhost')
+                if self.unicast_only and self.unicast_socket:
+                    self._add_datagram(datagrams, self.unicast_socket, msg, self.unicast_socket.interface, self.unicast_socket.interface, True)
+                elif self.send_mcast:
+                    # Send to the multicast group address as supplied
+                    # Default '226.0.0.0'
+                    self._add_datagram(datagrams, self, msg, self.mgroup, self.mgroup, True)
+            elif addr in self._locals:
+                self._put_loopback(msg, addr)
+            elif self.unicast_socket is None:
+                self._add_datagram(datagrams, self, msg, addr, addr, False)
+            else:
+                self._add_datagram(datagrams, self.unicast_socket, msg, addr, addr, False)
+        for sock, items in datagrams.values():
+            self._send_datagrams(sock, items)
+
+    def _add_datagram(self, datagrams, sock, msg, host, addr, multicast):
+        if self._rate_limit > 0 and not self._buckets.consume(addr):
+            _count('dropped')
+            return
+        if id(sock) not in datagrams:
+            datagrams[id(sock)] = (sock, [])
+        datagrams[id(sock)][1].append((msg, host, sock.getsockname()[1], addr, multicast))
+
+    def _put_loopback(self, msg, addr):
+        try:
+            self.receive_queue.put(QueueReceiveItem(msg, (addr, self.port), QueueReceiveItem.LOOPBACK), timeout=1)
+            _count('sent')
+        except Exception as e:
+            erro_msg = "Send to robot host '%s' failed: %s" % (addr, e)
+            rospy.logwarn(erro_msg)
+            SEND_ERRORS[addr] = erro_msg
+            _count('errors')
+
+    def _send_datagrams(self, sock, items):
+        while items:
+            try:
+                sent = self._sender.send(sock, [(msg, host, port) for msg, host, port, _, _ in items])
+            except Exception:
+                # send the first one again to get the error
+                sent = 0
+            for _, _, _, addr, _ in items[:sent]:
+                try:
+                    del SEND_ERRORS[addr]
+                except:
+                    pass
+            _count('sent', sent)
+            if sent < len(items):
+                # the datagram caused an error, send it alone to get the exception
+                self._send_datagram(sock, *items[sent])
+            items = items[sent + 1:]
+
+    def _send_datagram(self, sock, msg, host, port, addr, multicast):
+        try:
+            if sock is self.unicast_socket:
+                sock.send2addr(msg, host)
+            else:
+                sock.sendto(msg, (host, port))
+            try:
+                del SEND_ERRORS[addr]
+            except:
+                pass
+            _count('sent')
+        except socket.error as errobj:
+            _count('errors')
+            erro_msg = "Error while send to '%s': %s" % (addr, errobj)
+            SEND_ERRORS[addr] = erro_msg
+            # -2: Name or service not known
+            if errobj.errno in [-5, -2]:
+                if addr not in self.sock_5_error_printed:
+                    rospy.logwarn(erro_msg)
+                    self.sock_5_error_printed.append(addr)
+            elif multicast:
+                rospy.logdebug(erro_msg)
+            else:
+                rospy.logwarn(erro_msg)
+            if errobj.errno in [errno.ENETDOWN, errno.ENETUNREACH, errno.ENETRESET]:
+                self.SOKET_ERRORS_NEEDS_RECONNECT = True
+        except Exception as e:
+            _count('errors')
+            erro_msg = "Send to robot host '%s' failed: %s" % (addr, e)
+            rospy.logwarn(erro_msg)
+            SEND_ERRORS[addr] = erro_msg
 
     def hasEnabledMulticastIface(self):
         '''
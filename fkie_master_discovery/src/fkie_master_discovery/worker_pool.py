@@ -0,0 +1,279 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+'''
+A bounded worker pool for the socket servers of the XML-RPC API. Instead of a
+new thread for each connection a fixed count of worker threads handles the
+requests. Idle keep-alive connections do not occupy a worker: they are watched
+by one thread and queued as soon as the next request arrives. If the queue is
+full, the request is rejected with ``503 Service Unavailable``.
+'''
+
+import os
+try:
+    import Queue as queue  # python 2 compatibility
+except ImportError:
+    import queue
+import socket
+import threading
+import time
+
+from .prober import SocketPoller
+
+_REJECT_RESPONSE = b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+
+
+class ServerMetrics(object):
+    '''
+    Queue and latency metrics of a server with worker pool. The latency is the time from
+    the arrival of a request until its response was sent, the wait time is the part
+    spent in the queue. Averages are exponential moving averages.
+    '''
+
+    ALPHA = 0.1
+    '''the weight of the last request in the averages'''
+
+    def __init__(self, workers, queue_size):
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue_length = 0
+        self.queue_max = 0
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.wait_avg = 0.
+        self.wait_max = 0.
+        self.latency_avg = 0.
+        self.latency_max = 0.
+
+    def queued(self, queue_length):
+        with self._lock:
+            self.queue_length = queue_length
+            self.queue_max = max(self.queue_max, queue_length)
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def finished(self, wait, latency, queue_length):
+        with self._lock:
+            self.requests += 1
+            self.queue_length = queue_length
+            self.wait_avg += self.ALPHA * (wait - self.wait_avg)
+            self.wait_max = max(self.wait_max, wait)
+            self.latency_avg += self.ALPHA * (latency - self.latency_avg)
+            self.latency_max = max(self.latency_max, latency)
+
+    def to_dict(self):
+        '''
+        :rtype: dict(str: int or float)
+        '''
+        with self._lock:
+            return {'workers': self.workers, 'queue_size': self.queue_size,
+                    'queue_length': self.queue_length, 'queue_max': self.queue_max,
+                    'connections': self.connections, 'requests': self.requests, 'rejected': self.rejected,
+                    'wait_avg': self.wait_avg, 'wait_max': self.wait_max,
+                    'latency_avg': self.latency_avg, 'latency_max': self.latency_max}
+
+
+class WorkerPoolMixIn(object):
+    '''
+    Replaces the ``ThreadingMixIn`` of a socketserver with a bounded pool of worker threads.
+    The request handler must be a ``BaseHTTPRequestHandler``. Call :meth:`init_worker_pool`
+    in the constructor of the server and :meth:`stop_worker_pool` on shutdown.
+    '''
+
+    idle_timeout = 30.
+    '''idle connections are closed after this time [sec]'''
+
+    def init_worker_pool(self, workers=8, queue_size=64):
+        '''
+        :param int workers: the count of worker threads
+        :param int queue_size: the maximal count of requests waiting for a worker
+        '''
+        handler_class = self.RequestHandlerClass
+
+        class PooledRequestHandler(handler_class):
+            # handles only one request of a keep-alive connection, the connection is returned to the pool.
+            # A class statement, because the handler is an old-style class in python 2
+            def handle(self):
+                self.close_connection = True
+                self.handle_one_request()
+
+        self.RequestHandlerClass = PooledRequestHandler
+        self.metrics = ServerMetrics(workers, queue_size)
+        self._pool_running = True
+        self._queue = queue.Queue(max(1, queue_size))
+        self._new_connections = []
+        self._new_lock = threading.Lock()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._pool_threads = []
+        for _ in range(max(1, workers)):
+            self._start_thread(self._work)
+        self._start_thread(self._watch)
+
+    def _start_thread(self, target):
+        thread = threading.Thread(target=target)
+        thread.setDaemon(True)
+        thread.start()
+        self._pool_threads.append(thread)
+
+    def stop_worker_pool(self):
+        '''
+        Stops the worker threads and closes all idle connections.
+        '''
+        if not self._pool_running:
+            return
+        self._pool_running = False
+        for _ in range(self.metrics.workers):
+            try:
+                self._queue.put(None, timeout=1.)
+            except queue.Full:
+                pass
+        self._wakeup()
+        for thread in self._pool_threads:
+            thread.join(2.)
+
+    def process_request(self, request, client_address):
+        # called by serve_forever() for each new connection
+        self.metrics.connected()
+        self._watch_connection(request, client_address)
+
+    def _watch_connection(self, request, client_address):
+        with self._new_lock:
+            self._new_connections.append((request, client_address))
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            os.write(self._wakeup_w, b'x')
+        except OSError:
+            # the pool is stopped
+            pass
+
+    def _enqueue(self, request, client_address):
+        try:
+            self._queue.put_nowait((request, client_address, time.time()))
+            self.metrics.queued(self._queue.qsize())
+        except queue.Full:
+            self.metrics.reject()
+            try:
+                # read the pending request to avoid a reset of the connection before the response is received
+                request.setblocking(False)
+                request.recv(65536)
+            except Exception:
+                pass
+            try:
+                request.settimeout(0.1)
+                request.sendall(_REJECT_RESPONSE)
+            except Exception:
+                pass
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            request, client_address, ts = job
+            start = time.time()
+            keep_alive = False
+            try:
+                handler = self.RequestHandlerClass(request, client_address, self)
+                keep_alive = not handler.close_connection
+            except Exception:
+                self.handle_error(request, client_address)
+            now = time.time()
+            self.metrics.finished(start - ts, now - ts, self._queue.qsize())
+            if keep_alive and self._pool_running:
+                self._watch_connection(request, client_address)
+            else:
+                self.shutdown_request(request)
+
+    def _is_closed(self, request):
+        # the socket is readable, an empty read means the connection was closed by the client
+        try:
+            return not request.recv(1, socket.MSG_PEEK)
+        except socket.error:
+            return True
+
+    def _watch(self):
+        poller = SocketPoller()
+        poller.register(self._wakeup_r, False)
+        idle = dict()  # fileno: (request, client_address, idle since)
+        try:
+            while self._pool_running:
+                now = time.time()
+                timeout = self.idle_timeout
+                if idle:
+                    timeout = max(0., min(ts for _, _, ts in idle.values()) + self.idle_timeout - now)
+                for fileno, _error in poller.poll(timeout):
+                    if fileno == self._wakeup_r:
+                        os.read(self._wakeup_r, 4096)
+                        continue
+                    request, client_address, _ts = idle.pop(fileno)
+                    poller.unregister(fileno)
+                    if self._is_closed(request):
+                        self.shutdown_request(request)
+                    else:
+                        self._enqueue(request, client_address)
+                with self._new_lock:
+                    new_connections = self._new_connections
+                    self._new_connections = []
+                now = time.time()
+                for request, client_address in new_connections:
+                    try:
+                        fileno = request.fileno()
+                        poller.register(fileno, False)
+                        idle[fileno] = (request, client_address, now)
+                    except Exception:
+                        self.shutdown_request(request)
+                for fileno, (request, _client_address, ts) in list(idle.items()):
+                    if now - ts >= self.idle_timeout:
+                        del idle[fileno]
+                        poller.unregister(fileno)
+                        self.shutdown_request(request)
+        finally:
+            for request, _client_address, _ts in idle.values():
+                self.shutdown_request(request)
+            with self._new_lock:
+                for request, _client_address in self._new_connections:
+                    self.shutdown_request(request)
+                self._new_connections = []
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
@@ -0,0 +1,183 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+'''
+A thread-safe pool of persistent XML-RPC connections. The connections are kept
+alive between the calls (HTTP/1.1) and the timeout is set for each call instead
+of using the process-wide ``socket.setdefaulttimeout()``.
+
+Usage::
+
+    with server_proxy(monitoruri, timeout=10) as remote_monitor:
+        remote_monitor.masterContacts()
+'''
+
+from contextlib import contextmanager
+import threading
+import time
+try:
+    import xmlrpclib as xmlrpcclient
+except ImportError:
+    import xmlrpc.client as xmlrpcclient
+
+
+class _KeepAliveMixin(object):
+    '''
+    Sets the timeout of the current call on new and reused connections.
+    '''
+
+    def init_keep_alive(self, use_gzip):
+        self.timeout = None
+        self.last_used = time.time()
+        # compress large requests and accept compressed responses
+        self.accept_gzip_encoding = use_gzip
+        self.encode_threshold = 1400 if use_gzip else None
+
+    def make_connection(self, host):
+        conn = self._base_transport.make_connection(self, host)
+        conn.timeout = self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(self.timeout)
+        return conn
+
+
+class KeepAliveTransport(_KeepAliveMixin, xmlrpcclient.Transport):
+    '''
+    HTTP transport which keeps the connection open and supports a timeout per call.
+    '''
+    _base_transport = xmlrpcclient.Transport
+
+    def __init__(self, use_gzip=True):
+        xmlrpcclient.Transport.__init__(self)
+        self.init_keep_alive(use_gzip)
+
+
+class SafeKeepAliveTransport(_KeepAliveMixin, xmlrpcclient.SafeTransport):
+    '''
+    HTTPS transport which keeps the connection open and supports a timeout per call.
+    '''
+    _base_transport = xmlrpcclient.SafeTransport
+
+    def __init__(self, use_gzip=True):
+        xmlrpcclient.SafeTransport.__init__(self)
+        self.init_keep_alive(use_gzip)
+
+
+class TransportPool(object):
+    '''
+    Holds the idle transports for each URI. A transport is used by one thread only
+    at the same time. Transports which failed while a call are closed and dropped.
+    '''
+
+    MAX_IDLE = 4
+    '''the maximal count of idle transports for each URI'''
+    IDLE_TIMEOUT = 20.
+    '''idle transports older than this time [sec] are closed. It is lower than the server timeout to avoid reconnects.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = dict()  # (uri, use_gzip) : [transports]
+
+    @contextmanager
+    def server_proxy(self, uri, timeout=None, use_gzip=True, allow_none=False):
+        '''
+        Returns a ServerProxy with a persistent connection to the given URI.
+
+        :param str uri: the URI of the XML-RPC server
+        :param float timeout: the timeout [sec] for each call of this proxy, `None` blocks
+        :param bool use_gzip: compress large requests and accept compressed responses
+        :param bool allow_none: allow `None` values in requests
+        :rtype: xmlrpclib.ServerProxy
+        '''
+        transport = self._acquire(uri, use_gzip)
+        transport.timeout = timeout
+        success = False
+        try:
+            yield xmlrpcclient.ServerProxy(uri, transport=transport, allow_none=allow_none)
+            success = True
+        finally:
+            if success:
+                self._release(uri, use_gzip, transport)
+            else:
+                transport.close()
+
+    def clear(self):
+        '''
+        Closes all idle transports.
+        '''
+        with self._lock:
+            idle = self._idle
+            self._idle = dict()
+        for transports in idle.values():
+            for transport in transports:
+                transport.close()
+
+    def _acquire(self, uri, use_gzip):
+        now = time.time()
+        expired = []
+        transport = None
+        with self._lock:
+            transports = self._idle.get((uri, use_gzip), [])
+            while transports and transport is None:
+                item = transports.pop()
+                if now - item.last_used < self.IDLE_TIMEOUT:
+                    transport = item
+                else:
+                    expired.append(item)
+        for item in expired:
+            item.close()
+        if transport is None:
+            if uri.startswith('https'):
+                transport = SafeKeepAliveTransport(use_gzip)
+            else:
+                transport = KeepAliveTransport(use_gzip)
+        return transport
+
+    def _release(self, uri, use_gzip, transport):
+        transport.last_used = time.time()
+        with self._lock:
+            transports = self._idle.setdefault((uri, use_gzip), [])
+            if len(transports) < self.MAX_IDLE:
+                transports.append(transport)
+                return
+        transport.close()
+
+
+_POOL = TransportPool()
+
+
+def server_proxy(uri, timeout=None, use_gzip=True, allow_none=False):
+    '''
+    Returns a context manager with a ServerProxy of the process-wide transport pool.
+    See :meth:`TransportPool.server_proxy`.
+    '''
+    return _POOL.server_proxy(uri, timeout, use_gzip, allow_none)
@@ -31,8 +31,10 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import time
 import unittest
 
+from fkie_master_discovery.common import gen_pattern
 from fkie_master_discovery.filter_interface import FilterInterface
 
 PKG = 'fkie_master_discovery'
@@ -60,6 +62,48 @@ class TestFilterInterface(unittest.TestCase):
         ignore = fi.is_ignored_publisher('/some_node', '/test_topic', '')
         self.assertFalse(ignore, "/test_topic is in sync_topic, but ignored by filter interface")
 
+    def test_cached_decisions(self):
+        fi = FilterInterface()
+        fi.load(mastername='testmaster',
+                ignore_nodes=[], sync_nodes=[],
+                ignore_topics=[], sync_topics=['/test_topic'],
+                ignore_srv=[], sync_srv=[],
+                ignore_type=[],
+                ignore_publishers=[], ignore_subscribers=[],
+                do_not_sync=[])
+        for _ in range(2):
+            self.assertTrue(fi.is_ignored_publisher('/some_node', '/other_topic', ''), "/other_topic is not in sync_topic, but not ignored")
+            self.assertTrue(fi.is_ignored_subscriber('/some_node', '/other_topic', ''), "/other_topic is not in sync_topic, but not ignored")
+        fi.update_sync_topics_pattern(['/other_topic'])
+        self.assertFalse(fi.is_ignored_publisher('/some_node', '/other_topic', ''), "cached decision not cleared after update of sync_topic")
+        self.assertFalse(fi.is_ignored_subscriber('/some_node', '/other_topic', ''), "cached decision not cleared after update of sync_topic")
+        fi.set_hide_pattern(re_hide_topics=gen_pattern(['/other_topic'], 'hide_topics', print_info=False))
+        self.assertTrue(fi.is_ignored_publisher('/some_node', '/other_topic', ''), "cached decision not cleared after update of hide pattern")
+
+    def test_decision_throughput(self):
+        fi = FilterInterface()
+        # the default filter of a sync thread in master_sync
+        fi.load(mastername='testmaster',
+                ignore_nodes=['/rosout', '/master_discovery', '/master_sync', '/node_manager', '/node_manager_daemon', '/zeroconf', '/param_sync'], sync_nodes=[],
+                ignore_topics=['/rosout', '/rosout_agg', '/master_discovery/*', '/master_sync/*', '/zeroconf/*'], sync_topics=[],
+                ignore_srv=['/*get_loggers', '/*set_logger_level', '/master_discovery/*', '/master_sync/*', '/node_manager_daemon/*', '/zeroconf/*'], sync_srv=[],
+                ignore_type=['bond/Status', 'fkie_multimaster_msgs/SyncTopicInfo', 'fkie_multimaster_msgs/SyncServiceInfo', 'fkie_multimaster_msgs/SyncMasterInfo', 'fkie_multimaster_msgs/MasterState'],
+                ignore_publishers=[], ignore_subscribers=[],
+                do_not_sync=[])
+        types = ['std_msgs/String', 'sensor_msgs/Image', 'bond/Status', 'nav_msgs/Odometry']
+        triples = [('/robot%d/node%d' % (i % 50, i % 2000), '/robot%d/topic%d' % (i % 50, i), types[i % len(types)]) for i in range(50000)]
+        triples.extend([('/master_sync', '/master_sync/changes', 'std_msgs/String'), ('/talker', '/rosout', 'rosgraph_msgs/Log')])
+        durations = []
+        results = []
+        for _ in range(3):
+            start = time.time()
+            results.append([fi.is_ignored_publisher(node, topic, topictype) for node, topic, topictype in triples])
+            durations.append(max(time.time() - start, 0.000001))
+        self.assertEqual(results[0], results[1], "cached decisions differ from uncached decisions")
+        self.assertEqual(results[1], results[2], "cached decisions differ between passes")
+        self.assertEqual(results[0].count(True), 12502, "wrong count of ignored publishers: %d" % results[0].count(True))
+        print("is_ignored_publisher with %d triples: cold cache %.3f sec, warm cache %.3f sec" % (len(triples), durations[0], min(durations[1:])))
+
 
 if __name__ == '__main__':
     import rosunit
@@ -0,0 +1,161 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import random
+import unittest
+
+from fkie_master_discovery.heartbeat_table import HeartbeatTable
+
+PKG = 'fkie_master_discovery'
+
+
+class TestHeartbeatTable(unittest.TestCase):
+    '''
+    '''
+
+    def tables(self):
+        # the NumPy table falls back to python if NumPy is not available
+        return [HeartbeatTable(5, use_numpy=False), HeartbeatTable(5, use_numpy=True)]
+
+    def test_quality(self):
+        for table in self.tables():
+            row = table.add(1., 0.)
+            for ts in range(1, 6):
+                table.add_heartbeat(row, 1., ts - 0.5)
+            self.assertEqual(table.calculate(5, 1.4, [row], now=5.), ([100.], [False]), "wrong quality of complete heartbeats")
+            table.add_heartbeat(row, 1., 5.5)
+            # two heartbeats are lost, two are outside of the measurement duration
+            self.assertEqual(table.calculate(5, 1.4, [row], now=8.), ([60.], [False]), "wrong quality of lost heartbeats")
+            self.assertEqual(table.heartbeats(row), [3.5, 4.5, 5.5], "old heartbeats not removed")
+
+    def test_quality_on_start(self):
+        for table in self.tables():
+            row = table.add(2., 10.)
+            table.add_heartbeat(row, 2., 10.5)
+            table.add_heartbeat(row, 2., 11.)
+            self.assertEqual(table.calculate(5, 1.4, [row], now=11.), ([100.], [False]), "measurement duration not reduced on start")
+
+    def test_offline(self):
+        for table in self.tables():
+            row = table.add(1., 0.)
+            table.add_heartbeat(row, 1., 1.)
+            self.assertEqual(table.calculate(5, 1.4, [row], now=8.)[1], [False], "offline too early")
+            self.assertEqual(table.calculate(5, 1.4, [row], now=8.1)[1], [True], "offline not detected")
+
+    def test_low_rate(self):
+        for table in self.tables():
+            row = table.add(0.5, 0.)
+            slow = table.add(0.2, 0.)
+            for ts in range(2, 21, 2):
+                table.add_heartbeat(row, 0.5, ts)
+                table.add_heartbeat(slow, 0.2, ts)
+            # the measurement duration is divided by the rate
+            self.assertEqual(table.calculate(5, 1.4, [row, slow], now=20.), ([100., -1.], [False, False]), "wrong quality for low rates")
+            self.assertEqual(table.heartbeats(slow), [], "heartbeats with rate below minimum stored")
+
+    def test_rate_change(self):
+        for table in self.tables():
+            row = table.add(1., 0.)
+            table.add_heartbeat(row, 1., 1.)
+            table.add_heartbeat(row, 2., 2.)
+            self.assertEqual(table.heartbeats(row), [2.], "heartbeats not removed on rate change")
+            self.assertEqual(table.rates[row], 2., "rate not updated")
+
+    def test_requests(self):
+        for table in self.tables():
+            row = table.add(1., 0.)
+            for ts in range(1, 6):
+                table.add_heartbeat(row, 1., ts - 0.5)
+            table.add_request(row, 4.8)
+            self.assertEqual(table.calculate(5, 10, [row], now=5.)[0], [5. / 6. * 100.], "requests not expected")
+            table.add_heartbeat(row, 1., 5.5)
+            self.assertEqual(table.requests(row), [], "requests not reset by heartbeat")
+
+    def test_remove_heartbeats(self):
+        for table in self.tables():
+            row = table.add(1., 0.)
+            for ts in range(1, 6):
+                table.add_heartbeat(row, 1., ts)
+            table.add_request(row, 2.)
+            self.assertEqual(table.remove_heartbeats(row, 3.), 2, "wrong count of removed heartbeats")
+            self.assertEqual(table.remove_heartbeats(row, 3.), 0, "heartbeats removed twice")
+            self.assertEqual(table.heartbeats(row), [3., 4., 5.], "wrong heartbeats after remove")
+            self.assertEqual(table.requests(row), [], "old requests not removed")
+
+    def test_ring_buffer(self):
+        for table in self.tables():
+            row = table.add(25.5, 0.)
+            count = table.size + 10
+            for idx in range(count):
+                table.add_heartbeat(row, 25.5, 5. * idx / count)
+            self.assertEqual(len(table.heartbeats(row)), table.size, "ring buffer not bounded")
+            self.assertEqual(table.heartbeats(row)[-1], 5. * (count - 1) / count, "last heartbeat overwritten")
+            self.assertEqual(table.calculate(5, 1.4, [row], now=5.)[0], [100.], "wrong quality of full ring buffer")
+
+    def test_rows(self):
+        for table in self.tables():
+            rows = [table.add(1., 0.) for _ in range(HeartbeatTable.MIN_CAPACITY * 2 + 1)]
+            self.assertEqual(len(set(rows)), len(rows), "rows used twice")
+            self.assertEqual(len(table), len(rows), "wrong count of rows")
+            table.add_heartbeat(rows[3], 1., 1.)
+            table.remove(rows[3])
+            row = table.add(1., 0.)
+            self.assertEqual(row, rows[3], "removed row not reused")
+            self.assertEqual(table.heartbeats(row), [], "heartbeats of removed row not cleared")
+            qualities, offline = table.calculate(5, 1.4, now=0.5)
+            self.assertEqual(len(qualities), len(rows), "calculated not for all rows in use")
+
+    def test_same_results(self):
+        rnd = random.Random(0)
+        tables = self.tables()
+        rows = [[table.add(1., 0.) for _ in range(20)] for table in tables]
+        now = 0.
+        for _ in range(200):
+            now += rnd.random() * 2
+            for idx in range(20):
+                rate = rnd.choice([1., 1., 1., 0., 0.5, 10.])
+                for beat in range(rnd.randrange(4)):
+                    for table, trows in zip(tables, rows):
+                        table.add_heartbeat(trows[idx], rate, now + beat * 0.01)
+                if rnd.random() < 0.05:
+                    for table, trows in zip(tables, rows):
+                        table.add_request(trows[idx], now)
+            results = [table.calculate(5, 1.4, trows, now=now + 0.1) for table, trows in zip(tables, rows)]
+            self.assertEqual(results[0], results[1], "different results with and without NumPy")
+            self.assertEqual([tables[0].heartbeats(r) for r in rows[0]], [tables[1].heartbeats(r) for r in rows[1]], "different heartbeats with and without NumPy")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestHeartbeatTable)
@@ -0,0 +1,143 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import unittest
+
+from fkie_master_discovery.master_info import MasterInfo, TopicInfo
+
+PKG = 'fkie_master_discovery'
+
+
+def _create_master_info(masteruri, timestamp, publishers, subscribers, services):
+    result = MasterInfo(masteruri, 'testmaster')
+    for topic, node in publishers:
+        result.topics = topic
+        result.nodes = node
+        result.getNode(node).publishedTopics = topic
+        result.getTopic(topic).publisherNodes = node
+        result.getTopic(topic).type = 'std_msgs/String'
+    for topic, node in subscribers:
+        result.topics = topic
+        result.nodes = node
+        result.getNode(node).subscribedTopics = topic
+        result.getTopic(topic).subscriberNodes = node
+        result.getTopic(topic).type = 'std_msgs/String'
+    for service, node in services:
+        result.services = service
+        result.nodes = node
+        result.getNode(node).services = service
+        result.getService(service).serviceProvider = node
+    result.timestamp = timestamp
+    return result
+
+
+def _sorted_state(state):
+    return [sorted(item) if isinstance(item, list) else item for item in state]
+
+
+class TestMasterInfo(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        pass
+
+    def test_delta(self):
+        masteruri = 'http://localhost:11311/'
+        old = _create_master_info(masteruri, 1.0,
+                                  [('/chatter', '/talker'), ('/tf', '/talker')],
+                                  [('/chatter', '/listener')],
+                                  [('/talker/get_loggers', '/talker')])
+        new = _create_master_info(masteruri, 2.0,
+                                  [('/tf', '/talker'), ('/tf', '/other')],
+                                  [('/chatter', '/listener')],
+                                  [('/other/get_loggers', '/other')])
+        nodes, topics, services = new.changed_names(old)
+        self.assertEqual(nodes, set(['/talker', '/other']), "wrong changed nodes: %s" % nodes)
+        self.assertEqual(topics, set(['/chatter', '/tf']), "wrong changed topics: %s" % topics)
+        self.assertEqual(services, set(['/talker/get_loggers', '/other/get_loggers']), "wrong changed services: %s" % services)
+        base = old.listedState()
+        delta = new.listedStateDelta(base[0], nodes, topics, services)
+        self.assertEqual(delta[13], ['/talker/get_loggers'], "wrong removed services: %s" % delta[13])
+        merged = MasterInfo.merge_delta(base, delta)
+        self.assertEqual(_sorted_state(merged), _sorted_state(new.listedState()), "merged delta differs from the new state")
+        self.assertRaises(ValueError, MasterInfo.merge_delta, new.listedState(), delta)
+        # no changes
+        nodes, topics, services = new.changed_names(new)
+        self.assertFalse(nodes or topics or services, "changes in equal states detected")
+
+    def test_packed(self):
+        masteruri = 'http://localhost:11311/'
+        old = _create_master_info(masteruri, 1.0,
+                                  [('/chatter', '/talker')],
+                                  [('/chatter', '/listener')],
+                                  [('/talker/get_loggers', '/talker')])
+        new = _create_master_info(masteruri, 2.0,
+                                  [('/chatter', '/talker'), ('/tf', '/other')],
+                                  [('/chatter', '/listener')],
+                                  [])
+        new.getNode('/talker').pid = 42
+        state = new.listedState()
+        nodes, topics, services = new.changed_names(old)
+        delta = new.listedStateDelta(old.listedState()[0], nodes, topics, services)
+        for compress in [True, False]:
+            self.assertEqual(MasterInfo.unpack_state(MasterInfo.pack_state(state, compress)), tuple(state), "unpacked state differs, compress: %s" % compress)
+            self.assertEqual(MasterInfo.unpack_state(MasterInfo.pack_state(delta, compress)), tuple(delta), "unpacked delta differs, compress: %s" % compress)
+        self.assertRaises(ValueError, MasterInfo.unpack_state, b'no packed state')
+
+    def test_members(self):
+        topic = TopicInfo('/tf')
+        names = ['/node_%d' % i for i in range(20)]
+        for name in names + names:
+            topic.subscriberNodes = name
+        self.assertEqual(topic.subscriberNodes, names, "subscribers are not unique or not in insertion order")
+        copy = topic.copy()
+        copy.subscriberNodes = '/new'
+        self.assertEqual(len(topic.subscriberNodes), len(names), "copy shares the subscribers")
+        topic.publisherNodes = ['/b', '/a', '/b']
+        self.assertEqual(topic.publisherNodes, ['/b', '/a'], "wrong publishers after replace by list")
+        self.assertRaises(AttributeError, setattr, topic, 'unknown', 1)
+        masteruri = 'http://localhost:11311/'
+        state = _create_master_info(masteruri, 1.0, [('/chatter', '/talker')], [('/chatter', '/listener')], []).listedState()
+        MasterInfo.INTERN_NAMES = True
+        try:
+            info = MasterInfo.from_list(state)
+        finally:
+            MasterInfo.INTERN_NAMES = False
+        self.assertEqual(info.listedState(), state, "interned state differs")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestMasterInfo)
@@ -0,0 +1,148 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import threading
+import unittest
+
+from fkie_master_discovery.master_info import MasterInfo
+from fkie_master_discovery.master_monitor import MasterMonitor
+
+PKG = 'fkie_master_discovery'
+
+LOCAL_URI = 'http://local:11311/'
+REMOTE_URI = 'http://remote:11311/'
+NODE_URI = 'http://remote:40000/'
+SERVICE_URI = 'rosrpc://remote:40001'
+
+
+class SyncEntry(object):
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class DummyMonitor(MasterMonitor):
+    '''
+    MasterMonitor without connections to the ROS master. The synchronization
+    info is set by the test.
+    '''
+
+    def __init__(self):
+        self._create_access_lock = threading.RLock()
+        self.sync_info = None
+
+    def set_new_state(self, master_state, changes):
+        self._MasterMonitor__new_master_state = master_state
+        self._MasterMonitor__new_changes = changes
+
+    def _find_sync_info_service(self, master_state):
+        return master_state.getService('/master_sync/get_sync_info')
+
+    def _get_sync_info(self, service_name, service_uri):
+        return self.sync_info
+
+
+def _create_state():
+    result = MasterInfo(LOCAL_URI, 'local')
+    for node, uri in [('/master_sync', 'http://local:40000/'), ('/talker', NODE_URI)]:
+        result.nodes = node
+        result.getNode(node).uri = uri
+    result.services = '/master_sync/get_sync_info'
+    result.getService('/master_sync/get_sync_info').uri = 'rosrpc://local:40001'
+    result.getService('/master_sync/get_sync_info').serviceProvider = '/master_sync'
+    result.getNode('/master_sync').services = '/master_sync/get_sync_info'
+    result.services = '/talker/set_logger_level'
+    result.getService('/talker/set_logger_level').uri = SERVICE_URI
+    result.getService('/talker/set_logger_level').serviceProvider = '/talker'
+    result.getNode('/talker').services = '/talker/set_logger_level'
+    return result
+
+
+def _sync_info(synced=True):
+    hosts = []
+    if synced:
+        services = [SyncEntry(service='/talker/set_logger_level', serviceuri=SERVICE_URI, node='/talker', nodeuri=NODE_URI)]
+        hosts.append(SyncEntry(masteruri=REMOTE_URI, nodes=['/talker'], publisher=[], subscriber=[], services=services))
+    return SyncEntry(hosts=hosts)
+
+
+class TestMasterMonitor(unittest.TestCase):
+    '''
+    '''
+
+    def _update(self, monitor, base_state):
+        # the incremental update shares the unchanged entries with the current state
+        master_state = base_state.shallow_copy()
+        changes = (set(), set(), set())
+        monitor.set_new_state(master_state, changes)
+        monitor.updateSyncInfo()
+        return master_state, changes
+
+    def test_sync_info(self):
+        monitor = DummyMonitor()
+        monitor.sync_info = _sync_info()
+        state, changes = self._update(monitor, _create_state())
+        self.assertEqual(state.getNode('/talker').masteruri, REMOTE_URI, "origin ROS master URI of the synchronized node not set")
+        self.assertEqual(state.getService('/talker/set_logger_level').masteruri, REMOTE_URI, "origin ROS master URI of the synchronized service not set")
+        self.assertEqual(state.getNode('/master_sync').masteruri, LOCAL_URI, "ROS master URI of a local node changed")
+        self.assertEqual(changes, (set(['/talker']), set(), set(['/talker/set_logger_level'])), "wrong changes: %s" % (changes,))
+        # unchanged sync info, the entries are still shared
+        next_state, changes = self._update(monitor, state)
+        self.assertTrue(next_state.getNode('/talker') is state.getNode('/talker'), "unchanged node was replaced")
+        self.assertEqual(changes, (set(), set(), set()), "changes without changed sync info: %s" % (changes,))
+
+    def test_sync_info_removed(self):
+        monitor = DummyMonitor()
+        monitor.sync_info = _sync_info()
+        state, _ = self._update(monitor, _create_state())
+        # the remote master is removed from the sync info
+        monitor.sync_info = _sync_info(synced=False)
+        next_state, changes = self._update(monitor, state)
+        self.assertEqual(next_state.getNode('/talker').masteruri, LOCAL_URI, "origin ROS master URI of the node not reset")
+        self.assertEqual(next_state.getService('/talker/set_logger_level').masteruri, LOCAL_URI, "origin ROS master URI of the service not reset")
+        self.assertEqual(changes, (set(['/talker']), set(), set(['/talker/set_logger_level'])), "reset entries not in changes: %s" % (changes,))
+        self.assertEqual(state.getNode('/talker').masteruri, REMOTE_URI, "the node of the previous state was modified")
+        self.assertEqual(state.getService('/talker/set_logger_level').masteruri, REMOTE_URI, "the service of the previous state was modified")
+        # master_sync is stopped
+        monitor.sync_info = _sync_info()
+        state, _ = self._update(monitor, _create_state())
+        monitor.sync_info = None
+        next_state, changes = self._update(monitor, state)
+        self.assertEqual(next_state.getNode('/talker').masteruri, LOCAL_URI, "origin ROS master URI not reset after master_sync stopped")
+        self.assertEqual(next_state.getService('/talker/set_logger_level').masteruri, LOCAL_URI, "origin ROS master URI of the service not reset after master_sync stopped")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestMasterMonitor)
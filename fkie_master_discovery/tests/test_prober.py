@@ -0,0 +1,207 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import os
+import socket
+import struct
+import threading
+import time
+import unittest
+
+import roslib.network
+
+from fkie_master_discovery.master_monitor import RPCThreading
+from fkie_master_discovery.prober import Prober, NODE, SERVICE
+
+PKG = 'fkie_master_discovery'
+
+
+class _RPCServer(RPCThreading):
+
+    # accept all parallel probes of the test at once
+    request_queue_size = 64
+
+
+class _ServiceServer(object):
+    '''
+    Answers each connection with the header of a service, or does not answer at all if `hang` is True.
+    '''
+
+    def __init__(self, stype='std_srvs/Empty', hang=False):
+        self.stype = stype
+        self.hang = hang
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('localhost', 0))
+        self.sock.listen(256)
+        self.uri = 'rosrpc://localhost:%d' % self.sock.getsockname()[1]
+        self._conns = []
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except Exception:
+                return
+            self._conns.append(conn)
+            if not self.hang:
+                size = struct.unpack('<I', conn.recv(4))[0]
+                while size > 0:
+                    size -= len(conn.recv(size))
+                conn.sendall(roslib.network.encode_ros_handshake_header({'type': self.stype, 'md5sum': '*'}))
+                conn.close()
+
+    def close(self):
+        self.sock.close()
+        for conn in self._conns:
+            conn.close()
+
+
+class TestProber(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.server = _RPCServer(('localhost', 0), logRequests=False, allow_none=True)
+        self.server.register_function(lambda caller_id: (1, '', 4711), 'getPid')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+        self.node_uri = 'http://localhost:%d/' % self.server.server_address[1]
+        self.service = _ServiceServer()
+        self.hung = _ServiceServer(hang=True)
+        self.hung_node_uri = 'http://localhost:%d/' % self.hung.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.close()
+        self.hung.close()
+
+    def test_probe(self):
+        prober = Prober('/test_prober')
+        nodes = dict(('/node%d' % i, self.node_uri) for i in range(20))
+        services = dict(('/service%d' % i, self.service.uri) for i in range(20))
+        pids, types, failed = prober.run(nodes, services)
+        self.assertEqual(failed, {}, "probes failed: %s" % failed)
+        self.assertEqual(pids, dict((name, 4711) for name in nodes), "wrong pids: %s" % pids)
+        self.assertEqual(types, dict((name, 'std_srvs/Empty') for name in services), "wrong types: %s" % types)
+
+    def test_deadline(self):
+        prober = Prober('/test_prober')
+        nodes = dict(('/hung%d' % i, self.hung_node_uri) for i in range(50))
+        nodes['/node'] = self.node_uri
+        services = dict(('/hung_service%d' % i, self.hung.uri) for i in range(50))
+        start = time.time()
+        pids, types, failed = prober.run(nodes, services)
+        duration = time.time() - start
+        self.assertLess(duration, Prober.NODE_TIMEOUT + 0.5, "hung probes are not running in parallel, duration: %.2f" % duration)
+        self.assertEqual(pids, {'/node': 4711}, "wrong pids: %s" % pids)
+        self.assertEqual(types, {}, "wrong types: %s" % types)
+        self.assertEqual(len(failed), 100, "wrong count of failed probes: %d" % len(failed))
+        self.assertEqual(failed[(NODE, '/hung0')], 'timed out')
+
+    def test_budget(self):
+        prober = Prober('/test_prober', budget=0.2)
+        nodes = dict(('/hung%d' % i, self.hung_node_uri) for i in range(10))
+        start = time.time()
+        pids, types, failed = prober.run(nodes, {})
+        duration = time.time() - start
+        self.assertLess(duration, 0.5, "budget exceeded, duration: %.2f" % duration)
+        self.assertEqual((pids, types, failed), ({}, {}, {}), "interrupted probes are reported")
+
+    def test_backoff(self):
+        prober = Prober('/test_prober')
+        refused_uri = 'rosrpc://localhost:%d' % self._free_port()
+        _, _, failed = prober.run({}, {'/refused': refused_uri})
+        self.assertIn((SERVICE, '/refused'), failed)
+        # the second probe is skipped because of backoff
+        _, _, failed = prober.run({}, {'/refused': refused_uri})
+        self.assertEqual(failed, {}, "failed entity was probed again")
+        # a new URI is probed immediately
+        _, types, _ = prober.run({}, {'/refused': self.service.uri})
+        self.assertEqual(types, {'/refused': 'std_srvs/Empty'})
+        _, _, failed = prober.run({}, {'/refused': refused_uri})
+        self.assertIn((SERVICE, '/refused'), failed)
+        prober.clear_backoff()
+        _, _, failed = prober.run({}, {'/refused': refused_uri})
+        self.assertIn((SERVICE, '/refused'), failed)
+
+    def test_resolve(self):
+        prober = Prober('/test_prober')
+        resolved = []
+        getaddrinfo = socket.getaddrinfo
+
+        def counted_getaddrinfo(host, *args):
+            resolved.append(host)
+            if host == 'unknown.host':
+                raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+            if host == 'slow.host':
+                time.sleep(Prober.NODE_TIMEOUT + 0.1)
+                host = 'localhost'
+            return getaddrinfo(host, *args)
+        socket.getaddrinfo = counted_getaddrinfo
+        try:
+            nodes = dict(('/node%d' % i, self.node_uri) for i in range(20))
+            nodes['/unknown0'] = 'http://unknown.host:11311/'
+            pids, _, failed = prober.run(nodes, {})
+            self.assertEqual(len(pids), 20, "wrong count of pids: %d" % len(pids))
+            self.assertEqual(list(failed.keys()), [(NODE, '/unknown0')], "wrong failed probes: %s" % failed)
+            # the resolved and the unresolvable hosts are cached
+            nodes['/unknown1'] = 'http://unknown.host:11311/'
+            pids, _, failed = prober.run(nodes, {})
+            self.assertEqual(len(pids), 20, "wrong count of pids: %d" % len(pids))
+            self.assertEqual(list(failed.keys()), [(NODE, '/unknown1')], "wrong failed probes: %s" % failed)
+            self.assertEqual(sorted(resolved), ['localhost', 'unknown.host'], "hosts resolved more than once: %s" % resolved)
+            # a probe waiting for the resolution longer than its deadline fails
+            _, _, failed = prober.run({'/slow': self.node_uri.replace('localhost', 'slow.host')}, {})
+            self.assertEqual(failed, {(NODE, '/slow'): 'resolution of slow.host timed out'}, "wrong failed probes: %s" % failed)
+            pids, _, failed = prober.run({'/slow2': self.node_uri.replace('localhost', 'slow.host')}, {})
+            self.assertEqual(pids, {'/slow2': 4711}, "cached address not used: %s" % failed)
+        finally:
+            socket.getaddrinfo = getaddrinfo
+
+    def _free_port(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        return port
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestProber)
@@ -0,0 +1,109 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import os
+import threading
+import unittest
+try:
+    import xmlrpclib as xmlrpcclient
+except ImportError:
+    import xmlrpc.client as xmlrpcclient
+
+from fkie_master_discovery.master_monitor import RPCResponseCache, RPCThreading
+
+PKG = 'fkie_master_discovery'
+
+
+class TestResponseCache(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.state = 1
+        self.calls = 0
+        self.cache = RPCResponseCache(['masterInfo', 'masterInfoFiltered'], lambda: self.state)
+        self.server = RPCThreading(('localhost', 0), logRequests=False, allow_none=True)
+        self.server.response_cache = self.cache
+        self.server.register_function(self._master_info, 'masterInfo')
+        self.server.register_function(self._master_info_filtered, 'masterInfoFiltered')
+        self.server.register_function(self._master_info, 'masterContacts')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+        self.proxy = xmlrpcclient.ServerProxy('http://localhost:%d' % self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _master_info(self):
+        self.calls += 1
+        return ('state', self.state)
+
+    def _master_info_filtered(self, filter_list):
+        self.calls += 1
+        if not filter_list:
+            raise Exception('invalid filter')
+        return ('state', self.state, filter_list)
+
+    def test_cached_response(self):
+        for _ in range(5):
+            self.assertEqual(self.proxy.masterInfo(), ['state', 1])
+        self.assertEqual(self.calls, 1, "cached method was called %d times" % self.calls)
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 1))
+        self.state = 2
+        self.assertEqual(self.proxy.masterInfo(), ['state', 2], "outdated response after state change")
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 2))
+
+    def test_filter_fingerprint(self):
+        self.assertEqual(self.proxy.masterInfoFiltered(['a']), ['state', 1, ['a']])
+        self.assertEqual(self.proxy.masterInfoFiltered(['b']), ['state', 1, ['b']])
+        self.assertEqual(self.proxy.masterInfoFiltered(['a']), ['state', 1, ['a']])
+        self.assertEqual(self.calls, 2, "different filters share one response")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_not_cached(self):
+        for _ in range(2):
+            self.proxy.masterContacts()
+            self.assertRaises(xmlrpcclient.Fault, self.proxy.masterInfoFiltered, [])
+        self.assertEqual(self.calls, 4, "uncached method or fault served from cache")
+        self.state = None
+        self.proxy.masterInfo()
+        self.proxy.masterInfo()
+        self.assertEqual(self.calls, 6, "cache used without state")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestResponseCache)
@@ -0,0 +1,89 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import threading
+import time
+import unittest
+
+from fkie_master_discovery.scheduler import Scheduler
+
+PKG = 'fkie_master_discovery'
+
+
+class TestScheduler(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_periodic(self):
+        runs = []
+        self.scheduler.add('fast', lambda: runs.append(time.time()) or (0.01 if len(runs) < 5 else None), 0.)
+        time.sleep(0.5)
+        self.assertEqual(len(runs), 5, "wrong count of runs: %d" % len(runs))
+        self.assertNotIn('fast', self.scheduler.stats(), "job not removed after returning None")
+
+    def test_wakeup(self):
+        done = threading.Event()
+        self.scheduler.add('slow', lambda: done.set() or 60., 60.)
+        self.scheduler.wakeup('slow')
+        self.assertTrue(done.wait(1.), "job not run after wakeup")
+        done.clear()
+        self.scheduler.wakeup('slow', 0.1)
+        self.scheduler.wakeup('slow', 0.1)
+        self.assertTrue(done.wait(1.), "job not run after second wakeup")
+        time.sleep(0.2)
+        stats = self.scheduler.stats()['slow']
+        self.assertEqual(stats['runs'], 2, "wakeups are not merged: %s" % stats)
+        self.assertEqual(stats['wakeups'], 2, "wrong wakeup count: %s" % stats)
+
+    def test_blocking(self):
+        runs = []
+        release = threading.Event()
+        self.scheduler.add('blocking', lambda: release.wait(2.) and None, 0., blocking=True)
+        self.scheduler.add('fast', lambda: runs.append(time.time()) or 0.01, 0.)
+        time.sleep(0.3)
+        release.set()
+        self.assertGreater(len(runs), 5, "blocking job delays other jobs")
+        self.assertLess(self.scheduler.stats()['fast']['jitter_max'], 0.2, "jitter too large")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestScheduler)
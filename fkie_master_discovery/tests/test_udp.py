@@ -0,0 +1,112 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import socket
+import time
+import unittest
+
+from fkie_master_discovery import udp
+from fkie_master_discovery.udp import DatagramSender
+
+PKG = 'fkie_master_discovery'
+
+
+class TestDatagramSender(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(('127.0.0.1', 0))
+        self.receiver.settimeout(1.)
+        self.port = self.receiver.getsockname()[1]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.receiver.close()
+        self.sock.close()
+
+    def _test_send(self, sender):
+        datagrams = [(('msg%d' % i).encode(), '127.0.0.1', self.port) for i in range(20)]
+        self.assertEqual(sender.send(self.sock, datagrams), len(datagrams))
+        received = [self.receiver.recv(100) for _ in datagrams]
+        self.assertEqual(received, [msg for msg, _, _ in datagrams], "wrong received datagrams")
+
+    def test_send(self):
+        sender = DatagramSender()
+        self._test_send(sender)
+        # the fallback to sendto()
+        sender._sendmmsg = None
+        self._test_send(sender)
+
+    def test_unknown_host(self):
+        sender = DatagramSender()
+        if not sender.has_sendmmsg:
+            return
+        datagrams = [(b'first', '127.0.0.1', self.port), (b'unknown', 'unknown.host.invalid', self.port), (b'last', '127.0.0.1', self.port)]
+        self.assertEqual(sender.send(self.sock, datagrams), 1, "the send should stop at the unknown host")
+        self.assertEqual(self.receiver.recv(100), b'first')
+
+    def _fake_time(self):
+        self.now = 1000.
+        self.addCleanup(setattr, udp.time, 'time', udp.time.time)
+        udp.time.time = lambda: self.now
+
+    def test_rate_limit(self):
+        self._fake_time()
+        buckets = udp._TokenBuckets(5)
+        self.assertEqual([buckets.consume('host1') for _ in range(6)], [True] * 5 + [False], "wrong burst size")
+        self.assertTrue(buckets.consume('host2'), "the limit is not for each destination")
+        self.now += 0.2
+        self.assertEqual([buckets.consume('host1') for _ in range(2)], [True, False], "wrong refill")
+
+    def test_evict_buckets(self):
+        self._fake_time()
+        buckets = udp._TokenBuckets(5)
+        for idx in range(1000):
+            buckets.consume('host%d' % idx)
+        self.assertEqual(len(buckets), 1000, "wrong count of buckets")
+        # used buckets are kept until they are refilled
+        self.now += 0.5
+        for _ in range(3):
+            buckets.consume('host0')
+        self.now += 0.5
+        buckets.consume('host1000')
+        self.assertEqual(len(buckets), 2, "refilled buckets not removed: %d" % len(buckets))
+        self.assertEqual([buckets.consume('host0') for _ in range(5)], [True] * 4 + [False], "state of a used bucket lost")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestDatagramSender)
@@ -0,0 +1,125 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import os
+import socket
+import threading
+import time
+import unittest
+try:
+    import xmlrpclib as xmlrpcclient
+except ImportError:
+    import xmlrpc.client as xmlrpcclient
+
+from fkie_master_discovery.master_monitor import RPCWorkerPool
+from fkie_master_discovery.xmlrpc_pool import TransportPool
+
+PKG = 'fkie_master_discovery'
+
+
+class TestWorkerPool(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.server = RPCWorkerPool(('localhost', 0), logRequests=False, allow_none=True, workers=2, queue_size=2)
+        self.server.register_function(lambda: 'x' * 10000, 'masterInfo')
+        self.server.register_function(lambda t: time.sleep(t) or t, 'sleep')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+        self.uri = 'http://localhost:%d' % self.server.server_address[1]
+        self.pool = TransportPool()
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        for _ in range(5):
+            with self.pool.server_proxy(self.uri, timeout=5) as proxy:
+                self.assertEqual(len(proxy.masterInfo()), 10000)
+        # the metrics are updated after the response was sent
+        time.sleep(0.1)
+        metrics = self.server.metrics.to_dict()
+        self.assertEqual(metrics['connections'], 1, "connection was not reused")
+        self.assertEqual(metrics['requests'], 5)
+
+    def test_idle_connections(self):
+        # idle connections do not occupy the workers
+        idle = []
+        for _ in range(10):
+            sock = socket.create_connection(self.server.server_address[:2])
+            idle.append(sock)
+        try:
+            proxy = xmlrpcclient.ServerProxy(self.uri)
+            self.assertEqual(len(proxy.masterInfo()), 10000)
+        finally:
+            for sock in idle:
+                sock.close()
+
+    def test_bounded(self):
+        threads_before = threading.active_count()
+        results = []
+        errors = []
+
+        def call():
+            try:
+                results.append(xmlrpcclient.ServerProxy(self.uri).sleep(0.3))
+            except xmlrpcclient.ProtocolError as err:
+                errors.append(err.errcode)
+            except socket.error:
+                # the connection was closed while the request was sent
+                errors.append(503)
+        callers = [threading.Thread(target=call) for _ in range(8)]
+        for caller in callers:
+            caller.start()
+        time.sleep(0.1)
+        self.assertLessEqual(threading.active_count(), threads_before + len(callers), "server creates threads for requests")
+        for caller in callers:
+            caller.join()
+        time.sleep(0.1)
+        metrics = self.server.metrics.to_dict()
+        self.assertEqual(len(results) + len(errors), 8)
+        self.assertEqual(set(errors), set([503]) if errors else set())
+        self.assertEqual(metrics['rejected'], len(errors))
+        self.assertEqual(metrics['requests'], len(results))
+        self.assertLessEqual(metrics['queue_max'], 2)
+        self.assertGreater(metrics['latency_max'], 0.29)
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestWorkerPool)
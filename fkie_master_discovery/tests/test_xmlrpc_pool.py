@@ -0,0 +1,92 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import socket
+import threading
+import time
+import unittest
+
+from fkie_master_discovery.master_monitor import RPCThreading
+from fkie_master_discovery.xmlrpc_pool import TransportPool
+
+PKG = 'fkie_master_discovery'
+
+
+class _CountingServer(RPCThreading):
+
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        RPCThreading.process_request(self, request, client_address)
+
+
+class TestXmlRpcPool(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.server = _CountingServer(('localhost', 0), logRequests=False, allow_none=True)
+        self.server.register_function(lambda: 'x' * 10000, 'masterInfo')
+        self.server.register_function(lambda t: time.sleep(t) or t, 'sleep')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+        self.uri = 'http://localhost:%d' % self.server.server_address[1]
+        self.pool = TransportPool()
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        for _ in range(5):
+            with self.pool.server_proxy(self.uri, timeout=5) as proxy:
+                self.assertEqual(len(proxy.masterInfo()), 10000)
+        self.assertEqual(self.server.connections, 1, "connection was not reused")
+
+    def test_timeout(self):
+        with self.assertRaises(socket.timeout):
+            with self.pool.server_proxy(self.uri, timeout=0.1) as proxy:
+                proxy.sleep(1)
+        self.assertIsNone(socket.getdefaulttimeout(), "global socket timeout was changed")
+        # the failed connection is dropped, a new one works
+        with self.pool.server_proxy(self.uri, timeout=5) as proxy:
+            self.assertEqual(proxy.sleep(0), 0)
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestXmlRpcPool)
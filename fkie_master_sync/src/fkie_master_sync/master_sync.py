@@ -32,14 +32,9 @@
 
 
 
-import socket
 import threading
 import time
 import uuid
-try:
-    import xmlrpclib as xmlrpcclient
-except ImportError:
-    import xmlrpc.client as xmlrpcclient
 
 from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
 from fkie_multimaster_msgs.msg import MasterState  # , LinkState, LinkStatesStamped, MasterState, ROSMaster, SyncMasterInfo, SyncTopicInfo
@@ -48,8 +43,10 @@ import rospy
 
 from fkie_master_discovery.common import masteruri_from_master, resolve_url, read_interface, create_pattern, is_empty_pattern, get_hostname
 from fkie_master_discovery.master_info import MasterInfo
+from fkie_master_discovery.xmlrpc_pool import server_proxy
 import fkie_master_discovery.interface_finder as interface_finder
 
+from .sync_scheduler import SyncScheduler
 from .sync_thread import SyncThread
 
 
@@ -90,6 +87,13 @@ class Main(object):
         self.own_state_getter = None
         self._timer_update_diagnostics = None
         self._join_threads = dict()  # threads waiting for stopping the sync thread
+        # request the remote states in a bounded pool and merge the updates of the local ROS master
+        sync_workers = rospy.get_param('~sync_workers', 4)
+        sync_batch_window = rospy.get_param('~sync_batch_window', 0.05)
+        rospy.loginfo("sync_workers: %s, sync_batch_window: %s", sync_workers, sync_batch_window)
+        self._scheduler = SyncScheduler(self.masteruri, sync_workers, sync_batch_window)
+        # share the strings of names used by many remote ROS masters
+        MasterInfo.INTERN_NAMES = rospy.get_param('~intern_names', False)
         # initialize the ROS services
         rospy.Service('~get_sync_info', GetSyncInfo, self._rosservice_get_sync_info)
         rospy.on_shutdown(self.finish)
@@ -134,7 +138,9 @@ class Main(object):
                 try:
                     with self.__lock:
                         try:
-                            socket.setdefaulttimeout(5)
+                            # list_masters is a ROS service, not XML-RPC. Wait for it with a timeout
+                            # instead of changing the default timeout of all sockets in this process
+                            rospy.wait_for_service(service_name, timeout=5)
                             discoverMasters = rospy.ServiceProxy(service_name, DiscoverMasters)
                             resp = discoverMasters()
                             masters = []
@@ -146,13 +152,12 @@ class Main(object):
                                 self.update_master(m.name, m.uri, m.last_change.to_sec(), m.last_change_local.to_sec(), m.discoverer_name, m.monitoruri, m.online)
                             for key in set(self.masters.keys()) - set(masters):
                                 self.remove_master(self.masters[key].name)
-                        except rospy.ServiceException as e:
+                        except (rospy.ServiceException, rospy.ROSException) as e:
                             rospy.logwarn("ERROR Service call 'list_masters' failed: %s", str(e))
                 except:
                     import traceback
                     rospy.logwarn("ERROR while initial list masters: %s", traceback.format_exc())
-                finally:
-                    socket.setdefaulttimeout(None)
+            rospy.logdebug("sync scheduler stats: %s", self._scheduler.stats())
             self.update_timer = threading.Timer(self.UPDATE_INTERVALL, self.obtain_masters)
             self.update_timer.start()
 
@@ -187,7 +192,7 @@ class Main(object):
                                     # updates only, if local changes are occured
                                 self.masters[mastername].update(mastername, masteruri, discoverer_name, monitoruri, timestamp_local)
                             else:
-                                self.masters[mastername] = SyncThread(mastername, masteruri, discoverer_name, monitoruri, 0.0, self.__sync_topics_on_demand, callback_resync=self._callback_perform_resync)
+                                self.masters[mastername] = SyncThread(mastername, masteruri, discoverer_name, monitoruri, 0.0, self.__sync_topics_on_demand, callback_resync=self._callback_perform_resync, scheduler=self._scheduler)
                                 if self.__own_state is not None:
                                     self.masters[mastername].set_own_masterstate(MasterInfo.from_list(self.__own_state))
                                 self.masters[mastername].update(mastername, masteruri, discoverer_name, monitoruri, timestamp_local)
@@ -210,11 +215,10 @@ class Main(object):
         This function is running in a thread!!!
         '''
         try:
-            socket.setdefaulttimeout(3)
-            own_monitor = xmlrpcclient.ServerProxy(monitoruri)
-            self.__own_state = own_monitor.masterInfo()
+            # the local master_discovery: do not compress the master info
+            with server_proxy(monitoruri, timeout=3, use_gzip=False) as own_monitor:
+                self.__own_state = own_monitor.masterInfo()
             own_state = MasterInfo.from_list(self.__own_state)
-            socket.setdefaulttimeout(None)
             with self.__lock:
                 # update the state for all sync threads
                 for (_, s) in self.masters.items():
@@ -223,7 +227,6 @@ class Main(object):
         except:
             import traceback
             rospy.logwarn("ERROR while getting own state from '%s': %s", monitoruri, traceback.format_exc())
-            socket.setdefaulttimeout(None)
             time.sleep(3)
             if self.own_state_getter is not None and not rospy.is_shutdown():
                 self.own_state_getter = threading.Thread(target=self.get_own_state, args=(monitoruri,))
@@ -281,6 +284,7 @@ class Main(object):
         while len(self._join_threads) > 0:
             rospy.loginfo("  Wait for ending of %s threads ...", str(len(self._join_threads)))
             time.sleep(1)
+        self._scheduler.stop()
         rospy.loginfo("Synchronization is now off")
 
     def _perform_resync(self):
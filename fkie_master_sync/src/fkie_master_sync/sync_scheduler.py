@@ -0,0 +1,294 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+
+import threading
+import time
+import traceback
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+try:
+    import xmlrpclib as xmlrpcclient
+except ImportError:
+    import xmlrpc.client as xmlrpcclient
+
+import rospy
+
+from fkie_master_discovery.xmlrpc_pool import server_proxy
+
+
+class _WriteRequest(object):
+    '''
+    The calls of one sync thread waiting for execution at the local ROS master.
+    '''
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class SyncScheduler(object):
+    '''
+    Runs the requests of the remote states for all L{SyncThread} in a bounded pool
+    of worker threads and merges the updates of the local ROS master, which are
+    ready within a short time window, into one multicall.
+    '''
+
+    MAX_BATCH_CALLS = 500
+    '''the maximal count of calls in one multicall, the calls of one sync thread are never split'''
+    TIMEOUT = 3.
+    '''the timeout [sec] of a multicall to the local ROS master'''
+    TIMEOUT_PER_CALL = 0.01
+    '''additional timeout [sec] for each call in a multicall'''
+
+    def __init__(self, masteruri, workers=4, batch_window=0.05):
+        '''
+        @param masteruri: the URI of the local ROS master.
+        @type masteruri: C{str}
+        @param workers: the count of threads requesting the remote states.
+        @type workers: C{int}
+        @param batch_window: the time [sec] to wait for calls of other sync threads
+            before the local ROS master is updated.
+        @type batch_window: C{float}
+        '''
+        self.masteruri = masteruri
+        self._batch_window = batch_window
+        self._lock = threading.RLock()
+        self._jobs = queue.Queue()
+        self._writes = queue.Queue()
+        # keys of queued and running jobs, a job is queued only once
+        self._queued = set()
+        self._running = set()
+        # jobs submitted while the job with same key was running, they are queued after it is finished
+        self._rerun = dict()
+        self._stopped = False
+        # statistics
+        self._max_queue_depth = 0
+        self._batch_count = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+        self._last_batch_calls = 0
+        self._workers = []
+        for _ in range(max(1, workers)):
+            thread = threading.Thread(target=self._run_jobs)
+            thread.setDaemon(True)
+            thread.start()
+            self._workers.append(thread)
+        self._writer = threading.Thread(target=self._run_writes)
+        self._writer.setDaemon(True)
+        self._writer.start()
+
+    def submit(self, key, func, *args):
+        '''
+        Queues a job into the worker pool. A job with the same key is queued only once.
+        If a job with the same key is currently running, the new job is queued after
+        the running job is finished.
+        @param key: the identification of the job, e.g. the sync thread
+        @param func: the function to call
+        @return: `True` if the job was queued
+        @rtype: C{bool}
+        '''
+        with self._lock:
+            if self._stopped:
+                return False
+            if key in self._running:
+                self._rerun[key] = (func, args)
+                return True
+            if key in self._queued:
+                return False
+            self._queued.add(key)
+            self._jobs.put((key, func, args))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queued))
+            return True
+
+    def execute(self, calls):
+        '''
+        Executes the calls at the local ROS master together with the calls of other
+        sync threads. Blocks until the results are available.
+        @param calls: the list with calls as tuple of (method name, arguments)
+        @type calls: C{[(str, tuple)]}
+        @return: the results of the given calls in the same order
+        @rtype: xmlrpclib.MultiCallIterator
+        @raise Exception: on errors while the multicall
+        '''
+        if not calls:
+            return xmlrpcclient.MultiCallIterator([])
+        request = _WriteRequest(calls)
+        with self._lock:
+            if self._stopped:
+                raise Exception("SyncScheduler is stopped")
+            self._writes.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return xmlrpcclient.MultiCallIterator(request.results)
+
+    def stop(self):
+        '''
+        Stops the worker threads. Queued jobs are discarded.
+        '''
+        with self._lock:
+            self._stopped = True
+            self._queued.clear()
+            self._rerun.clear()
+            try:
+                while True:
+                    self._jobs.get_nowait()
+            except queue.Empty:
+                pass
+            for _ in self._workers:
+                self._jobs.put(None)
+            self._writes.put(None)
+
+    def stats(self):
+        '''
+        @return: the current statistics of the scheduler: queue_depth, max_queue_depth,
+            batches, last_batch_size, max_batch_size (count of merged sync threads)
+            and last_batch_calls.
+        @rtype: C{dict}
+        '''
+        with self._lock:
+            return {'queue_depth': len(self._queued),
+                    'max_queue_depth': self._max_queue_depth,
+                    'batches': self._batch_count,
+                    'last_batch_size': self._last_batch_size,
+                    'max_batch_size': self._max_batch_size,
+                    'last_batch_calls': self._last_batch_calls}
+
+    def _run_jobs(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            key, func, args = job
+            with self._lock:
+                self._queued.discard(key)
+                self._running.add(key)
+            try:
+                func(*args)
+            except Exception:
+                rospy.logerr("SyncScheduler: ERROR while running job: %s", traceback.format_exc())
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+                    rerun = self._rerun.pop(key, None)
+                if rerun is not None:
+                    self.submit(key, rerun[0], *rerun[1])
+
+    def _run_writes(self):
+        finished = False
+        while not finished:
+            request = self._writes.get()
+            if request is None:
+                break
+            batch = [request]
+            # wait for the calls of other sync threads
+            time.sleep(self._batch_window)
+            try:
+                while True:
+                    request = self._writes.get_nowait()
+                    if request is None:
+                        finished = True
+                    else:
+                        batch.append(request)
+            except queue.Empty:
+                pass
+            for chunk in self._split_batch(batch):
+                self._execute_batch(chunk)
+        # release the callers waiting for results
+        try:
+            while True:
+                request = self._writes.get_nowait()
+                if request is not None:
+                    request.error = Exception("SyncScheduler is stopped")
+                    request.done.set()
+        except queue.Empty:
+            pass
+
+    def _split_batch(self, batch):
+        '''
+        Splits the requests into chunks with at most `MAX_BATCH_CALLS` calls.
+        '''
+        chunk = []
+        calls = 0
+        for request in batch:
+            if chunk and calls + len(request.calls) > self.MAX_BATCH_CALLS:
+                yield chunk
+                chunk = []
+                calls = 0
+            chunk.append(request)
+            calls += len(request.calls)
+        if chunk:
+            yield chunk
+
+    def _multicall(self, calls):
+        with server_proxy(self.masteruri, timeout=self.TIMEOUT + len(calls) * self.TIMEOUT_PER_CALL, use_gzip=False) as own_master:
+            own_master_multi = xmlrpcclient.MultiCall(own_master)
+            for method, args in calls:
+                getattr(own_master_multi, method)(*args)
+            return own_master_multi().results
+
+    def _execute_batch(self, batch):
+        try:
+            results = self._multicall([call for request in batch for call in request.calls])
+            # split the results to the requests
+            idx = 0
+            for request in batch:
+                request.results = results[idx:idx + len(request.calls)]
+                idx += len(request.calls)
+        except Exception as err:
+            if len(batch) == 1:
+                batch[0].error = err
+            else:
+                # an error fails only the request of the sync thread causing it
+                rospy.logwarn("SyncScheduler: update of local ROS master with %d sync threads failed, retry each: %s", len(batch), err)
+                for request in batch:
+                    try:
+                        request.results = self._multicall(request.calls)
+                    except Exception as req_err:
+                        request.error = req_err
+        finally:
+            calls = sum(len(request.calls) for request in batch)
+            with self._lock:
+                self._batch_count += 1
+                self._last_batch_size = len(batch)
+                self._max_batch_size = max(self._max_batch_size, len(batch))
+                self._last_batch_calls = calls
+            rospy.logdebug("SyncScheduler: updated local ROS master with %d calls of %d sync threads", calls, len(batch))
+            for request in batch:
+                request.done.set()
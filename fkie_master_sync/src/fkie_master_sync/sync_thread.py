@@ -35,7 +35,6 @@
 import random
 import roslib
 import roslib.message
-import socket
 import threading
 import time
 import traceback
@@ -49,6 +48,8 @@ import rospy
 
 from fkie_master_discovery.common import masteruri_from_ros, get_hostname
 from fkie_master_discovery.filter_interface import FilterInterface
+from fkie_master_discovery.master_info import MasterInfo
+from fkie_master_discovery.xmlrpc_pool import server_proxy
 
 
 class SyncThread(object):
@@ -62,7 +63,7 @@ class SyncThread(object):
 
     MSG_ANY_TYPE = '*'
 
-    def __init__(self, name, uri, discoverer_name, monitoruri, timestamp, sync_on_demand=False, callback_resync=None):
+    def __init__(self, name, uri, discoverer_name, monitoruri, timestamp, sync_on_demand=False, callback_resync=None, scheduler=None):
         '''
         Initialization method for the SyncThread.
         @param name: the name of the ROS master synchronized with.
@@ -77,6 +78,9 @@ class SyncThread(object):
         @type timestamp:  C{float64}
         @param sync_on_demand: Synchronize topics on demand
         @type sync_on_demand: bool
+        @param scheduler: the scheduler used to request the remote state and to update the local ROS master.
+            If `None` the requests are performed in own threads.
+        @type scheduler: L{SyncScheduler} or C{None}
         '''
         self.name = name
         self.uri = uri
@@ -95,6 +99,11 @@ class SyncThread(object):
         self.__lock_info = threading.RLock()
         self.__lock_intern = threading.RLock()
         self._use_filtered_method = None
+        self._use_delta_method = None
+        self._use_packed_method = None
+        # the last received remote state and the filter used to request it. Used to apply the deltas.
+        self._last_remote_state = None
+        self._last_remote_filter = None
         self._use_md5check_topics = None
         self._md5warnings = {}  # ditionary of {(topicname, node, nodeuri) : (topictype, md5sum)}
         self._topic_type_warnings = {}  # ditionary of {(topicname, node, nodeuri) : remote topictype}
@@ -112,6 +121,7 @@ class SyncThread(object):
         self.__own_state = None
         self.__callback_resync = callback_resync
         self.__has_remove_sync = False
+        self._scheduler = scheduler
 
         # setup the filter
         self._filter = FilterInterface()
@@ -170,6 +180,7 @@ class SyncThread(object):
                         self.__publisher = []
                         self.__subscriber = []
                         self.__services = []
+                        self._last_remote_state = None
                         self.timestamp = 0.
                         self.timestamp_local = 0.
                         self.timestamp_remote = 0.
@@ -242,7 +253,7 @@ class SyncThread(object):
             # start update timer with a random waiting time to avoid a congestion picks on changes of ROS master state
             if self._update_timer is None or not self._update_timer.is_alive():
                 del self._update_timer
-                self._update_timer = threading.Timer(r, self._request_remote_state, args=(self._apply_remote_state,))
+                self._update_timer = threading.Timer(r, self._schedule_remote_state)
                 self._update_timer.start()
             else:
                 if self._delayed_update < self.MAX_UPDATE_DELAY:
@@ -251,36 +262,63 @@ class SyncThread(object):
                     # if callback (XMLRPC request) is already running the timer is not canceled -> test for `self.__on_update`
                     if not self._update_timer.is_alive() or not self.__on_update:
                         self._delayed_update += 1
-                        self._update_timer = threading.Timer(r, self._request_remote_state, args=(self._apply_remote_state,))
+                        self._update_timer = threading.Timer(r, self._schedule_remote_state)
                         self._update_timer.start()
 
+    def _schedule_remote_state(self):
+        '''
+        Requests and applies the remote state. If a scheduler is available, the request
+        is queued into its worker pool, otherwise it is performed in the calling thread.
+        '''
+        if self._scheduler is not None:
+            self._scheduler.submit(self, self._request_remote_state, self._apply_remote_state)
+        else:
+            self._request_remote_state(self._apply_remote_state)
+
     def _request_remote_state(self, handler):
         self._delayed_update = 0
         self.__on_update = True
         try:
             # connect to master_monitor rpc-xml server of remote master discovery
-            socket.setdefaulttimeout(20)
-            remote_monitor = xmlrpcclient.ServerProxy(self.monitoruri)
-            # determine the getting method: older versions have not a filtered method
-            if self._use_filtered_method is None:
-                try:
-                    self._use_filtered_method = 'masterInfoFiltered' in remote_monitor.system.listMethods()
-                except:
-                    self._use_filtered_method = False
-            remote_state = None
-            # get the state informations
-            rospy.loginfo("SyncThread[%s] Requesting remote state from '%s'", self.name, self.monitoruri)
-            if self._use_filtered_method:
-                remote_state = remote_monitor.masterInfoFiltered(self._filter.to_list())
-            else:
-                remote_state = remote_monitor.masterInfo()
+            with server_proxy(self.monitoruri, timeout=20) as remote_monitor:
+                # determine the getting method: older versions have not a filtered, delta or packed method
+                if self._use_filtered_method is None:
+                    try:
+                        remote_methods = remote_monitor.system.listMethods()
+                        self._use_filtered_method = 'masterInfoFiltered' in remote_methods
+                        self._use_delta_method = 'masterInfoDelta' in remote_methods
+                        self._use_packed_method = 'masterInfoPacked' in remote_methods
+                    except:
+                        self._use_filtered_method = False
+                        self._use_delta_method = False
+                        self._use_packed_method = False
+                remote_state = None
+                # get the state informations
+                rospy.loginfo("SyncThread[%s] Requesting remote state from '%s'", self.name, self.monitoruri)
+                if self._use_delta_method or self._use_packed_method:
+                    filter_list = self._filter.to_list()
+                    since = ''
+                    if self._last_remote_state is not None and self._last_remote_filter == filter_list:
+                        since = self._last_remote_state[0]
+                    if self._use_packed_method:
+                        remote_delta = MasterInfo.unpack_state(remote_monitor.masterInfoPacked(since, filter_list, True).data)
+                    else:
+                        remote_delta = remote_monitor.masterInfoDelta(since, filter_list)
+                    remote_state = MasterInfo.merge_delta(self._last_remote_state, remote_delta)
+                    self._last_remote_state = remote_state
+                    self._last_remote_filter = filter_list
+                elif self._use_filtered_method:
+                    remote_state = remote_monitor.masterInfoFiltered(self._filter.to_list())
+                else:
+                    remote_state = remote_monitor.masterInfo()
             if not self.__unregistered:
                 handler(remote_state)
         except:
+            # request the complete state on next update
+            self._last_remote_state = None
             rospy.logerr("SyncThread[%s] ERROR: %s", self.name, traceback.format_exc())
         finally:
             self.__on_update = False
-            socket.setdefaulttimeout(None)
 
     def _apply_remote_state(self, remote_state):
         rospy.loginfo("SyncThread[%s] Applying remote state...", self.name)
@@ -297,33 +335,38 @@ class SyncThread(object):
             nodeProviders = remote_state[8]
             serviceProviders = remote_state[9]
 
-            # create a multicall object
-            own_master = xmlrpcclient.ServerProxy(self.masteruri_local)
-            own_master_multi = xmlrpcclient.MultiCall(own_master)
-            # fill the multicall object
+            # collect the calls to the local ROS master, they are executed in one multicall
+            calls = []
             handler = []
+            # index the remote state once to avoid searching the lists for each (topic, node) pair
+            topic_types = self._get_topictypes(topicTypes)
+            node_uris = self._get_nodeuris(nodeProviders, remote_masteruri)
+            service_uris = self._get_serviceuris(serviceProviders, remote_masteruri)
+            current_publisher = set(self.__publisher)
+            current_subscriber = set(self.__subscriber)
+            current_services = set(self.__services)
             # sync the publishers
             publisher = []
             publisher_to_register = []
+            own_name = rospy.get_name()
             remove_sync_found = False
             for (topic, nodes) in publishers:
-                for node in nodes:
-                    if node == rospy.get_name():
-                        self.__has_remove_sync = True
-                        remove_sync_found = True
-                        break
+                if own_name in nodes:
+                    self.__has_remove_sync = True
+                    remove_sync_found = True
+                    break
             for (topic, nodes) in publishers:
+                topictype = topic_types.get(topic, None)
                 for node in nodes:
-                    topictype = self._get_topictype(topic, topicTypes)
-                    nodeuri = self._get_nodeuri(node, nodeProviders, remote_masteruri)
+                    nodeuri = node_uris.get(node, None)
                     if topictype and nodeuri and not self._do_ignore_ntp(node, topic, topictype):
                         # register the nodes only once
-                        if not ((topic, topictype, node, nodeuri) in self.__publisher):
+                        if not ((topic, topictype, node, nodeuri) in current_publisher):
                             publisher_to_register.append((topic, topictype, node, nodeuri))
                         publisher.append((topic, topictype, node, nodeuri))
             # unregister not updated publishers
-            for (topic, topictype, node, nodeuri) in set(self.__publisher) - set(publisher):
-                own_master_multi.unregisterPublisher(node, topic, nodeuri)
+            for (topic, topictype, node, nodeuri) in current_publisher - set(publisher):
+                calls.append(('unregisterPublisher', (node, topic, nodeuri)))
                 rospy.logdebug("SyncThread[%s]: prepare UNPUB %s[%s] %s",
                                 self.name, node, nodeuri, topic)
                 handler.append(('upub', topic, node, nodeuri))
@@ -333,7 +376,7 @@ class SyncThread(object):
                         del self._md5warnings[(topic, node, nodeuri)]
             # register new publishers
             for (topic, topictype, node, nodeuri) in publisher_to_register:
-                own_master_multi.registerPublisher(node, topic, topictype, nodeuri)
+                calls.append(('registerPublisher', (node, topic, topictype, nodeuri)))
                 rospy.logdebug("SyncThread[%s]: prepare PUB %s[%s] %s[%s]",
                                 self.name, node, nodeuri, topic, topictype)
                 handler.append(('pub', topic, topictype, node, nodeuri))
@@ -342,23 +385,23 @@ class SyncThread(object):
             subscriber = []
             subscriber_to_register = []
             for (topic, nodes) in subscribers:
-                for node in nodes:
-                    topictype = self._get_topictype(topic, topicTypes)
-                    nodeuri = self._get_nodeuri(node, nodeProviders, remote_masteruri)
-                    # if remote topictype is None, try to set to the local topic type
+                topictype = topic_types.get(topic, None)
+                # if remote topictype is None, try to set to the local topic type
 #          if not topictype and not self.__own_state is None:
 #            if topic in self.__own_state.topics:
 #              topictype = self.__own_state.topics[topic].type
-                    if not topictype:
-                        topictype = self.MSG_ANY_TYPE
+                if not topictype:
+                    topictype = self.MSG_ANY_TYPE
+                for node in nodes:
+                    nodeuri = node_uris.get(node, None)
                     if topictype and nodeuri and not self._do_ignore_nts(node, topic, topictype):
                         # register the node as subscriber in local ROS master
-                        if not ((topic, node, nodeuri) in self.__subscriber):
+                        if not ((topic, node, nodeuri) in current_subscriber):
                             subscriber_to_register.append((topic, topictype, node, nodeuri))
                         subscriber.append((topic, topictype, node, nodeuri))
             # unregister not updated topics
-            for (topic, topictype, node, nodeuri) in set(self.__subscriber) - set(subscriber):
-                own_master_multi.unregisterSubscriber(node, topic, nodeuri)
+            for (topic, topictype, node, nodeuri) in current_subscriber - set(subscriber):
+                calls.append(('unregisterSubscriber', (node, topic, nodeuri)))
                 rospy.logdebug("SyncThread[%s]: prepare UNSUB %s[%s] %s",
                             self.name, node, nodeuri, topic)
                 handler.append(('usub', topic, node, nodeuri))
@@ -368,7 +411,7 @@ class SyncThread(object):
                         del self._md5warnings[(topic, node, nodeuri)]
             # register new subscriber
             for (topic, topictype, node, nodeuri) in subscriber_to_register:
-                own_master_multi.registerSubscriber(node, topic, topictype, nodeuri)
+                calls.append(('registerSubscriber', (node, topic, topictype, nodeuri)))
                 rospy.logdebug("SyncThread[%s]: prepare SUB %s[%s] %s[%s]",
                             self.name, node, nodeuri, topic, topictype)
                 handler.append(('sub', topic, topictype, node, nodeuri))
@@ -380,23 +423,23 @@ class SyncThread(object):
             services = []
             services_to_register = []
             for (service, nodes) in rservices:
+                serviceuri = service_uris.get(service, None)
                 for node in nodes:
-                    serviceuri = self._get_serviceuri(service, serviceProviders, remote_masteruri)
-                    nodeuri = self._get_nodeuri(node, nodeProviders, remote_masteruri)
+                    nodeuri = node_uris.get(node, None)
                     if serviceuri and nodeuri and not self._do_ignore_ns(node, service):
                         # register the node as publisher in local ROS master
-                        if not ((service, serviceuri, node, nodeuri) in self.__services):
+                        if not ((service, serviceuri, node, nodeuri) in current_services):
                             services_to_register.append((service, serviceuri, node, nodeuri))
                         services.append((service, serviceuri, node, nodeuri))
             # unregister not updated services
-            for (service, serviceuri, node, nodeuri) in set(self.__services) - set(services):
-                own_master_multi.unregisterService(node, service, serviceuri)
+            for (service, serviceuri, node, nodeuri) in current_services - set(services):
+                calls.append(('unregisterService', (node, service, serviceuri)))
                 rospy.logdebug("SyncThread[%s]: prepare UNSRV %s[%s] %s[%s]",
                             self.name, node, nodeuri, service, serviceuri)
                 handler.append(('usrv', service, serviceuri, node, nodeuri))
             # register new services
             for (service, serviceuri, node, nodeuri) in services_to_register:
-                own_master_multi.registerService(node, service, serviceuri, nodeuri)
+                calls.append(('registerService', (node, service, serviceuri, nodeuri)))
                 rospy.logdebug("SyncThread[%s]: prepare SRV %s[%s] %s[%s]",
                             self.name, node, nodeuri, service, serviceuri)
                 handler.append(('srv', service, serviceuri, node, nodeuri))
@@ -409,8 +452,7 @@ class SyncThread(object):
                     self.__subscriber = subscriber
                     self.__services = services
                 # update the local ROS master
-                socket.setdefaulttimeout(3)
-                result = own_master_multi()
+                result = self._execute_calls(calls)
                 self._check_multical_result(result, handler)
                 # set the last synchronization time
                 self.timestamp = stamp
@@ -418,7 +460,7 @@ class SyncThread(object):
                 rospy.logdebug("SyncThread[%s]: current timestamp %.9f, local %.9f", self.name, stamp, stamp_local)
                 if self.timestamp_remote > stamp_local:
                     rospy.logdebug("SyncThread[%s]: invoke next update, remote ts: %.9f", self.name, self.timestamp_remote)
-                    self._update_timer = threading.Timer(random.random() * 2., self._request_remote_state, args=(self._apply_remote_state,))
+                    self._update_timer = threading.Timer(random.random() * 2., self._schedule_remote_state)
                     self._update_timer.start()
             # check md5sum for topics
             with self.__lock_info:
@@ -431,10 +473,25 @@ class SyncThread(object):
                 self.__has_remove_sync = False
         except:
             rospy.logerr("SyncThread[%s] ERROR: %s", self.name, traceback.format_exc())
-        finally:
-            socket.setdefaulttimeout(None)
         rospy.loginfo("SyncThread[%s] remote state applied.", self.name)
 
+    def _execute_calls(self, calls):
+        '''
+        Executes the calls at the local ROS master. With a scheduler the calls are
+        merged with calls of other sync threads into one multicall.
+        @param calls: the list with calls as tuple of (method name, arguments)
+        @type calls: C{[(str, tuple)]}
+        @return: the results of the calls in the same order
+        @rtype: xmlrpclib.MultiCallIterator
+        '''
+        if self._scheduler is not None:
+            return self._scheduler.execute(calls)
+        with server_proxy(self.masteruri_local, timeout=3, use_gzip=False) as own_master:
+            own_master_multi = xmlrpcclient.MultiCall(own_master)
+            for method, args in calls:
+                getattr(own_master_multi, method)(*args)
+            return own_master_multi()
+
     def _check_multical_result(self, mresult, handler):
         if not self.__unregistered:
             # analyze the results of the registration call
@@ -508,18 +565,18 @@ class SyncThread(object):
     def _check_md5sums(self, topics_to_register):
         try:
             # connect to master_monitor rpc-xml server of remote master discovery
-            socket.setdefaulttimeout(20)
-            remote_monitor = xmlrpcclient.ServerProxy(self.monitoruri)
-            # determine the getting method: older versions have not a getTopicsMd5sum method
-            if self._use_md5check_topics is None:
-                try:
-                    self._use_md5check_topics = 'getTopicsMd5sum' in remote_monitor.system.listMethods()
-                except:
-                    self._use_md5check_topics = False
-            if self._use_md5check_topics:
-                rospy.loginfo("SyncThread[%s] Requesting remote md5sums '%s'", self.name, self.monitoruri)
-                topic_types = [topictype for _topic, topictype, _node, _nodeuri in topics_to_register]
-                remote_md5sums_topics = remote_monitor.getTopicsMd5sum(topic_types)
+            with server_proxy(self.monitoruri, timeout=20) as remote_monitor:
+                # determine the getting method: older versions have not a getTopicsMd5sum method
+                if self._use_md5check_topics is None:
+                    try:
+                        self._use_md5check_topics = 'getTopicsMd5sum' in remote_monitor.system.listMethods()
+                    except:
+                        self._use_md5check_topics = False
+                remote_md5sums_topics = []
+                if self._use_md5check_topics:
+                    rospy.loginfo("SyncThread[%s] Requesting remote md5sums '%s'", self.name, self.monitoruri)
+                    topic_types = [topictype for _topic, topictype, _node, _nodeuri in topics_to_register]
+                    remote_md5sums_topics = remote_monitor.getTopicsMd5sum(topic_types)
                 for rttype, rtmd5sum in remote_md5sums_topics:
                     try:
                         lmd5sum = None
@@ -542,8 +599,6 @@ class SyncThread(object):
         except:
             import traceback
             rospy.logerr("SyncThread[%s] ERROR: %s", self.name, traceback.format_exc())
-        finally:
-            socket.setdefaulttimeout(None)
 
     def _check_local_topic_types(self, topics_to_register):
         try:
@@ -564,9 +619,6 @@ class SyncThread(object):
         except:
             import traceback
             rospy.logerr("SyncThread[%s] ERROR: %s", self.name, traceback.format_exc())
-        finally:
-            socket.setdefaulttimeout(None)
-
 
     def get_md5warnigs(self):
         with self.__lock_info:
@@ -581,27 +633,25 @@ class SyncThread(object):
             self.__unregistered = True
             try:
                 rospy.logdebug("    SyncThread[%s] clear all registrations", self.name)
-                socket.setdefaulttimeout(5)
-                own_master = xmlrpcclient.ServerProxy(self.masteruri_local)
-                own_master_multi = xmlrpcclient.MultiCall(own_master)
-                # end routine if the master was removed
-                for topic, _topictype, node, uri in self.__subscriber:
-                    rospy.logdebug("    SyncThread[%s]   unsibscribe %s [%s]" % (self.name, topic, node))
-                    own_master_multi.unregisterSubscriber(node, topic, uri)
-                    # TODO: unregister a remote subscriber while local publisher is still there
-                    # Note: the connection between running components after unregistration is stil there!
-                for topic, _topictype, node, uri in self.__publisher:
-                    rospy.logdebug("    SyncThread[%s]   unadvertise %s [%s]" % (self.name, topic, node))
-                    own_master_multi.unregisterPublisher(node, topic, uri)
-                for service, serviceuri, node, uri in self.__services:
-                    rospy.logdebug("    SyncThread[%s]   unregister service %s [%s]" % (self.name, service, node))
-                    own_master_multi.unregisterService(node, service, serviceuri)
-                rospy.logdebug("    SyncThread[%s] execute a MultiCall", self.name)
-                _ = own_master_multi()
-                rospy.logdebug("    SyncThread[%s] finished", self.name)
+                with server_proxy(self.masteruri_local, timeout=5, use_gzip=False) as own_master:
+                    own_master_multi = xmlrpcclient.MultiCall(own_master)
+                    # end routine if the master was removed
+                    for topic, _topictype, node, uri in self.__subscriber:
+                        rospy.logdebug("    SyncThread[%s]   unsibscribe %s [%s]" % (self.name, topic, node))
+                        own_master_multi.unregisterSubscriber(node, topic, uri)
+                        # TODO: unregister a remote subscriber while local publisher is still there
+                        # Note: the connection between running components after unregistration is stil there!
+                    for topic, _topictype, node, uri in self.__publisher:
+                        rospy.logdebug("    SyncThread[%s]   unadvertise %s [%s]" % (self.name, topic, node))
+                        own_master_multi.unregisterPublisher(node, topic, uri)
+                    for service, serviceuri, node, uri in self.__services:
+                        rospy.logdebug("    SyncThread[%s]   unregister service %s [%s]" % (self.name, service, node))
+                        own_master_multi.unregisterService(node, service, serviceuri)
+                    rospy.logdebug("    SyncThread[%s] execute a MultiCall", self.name)
+                    _ = own_master_multi()
+                    rospy.logdebug("    SyncThread[%s] finished", self.name)
             except:
                 rospy.logerr("SyncThread[%s] ERROR while ending: %s", self.name, traceback.format_exc())
-            socket.setdefaulttimeout(None)
 
     def _do_ignore_ntp(self, node, topic, topictype):
         if node == rospy.get_name():
@@ -618,23 +668,37 @@ class SyncThread(object):
             return True
         return self._filter.is_ignored_service(node, service)
 
-    def _get_topictype(self, topic, topic_types):
+    def _get_topictypes(self, topic_types):
+        '''
+        :return: dictionary with {topic name: topic type}. On duplicate entries the first one is used.
+        '''
+        result = {}
         for (topicname, topic_type) in topic_types:
-            if (topicname == topic):
-                return topic_type.replace('None', '')
-        return None
+            if topicname not in result:
+                result[topicname] = topic_type.replace('None', '')
+        return result
 
-    def _get_nodeuri(self, node, nodes, remote_masteruri):
-        for (nodename, uri, masteruri, pid, local) in nodes:
-            if (nodename == node) and ((self._filter.sync_remote_nodes() and masteruri == remote_masteruri) or local == 'local'):
+    def _get_nodeuris(self, nodes, remote_masteruri):
+        '''
+        :return: dictionary with {node name: node uri} of all nodes to synchronize.
+        '''
+        result = {}
+        sync_remote_nodes = self._filter.sync_remote_nodes()
+        for (nodename, uri, masteruri, _pid, local) in nodes:
+            if nodename not in result and ((sync_remote_nodes and masteruri == remote_masteruri) or local == 'local'):
                 # the node was registered originally to another ROS master -> do sync
                 if masteruri != self.masteruri_local:
-                    return uri
-        return None
+                    result[nodename] = uri
+        return result
 
-    def _get_serviceuri(self, service, nodes, remote_masteruri):
-        for (servicename, uri, masteruri, _topic_type, local) in nodes:
-            if (servicename == service) and ((self._filter.sync_remote_nodes() and masteruri == remote_masteruri) or local == 'local'):
+    def _get_serviceuris(self, services, remote_masteruri):
+        '''
+        :return: dictionary with {service name: service uri} of all services to synchronize.
+        '''
+        result = {}
+        sync_remote_nodes = self._filter.sync_remote_nodes()
+        for (servicename, uri, masteruri, _topic_type, local) in services:
+            if servicename not in result and ((sync_remote_nodes and masteruri == remote_masteruri) or local == 'local'):
                 if masteruri != self.masteruri_local:
-                    return uri
-        return None
+                    result[servicename] = uri
+        return result
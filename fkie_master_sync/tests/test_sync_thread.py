@@ -0,0 +1,132 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import time
+import unittest
+
+from fkie_master_sync.sync_thread import SyncThread
+
+PKG = 'fkie_master_sync'
+
+REMOTE_URI = 'http://remote:11311/'
+
+
+class DummyScheduler(object):
+    '''
+    Replaces the local ROS master, counts the executed calls.
+    '''
+
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, calls):
+        self.calls.extend(calls)
+        return [[1, '', []] for _ in calls]
+
+
+def _create_remote_state(topic_count, node_count, service_count):
+    nodes = ['/robot%d/node%d' % (idx % 20, idx) for idx in range(node_count)]
+    topics = ['/robot%d/topic%d' % (idx % 20, idx) for idx in range(topic_count)]
+    services = ['/robot%d/service%d' % (idx % 20, idx) for idx in range(service_count)]
+    publishers = [(topic, [nodes[idx % node_count]]) for idx, topic in enumerate(topics)]
+    subscribers = [(topic, [nodes[(idx + 1) % node_count], nodes[(idx + 2) % node_count]]) for idx, topic in enumerate(topics)]
+    rservices = [(service, [nodes[idx % node_count]]) for idx, service in enumerate(services)]
+    topic_types = [(topic, 'std_msgs/String') for topic in topics]
+    node_providers = [(node, 'http://remote:%d/' % (40000 + idx), REMOTE_URI, 1000 + idx, 'local') for idx, node in enumerate(nodes)]
+    service_providers = [(service, 'rosrpc://remote:%d' % (50000 + idx), REMOTE_URI, 'std_srvs/Empty', 'local') for idx, service in enumerate(services)]
+    return [time.time(), time.time(), REMOTE_URI, 'remote', publishers, subscribers, rservices, topic_types, node_providers, service_providers]
+
+
+def _linear_topictype(topic, topic_types):
+    # the lookup of the topic type before the remote state was indexed
+    for (topicname, topic_type) in topic_types:
+        if topicname == topic:
+            return topic_type.replace('None', '')
+    return None
+
+
+def _linear_nodeuri(node, nodes, remote_masteruri):
+    # the lookup of the node URI before the remote state was indexed
+    for (nodename, uri, masteruri, _pid, local) in nodes:
+        if nodename == node and (masteruri == remote_masteruri or local == 'local'):
+            return uri
+    return None
+
+
+class TestSyncThread(unittest.TestCase):
+    '''
+    '''
+
+    def _create_sync_thread(self):
+        scheduler = DummyScheduler()
+        sync_thread = SyncThread('remote', REMOTE_URI, '/master_discovery', 'http://127.0.0.1:1/', 0., scheduler=scheduler)
+        # do not request the md5sums from the remote master_discovery
+        sync_thread._use_md5check_topics = False
+        return sync_thread, scheduler
+
+    def test_apply_remote_state(self):
+        sync_thread, scheduler = self._create_sync_thread()
+        remote_state = _create_remote_state(10000, 2000, 1000)
+        start = time.time()
+        sync_thread._apply_remote_state(remote_state)
+        duration = time.time() - start
+        methods = [method for method, _args in scheduler.calls]
+        self.assertEqual(methods.count('registerPublisher'), 10000, "wrong count of registered publishers: %d" % methods.count('registerPublisher'))
+        self.assertEqual(methods.count('registerSubscriber'), 20000, "wrong count of registered subscribers: %d" % methods.count('registerSubscriber'))
+        self.assertEqual(methods.count('registerService'), 1000, "wrong count of registered services: %d" % methods.count('registerService'))
+        # the same state again does not change the registrations
+        del scheduler.calls[:]
+        start = time.time()
+        sync_thread._apply_remote_state(remote_state)
+        duration_unchanged = time.time() - start
+        # the subscribers are registered again on each apply
+        methods = [method for method, _args in scheduler.calls if method != 'registerSubscriber']
+        self.assertEqual(methods, [], "registrations changed by the same remote state: %d calls" % len(methods))
+        # the lookups as they were done before the remote state was indexed, measured for a part of the topics
+        sample = 1000
+        topic_types = remote_state[7]
+        node_providers = remote_state[8]
+        start = time.time()
+        for topic, nodes in (remote_state[4][:sample] + remote_state[5][:sample]):
+            for node in nodes:
+                _linear_topictype(topic, topic_types)
+                _linear_nodeuri(node, node_providers, REMOTE_URI)
+        duration_linear = (time.time() - start) * len(remote_state[4]) / sample
+        print("apply remote state with 10000 topics and 2000 nodes: %.3f sec, unchanged state: %.3f sec, "
+              "estimated for the lookups before indexing: %.1f sec" % (duration, duration_unchanged, duration_linear))
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestSyncThread)
@@ -850,6 +850,7 @@ class MainWindow(QMainWindow):
             else:
                 rospy.loginfo("Autoupdate disabled, the data will not be updated for %s" % msg.master.uri)
         if msg.state == MasterState.STATE_REMOVED:
+            self._update_handler.removeMaster(msg.master.uri, msg.master.monitoruri)
             if msg.master.uri == self.getMasteruri():
                 # switch to locale monitoring, if the local master discovering was removed
                 nm.nameres().remove_master_entry(msg.master.uri)
@@ -1901,8 +1902,9 @@ class MainWindow(QMainWindow):
             nmd_url = nmdurl.nmduri()
             if self.currentMaster is not None:
                 nmd_url = get_hostname(self.currentMaster.masteruri)
-            params = {'master': {':type': 'string', ':value': self.currentMaster.masteruri},
-                      'recursive': {':type': 'bool', ':value': False}
+            params = {'master': {':type': 'string', ':value': self.currentMaster.masteruri, ':hint': 'separate several destinations by comma'},
+                      'recursive': {':type': 'bool', ':value': False},
+                      'sync_directory': {':type': 'bool', ':value': False, ':hint': 'synchronize the directories of the selected files, only changed parts of the files are transferred'}
                       }
             dia = ParameterDialog(params, store_geometry="launch_transfer_dialog")
             dia.setFilterVisible(False)
@@ -1911,23 +1913,34 @@ class MainWindow(QMainWindow):
             if dia.exec_():
                 try:
                     params = dia.getKeywords()
-                    nmd_url = params['master']
+                    nmd_urls = [nmdurl.nmduri(url.strip()) for url in params['master'].split(',') if url.strip()]
                     recursive = params['recursive']
-                    for path in files:
-                        nmd_url = nmdurl.nmduri(nmd_url)
-                        rospy.loginfo("TRANSFER to %s: %s" % (nmd_url, path))
-                        self.launch_dock.progress_queue.add2queue('%s' % uuid.uuid4(),
-                                                                  'transfer files to %s' % nmd_url,
-                                                                  nm.starter().transfer_file_nmd,
-                                                                  {'grpc_url': '%s' % nmd_url,
-                                                                   'path': path,
-                                                                   'auto_pw_request': False
-                                                                  })
-                        if recursive:
+                    sync_directory = params['sync_directory']
+                    if sync_directory:
+                        for path in sorted(set([os.path.dirname(path) for path in files])):
+                            rospy.loginfo("SYNCHRONIZE with %s: %s" % (nmd_urls, path))
                             self.launch_dock.progress_queue.add2queue('%s' % uuid.uuid4(),
-                                                                      "transfer recursive '%s' to %s" % (path, nmd_url),
-                                                                      self._recursive_transfer,
-                                                                      {'path': path, 'nmd_url': nmd_url})
+                                                                      "synchronize '%s' with %s" % (path, ', '.join(nmd_urls)),
+                                                                      nm.starter().sync_dir_nmd,
+                                                                      {'grpc_path': path,
+                                                                       'grpc_urls': nmd_urls
+                                                                      })
+                    for nmd_url in nmd_urls:
+                        for path in files:
+                            if not sync_directory:
+                                rospy.loginfo("TRANSFER to %s: %s" % (nmd_url, path))
+                                self.launch_dock.progress_queue.add2queue('%s' % uuid.uuid4(),
+                                                                          'transfer files to %s' % nmd_url,
+                                                                          nm.starter().transfer_file_nmd,
+                                                                          {'grpc_url': '%s' % nmd_url,
+                                                                           'path': path,
+                                                                           'auto_pw_request': False
+                                                                          })
+                            if recursive:
+                                self.launch_dock.progress_queue.add2queue('%s' % uuid.uuid4(),
+                                                                          "transfer recursive '%s' to %s" % (path, nmd_url),
+                                                                          self._recursive_transfer,
+                                                                          {'path': path, 'nmd_url': nmd_url})
                     self.launch_dock.progress_queue.start()
                 except Exception as e:
                     MessageBox.warning(self, "Transfer error",
@@ -382,6 +382,7 @@ class MasterViewProxy(QWidget):
         self.loaded_config.connect(self._apply_launch_config)
         nm.nmd().launch.mtimes.connect(self._apply_mtimes)
         nm.nmd().launch.changed_binaries.connect(self._apply_changed_binaries)
+        nm.nmd().file.changed_binaries.connect(self._apply_changed_binaries)
         nm.nmd().launch.launch_nodes.connect(self.on_launch_description_retrieved)
         nm.nmd().version.version_signal.connect(self.on_nmd_version_retrieved)
         nm.nmd().screen.log_dir_size_signal.connect(self.on_log_dir_retrieved)
@@ -877,11 +878,23 @@ class MasterViewProxy(QWidget):
         if self._has_nmd:
             # do not connect to the node manager daemon until it is not in the nodes list (not started)
             if lfiles:
-                nm.nmd().file.check_for_changed_files_threaded(lfiles)
                 nm.nmd().screen.multiple_screens_threaded(grpc_url)
             nodes = self.get_nodes_runningIfLocal(True)
-            if nodes:
-                nm.nmd().launch.get_changed_binaries_threaded(grpc_url, list(nodes.keys()))
+            # the files of this daemon are watched, all other files are polled
+            wfiles = {}
+            pfiles = {}
+            for path, mtime in lfiles.items():
+                uri, lpath = nmdurl.split(path, with_scheme=True)
+                if uri == grpc_url:
+                    wfiles[lpath] = mtime
+                else:
+                    pfiles[path] = mtime
+            if not nm.nmd().file.watch_files(grpc_url, wfiles, list(nodes.keys())):
+                pfiles = lfiles
+                if nodes:
+                    nm.nmd().launch.get_changed_binaries_threaded(grpc_url, list(nodes.keys()))
+            if pfiles:
+                nm.nmd().file.check_for_changed_files_threaded(pfiles)
 
     def perform_diagnostic_requests(self, force=False):
         now = time.time()
@@ -889,9 +902,9 @@ class MasterViewProxy(QWidget):
             nmd_uri = nmdurl.nmduri(self.masteruri)
             nm.nmd().monitor.get_system_diagnostics_threaded(nmd_uri)
             if not self.has_master_sync:
-                nm.nmd().monitor.get_diagnostics_threaded(nmd_uri)
+                nm.nmd().monitor.get_diagnostics_threaded(nmd_uri, incremental=not force)
             elif nmdurl.equal_uri(self.masteruri, self.main_window.getMasteruri()):
-                nm.nmd().monitor.get_diagnostics_threaded(nmd_uri)
+                nm.nmd().monitor.get_diagnostics_threaded(nmd_uri, incremental=not force)
             self._ts_last_diagnostic_request = now
 
     def get_files_for_change_check(self):
@@ -32,19 +32,54 @@
 
 
 
+import grpc
 import os
 import rospy
+import threading
+import time
 from python_qt_binding.QtCore import Signal
 
+import fkie_node_manager_daemon.compression as compression
 import fkie_node_manager_daemon.file_stub as fstub
+import fkie_node_manager_daemon.host as nmdhost
 from fkie_node_manager_daemon import url as nmdurl
 from fkie_node_manager_daemon.common import utf8
 
 from .channel_interface import ChannelInterface
 
 
+class _FileWatch(object):
+    '''
+    An open WatchFiles stream to one daemon.
+    '''
+
+    def __init__(self, key):
+        self.key = key
+        self._lock = threading.Lock()
+        self._stream = None
+        self._cancelled = False
+
+    def set_stream(self, stream):
+        with self._lock:
+            if self._cancelled:
+                stream.cancel()
+                return False
+            self._stream = stream
+            return True
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._stream is not None:
+                self._stream.cancel()
+
+
 class FileChannel(ChannelInterface):
 
+    WATCH_RETRY_AFTER = 60.
+    '''
+    :ivar float WATCH_RETRY_AFTER: time in seconds to poll for changes, after the daemon rejected the watch of files because of too many open watches.
+    '''
     listed_path = Signal(str, str, list)
     '''
     :ivar str,str,list listed_path: listed_path is a signal, which is emitted, if path is listed successful {url, path, list with paths}.
@@ -65,12 +100,24 @@ class FileChannel(ChannelInterface):
     '''
     :ivar str,int,int,str file_content: gets the content of the file  {grpc_url, size, mtime, content}.
     '''
+    changed_binaries = Signal(str, dict)
+    '''
+    :ivar str,dict changed_binaries: this signal is emitted by the watch of files on changed binaries of nodes {grpc_url, {node names: mtime}}.
+    '''
 
     def __init__(self):
         ChannelInterface.__init__(self)
         self._cache_file_content = {}
         self._cache_packages = {}
         self._cache_path = {}
+        self._watch_lock = threading.RLock()
+        self._watches = {}
+        self._watch_unsupported = set()
+        self._watch_rejected = {}  # uri: time of the rejected watch
+
+    def stop(self):
+        self.stop_watch()
+        ChannelInterface.stop(self)
 
     def clear_cache(self, grpc_path=''):
         if grpc_path:
@@ -180,6 +227,90 @@ class FileChannel(ChannelInterface):
         if hasattr(self, '_threads'):
             self._threads.finished("cft_%s" % url)
 
+    def watch_files(self, grpc_url, files, nodes=[]):
+        '''
+        Subscribes on the daemon for changes of the files and of the binaries
+        of the nodes. The changes are emitted by `changed_file` and
+        `changed_binaries` signals. A running subscription is replaced only if
+        the files or nodes are changed. A subscription closed by errors is
+        renewed on next call.
+
+        :param str grpc_url: the url of the daemon
+        :param files: dictionary with paths of the files on the daemon and their last known modification time.
+        :type files: dict(str: float)
+        :param nodes: names of the nodes to watch for changed binaries.
+        :type nodes: [str]
+        :return: False if the daemon does not support the watch of files or rejected it in
+            the last :attr:`WATCH_RETRY_AFTER` seconds. In this case use
+            :meth:`check_for_changed_files_threaded` and `LaunchChannel.get_changed_binaries_threaded()`.
+        :rtype: bool
+        '''
+        uri, _path = nmdurl.split(grpc_url)
+        if uri in self._watch_unsupported:
+            return False
+        if time.time() - self._watch_rejected.get(uri, 0) < self.WATCH_RETRY_AFTER:
+            return False
+        if not files and not nodes:
+            self.stop_watch(grpc_url)
+            return True
+        key = (frozenset(files.keys()), frozenset(nodes))
+        with self._watch_lock:
+            watch = self._watches.get(uri, None)
+            if watch is not None:
+                if watch.key == key:
+                    return True
+                watch.cancel()
+            watch = _FileWatch(key)
+            self._watches[uri] = watch
+        thread = threading.Thread(target=self._watch_files_threaded, args=(grpc_url, dict(files), list(nodes), watch))
+        thread.setDaemon(True)
+        thread.start()
+        return True
+
+    def stop_watch(self, grpc_url=''):
+        '''
+        Cancels the watch of files on given daemon or on all daemons if no url is given.
+        '''
+        with self._watch_lock:
+            if grpc_url:
+                uri, _path = nmdurl.split(grpc_url)
+                watches = [self._watches.pop(uri)] if uri in self._watches else []
+            else:
+                watches = list(self._watches.values())
+                self._watches.clear()
+        for watch in watches:
+            watch.cancel()
+
+    def _watch_files_threaded(self, grpc_url, files, nodes, watch):
+        uri, _path = nmdurl.split(grpc_url)
+        rospy.logdebug("[thread] watch %d files and %d nodes on %s" % (len(files), len(nodes), uri))
+        channel = None
+        try:
+            fm, channel = self.get_file_manager(uri)
+            stream = fm.watch_files(files, nodes)
+            if watch.set_stream(stream):
+                for reply in stream:
+                    for item in reply.items:
+                        self.changed_file.emit(nmdurl.join(grpc_url, item.path), item.mtime)
+                    if reply.nodes:
+                        self.changed_binaries.emit(grpc_url, dict([(item.path, item.mtime) for item in reply.nodes]))
+        except grpc.RpcError as gerr:
+            if gerr.code() == grpc.StatusCode.UNIMPLEMENTED:
+                rospy.loginfo("%s does not support the watch of files, poll for changes" % uri)
+                self._watch_unsupported.add(uri)
+            elif gerr.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                rospy.loginfo("%s has too many open watches of files, poll for changes" % uri)
+                self._watch_rejected[uri] = time.time()
+            elif gerr.code() != grpc.StatusCode.CANCELLED:
+                rospy.logdebug("watch of files on %s closed: %s" % (uri, utf8(gerr)))
+        except Exception as err:
+            rospy.logdebug("watch of files on %s closed: %s" % (uri, utf8(err)))
+        finally:
+            with self._watch_lock:
+                if self._watches.get(uri, None) is watch:
+                    del self._watches[uri]
+            self.close_channel(channel, uri)
+
     def list_packages_threaded(self, grpc_url_or_path='grpc://localhost:12321', clear_ros_cache=False):
         self._threads.start_thread("gmt_%s_%d" % (grpc_url_or_path, clear_ros_cache), target=self._list_packages, args=(grpc_url_or_path, clear_ros_cache))
 
@@ -222,7 +353,7 @@ class FileChannel(ChannelInterface):
             uri, path = nmdurl.split(grpc_path)
             fm, channel = self.get_file_manager(uri)
             try:
-                file_size, file_mtime, file_content = fm.get_file_content(path)
+                file_size, file_mtime, file_content = fm.get_file_content(path, compression=self._compression(uri))
                 file_content = utf8(file_content)
                 self._cache_file_content[grpc_path] = (file_size, file_mtime, file_content)
             except Exception as e:
@@ -235,6 +366,18 @@ class FileChannel(ChannelInterface):
         self.file_content.emit(grpc_path, file_size, file_mtime, file_content)
         return file_size, file_mtime, file_content
 
+    def _compression(self, uri):
+        '''
+        :return: the compression for file transfers from given daemon. Only transfers from remote hosts are compressed.
+        :rtype: int
+        '''
+        try:
+            if nmdhost.is_local(nmdhost.get_hostname(uri), wait=False):
+                return compression.NONE
+        except Exception:
+            pass
+        return compression.preferred()
+
     def save_file(self, grpc_path, content, mtime):
         rospy.logdebug("save_file_content: %s" % grpc_path)
         uri, path = nmdurl.split(grpc_path)
@@ -264,6 +407,31 @@ class FileChannel(ChannelInterface):
         fm.copy(path, grpc_dest)
         self.close_channel(channel, uri)
 
+    def sync_dir(self, grpc_path, grpc_urls):
+        '''
+        Synchronizes the directory of given path with the same directory on
+        other daemons. Only changed blocks of the files are transferred.
+
+        :param str grpc_path: directory or file inside a package on the source daemon
+        :param [str] grpc_urls: urls of the destination daemons
+        :raise Exception: if the synchronization with one of the destinations failed.
+        '''
+        uri, path = nmdurl.split(grpc_path)
+        rospy.logdebug("sync '%s' to %s" % (grpc_path, grpc_urls))
+        fm, channel = self.get_file_manager(uri)
+        try:
+            results = fm.sync_dir(path, [nmdurl.split(url)[0] for url in grpc_urls])
+        finally:
+            self.close_channel(channel, uri)
+        errors = []
+        for result in results:
+            if result.status.code != fstub.OK:
+                errors.append("%s: %s %s" % (result.uri, result.status.error_msg, result.status.error_file))
+            else:
+                rospy.loginfo("synchronized '%s' with %s: %d of %d files changed, %d of %d bytes transferred" % (path, result.uri, result.changed, result.files, result.sent_bytes, result.total_bytes))
+        if errors:
+            raise Exception('\n'.join(errors))
+
     def get_package_binaries(self, pkgname, grpc_url='grpc://localhost:12321'):
         uri, _path = nmdurl.split(grpc_url)
         rospy.logdebug("get_package_binaries for '%s' from '%s'" % (pkgname, uri))
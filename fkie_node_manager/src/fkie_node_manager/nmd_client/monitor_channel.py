@@ -58,8 +58,20 @@ class MonitorChannel(ChannelInterface):
     '''
 
 
+    def __init__(self):
+        ChannelInterface.__init__(self)
+        # uri: timestamp of the last received diagnostics, used for incremental requests
+        self._diagnostics_ts = {}
+
     def clear_cache(self, grpc_url=''):
-        pass
+        if grpc_url:
+            uri, _ = nmdurl.split(grpc_url)
+            try:
+                del self._diagnostics_ts[uri]
+            except Exception:
+                pass
+        else:
+            self._diagnostics_ts.clear()
 
     def get_monitor_manager(self, uri='localhost:12321'):
         channel = self.get_insecure_channel(uri)
@@ -83,20 +95,26 @@ class MonitorChannel(ChannelInterface):
         finally:
             self.close_channel(channel, uri)
 
-    def get_diagnostics_threaded(self, grpc_url='grpc://localhost:12321'):
-        self._threads.start_thread("gmdt_%s" % grpc_url, target=self.get_diagnostics, args=(grpc_url, True))
+    def get_diagnostics_threaded(self, grpc_url='grpc://localhost:12321', incremental=True):
+        self._threads.start_thread("gmdt_%s" % grpc_url, target=self.get_diagnostics, args=(grpc_url, True, incremental))
 
-    def get_diagnostics(self, grpc_url='grpc://localhost:12321', threaded=False):
+    def get_diagnostics(self, grpc_url='grpc://localhost:12321', threaded=False, incremental=False):
+        '''
+        :param bool incremental: request only the diagnostics changed since the last request to this daemon.
+        '''
         rospy.logdebug("get diagnostics from %s" % (grpc_url))
         uri, _ = nmdurl.split(grpc_url)
         vm, channel = self.get_monitor_manager(uri)
         try:
-            diagnostic_array = vm.get_diagnostics()
+            filter_ts = self._diagnostics_ts.get(uri, 0) if incremental else 0
+            diagnostic_array = vm.get_diagnostics(filter_timestamp=filter_ts)
+            self._diagnostics_ts[uri] = diagnostic_array.header.stamp.to_sec()
             if threaded:
                 self.remote_diagnostics_signal.emit(diagnostic_array, grpc_url)
                 self._threads.finished("gmdt_%s" % grpc_url)
             return diagnostic_array
         except Exception as e:
+            self._diagnostics_ts.pop(uri, None)
             self.error.emit("get_diagnostics", "grpc://%s" % uri, "", e)
         finally:
             self.close_channel(channel, uri)
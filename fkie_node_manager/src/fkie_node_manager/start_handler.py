@@ -583,6 +583,17 @@ class StartHandler(object):
             rospy.logwarn("use SSH to transfer file '%s' to '%s', because of error: %s" % (path, host, utf8(err)))
             cls.transfer_files(host, path, auto_pw_request, user, pw)
 
+    @classmethod
+    def sync_dir_nmd(cls, grpc_path, grpc_urls):
+        '''
+        Synchronizes the directory of the given path with the remote hosts.
+        Only changed blocks of the files are transferred.
+
+        :param str grpc_path: directory or file inside a package
+        :param [str] grpc_urls: destination grpc servers
+        '''
+        nm.nmd().file.sync_dir(grpc_path, grpc_urls)
+
     @classmethod
     def transfer_files(cls, host, path, auto_pw_request=False, user=None, pw=None):
         '''
@@ -112,6 +112,18 @@ class UpdateHandler(QObject):
             except Exception:
                 pass
 
+    def removeMaster(self, masteruri, monitoruri):
+        '''
+        Cancels the requested update of a removed master and drops the last state
+        retrieved from its master_discovery node.
+
+        :param str masteruri: the URI of the remote ROS master
+        :param str monitoruri: the URI of the monitor RPC interface of the master_discovery node
+        '''
+        with self._lock:
+            self.__requestedUpdates.pop(masteruri, None)
+        UpdateThread.clear_listed_state(monitoruri)
+
     def _on_master_info(self, minfo):
         self.master_info_signal.emit(minfo)
         self.__handle_requests(minfo.masteruri)
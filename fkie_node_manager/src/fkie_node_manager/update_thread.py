@@ -34,7 +34,6 @@
 
 from python_qt_binding.QtCore import QObject, Signal
 import random
-import socket
 import threading
 import time
 try:
@@ -45,6 +44,7 @@ except ImportError:
 import rospy
 
 from fkie_master_discovery.master_info import MasterInfo
+from fkie_master_discovery.xmlrpc_pool import server_proxy
 from fkie_node_manager_daemon.common import utf8
 
 
@@ -83,6 +83,24 @@ class UpdateThread(QObject, threading.Thread):
   after the name was retrieved from host.
   '''
 
+    DELTA_RETRY_AFTER = 300.
+    '''
+  :cvar: seconds until `masterInfoDelta` is requested again from a master_discovery
+  which did not support it.
+  '''
+
+    _listed_states = dict()
+    '''
+  :cvar: the last listed state received from a monitor URI. Used to apply the
+  deltas of `masterInfoDelta` requests.
+  '''
+    _no_delta = dict()
+    '''
+  :cvar: monitor URI: time of the failed `masterInfoDelta` request of an older
+  master_discovery without delta support.
+  '''
+    _listed_states_lock = threading.RLock()
+
     def __init__(self, monitoruri, masteruri, delayed_exec=0., parent=None):
         '''
         :param str masteruri: the URI of the remote ROS master
@@ -104,29 +122,28 @@ class UpdateThread(QObject, threading.Thread):
             # 'print "wait request update", self._monitoruri, delay
             time.sleep(delay)
             # 'print "request update", self._monitoruri
-            socket.setdefaulttimeout(25)
-            remote_monitor = xmlrpcclient.ServerProxy(self._monitoruri)
-            # get first master errors
-            try:
-                muri, errors = remote_monitor.masterErrors()
-                self.master_errors_signal.emit(muri, errors)
-            except xmlrpcclient.Fault as _err:
-                rospy.logwarn("Older master_discovery on %s detected. It does not support master error reports!" % self._masteruri)
-            # get the time difference
-            try:
-                myts = time.time()
-                muri, remote_ts = remote_monitor.getCurrentTime()
-                self.timediff_signal.emit(muri, remote_ts - myts - (time.time() - myts) / 2.0)
-            except xmlrpcclient.Fault as _errts:
-                rospy.logwarn("Older master_discovery on %s detected. It does not support getCurrentTime!" % self._masteruri)
-            # get the user name
-            try:
-                muri, username = remote_monitor.getUser()
-                self.username_signal.emit(muri, username)
-            except xmlrpcclient.Fault as _errts:
-                rospy.logwarn("Older master_discovery on %s detected. It does not support getUser!" % self._masteruri)
-            # now get master info from master discovery
-            remote_info = remote_monitor.masterInfo()
+            with server_proxy(self._monitoruri, timeout=25) as remote_monitor:
+                # get first master errors
+                try:
+                    muri, errors = remote_monitor.masterErrors()
+                    self.master_errors_signal.emit(muri, errors)
+                except xmlrpcclient.Fault as _err:
+                    rospy.logwarn("Older master_discovery on %s detected. It does not support master error reports!" % self._masteruri)
+                # get the time difference
+                try:
+                    myts = time.time()
+                    muri, remote_ts = remote_monitor.getCurrentTime()
+                    self.timediff_signal.emit(muri, remote_ts - myts - (time.time() - myts) / 2.0)
+                except xmlrpcclient.Fault as _errts:
+                    rospy.logwarn("Older master_discovery on %s detected. It does not support getCurrentTime!" % self._masteruri)
+                # get the user name
+                try:
+                    muri, username = remote_monitor.getUser()
+                    self.username_signal.emit(muri, username)
+                except xmlrpcclient.Fault as _errts:
+                    rospy.logwarn("Older master_discovery on %s detected. It does not support getUser!" % self._masteruri)
+                # now get master info from master discovery
+                remote_info = self._get_remote_info(remote_monitor)
             master_info = MasterInfo.from_list(remote_info)
             master_info.check_ts = time.time()
             # 'print "request success", self._monitoruri
@@ -138,6 +155,41 @@ class UpdateThread(QObject, threading.Thread):
             rospy.logwarn("Cannot update ROS state, connection to %s failed:\n\t%s", utf8(self._monitoruri), formatted_lines[-1])
             # 'print "request failed", self._monitoruri
             self.error_signal.emit(self._masteruri, formatted_lines[-1])
-        finally:
-            if socket is not None:
-                socket.setdefaulttimeout(None)
+
+    @classmethod
+    def clear_listed_state(cls, monitoruri):
+        '''
+        Removes the last listed state and the delta support marker of a removed master.
+
+        :param str monitoruri: the URI of the monitor RPC interface of the master_discovery node
+        '''
+        with cls._listed_states_lock:
+            cls._listed_states.pop(monitoruri, None)
+            cls._no_delta.pop(monitoruri, None)
+
+    def _get_remote_info(self, remote_monitor):
+        with UpdateThread._listed_states_lock:
+            last_info = UpdateThread._listed_states.get(self._monitoruri, ())
+            failed = UpdateThread._no_delta.get(self._monitoruri, None)
+            if failed is not None and time.time() - failed > self.DELTA_RETRY_AFTER:
+                # the master_discovery may be updated in the meantime
+                del UpdateThread._no_delta[self._monitoruri]
+                failed = None
+        if failed is None:
+            try:
+                since = last_info[0] if last_info else ''
+                remote_delta = remote_monitor.masterInfoDelta(since, [])
+                remote_info = MasterInfo.merge_delta(last_info if last_info else None, remote_delta)
+                with UpdateThread._listed_states_lock:
+                    UpdateThread._listed_states[self._monitoruri] = remote_info
+                return remote_info
+            except xmlrpcclient.Fault as _errdelta:
+                rospy.logwarn("Older master_discovery on %s detected. It does not support masterInfoDelta!" % self._masteruri)
+                with UpdateThread._listed_states_lock:
+                    UpdateThread._listed_states.pop(self._monitoruri, None)
+                    UpdateThread._no_delta[self._monitoruri] = time.time()
+            except ValueError:
+                with UpdateThread._listed_states_lock:
+                    UpdateThread._listed_states.pop(self._monitoruri, None)
+                raise
+        return remote_monitor.masterInfo()
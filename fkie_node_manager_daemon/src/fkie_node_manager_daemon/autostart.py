@@ -0,0 +1,310 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2017, Fraunhofer FKIE/CMS, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import OrderedDict, deque
+import heapq
+import threading
+import time
+
+import rosgraph.masterapi
+import rospy
+
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+from .common import utf8
+
+
+class AutostartJob(object):
+    '''
+    A node waiting for the start.
+    '''
+    __slots__ = ('name', 'cfg', 'delay', 'required', 'created')
+
+    def __init__(self, name, cfg, delay=0., required=''):
+        '''
+        :param str name: the full name of the node
+        :param cfg: the launch configuration containing the node
+        :type cfg: :class:`fkie_node_manager_daemon.launch_config.LaunchConfig`
+        :param float delay: start delay in seconds, counted after the required topic is available.
+        :param str required: the topic which has to be published before the node is started.
+        '''
+        self.name = name
+        self.cfg = cfg
+        self.delay = delay
+        self.required = required
+        self.created = time.time()
+
+
+class Autostart(object):
+    '''
+    Starts the nodes of launch files with `autostart` concurrently. Nodes with
+    `autostart/required/publisher` wait until one watcher thread finds the topic
+    on the ROS master, nodes with `autostart/delay` wait in a time ordered queue.
+    Both are handled by the same thread, the nodes are started by a fixed count
+    of worker threads. Ready nodes of the same launch file are started together
+    to load their parameter with one request. The first node of each launch file
+    is started alone, since it loads the global parameter.
+    '''
+
+    POLL_INTERVAL = 3.0
+    ''':var POLL_INTERVAL: interval in seconds to ask the ROS master for published topics while nodes are waiting.'''
+    MAX_BATCH = 16
+    ''':var MAX_BATCH: maximal count of nodes of the same launch file started by one call of the start method.'''
+    MAX_LATENCIES = 1000
+    ''':var MAX_LATENCIES: count of nodes with recorded start latencies, the oldest are removed first.'''
+
+    def __init__(self, start_func, parallel=4, monitor_servicer=None):
+        '''
+        :param start_func: the method called to start nodes with a list of full node names and the launch configuration.
+                           It returns for each node None on success or the exception.
+        :type start_func: function([str], :class:`fkie_node_manager_daemon.launch_config.LaunchConfig`) -> [Exception or None]
+        :param int parallel: count of nodes started at the same time.
+        :param monitor_servicer: reports the start latencies of each launch file as diagnostics if not None
+        :type monitor_servicer: :class:`fkie_node_manager_daemon.monitor_servicer.MonitorServicer`
+        '''
+        self._start_func = start_func
+        self._monitor_servicer = monitor_servicer
+        self._cond = threading.Condition()
+        self._running = True
+        self._parallel = max(1, int(parallel))
+        self._workers = 0
+        self._watcher = None
+        self._ready = deque()
+        self._delayed = []  # heap of (time to start, sequence, AutostartJob)
+        self._seq = 0
+        self._waiting = {}  # masteruri: {topic: [AutostartJob]}
+        self._next_poll = 0
+        self._inflight = {}  # (launch file, masteruri): count of starting nodes
+        self._prepared = set()  # (launch file, masteruri) of launch files with already started node and further jobs
+        self._reports = {}  # (launch file, masteruri): [count of jobs, time of first add, [(node, wait, duration, error)]]
+        self.latencies = OrderedDict()  # node: (seconds until start, duration of the start)
+
+    def set_parallel(self, parallel):
+        '''
+        Changes the count of nodes started at the same time.
+
+        :param int parallel: count of parallel starts
+        '''
+        with self._cond:
+            self._parallel = max(1, int(parallel))
+            if self._running and self._workers:
+                self._start_threads()
+            self._cond.notify_all()
+
+    def add(self, name, cfg, delay=0., required=''):
+        '''
+        Adds a node to start. The node is started immediately if no delay and
+        no required topic is given and a worker is free.
+
+        :param str name: the full name of the node
+        :param cfg: the launch configuration containing the node
+        :type cfg: :class:`fkie_node_manager_daemon.launch_config.LaunchConfig`
+        :param float delay: start delay in seconds, counted after the required topic is available.
+        :param str required: the topic which has to be published before the node is started.
+        '''
+        job = AutostartJob(name, cfg, delay, required)
+        with self._cond:
+            if not self._running:
+                return
+            report = self._reports.setdefault(self._cfg_key(cfg), [0, job.created, []])
+            report[0] += 1
+            if required:
+                self._waiting.setdefault(cfg.masteruri, {}).setdefault(required, []).append(job)
+                # check the topics on next loop of the watcher
+                self._next_poll = 0
+            else:
+                self._schedule(job)
+            self._start_threads()
+            self._cond.notify_all()
+
+    def stop(self):
+        '''
+        Cancels the start of all waiting nodes.
+        '''
+        with self._cond:
+            self._running = False
+            self._ready.clear()
+            del self._delayed[:]
+            self._waiting.clear()
+            self._cond.notify_all()
+
+    @staticmethod
+    def _cfg_key(cfg):
+        # the launch configuration objects are replaced on reload, use the path
+        return (cfg.filename, cfg.masteruri)
+
+    def _schedule(self, job):
+        # the lock must be held by the caller
+        if job.delay > 0:
+            self._seq += 1
+            heapq.heappush(self._delayed, (time.time() + job.delay, self._seq, job))
+        else:
+            self._ready.append(job)
+
+    def _start_threads(self):
+        # the lock must be held by the caller
+        while self._workers < self._parallel:
+            self._workers += 1
+            thread = threading.Thread(target=self._run_worker)
+            thread.daemon = True
+            thread.start()
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._run_watcher)
+            self._watcher.daemon = True
+            self._watcher.start()
+
+    def _run_watcher(self):
+        with self._cond:
+            while self._running:
+                now = time.time()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._delayed)[2])
+                if self._waiting and self._next_poll <= now:
+                    masteruris = list(self._waiting.keys())
+                    self._cond.release()
+                    try:
+                        published = dict((masteruri, self._get_published_topics(masteruri)) for masteruri in masteruris)
+                    finally:
+                        self._cond.acquire()
+                    for masteruri, topics in published.items():
+                        waiting = self._waiting.get(masteruri, {})
+                        for topic in topics & set(waiting.keys()):
+                            for job in waiting.pop(topic):
+                                self._schedule(job)
+                        if not waiting:
+                            self._waiting.pop(masteruri, None)
+                    self._next_poll = time.time() + self.POLL_INTERVAL
+                    continue
+                if self._ready:
+                    self._cond.notify_all()
+                timeout = None
+                if self._delayed:
+                    timeout = self._delayed[0][0] - now
+                if self._waiting:
+                    poll_in = self._next_poll - now
+                    timeout = poll_in if timeout is None else min(timeout, poll_in)
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+            self._watcher = None
+
+    def _get_published_topics(self, masteruri):
+        try:
+            master = rosgraph.masterapi.Master(rospy.get_name(), master_uri=masteruri)
+            return set(topic for topic, _datatype in master.getPublishedTopics(''))
+        except Exception as err:
+            rospy.logwarn("Can't get published topics from %s to autostart nodes: %s" % (masteruri, utf8(err)))
+        return set()
+
+    def _next_jobs(self):
+        # the lock must be held by the caller
+        # only one node of a launch file is started until the global parameter are loaded
+        for idx, job in enumerate(self._ready):
+            cfg_id = self._cfg_key(job.cfg)
+            if cfg_id in self._prepared or not self._inflight.get(cfg_id, 0):
+                del self._ready[idx]
+                jobs = [job]
+                if cfg_id in self._prepared:
+                    # take further nodes of the same launch file, but leave work for other workers
+                    count = min(self.MAX_BATCH, (len(self._ready) + 1) // self._parallel)
+                    idx = 0
+                    while len(jobs) < count and idx < len(self._ready):
+                        if self._ready[idx].cfg is job.cfg:
+                            jobs.append(self._ready[idx])
+                            del self._ready[idx]
+                        else:
+                            idx += 1
+                self._inflight[cfg_id] = self._inflight.get(cfg_id, 0) + 1
+                return jobs
+        return []
+
+    def _run_worker(self):
+        with self._cond:
+            while self._running and self._workers <= self._parallel:
+                jobs = self._next_jobs()
+                if not jobs:
+                    self._cond.wait()
+                    continue
+                cfg = jobs[0].cfg
+                self._cond.release()
+                started = time.time()
+                try:
+                    errors = self._start_func([job.name for job in jobs], cfg)
+                except Exception as err:
+                    errors = [err] * len(jobs)
+                finished = time.time()
+                self._cond.acquire()
+                cfg_id = self._cfg_key(cfg)
+                self._inflight[cfg_id] -= 1
+                if not self._inflight[cfg_id]:
+                    del self._inflight[cfg_id]
+                self._prepared.add(cfg_id)
+                report = self._reports.get(cfg_id, None)
+                for job, err in zip(jobs, errors):
+                    error = utf8(err) if err is not None else ''
+                    if error:
+                        rospy.logwarn("Error while start %s: %s" % (job.name, error))
+                    wait = started - job.created
+                    self.latencies.pop(job.name, None)
+                    self.latencies[job.name] = (wait, finished - started)
+                    if len(self.latencies) > self.MAX_LATENCIES:
+                        self.latencies.popitem(last=False)
+                    if report is not None:
+                        report[2].append((job.name, wait, finished - started, error))
+                        report[0] -= 1
+                if report is not None and report[0] == 0:
+                    # no further nodes of this launch file, the next added node loads the global parameter again
+                    del self._reports[cfg_id]
+                    self._prepared.discard(cfg_id)
+                    self._report(cfg, report)
+                self._cond.notify_all()
+            self._workers -= 1
+
+    def _report(self, cfg, report):
+        duration = time.time() - report[1]
+        errors = [item for item in report[2] if item[3]]
+        rospy.loginfo("autostart of %d nodes from %s finished in %.2f sec, %d failed" % (len(report[2]), cfg.filename, duration, len(errors)))
+        if self._monitor_servicer is None:
+            return
+        try:
+            diag = DiagnosticArray()
+            diag.header.stamp = rospy.Time.now()
+            ds = DiagnosticStatus()
+            ds.level = DiagnosticStatus.WARN if errors else DiagnosticStatus.OK
+            ds.name = 'autostart %s' % cfg.filename
+            ds.message = 'started %d nodes in %.2f sec, %d failed' % (len(report[2]), duration, len(errors))
+            for name, wait, start, error in report[2]:
+                ds.values.append(KeyValue(name, 'wait %.3f sec, start %.3f sec%s' % (wait, start, ', %s' % error if error else '')))
+            diag.status.append(ds)
+            self._monitor_servicer.add_diagnostics(diag)
+        except Exception as err:
+            rospy.logwarn("Can't report the autostart diagnostics: %s" % utf8(err))
@@ -32,6 +32,7 @@
 
 
 
+import bisect
 from datetime import datetime
 import os
 import re
@@ -64,6 +65,10 @@ _get_pkg_path_var = None
 
 PACKAGE_CACHE = {}
 SOURCE_PATH_TO_PACKAGES = {}
+INCLUDE_CACHE = {}
+''':var INCLUDE_CACHE: the includes found in a file by (path, include pattern, resolve args). Each entry is validated by modification time, inode and size of the file.'''
+INCLUDE_CACHE_MAX = 4096
+XML_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
 
 
 class IncludedFile():
@@ -246,6 +251,8 @@ def reset_package_cache():
     PACKAGE_CACHE = {}
     global SOURCE_PATH_TO_PACKAGES
     SOURCE_PATH_TO_PACKAGES = {}
+    global INCLUDE_CACHE
+    INCLUDE_CACHE = {}
 
 def interpret_path(path, pwd='.'):
     '''
@@ -456,26 +463,91 @@ def find_included_files(string,
     :return: Returns an iterator with IncludedFile-class
     :rtype: iterator with IncludedFile
     '''
-    re_filelist = EMPTY_PATTERN
-    if include_pattern:
-        # create regular expression from pattern
-        re_filelist = re.compile(r"%s" % '|'.join(include_pattern))
     pwd = '.'
-    content = string
     content_info = 'content'
     # read file content if file exists
     if os.path.exists(string) and not os.path.isdir(string):
         pwd = os.path.dirname(string)
         content_info = string
-        with open(string, 'r') as f:
-            content = f.read()
-            # replace XML comments by the same count of NEWLINES
-            comment_pattern = re.compile(r"<!--.*?-->", re.DOTALL)
-            match = comment_pattern.search(content)
-            while match is not None:
-                count_nl = content[match.start():match.end()].count('\n')
-                content = content[:match.start()] + '\n' * count_nl + content[match.end():]
-                match = comment_pattern.search(content, match.start())
+        includes = _get_file_includes(string, include_pattern, resolve_args)
+    else:
+        includes = _parse_includes(string, string, pwd, include_pattern, resolve_args)
+    my_unique_files = unique_files
+    if not unique_files:
+        my_unique_files = list()
+    for position, filename, rawname, forward_args, resolve_args_all in includes:
+        try:
+            if os.path.isdir(filename):
+                filename = ''
+            exists = os.path.isfile(filename)
+            if filename:
+                publish = not unique or (unique and filename not in my_unique_files)
+                if publish:
+                    my_unique_files.append(filename)
+                    yield IncludedFile(string, position, filename, exists, rawname, rec_depth, dict(forward_args))
+            # for recursive search
+            if exists:
+                if recursive:
+                    try:
+                        ext = os.path.splitext(filename)
+                        if ext[1] in search_in_ext:
+                            for res_item in find_included_files(filename, recursive, False, include_pattern, search_in_ext, resolve_args_all, rec_depth=rec_depth + 1):
+                                publish = not unique or (unique and res_item.inc_path not in my_unique_files)
+                                if publish:
+                                    my_unique_files.append(res_item.inc_path)
+                                    yield res_item
+                    except Exception as e:
+                        rospy.logwarn("Error while recursive search for include pattern in %s: %s" % (filename, utf8(e)))
+        except Exception as e:
+            rospy.logwarn("Error while parse %s for include pattern: %s" % (content_info, utf8(e)))
+
+
+def _get_file_includes(path, include_pattern, resolve_args):
+    '''
+    Returns the includes of a file from :data:`INCLUDE_CACHE`. The file is parsed
+    only if it was changed since last parse.
+
+    :rtype: list(tuple(int, str, str, dict, dict))
+    :see: :meth:`_parse_includes`
+    '''
+    stat = os.stat(path)
+    stamp = (stat.st_mtime, stat.st_ino, stat.st_size)
+    try:
+        key = (path, tuple(include_pattern) if include_pattern else (), tuple(sorted(resolve_args.items())))
+        hash(key)
+    except TypeError:
+        key = None
+    if key is not None:
+        entry = INCLUDE_CACHE.get(key, None)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+    with open(path, 'r') as f:
+        # replace XML comments by the same count of NEWLINES
+        content = XML_COMMENT_PATTERN.sub(lambda match: '\n' * match.group(0).count('\n'), f.read())
+    result = _parse_includes(path, content, os.path.dirname(path), include_pattern, resolve_args)
+    if key is not None:
+        if len(INCLUDE_CACHE) >= INCLUDE_CACHE_MAX:
+            INCLUDE_CACHE.clear()
+        INCLUDE_CACHE[key] = (stamp, result)
+    return result
+
+
+def _parse_includes(string, content, pwd, include_pattern, resolve_args):
+    '''
+    Searches in the content for included files and resolves their paths.
+
+    :param str string: the path of the file or the content itself.
+    :param str content: the content without comments.
+    :param str pwd: the path to resolve relative paths.
+    :return: list with line number, resolved path, raw path, forwarded args and
+             all args to resolve the included file.
+    :rtype: list(tuple(int, str, str, dict, dict))
+    '''
+    result = []
+    re_filelist = EMPTY_PATTERN
+    if include_pattern:
+        # create regular expression from pattern
+        re_filelist = re.compile(r"%s" % '|'.join(include_pattern))
     inc_files_forward_args = []
     # replace the arguments and detect arguments for include-statements
     resolve_args_intern = {}
@@ -483,9 +555,7 @@ def find_included_files(string,
         _replaced, content_resolved, resolve_args_intern = replace_internal_args(content, resolve_args=resolve_args, path=string)
         # intern args use only internal
         inc_files_forward_args = __get_include_args(content_resolved, resolve_args)
-    my_unique_files = unique_files
-    if not unique_files:
-        my_unique_files = list()
+    newlines = None
     # search for include pattern in the content without comments
     for groups in re_filelist.finditer(content):
         if groups.lastindex is None:
@@ -508,34 +578,14 @@ def find_included_files(string,
                         filename = interpret_path(filename, pwd)
                     except Exception as err:
                         rospy.logwarn("Interpret file failed: %s" % utf8(err))
-                    if os.path.isdir(filename):
-                        filename = ''
-                    exists = os.path.isfile(filename)
-                    if filename:
-                        publish = not unique or (unique and filename not in my_unique_files)
-                        if publish:
-                            my_unique_files.append(filename)
-                            # transform found position to line number
-                            content_tmp = content
-                            if sys.version_info < (3, 0):
-                                content_tmp = content.decode('utf-8')
-                            position = content_tmp.count("\n", 0, groups.start()) + 1
-                            yield IncludedFile(string, position, filename, exists, rawname, rec_depth, forward_args)
-                    # for recursive search
-                    if exists:
-                        if recursive:
-                            try:
-                                ext = os.path.splitext(filename)
-                                if ext[1] in search_in_ext:
-                                    for res_item in find_included_files(filename, recursive, False, include_pattern, search_in_ext, resolve_args_all, rec_depth=rec_depth + 1):
-                                        publish = not unique or (unique and res_item.inc_path not in my_unique_files)
-                                        if publish:
-                                            my_unique_files.append(res_item.inc_path)
-                                            yield res_item
-                            except Exception as e:
-                                rospy.logwarn("Error while recursive search for include pattern in %s: %s" % (filename, utf8(e)))
+                    # transform found position to line number
+                    if newlines is None:
+                        newlines = [match.start() for match in re.finditer('\n', content)]
+                    position = bisect.bisect_left(newlines, groups.start()) + 1
+                    result.append((position, filename, rawname, forward_args, resolve_args_all))
                 except Exception as e:
-                    rospy.logwarn("Error while parse %s for include pattern: %s" % (content_info, utf8(e)))
+                    rospy.logwarn("Error while parse %s for include pattern: %s" % ('content' if content is string else string, utf8(e)))
+    return result
 
 
 def remove_after_space(filename):
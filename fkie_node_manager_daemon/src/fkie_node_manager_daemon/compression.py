@@ -0,0 +1,111 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2017, Fraunhofer FKIE/CMS, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+
+import zlib
+
+import fkie_multimaster_msgs.grpc.file_pb2 as fms
+
+try:
+    import zstandard
+    ZSTD_SUPPORTED = True
+except ImportError:
+    ZSTD_SUPPORTED = False
+
+NONE = fms.FileChunk.Compression.Value('NONE')
+ZLIB = fms.FileChunk.Compression.Value('ZLIB')
+ZSTD = fms.FileChunk.Compression.Value('ZSTD')
+
+
+def preferred():
+    '''
+    :return: the best compression supported by this host.
+    :rtype: int
+    '''
+    return ZSTD if ZSTD_SUPPORTED else ZLIB
+
+
+def decompress(data, compression):
+    '''
+    Decompresses the data of a file chunk.
+
+    :param bytes data: data of the chunk
+    :param int compression: compression of the chunk, one of :const:`NONE`, :const:`ZLIB`, :const:`ZSTD`
+    :rtype: bytes
+    :raise Exception: on unknown or not supported compression
+    '''
+    if compression == NONE:
+        return data
+    if compression == ZLIB:
+        return zlib.decompress(data)
+    if compression == ZSTD and ZSTD_SUPPORTED:
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise Exception("compression %d of file chunk not supported" % compression)
+
+
+class Compressor(object):
+    '''
+    Compresses the chunks of one file stream. The requested compression is
+    replaced by zlib, if it is not supported. Chunks which are not smaller
+    after compression, e.g. of compressed images, are not compressed.
+    '''
+
+    def __init__(self, compression=NONE, level=1):
+        '''
+        :param int compression: requested compression
+        :param int level: compression level, low values are faster.
+        '''
+        self.compression = compression
+        if compression == ZSTD and not ZSTD_SUPPORTED:
+            self.compression = ZLIB
+        elif compression not in [NONE, ZLIB, ZSTD]:
+            self.compression = ZLIB
+        self.level = level
+        self._zstd = zstandard.ZstdCompressor(level=level) if self.compression == ZSTD else None
+
+    def compress(self, data):
+        '''
+        :param bytes data: uncompressed data
+        :return: the used compression and the data
+        :rtype: (int, bytes)
+        '''
+        if self.compression == NONE or not data:
+            return (NONE, data)
+        if self.compression == ZSTD:
+            result = self._zstd.compress(data)
+        else:
+            result = zlib.compress(data, self.level)
+        if len(result) < len(data):
+            return (self.compression, result)
+        return (NONE, data)
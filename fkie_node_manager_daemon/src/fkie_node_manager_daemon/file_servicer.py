@@ -31,24 +31,28 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
+from concurrent import futures
 from io import FileIO
+import grpc
+import hashlib
 import os
+import rospkg
 import rospy
 import shutil
+import threading
 
 import fkie_multimaster_msgs.grpc.file_pb2_grpc as fms_grpc
 import fkie_multimaster_msgs.grpc.file_pb2 as fms
 from . import file_item
+from . import file_sync
+from . import launcher
 from . import remote
 from . import settings
 from . import url as nmdurl
 from .common import interpret_path, is_package, get_pkg_path, package_name, utf8
-
-try:
-    from catkin_pkg.package import parse_package
-    CATKIN_SUPPORTED = True
-except ImportError:
-    CATKIN_SUPPORTED = False
+from .compression import Compressor, decompress
+from .file_watcher import FileWatcher, get_mtime
+from .package_index import PackageIndex, MANIFEST_FILE, PACKAGE_FILE
 
 OK = fms.ReturnStatus.StatusType.Value('OK')
 ERROR = fms.ReturnStatus.StatusType.Value('ERROR')
@@ -60,19 +64,37 @@ PATH_PACKAGE = fms.PathObj.PathType.Value('PACKAGE')
 PATH_DIR = fms.PathObj.PathType.Value('DIR')
 PATH_FILE = fms.PathObj.PathType.Value('FILE')
 PATH_SYMLINK = fms.PathObj.PathType.Value('SYMLINK')
-MANIFEST_FILE = 'manifest.xml'
-PACKAGE_FILE = 'package.xml'
 
 
 class FileServicer(fms_grpc.FileServiceServicer):
 
-    FILE_CHUNK_SIZE = 1024
+    FILE_CHUNK_SIZE = 1024 * 1024
+    ''':var FILE_CHUNK_SIZE: chunk size of GetFileContent if the client does not request a size.'''
+    MAX_CHUNK_SIZE = 3 * 1024 * 1024
+    ''':var MAX_CHUNK_SIZE: maximal chunk size, the default message size of gRPC is limited to 4MB.'''
+    SYNC_BATCH = 100
+    ''':var SYNC_BATCH: count of files in one request for signatures while synchronize directories.'''
+    SYNC_PARALLEL = 8
+    ''':var SYNC_PARALLEL: maximal count of destinations synchronized in parallel.'''
+    SYNC_MIN_RATE = 10 * 1024.
+    ''':var SYNC_MIN_RATE: bytes per second expected at least while synchronize files. Used to calculate the timeout.'''
+    WATCH_INTERVAL = 1.0
+    ''':var WATCH_INTERVAL: interval in seconds to test for new started binaries and for closed streams of WatchFiles.'''
+    MAX_WATCH_STREAMS = 4
+    ''':var MAX_WATCH_STREAMS: maximal count of open WatchFiles streams. Each stream holds a thread of the gRPC server while it is open, further streams are rejected with RESOURCE_EXHAUSTED.'''
 
     def __init__(self):
         rospy.loginfo("Create file manger servicer")
         fms_grpc.FileServiceServicer.__init__(self)
         self.DIR_CACHE = {}
         self._peers = {}
+        self._watcher = FileWatcher()
+        self._watch_lock = threading.Lock()
+        self._watch_streams = 0
+        self._package_index = PackageIndex(os.path.join(rospkg.get_ros_home(), 'node_manager_daemon_packages.json'))
+
+    def stop(self):
+        self._watcher.stop()
 
 #     def _terminated(self):
 #         rospy.loginfo("terminated context")
@@ -87,20 +109,19 @@ class FileServicer(fms_grpc.FileServiceServicer):
     def GetFileContent(self, request, context):
         result = fms.GetFileContentReply()
         try:
+            compressor = Compressor(request.compression)
             with FileIO(request.path, 'r') as outfile:
                 result.file.path = interpret_path(request.path)
-                a = os.path.getmtime(request.path)
-                result.file.mtime = a
-                result.file.size = os.path.getsize(request.path)
-                result.file.offset = 0
-                result.file.data = outfile.read(self.FILE_CHUNK_SIZE)
-                yield result
-                datalen = len(result.file.data)
-                while len(result.file.data) == self.FILE_CHUNK_SIZE:
-                    result = fms.GetFileContentReply()
-                    result.file.offset = datalen
-                    result.file.data = outfile.read(self.FILE_CHUNK_SIZE)
-                    datalen += len(result.file.data)
+                stat = os.fstat(outfile.fileno())
+                result.file.mtime = stat.st_mtime
+                result.file.size = stat.st_size
+                offset = 0
+                for data in self._read_chunks(outfile, self._chunk_size(request.chunk_size)):
+                    if offset > 0:
+                        result = fms.GetFileContentReply()
+                    result.file.offset = offset
+                    result.file.compression, result.file.data = compressor.compress(data)
+                    offset += len(data)
                     yield result
         except IOError as ioe:
             result.status.code = IO_ERROR
@@ -110,6 +131,29 @@ class FileServicer(fms_grpc.FileServiceServicer):
             result.status.error_file = utf8(ioe.filename)
             yield result
 
+    def _chunk_size(self, requested=0):
+        '''
+        :return: the requested chunk size limited to :attr:`MAX_CHUNK_SIZE` or :attr:`FILE_CHUNK_SIZE` if nothing requested.
+        :rtype: int
+        '''
+        if requested > 0:
+            return min(requested, self.MAX_CHUNK_SIZE)
+        return self.FILE_CHUNK_SIZE
+
+    def _read_chunks(self, fileobj, chunk_size):
+        '''
+        Reads the file in chunks. Yields at least one, possibly empty chunk.
+        The file is read piecewise and not mapped into memory, a mapped file
+        truncated by other process while reading crashes the daemon with SIGBUS.
+        '''
+        data = fileobj.read(chunk_size)
+        yield data
+        while len(data) == chunk_size:
+            data = fileobj.read(chunk_size)
+            if not data:
+                break
+            yield data
+
     def SaveFileContent(self, request_iterator, context):
         result = fms.SaveFileContentReply()
         try:
@@ -154,11 +198,12 @@ class FileServicer(fms_grpc.FileServiceServicer):
                     first = False
                 if result.status.code == 0:
                     written = 0
-                    if chunk.file.data:
-                        written = file_tmp.write(chunk.file.data)
+                    data = decompress(chunk.file.data, chunk.file.compression)
+                    if data:
+                        written = file_tmp.write(data)
                         if written is None:
-                            written = len(chunk.file.data)
-                    if written != len(chunk.file.data):
+                            written = len(data)
+                    if written != len(data):
                         result.status.code = ERROR
                         result.status.error_msg = utf8("error while write to tmp file")
                         result.status.error_file = utf8(path)
@@ -213,23 +258,19 @@ class FileServicer(fms_grpc.FileServiceServicer):
             result.error_file = utf8(request.old)
         return result
 
-    def _gen_save_content_list(self, path, content, mtime, package=''):
-        send_content = content
-        while send_content:
-            chunk = send_content
-            # split into small parts on big files
-            if len(chunk) > self.FILE_CHUNK_SIZE:
-                chunk = send_content[0:self.FILE_CHUNK_SIZE]
-                send_content = send_content[self.FILE_CHUNK_SIZE:]
-            else:
-                send_content = ''
+    def _gen_save_content_list(self, fileobj, path, mtime, package=''):
+        size = os.fstat(fileobj.fileno()).st_size
+        offset = 0
+        for data in self._read_chunks(fileobj, self.MAX_CHUNK_SIZE):
             msg = fms.SaveFileContentRequest()
             msg.overwrite = mtime == 0
             msg.file.path = path
             msg.file.mtime = mtime  # something not zero to update a not existing file
-            msg.file.size = len(content)
-            msg.file.data = chunk
+            msg.file.size = size
+            msg.file.offset = offset
+            msg.file.data = data
             msg.file.package = package
+            offset += len(data)
             yield msg
 
     def CopyFileTo(self, request, context):
@@ -244,14 +285,13 @@ class FileServicer(fms_grpc.FileServiceServicer):
                 prest = dest_path.replace(ppath, '').lstrip(os.path.sep)
                 with FileIO(path, 'r') as outfile:
                     mtime = 0.0 if request.overwrite else os.path.getmtime(path)
-                    content = outfile.read()
                     # get channel to the remote grpc server
                     # TODO: get secure channel, if available
                     channel = remote.get_insecure_channel(dest_uri)
                     if channel is not None:
                         # save file on remote server
                         fs = fms_grpc.FileServiceStub(channel)
-                        response_stream = fs.SaveFileContent(self._gen_save_content_list(prest, content, mtime, pname), timeout=settings.GRPC_TIMEOUT)
+                        response_stream = fs.SaveFileContent(self._gen_save_content_list(outfile, prest, mtime, pname), timeout=settings.GRPC_TIMEOUT)
                         for response in response_stream:
                             if response.status.code == OK:
                                 result.code = OK
@@ -287,6 +327,185 @@ class FileServicer(fms_grpc.FileServiceServicer):
             result.error_file = utf8(request.path)
         return result
 
+    def SyncDirTo(self, request, context):
+        '''
+        Synchronizes a directory of a package to other daemons in parallel.
+        For each destination the files are compared by MD5 digest. Changed
+        files are transferred as delta to the existing files, see
+        :mod:`fkie_node_manager_daemon.file_sync`.
+        '''
+        uris = list(request.uris)
+        items = []
+        try:
+            pname, ppath = package_name(request.path)
+            if pname is None:
+                raise Exception("no package found! Only directories of packages can be synchronized!")
+            for relpath, path, size, mode in file_sync.manifest(request.path, ppath):
+                items.append((relpath, path, size, mode, file_sync.file_md5(path)))
+        except Exception as err:
+            for uri in uris:
+                result = fms.SyncDirReply(uri=uri)
+                self._set_status(result.status, err, request.path)
+                yield result
+            return
+        pool = futures.ThreadPoolExecutor(max_workers=max(1, min(len(uris), self.SYNC_PARALLEL)))
+        try:
+            jobs = [pool.submit(self._sync_dir_to, uri, pname, items) for uri in uris]
+            for job in futures.as_completed(jobs):
+                yield job.result()
+        finally:
+            pool.shutdown(wait=False)
+
+    def _sync_dir_to(self, uri, pname, items):
+        result = fms.SyncDirReply(uri=uri, files=len(items), total_bytes=sum([item[2] for item in items]))
+        channel = None
+        try:
+            # TODO: get secure channel, if available
+            channel = remote.get_insecure_channel(uri)
+            if channel is None:
+                raise Exception("can not establish insecure channel to '%s'" % uri)
+            fs = fms_grpc.FileServiceStub(channel)
+            changed = []
+            # send the manifest in batches and get signatures of changed files
+            for start in range(0, len(items), self.SYNC_BATCH):
+                batch = items[start:start + self.SYNC_BATCH]
+                request = fms.FileSignaturesRequest(package=pname)
+                request.items.extend([fms.FileManifestItem(path=relpath, size=size, md5=md5) for relpath, _path, size, _mode, md5 in batch])
+                response = fs.GetFileSignatures(request, timeout=settings.GRPC_TIMEOUT)
+                if response.status.code != OK:
+                    result.status.CopyFrom(response.status)
+                    return result
+                for item, signature in zip(batch, response.items):
+                    if not signature.equal:
+                        changed.append((item, signature))
+            if changed:
+                sent = [0]
+                timeout = settings.GRPC_TIMEOUT + sum([item[2] for item, _signature in changed]) / self.SYNC_MIN_RATE
+                response = fs.PatchFiles(self._gen_patch_requests(pname, changed, sent), timeout=timeout)
+                for status in response.items:
+                    if status.code != OK:
+                        result.status.CopyFrom(status)
+                        break
+                result.sent_bytes = sent[0]
+            result.changed = len(changed)
+        except Exception as err:
+            self._set_status(result.status, err)
+        finally:
+            if channel is not None:
+                channel.close()
+        return result
+
+    def _gen_patch_requests(self, pname, changed, sent):
+        for (relpath, path, _size, mode, _md5), signature in changed:
+            msg = fms.PatchFileRequest(package=pname, path=relpath, mode=mode, block_size=signature.block_size)
+            msg_size = 0
+            with FileIO(path, 'r') as infile:
+                if os.fstat(infile.fileno()).st_size > file_sync.MAX_DELTA_SIZE:
+                    # too big to search for equal blocks, send the content
+                    ops = self._read_chunks(infile, file_sync.MAX_LITERAL_SIZE)
+                    md5 = hashlib.md5()
+                    size = 0
+                    only_literals = True
+                else:
+                    data = infile.read()
+                    md5 = hashlib.md5(data)
+                    size = len(data)
+                    only_literals = False
+                    signatures = [(block.weak, block.strong) for block in signature.blocks]
+                    ops = file_sync.compute_delta(data, signature.block_size, signatures, signature.size)
+                for op in ops:
+                    if isinstance(op, bytes):
+                        if not op:
+                            continue
+                        msg.ops.extend([fms.PatchOp(data=op)])
+                        msg_size += len(op)
+                        sent[0] += len(op)
+                        if only_literals:
+                            md5.update(op)
+                            size += len(op)
+                    else:
+                        msg.ops.extend([fms.PatchOp(block=op)])
+                        msg_size += 16
+                    if msg_size >= file_sync.MAX_LITERAL_SIZE:
+                        yield msg
+                        msg = fms.PatchFileRequest(package=pname, path=relpath, mode=mode, block_size=signature.block_size)
+                        msg_size = 0
+            msg.size = size
+            msg.md5 = md5.digest()
+            msg.last = True
+            yield msg
+
+    def GetFileSignatures(self, request, context):
+        result = fms.FileSignaturesReply()
+        try:
+            ppath = get_pkg_path(request.package)
+            for item in request.items:
+                path = self._package_file(ppath, item.path)
+                signature = fms.FileSignature(path=item.path)
+                if os.path.isfile(path):
+                    signature.size = os.path.getsize(path)
+                    if signature.size == item.size and file_sync.file_md5(path) == item.md5:
+                        signature.equal = True
+                    else:
+                        signature.block_size = file_sync.block_size_for(signature.size)
+                        if signature.size <= file_sync.MAX_DELTA_SIZE and item.size <= file_sync.MAX_DELTA_SIZE:
+                            signature.blocks.extend([fms.BlockSignature(weak=weak, strong=strong) for weak, strong in file_sync.block_signatures(path, signature.block_size)])
+                result.items.extend([signature])
+            result.status.code = OK
+        except Exception as err:
+            self._set_status(result.status, err, request.package)
+        return result
+
+    def PatchFiles(self, request_iterator, context):
+        result = fms.PatchFilesReply()
+        patcher = None
+        failed = None
+        try:
+            for chunk in request_iterator:
+                try:
+                    if patcher is None and failed is None:
+                        path = self._package_file(get_pkg_path(chunk.package), chunk.path)
+                        patcher = file_sync.Patcher(path, chunk.block_size, chunk.mode)
+                    if patcher is not None:
+                        for op in chunk.ops:
+                            patcher.add(op.block, op.data)
+                        if chunk.last:
+                            patcher.finish(chunk.size, chunk.md5)
+                            result.items.extend([fms.ReturnStatus(code=OK, error_file=chunk.path)])
+                except Exception as err:
+                    if patcher is not None:
+                        patcher.abort()
+                    patcher = None
+                    failed = fms.ReturnStatus()
+                    self._set_status(failed, err, chunk.path)
+                if chunk.last:
+                    if failed is not None:
+                        result.items.extend([failed])
+                    patcher = None
+                    failed = None
+        finally:
+            if patcher is not None:
+                patcher.abort()
+        return result
+
+    def _package_file(self, ppath, relpath):
+        path = os.path.normpath(os.path.join(ppath, relpath.lstrip(os.path.sep)))
+        if not path.startswith(os.path.join(ppath, '')):
+            raise Exception("%s is not in package path %s" % (relpath, ppath))
+        return path
+
+    def _set_status(self, status, err, path=''):
+        if isinstance(err, EnvironmentError):
+            status.code = OS_ERROR if isinstance(err, OSError) else IO_ERROR
+            if err.errno:
+                status.error_code = err.errno
+            status.error_msg = utf8(err.strerror if err.strerror else err)
+            status.error_file = utf8(err.filename if err.filename else path)
+        else:
+            status.code = ERROR
+            status.error_msg = utf8(err)
+            status.error_file = utf8(path)
+
     def ListPath(self, request, context):
         result = fms.ListPathReply()
         result.path = request.path
@@ -339,24 +558,6 @@ class FileServicer(fms_grpc.FileServiceServicer):
         result.items.extend(path_list)
         return result
 
-    def _get_packages(self, path):
-        result = {}
-        if os.path.isdir(path):
-            fileList = os.listdir(path)
-            if MANIFEST_FILE in fileList:
-                return {os.path.basename(path): path}
-            if CATKIN_SUPPORTED and PACKAGE_FILE in fileList:
-                try:
-                    pkg = parse_package(path)
-                    return {pkg.name: path}
-                except Exception:
-                    pass
-                return {}
-            for f in fileList:
-                ret = self._get_packages(os.path.join(path, f))
-                result.update(ret)
-        return result
-
     def ListPackages(self, request, context):
         if request.clear_ros_cache:
             try:
@@ -365,19 +566,18 @@ class FileServicer(fms_grpc.FileServiceServicer):
                 substitution_args._rospack = rospkg.RosPack()
             except Exception as err:
                 rospy.logwarn("Cannot reset package cache: %s" % utf8(err))
+            self._package_index.clear()
         result = fms.ListPackagesReply()
         try:
             # fill the input fields
             root_paths = [os.path.normpath(p) for p in os.getenv("ROS_PACKAGE_PATH").split(':')]
-            for p in root_paths:
-                ret = self._get_packages(p)
-                for name, path in ret.items():
-                    package = fms.PackageObj(name=name, path=path)
-                    result.items.extend([package])
+            packages = self._package_index.get_packages(root_paths)
+            result.items.extend([fms.PackageObj(name=name, path=path) for name, path in packages])
             result.status.code = OK
         except Exception as err:
             result.status.code = ERROR
             result.status.error_msg = utf8(err)
+        self._package_index.save()
         return result
 
     def ChangedFiles(self, request, context):
@@ -392,31 +592,100 @@ class FileServicer(fms_grpc.FileServiceServicer):
         result.items.extend(chnged_files)
         return result
 
-    def _get_binaries(self, path, binaries):
-        if os.path.isdir(path):
-            fileList = os.listdir(path)
-            for f in fileList:
-                if f and f[0] != '.' and f not in ['build'] and not f.endswith('.cfg') and not f.endswith('.so'):
-                    self._get_binaries(os.path.join(path, f), binaries)
-        elif os.path.isfile(path) and os.access(path, os.X_OK):
-            binaries.append(fms.PathObj(path=path, mtime=os.path.getmtime(path)))
+    def WatchFiles(self, request, context):
+        '''
+        Streams the changes of the requested files and of the binaries of the
+        requested nodes until the client closes the stream.
+        '''
+        with self._watch_lock:
+            if self._watch_streams >= self.MAX_WATCH_STREAMS:
+                context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+                context.set_details('too many open watch streams (%d), poll for changes' % self.MAX_WATCH_STREAMS)
+                return
+            self._watch_streams += 1
+        try:
+            for reply in self._watch_files(request, context):
+                yield reply
+        finally:
+            with self._watch_lock:
+                self._watch_streams -= 1
+
+    def _watch_files(self, request, context):
+        known = {}
+        for item in request.items:
+            known[item.path] = item.mtime
+        nodes = list(request.nodes)
+        binaries = {}  # path of the binary: list with node names
+        reported = {}  # node name: reported modification time of the binary
+        sub = self._watcher.subscribe(known.keys())
+        context.add_callback(sub.close)
+        try:
+            # report the changes since the last known modification time
+            changed = set(known.keys())
+            while changed is not None and context.is_active():
+                changed.update(self._watch_binaries(sub, nodes, binaries))
+                reply = fms.WatchFilesReply()
+                for path in changed:
+                    mtime = get_mtime(path)
+                    if path in known and known[path] != mtime:
+                        known[path] = mtime
+                        reply.items.extend([fms.PathObj(path=path, mtime=mtime)])
+                    for node in binaries.get(path, []):
+                        try:
+                            _binary, started_mtime = launcher.STARTED_BINARIES[node]
+                            if mtime != started_mtime and mtime != reported.get(node, None):
+                                reported[node] = mtime
+                                reply.nodes.extend([fms.PathObj(path=node, mtime=mtime)])
+                        except KeyError:
+                            pass
+                if reply.items or reply.nodes:
+                    yield reply
+                changed = sub.wait(self.WATCH_INTERVAL)
+                if changed is not None:
+                    changed = set(changed)
+        finally:
+            self._watcher.unsubscribe(sub)
+
+    def _watch_binaries(self, sub, nodes, binaries):
+        '''
+        Adds the binaries of the started nodes to the subscription. The nodes
+        can be started or restarted with other binary after the subscription.
+
+        :return: the paths of new added binaries.
+        :rtype: [str]
+        '''
+        current = {}
+        for node in nodes:
+            try:
+                binary, _mtime = launcher.STARTED_BINARIES[node]
+                current.setdefault(binary, []).append(node)
+            except KeyError:
+                pass
+        new_binaries = [path for path in current.keys() if path not in binaries]
+        binaries.clear()
+        binaries.update(current)
+        if new_binaries:
+            self._watcher.add_paths(sub, new_binaries)
+        return new_binaries
 
     def GetPackageBinaries(self, request, context):
         result = fms.PathList()
         binaries = []
         try:
             path = get_pkg_path(request.name)
-            self._get_binaries(path, binaries)
-            result.items.extend(binaries)
+            binaries = self._package_index.get_binaries(path)
             # find binaries in catkin workspace
             from catkin.find_in_workspaces import find_in_workspaces as catkin_find
             search_paths = catkin_find(search_dirs=['libexec', 'share'], project=request.name, first_matching_workspace_only=True)
             for p in search_paths:
-                self._get_binaries(p, binaries)
+                if p != path:
+                    binaries.extend(self._package_index.get_binaries(p))
         except Exception:
             import traceback
             print(traceback.format_exc())
             pass
+        result.items.extend([fms.PathObj(path=bpath, mtime=mtime) for bpath, mtime in binaries])
+        self._package_index.save()
         return result
 
     def Delete(self, request, context):
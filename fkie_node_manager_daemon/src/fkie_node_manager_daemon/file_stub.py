@@ -37,6 +37,7 @@ from . import settings
 import fkie_multimaster_msgs.grpc.file_pb2_grpc as fgrpc
 import fkie_multimaster_msgs.grpc.file_pb2 as fmsg
 from .common import utf8
+from .compression import NONE, decompress
 
 OK = fmsg.ReturnStatus.StatusType.Value('OK')
 ERROR = fmsg.ReturnStatus.StatusType.Value('ERROR')
@@ -48,7 +49,7 @@ REMOVED_FILE = fmsg.ReturnStatus.StatusType.Value('REMOVED_FILE')
 
 class FileStub(object):
 
-    FILE_CHUNK_SIZE = 1024
+    FILE_CHUNK_SIZE = 1024 * 1024
     ''':ivar FileStub.FILE_CHUNK_SIZE: while save on remote server the file will be split into chunks of this size.'''
 
     def __init__(self, channel):
@@ -105,28 +106,30 @@ class FileStub(object):
             raise Exception(response.status.error_msg)
         return result
 
-    def get_file_content(self, path):
+    def get_file_content(self, path, chunk_size=0, compression=NONE):
         '''
         Requests the content of the file.
 
         :path str path: the path to the file.
+        :param int chunk_size: preferred size of the chunks, zero for the default size of the server.
+        :param int compression: preferred compression of the transfer, see :mod:`fkie_node_manager_daemon.compression`.
         :retrun: the size, last modification time and the content of the file.
         :rtype: tuple(int, float, str)
         :raise OSError:
         :raise IOError:
         :raise Exception:
         '''
-        response_stream = self.fm_stub.GetFileContent(fmsg.ListPathRequest(path=path))
+        response_stream = self.fm_stub.GetFileContent(fmsg.GetFileContentRequest(path=path, chunk_size=chunk_size, compression=compression))
         file_size = None
         file_mtime = None
-        file_content = b''
+        file_content = []
         for response in response_stream:
             if self._running:
                 if response.status.code == OK:
                     if response.file.offset == 0:
                         file_size = response.file.size
                         file_mtime = response.file.mtime
-                    file_content += response.file.data
+                    file_content.append(decompress(response.file.data, response.file.compression))
                 elif response.status.code == OS_ERROR:
                     raise OSError(response.status.error_code, response.status.error_msg, response.status.error_file)
                 elif response.status.code in [IO_ERROR, CHANGED_FILE, REMOVED_FILE]:
@@ -135,7 +138,7 @@ class FileStub(object):
                     raise Exception("%s %s" % (response.status.error_msg, response.status.error_file))
             else:
                 raise Exception("receiving for '%s' aborted! %d of %d transmitted." % (response.file.path, response.file.offset, response.file.size))
-        return (file_size, file_mtime, file_content)
+        return (file_size, file_mtime, b''.join(file_content))
 
     def _gen_save_content_list(self, path, content, mtime, package=''):
         minone = True
@@ -246,6 +249,37 @@ class FileStub(object):
         response = self.fm_stub.ChangedFiles(request, timeout=settings.GRPC_TIMEOUT)
         return response.items
 
+    def watch_files(self, files, nodes=[]):
+        '''
+        Subscribes for changes of files and of binaries used to start the given nodes.
+        The stream is open until it is cancelled by the client or the daemon is stopped.
+
+        :param files: dictionary with files and their last known modification time.
+            Files with other modification time are reported with the first reply.
+        :type files: dict(str: float)
+        :param nodes: names of the nodes started by the daemon.
+        :type nodes: [str]
+        :return: the stream with changes. Call `cancel()` of the stream to stop the watch.
+        :rtype: iterator of :class:`fkie_multimaster_msgs.grpc.file_pb2.WatchFilesReply`
+        '''
+        request = fmsg.WatchFilesRequest(nodes=nodes)
+        request.items.extend([fmsg.PathObj(path=path, mtime=mtime) for path, mtime in files.items()])
+        return self.fm_stub.WatchFiles(request)
+
+    def sync_dir(self, path, dest_uris):
+        '''
+        Synchronizes a directory of a package to other remote gRPC-servers.
+        Only changed blocks of the files are transferred.
+
+        :param str path: path of a directory or file inside a package.
+        :param dest_uris: URIs of destination gRPC-servers. The URIs should not contain any scheme. (example: hostname:port)
+        :type dest_uris: [str]
+        :return: the results for each destination.
+        :rtype: [:class:`fkie_multimaster_msgs.grpc.file_pb2.SyncDirReply`]
+        '''
+        response_stream = self.fm_stub.SyncDirTo(fmsg.SyncDirRequest(path=path, uris=dest_uris))
+        return [response for response in response_stream]
+
     def get_package_binaries(self, pkgname):
         '''
         Request for given package a list with all known binaries.
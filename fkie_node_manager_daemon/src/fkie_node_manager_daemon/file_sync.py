@@ -0,0 +1,302 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2017, Fraunhofer FKIE/CMS, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Delta synchronization of files between daemons. The receiver sends the
+signatures of the blocks of its files, the sender answers with the indexes
+of equal blocks and literal data for the differences. Like rsync the blocks
+are found at any offset by a rolling weak checksum.
+'''
+
+import hashlib
+import math
+import os
+import uuid
+import zlib
+
+MIN_BLOCK_SIZE = 512
+MAX_BLOCK_SIZE = 64 * 1024
+MAX_LITERAL_SIZE = 1024 * 1024
+''':var MAX_LITERAL_SIZE: maximal size of literal data in one delta operation.'''
+MAX_DELTA_SIZE = 4 * 1024 * 1024
+''':var MAX_DELTA_SIZE: bigger files are sent without search for equal blocks. The search runs in python
+    and costs about one second of CPU for each 2 MiB without equal blocks.'''
+_ADLER_MOD = 65521
+
+
+def block_size_for(size):
+    '''
+    Determines the block size for the signatures of a file. Like rsync the
+    size grows with the square root of the file size.
+
+    :param int size: size of the file
+    :rtype: int
+    '''
+    block_size = int(math.sqrt(size)) & ~7
+    return max(MIN_BLOCK_SIZE, min(MAX_BLOCK_SIZE, block_size))
+
+
+def file_md5(path):
+    '''
+    :return: MD5 digest of the file content.
+    :rtype: bytes
+    '''
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        data = f.read(MAX_LITERAL_SIZE)
+        while data:
+            md5.update(data)
+            data = f.read(MAX_LITERAL_SIZE)
+    return md5.digest()
+
+
+def weak_checksum(data):
+    '''
+    The weak checksum of a block is the Adler-32 checksum. It can be moved
+    along the data by :func:`roll`.
+
+    :rtype: int
+    '''
+    return zlib.adler32(data) & 0xffffffff
+
+
+def roll(checksum, out_byte, in_byte, block_size):
+    '''
+    Moves the weak checksum of a block one byte forward.
+
+    :param int checksum: the weak checksum of the current block
+    :param int out_byte: the first byte of the current block
+    :param int in_byte: the byte after the current block
+    :param int block_size: size of the block
+    :return: weak checksum of the next block
+    :rtype: int
+    '''
+    a = checksum & 0xffff
+    b = checksum >> 16
+    a = (a - out_byte + in_byte) % _ADLER_MOD
+    b = (b - block_size * out_byte + a - 1) % _ADLER_MOD
+    return (b << 16) | a
+
+
+def block_signatures(path, block_size):
+    '''
+    Calculates the signatures of all blocks of the file. The last block can
+    be shorter than the block size.
+
+    :return: list with tuples of weak and strong (MD5) checksums.
+    :rtype: [(int, bytes)]
+    '''
+    result = []
+    with open(path, 'rb') as f:
+        data = f.read(block_size)
+        while data:
+            result.append((weak_checksum(data), hashlib.md5(data).digest()))
+            data = f.read(block_size)
+    return result
+
+
+def compute_delta(data, block_size, signatures, size):
+    '''
+    Compares the new content of a file with the signatures of the blocks of
+    the old file and yields the operations to create the new file from the old
+    one. The blocks are searched at each offset using the rolling weak
+    checksum, so that inserted or removed bytes do not invalidate the
+    following blocks.
+
+    :param bytes data: the new content of the file
+    :param int block_size: the block size of the signatures
+    :param signatures: the signatures of the old file, see :func:`block_signatures`
+    :type signatures: [(int, bytes)]
+    :param int size: the size of the old file
+    :return: the index of a block of the old file or literal data (bytes)
+    :rtype: generator of int or bytes
+    '''
+    length = len(data)
+    if not signatures or length > MAX_DELTA_SIZE:
+        for literal in _split_literal(data, 0, length):
+            yield literal
+        return
+    last_index = len(signatures) - 1
+    last_size = size - last_index * block_size
+    weak_index = {}
+    for index, (weak, _strong) in enumerate(signatures):
+        if index != last_index or last_size == block_size:
+            weak_index.setdefault(weak, []).append(index)
+    buf = bytearray(data)
+    pos = 0
+    literal_start = 0
+    checksum = weak_checksum(data[0:block_size])
+    # the rolling of the checksum is inlined, it runs for each byte without match
+    weak_get = weak_index.get
+    sum_a = checksum & 0xffff
+    sum_b = checksum >> 16
+    end = length - block_size
+    while pos <= end:
+        indexes = weak_get((sum_b << 16) | sum_a, None)
+        if indexes is not None:
+            strong = hashlib.md5(data[pos:pos + block_size]).digest()
+            match = None
+            for index in indexes:
+                if signatures[index][1] == strong:
+                    match = index
+                    break
+            if match is not None:
+                for literal in _split_literal(data, literal_start, pos):
+                    yield literal
+                yield match
+                pos += block_size
+                literal_start = pos
+                checksum = weak_checksum(data[pos:pos + block_size])
+                sum_a = checksum & 0xffff
+                sum_b = checksum >> 16
+                continue
+        if pos < end:
+            out_byte = buf[pos]
+            sum_a = (sum_a - out_byte + buf[pos + block_size]) % _ADLER_MOD
+            sum_b = (sum_b - block_size * out_byte + sum_a - 1) % _ADLER_MOD
+        pos += 1
+    # the last block of the old file can be shorter than the block size
+    tail_start = length - last_size
+    if last_size < block_size and tail_start >= literal_start and last_size > 0:
+        tail = data[tail_start:]
+        if weak_checksum(tail) == signatures[last_index][0] and hashlib.md5(tail).digest() == signatures[last_index][1]:
+            for literal in _split_literal(data, literal_start, tail_start):
+                yield literal
+            yield last_index
+            return
+    for literal in _split_literal(data, literal_start, length):
+        yield literal
+
+
+def _split_literal(data, start, end):
+    while start < end:
+        yield data[start:min(end, start + MAX_LITERAL_SIZE)]
+        start += MAX_LITERAL_SIZE
+
+
+class Patcher(object):
+    '''
+    Creates a file from the blocks of the existing file and literal data. The
+    new content is written to a temporary file, which replaces the existing
+    file after the MD5 checksum was verified.
+    '''
+
+    def __init__(self, path, block_size, mode=0):
+        '''
+        :param str path: the path of the file to patch or to create
+        :param int block_size: the block size used for the signatures
+        :param int mode: the permission bits of the new file, zero to keep the mode
+        '''
+        self.path = path
+        self.block_size = block_size
+        self.mode = mode
+        self._md5 = hashlib.md5()
+        self._written = 0
+        dirname = os.path.dirname(path)
+        # hidden and unique, the same file can be synchronized by more than one daemon at the same time
+        self._tmp_path = os.path.join(dirname, '.%s.%s.sync.tmp' % (os.path.basename(path), uuid.uuid4().hex[:12]))
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self._base = open(path, 'rb') if os.path.isfile(path) else None
+        self._tmp = os.fdopen(os.open(self._tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), 'wb')
+
+    def add(self, block=0, data=b''):
+        '''
+        Appends literal data or, if no data is given, a block of the existing file.
+        '''
+        if not data:
+            if self._base is None:
+                raise IOError("block %d requested, but %s not exists" % (block, self.path))
+            self._base.seek(block * self.block_size)
+            data = self._base.read(self.block_size)
+        self._tmp.write(data)
+        self._md5.update(data)
+        self._written += len(data)
+
+    def finish(self, size, md5):
+        '''
+        Replaces the file by the new content.
+
+        :param int size: the size of the new file
+        :param bytes md5: the MD5 digest of the new content
+        :raise IOError: if the size or the checksum of the new content is wrong.
+        '''
+        self._close()
+        if self._written != size or self._md5.digest() != md5:
+            os.remove(self._tmp_path)
+            raise IOError("checksum of synchronized %s failed" % self.path)
+        if self.mode:
+            os.chmod(self._tmp_path, self.mode)
+        elif os.path.exists(self.path):
+            os.chmod(self._tmp_path, os.stat(self.path).st_mode & 0o7777)
+        os.rename(self._tmp_path, self.path)
+
+    def abort(self):
+        self._close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def _close(self):
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+        self._tmp.close()
+
+
+def manifest(path, root):
+    '''
+    Lists the files to synchronize. Hidden files and directories are ignored.
+
+    :param str path: a directory or file
+    :param str root: the returned paths are relative to this directory, e.g. the package path.
+    :return: list with relative path, absolute path, size and mode of each file.
+    :rtype: [(str, str, int, int)]
+    '''
+    result = []
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        result.append((os.path.relpath(path, root), path, stat.st_size, stat.st_mode & 0o7777))
+        return result
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted([name for name in dirnames if not name.startswith('.')])
+        for name in sorted(filenames):
+            if name.startswith('.') or name.endswith('.sync.tmp'):
+                continue
+            filepath = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(filepath)
+                result.append((os.path.relpath(filepath, root), filepath, stat.st_size, stat.st_mode & 0o7777))
+            except OSError:
+                pass
+    return result
@@ -0,0 +1,353 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2017, Fraunhofer FKIE/CMS, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+
+import rospy
+
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def get_mtime(path):
+    '''
+    :return: the modification time of the file or 0 if the file does not exists.
+    :rtype: float
+    '''
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+class Subscription(object):
+    '''
+    A set of paths watched for one client. The changes are collected and
+    delivered by :meth:`wait` after the files are quiet for the debounce time.
+    '''
+
+    def __init__(self, paths, debounce=0.3):
+        self.paths = set(paths)
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._changed = set()
+        self._last_event = 0
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def notify(self, paths):
+        with self._cond:
+            changed = self.paths.intersection(paths)
+            if changed:
+                self._changed.update(changed)
+                self._last_event = time.time()
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def wait(self, timeout):
+        '''
+        Waits for changes.
+
+        :param float timeout: the maximal time to wait in seconds.
+        :return: changed paths, an empty list on timeout or None if the subscription was closed.
+        :rtype: [str] or None
+        '''
+        end = time.time() + timeout
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                if self._changed:
+                    quiet = self._last_event + self.debounce - now
+                    if quiet <= 0:
+                        result = list(self._changed)
+                        self._changed.clear()
+                        return result
+                    self._cond.wait(quiet)
+                elif now >= end:
+                    return []
+                else:
+                    self._cond.wait(end - now)
+        return None
+
+
+class FileWatcher(object):
+    '''
+    Watches files for changes. On Linux inotify is used to watch the
+    directories of the files, so that a file replaced by an editor or by a
+    build is detected, too. Files in not existing directories and all files on
+    systems without inotify are polled by their modification time.
+    '''
+
+    def __init__(self, poll_interval=1.0, debounce=0.3, use_inotify=True):
+        '''
+        :param float poll_interval: interval in seconds to test the files not watched by inotify.
+        :param float debounce: time in seconds without events before the changes are reported.
+        :param bool use_inotify: set to False to poll all files.
+        '''
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._subscriptions = []
+        self._paths = {}  # path: count of subscriptions
+        self._dir_paths = {}  # directory: set with paths
+        self._dir_wd = {}
+        self._wd_dir = {}
+        self._polled = {}  # path: last modification time
+        self._thread = None
+        self._stop = False
+        self._fd = -1
+        self._libc = _load_libc() if use_inotify else None
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd < 0:
+                rospy.logwarn("inotify not available (%s), poll files for changes" % os.strerror(ctypes.get_errno()))
+                self._libc = None
+
+    @property
+    def uses_inotify(self):
+        return self._fd >= 0
+
+    def subscribe(self, paths):
+        '''
+        Starts the watch of the given paths.
+
+        :param [str] paths: the absolute paths of the files to watch.
+        :rtype: :class:`Subscription`
+        '''
+        sub = Subscription(paths, self.debounce)
+        with self._lock:
+            self._subscriptions.append(sub)
+            self._add_paths(sub.paths)
+            self._start_thread()
+        return sub
+
+    def add_paths(self, sub, paths):
+        '''
+        Adds paths to an existing subscription.
+        '''
+        with self._lock:
+            new_paths = set(paths) - sub.paths
+            sub.paths.update(new_paths)
+            self._add_paths(new_paths)
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self._lock:
+            try:
+                self._subscriptions.remove(sub)
+            except ValueError:
+                return
+            for path in sub.paths:
+                count = self._paths.get(path, 0) - 1
+                if count > 0:
+                    self._paths[path] = count
+                else:
+                    self._remove_path(path)
+
+    def stop(self):
+        with self._lock:
+            self._stop = True
+            for sub in self._subscriptions:
+                sub.close()
+            del self._subscriptions[:]
+        if self._thread is not None:
+            self._thread.join(self.poll_interval + 1)
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _start_thread(self):
+        if self._thread is None and not self._stop:
+            self._thread = threading.Thread(target=self._run, name='file_watcher')
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def _add_paths(self, paths):
+        for path in paths:
+            count = self._paths.get(path, 0)
+            self._paths[path] = count + 1
+            if count == 0:
+                dirname = os.path.dirname(path)
+                if not self._watch_dir(dirname):
+                    self._polled[path] = get_mtime(path)
+                self._dir_paths.setdefault(dirname, set()).add(path)
+
+    def _remove_path(self, path):
+        self._paths.pop(path, None)
+        self._polled.pop(path, None)
+        dirname = os.path.dirname(path)
+        paths = self._dir_paths.get(dirname, set())
+        paths.discard(path)
+        if not paths:
+            self._dir_paths.pop(dirname, None)
+            wd = self._dir_wd.pop(dirname, None)
+            if wd is not None:
+                self._wd_dir.pop(wd, None)
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _watch_dir(self, dirname):
+        if self._fd < 0:
+            return False
+        if dirname in self._dir_wd:
+            return True
+        wd = self._libc.inotify_add_watch(self._fd, dirname.encode('utf-8'), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err not in [errno.ENOENT, errno.ENOTDIR, errno.EACCES]:
+                rospy.logwarn("can not watch %s: %s, poll files for changes" % (dirname, os.strerror(err)))
+            return False
+        self._dir_wd[dirname] = wd
+        self._wd_dir[wd] = dirname
+        # a directory created again after remove gets a new watch descriptor,
+        # the polled files of this directory are watched now by inotify
+        for path in self._dir_paths.get(dirname, []):
+            self._polled.pop(path, None)
+        return True
+
+    def _notify(self, paths):
+        if paths:
+            for sub in list(self._subscriptions):
+                sub.notify(paths)
+
+    def _run(self):
+        next_poll = time.time() + self.poll_interval
+        while not self._stop:
+            timeout = max(0, next_poll - time.time())
+            changed = set()
+            if self._fd >= 0:
+                try:
+                    readable, _, _ = select.select([self._fd], [], [], timeout)
+                    if readable:
+                        changed.update(self._read_events())
+                except (select.error, OSError) as err:
+                    if getattr(err, 'errno', err.args[0]) != errno.EINTR:
+                        rospy.logwarn("error while read inotify events: %s" % err)
+                        time.sleep(timeout)
+            else:
+                time.sleep(timeout)
+            with self._lock:
+                if time.time() >= next_poll:
+                    changed.update(self._poll())
+                    next_poll = time.time() + self.poll_interval
+                self._notify(changed)
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except OSError as err:
+            if err.errno in [errno.EAGAIN, errno.EINTR]:
+                return set()
+            raise
+        changed = set()
+        with self._lock:
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # events lost, report all, the subscribers compares the modification time
+                    changed.update(self._paths.keys())
+                    continue
+                dirname = self._wd_dir.get(wd, None)
+                if dirname is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # the directory is removed, poll the files until it exists again
+                    self._dir_wd.pop(dirname, None)
+                    self._wd_dir.pop(wd, None)
+                    if mask & IN_MOVE_SELF and not mask & IN_IGNORED:
+                        # the kernel keeps the watch on a moved directory
+                        self._libc.inotify_rm_watch(self._fd, wd)
+                    for path in self._dir_paths.get(dirname, []):
+                        self._polled[path] = 0
+                        changed.add(path)
+                elif name:
+                    path = os.path.join(dirname, name)
+                    if path in self._paths:
+                        changed.add(path)
+        return changed
+
+    def _poll(self):
+        changed = set()
+        for dirname in set([os.path.dirname(path) for path in self._polled.keys()]):
+            # try to watch the directories which are created in the meantime
+            if dirname not in self._dir_wd and os.path.isdir(dirname) and self._watch_dir(dirname):
+                changed.update(self._dir_paths.get(dirname, []))
+        for path, mtime in list(self._polled.items()):
+            new_mtime = get_mtime(path)
+            if new_mtime != mtime:
+                self._polled[path] = new_mtime
+                changed.add(path)
+        return changed
@@ -51,6 +51,136 @@ class LaunchConfigException(Exception):
     pass
 
 
+class _ParamTrieNode(object):
+    '''
+    One namespace level of the :class:`ParamIndex`.
+    '''
+    __slots__ = ('children', 'param', 'clear_params', 'is_node')
+
+    def __init__(self):
+        self.children = {}
+        self.param = None  # tuple(index in roscfg.params, name)
+        self.clear_params = []  # list(tuple(index in roscfg.clear_params, name))
+        self.is_node = False
+
+
+class ParamIndex(object):
+    '''
+    A namespace trie over the parameter and clear parameter of a loaded launch
+    configuration. It replaces the scans over all parameter for each started
+    node by prefix queries.
+    '''
+
+    def __init__(self, roscfg):
+        '''
+        :param roscfg: the loaded launch configuration
+        :type roscfg: roslaunch.ROSLaunchConfig<http://docs.ros.org/kinetic/api/roslaunch/html/>
+        '''
+        self._params = roscfg.params
+        self._root = _ParamTrieNode()
+        for idx, name in enumerate(roscfg.params.keys()):
+            self._insert(name).param = (idx, name)
+        for idx, name in enumerate(roscfg.clear_params):
+            self._insert(name).clear_params.append((idx, name))
+        for name in roscfg.resolved_node_names:
+            self._insert(name).is_node = True
+
+    @classmethod
+    def _split(cls, name):
+        return [part for part in name.split(roslib.names.SEP) if part]
+
+    def _insert(self, name):
+        trie = self._root
+        for part in self._split(name):
+            child = trie.children.get(part)
+            if child is None:
+                child = _ParamTrieNode()
+                trie.children[part] = child
+            trie = child
+        return trie
+
+    def _find(self, name):
+        trie = self._root
+        for part in self._split(name):
+            trie = trie.children.get(part)
+            if trie is None:
+                return None
+        return trie
+
+    @classmethod
+    def _walk(cls, trie, skip_nodes=False):
+        stack = [trie]
+        while stack:
+            trie = stack.pop()
+            yield trie
+            if not (skip_nodes and trie.is_node):
+                stack.extend(trie.children.values())
+
+    def get_params(self, ns):
+        '''
+        Returns the parameter with names starting with given namespace.
+
+        :param str ns: the namespace with trailing slash, e.g. the node name followed by '/'
+        :return: the dictionary with names of the parameter and their values, in order of the launch configuration
+        :rtype: dict(str: value type)
+        '''
+        trie = self._find(ns)
+        if trie is None:
+            return dict()
+        found = [t.param for t in self._walk(trie) if t.param is not None and t.param[1].startswith(ns)]
+        found.sort()
+        return dict((name, self._params[name].value) for _idx, name in found)
+
+    def get_clear_params(self, ns):
+        '''
+        Returns the clear parameter starting with given namespace.
+
+        :param str ns: the namespace with trailing slash, e.g. the node name followed by '/'
+        :rtype: list(str)
+        '''
+        trie = self._find(ns)
+        if trie is None:
+            return []
+        found = [cp for t in self._walk(trie) for cp in t.clear_params if cp[1].startswith(ns)]
+        found.sort()
+        return [name for _idx, name in found]
+
+    def get_global_params(self):
+        '''
+        Returns the parameter, which are not in the namespace of any node. Parameter
+        with names equal to node names are global parameter.
+
+        :return: the dictionary with names of the global parameter and their values
+        :rtype: dict(str: value type)
+        '''
+        found = [t.param for t in self._walk(self._root, skip_nodes=True) if t.param is not None]
+        found.sort()
+        return dict((name, self._params[name].value) for _idx, name in found)
+
+    def find_in_ns(self, name, leaf):
+        '''
+        Searches for the parameter `leaf` in the namespace given by name and in
+        all its parent namespaces.
+
+        :param str name: the name to start the search, e.g. a node name
+        :param str leaf: the name of the parameter without namespace, e.g. 'capability_group'
+        :return: the name of the parameter found in the deepest namespace or None
+        :rtype: str or None
+        '''
+        result = None
+        trie = self._root
+        parts = self._split(name)
+        for depth in range(len(parts) + 1):
+            if depth > 0:
+                trie = trie.children.get(parts[depth - 1])
+                if trie is None:
+                    break
+            child = trie.children.get(leaf)
+            if child is not None and child.param is not None:
+                result = child.param[1]
+        return result
+
+
 class LaunchConfig(object):
     '''
     A class to handle the ROS configuration stored in launch file.
@@ -87,6 +217,10 @@ class LaunchConfig(object):
         self.__launch_id = '%.9f' % time.time()
         self._robot_description = None
         self._capabilities = None
+        self._param_index = None
+        self._nodes = None
+        self._nodelets = None
+        self._associations = None
         self.host = host if host else None
         self.resolve_dict = {}
         self.changed = True
@@ -119,6 +253,18 @@ class LaunchConfig(object):
                 raise LaunchConfigException("not all argv are setted properly!")
             return self.__roscfg
 
+    @property
+    def param_index(self):
+        '''
+        Namespace index over the parameter of the loaded configuration. It is
+        created on first request and recreated after each :meth:`load`.
+
+        :rtype: :class:`ParamIndex`
+        '''
+        if self._param_index is None:
+            self._param_index = ParamIndex(self.roscfg)
+        return self._param_index
+
     @property
     def filename(self):
         '''
@@ -182,6 +328,10 @@ class LaunchConfig(object):
         try:
             self._capabilities = None
             self._robot_description = None
+            self._param_index = None
+            self._nodes = None
+            self._nodelets = None
+            self._associations = None
             roscfg = roslaunch.ROSLaunchConfig()
             loader = roslaunch.XmlLoader()
             self.argv = self.resolve_args(argv)
@@ -209,7 +359,7 @@ class LaunchConfig(object):
                     diag_dep.status.append(ds)
             if self._monitor_servicer is not None:
                 # set diagnostics
-                self._monitor_servicer._monitor._callback_diagnostics(diag_dep)
+                self._monitor_servicer.add_diagnostics(diag_dep)
         except roslaunch.XmlParseException as e:
             test = list(re.finditer(r"environment variable '\w+' is not set", utf8(e)))
             message = utf8(e)
@@ -351,20 +501,19 @@ class LaunchConfig(object):
                 node_fullname = roslib.names.ns_join(item.namespace, item.name)
                 machine_name = item.machine_name if item.machine_name is not None and not item.machine_name == 'localhost' else ''
                 added = False
-                cap_param = roslib.names.ns_join(node_fullname, 'capability_group')
-                cap_ns = node_fullname
                 # find the capability group parameter in namespace
-                while cap_param not in self.roscfg.params and cap_param.count(roslib.names.SEP) > 1:
-                    cap_ns = roslib.names.namespace(cap_ns).rstrip(roslib.names.SEP)
-                    if not cap_ns:
-                        cap_ns = roslib.names.SEP
-                    cap_param = roslib.names.ns_join(cap_ns, 'capability_group')
+                cap_param = self.param_index.find_in_ns(node_fullname, 'capability_group')
+                if cap_param is None:
+                    continue
+                cap_ns = roslib.names.namespace(cap_param).rstrip(roslib.names.SEP)
+                if not cap_ns:
+                    cap_ns = roslib.names.SEP
                 if cap_ns == node_fullname:
                     cap_ns = item.namespace.rstrip(roslib.names.SEP)
                     if not cap_ns:
                         cap_ns = roslib.names.SEP
                 # if the 'capability_group' parameter found, assign node to the group
-                if cap_param in self.roscfg.params and self.roscfg.params[cap_param].value:
+                if self.roscfg.params[cap_param].value:
                     p = self.roscfg.params[cap_param]
                     if machine_name not in result:
                         result[machine_name] = dict()
@@ -412,10 +561,67 @@ class LaunchConfig(object):
         '''
         nodename = os.path.basename(name)
         namespace = os.path.dirname(name).strip(roslib.names.SEP)
+        return self._get_nodes_index().get((namespace, nodename), None)
+
+    def _get_nodes_index(self):
+        '''
+        :return: the nodes of the configuration by their namespace without leading
+                 and trailing slash and their name. Created once per load.
+        :rtype: dict((str, str): :class:`roslaunch.Node` <http://docs.ros.org/kinetic/api/roslaunch/html/>)
+        '''
+        if self._nodes is not None:
+            return self._nodes
+        nodes = dict()
         for item in self.roscfg.nodes:
-            if (item.name == nodename) and (item.namespace.strip(roslib.names.SEP) == namespace):
-                return item
-        return None
+            key = (item.namespace.strip(roslib.names.SEP), item.name)
+            if key not in nodes:
+                nodes[key] = item
+        self._nodes = nodes
+        return nodes
+
+    def get_nodelets(self):
+        '''
+        Returns the nodelets of this configuration grouped by their manager.
+
+        :return: the dictionary with full name of the nodelet manager and the full names of the loaded nodelets.
+        :rtype: dict(str: [str])
+        '''
+        if self._nodelets is not None:
+            return self._nodelets
+        result = dict()
+        for n in self.roscfg.nodes:
+            if n.package == 'nodelet' and n.type == 'nodelet':
+                args = n.args.split(' ')
+                if len(args) == 3 and args[0] == 'load':
+                    nodelet_mngr = roslib.names.ns_join(n.namespace, args[2])
+                    if nodelet_mngr not in result:
+                        result[nodelet_mngr] = []
+                    result[nodelet_mngr].append(roslib.names.ns_join(n.namespace, n.name))
+        self._nodelets = result
+        return result
+
+    def get_associations(self):
+        '''
+        Returns the nodes associated by `nm/associations` or the deprecated
+        `associations` parameter.
+
+        :return: the dictionary with full name of the node and the full names of the associated nodes.
+        :rtype: dict(str: [str])
+        '''
+        if self._associations is not None:
+            return self._associations
+        result = dict()
+        for n in self.roscfg.nodes:
+            node_fullname = roslib.names.ns_join(n.namespace, n.name)
+            # the DEPRECATED 'associations' overrides 'nm/associations'
+            for param in ['nm/associations', 'associations']:
+                associations_param = roslib.names.ns_join(node_fullname, param)
+                if associations_param in self.roscfg.params:
+                    line = self.roscfg.params[associations_param].value
+                    splits = re.split(r'[;,\s]\s*', line)
+                    result[node_fullname] = [roslib.names.ns_join(n.namespace, split) for split in splits]
+        self._associations = result
+        return result
 
     def get_robot_icon(self):
         '''
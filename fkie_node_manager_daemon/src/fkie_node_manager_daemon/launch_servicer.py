@@ -39,7 +39,6 @@ import rospy
 import roslib.names
 import roslib.packages
 import rospkg
-import threading
 import traceback
 
 from fkie_master_discovery.common import masteruri_from_master
@@ -49,6 +48,7 @@ import fkie_multimaster_msgs.grpc.launch_pb2 as lmsg
 from . import exceptions
 from . import launcher
 from . import url
+from .autostart import Autostart
 from .common import INCLUDE_PATTERN, SEARCH_IN_EXT, find_included_files, interpret_path, utf8, reset_package_cache
 from .launch_config import LaunchConfig
 from .startcfg import StartConfig
@@ -121,13 +121,19 @@ class LaunchServicer(lgrpc.LaunchServiceServicer):
     Handles GRPC-requests defined in `launch.proto`.
     '''
 
-    def __init__(self, monitor_servicer):
+    def __init__(self, monitor_servicer, settings=None):
         rospy.loginfo("Create launch manger servicer")
         lgrpc.LaunchServiceServicer.__init__(self)
         self._is_running = True
         self._peers = {}
         self._loaded_files = dict()  # dictionary of (CfgId: LaunchConfig)
         self._monitor_servicer = monitor_servicer
+        self._autostart = Autostart(self._autostart_run, monitor_servicer=monitor_servicer)
+        if settings is not None:
+            settings.add_reload_listener(self.reload_parameter)
+
+    def reload_parameter(self, settings):
+        self._autostart.set_parallel(settings.param('global/autostart_parallel', 4))
 
     def _terminated(self):
         rospy.loginfo("terminated launch context")
@@ -144,6 +150,7 @@ class LaunchServicer(lgrpc.LaunchServiceServicer):
         '''
         global IS_RUNNING
         IS_RUNNING = False
+        self._autostart.stop()
 
     def load_launch_file(self, path, autostart=False):
         '''
@@ -162,8 +169,7 @@ class LaunchServicer(lgrpc.LaunchServiceServicer):
             rospy.logdebug("loaded %s\n  used args: %s" % (path, utf8(res_argv)))
             self._loaded_files[CfgId(path, '')] = launch_config
             if autostart:
-                start_thread = threading.Thread(target=self._autostart_nodes_threaded, args=(launch_config,))
-                start_thread.start()
+                self._autostart_nodes(launch_config)
         else:
             rospy.logwarn("load %s failed!" % (path))
 
@@ -179,7 +185,7 @@ class LaunchServicer(lgrpc.LaunchServiceServicer):
                 return
         raise Exception("Node '%s' not found!" % node_name)
 
-    def _autostart_nodes_threaded(self, cfg):
+    def _autostart_nodes(self, cfg):
         global IS_RUNNING
         for item in cfg.roscfg.nodes:
             if not IS_RUNNING:
@@ -190,40 +196,26 @@ class LaunchServicer(lgrpc.LaunchServiceServicer):
                     # skip autostart
                     rospy.logdebug("%s is in exclude list, skip autostart", node_fullname)
                     continue
-                self._autostart_node(node_fullname, cfg)
+                self._autostart.add(node_fullname, cfg, self._get_start_delay(cfg, node_fullname), self._get_start_required(cfg, node_fullname))
             except Exception as err:
                 rospy.logwarn("Error while start %s: %s", node_fullname, err)
 
-    def _autostart_node(self, node_name, cfg):
+    def _autostart_run(self, node_names, cfg):
         global IS_RUNNING
         if not IS_RUNNING:
-            return
-        start_required = self._get_start_required(cfg, node_name)
-        start_now = False
-        if start_required:
-            import rosgraph
-            # get published topics from ROS master
-            master = rosgraph.masterapi.Master(cfg.masteruri)
-            for topic, _datatype in master.getPublishedTopics(''):
-                if start_required == topic:
-                    start_now = True
-                    break
-            if not start_now:
-                # Start the timer for waiting for the topic
-                start_timer = threading.Timer(3.0, self._autostart_node, args=(node_name, cfg))
-                start_timer.start()
-        else:
-            start_now = True
-        if start_now:
-            startcfg = launcher.create_start_config(node_name, cfg, '', masteruri='', loglevel='', reload_global_param=False)
-            start_delay = self._get_start_delay(cfg, node_name)
-            if start_delay > 0:
-                # start timer for delayed start
-                start_timer = threading.Timer(start_delay, launcher.run_node, args=(startcfg,))
-                start_timer.setDaemon(True)
-                start_timer.start()
-            else:
-                launcher.run_node(startcfg)
+            return [None] * len(node_names)
+        errors = [None] * len(node_names)
+        startcfgs = []
+        indexes = []
+        for idx, node_name in enumerate(node_names):
+            try:
+                startcfgs.append(launcher.create_start_config(node_name, cfg, '', masteruri='', loglevel='', reload_global_param=False))
+                indexes.append(idx)
+            except Exception as err:
+                errors[idx] = err
+        for idx, err in zip(indexes, launcher.run_nodes(startcfgs)):
+            errors[idx] = err
+        return errors
 
     def _get_start_exclude(self, cfg, node):
         param_name = rospy.names.ns_join(node, 'autostart/exclude')
@@ -464,97 +456,107 @@ class LaunchServicer(lgrpc.LaunchServiceServicer):
                 except Exception:
                     print(traceback.format_exc())
             # create nodelets description
-            nodelets = {}
-            for n in lc.roscfg.nodes:
-                if n.package == 'nodelet' and n.type == 'nodelet':
-                    args = n.args.split(' ')
-                    if len(args) == 3 and args[0] == 'load':
-                        nodelet_mngr = roslib.names.ns_join(n.namespace, args[2])
-                        if nodelet_mngr not in nodelets:
-                            nodelets[nodelet_mngr] = []
-                        nodelets[nodelet_mngr].append(roslib.names.ns_join(n.namespace, n.name))
-            for mngr, ndl in nodelets.items():
+            for mngr, ndl in lc.get_nodelets().items():
                 nlmsg = lmsg.Nodelets(manager=mngr)
                 nlmsg.nodes.extend(ndl)
                 reply.nodelets.extend([nlmsg])
             # create association description
-            associations = {}
-            for n in lc.roscfg.nodes:
-                node_fullname = roslib.names.ns_join(n.namespace, n.name)
-                associations_param = roslib.names.ns_join(node_fullname, 'nm/associations')
-                if associations_param in lc.roscfg.params:
-                    line = lc.roscfg.params[associations_param].value
-                    splits = re.split(r'[;,\s]\s*', line)
-                    values = []
-                    for split in splits:
-                        values.append(roslib.names.ns_join(item.namespace, split))
-                    associations[node_fullname] = values
-                # DEPRECATED 'associations'
-                associations_param = roslib.names.ns_join(node_fullname, 'associations')
-                if associations_param in lc.roscfg.params:
-                    line = lc.roscfg.params[associations_param].value
-                    splits = re.split(r'[;,\s]\s*', line)
-                    values = []
-                    for split in splits:
-                        values.append(roslib.names.ns_join(item.namespace, split))
-                    associations[node_fullname] = values
-            for node, ass in associations.items():
+            for node, ass in lc.get_associations().items():
                 assmsg = lmsg.Associations(node=node)
                 assmsg.nodes.extend(ass)
                 reply.associations.extend([assmsg])
             yield reply
 
+    def _create_start_config(self, request, result):
+        '''
+        Creates the start configuration for a node request. If the node is not
+        found or found in multiple launch files the status of the result is set.
+
+        :param request: the start request
+        :type request: fkie_multimaster_msgs.grpc.launch_pb2.Node
+        :param result: the reply for the request
+        :type result: fkie_multimaster_msgs.grpc.launch_pb2.StartNodeReply
+        :return: the start configuration or None
+        :rtype: :class:`fkie_node_manager_daemon.startcfg.StartConfig`
+        '''
+        launch_configs = []
+        if request.opt_launch:
+            cfgid = CfgId(request.opt_launch, request.masteruri)
+            if cfgid in self._loaded_files:
+                launch_configs.append(self._loaded_files[cfgid])
+        if not launch_configs:
+            # get launch configurations with given node
+            launch_configs = []
+            for cfgid, launchcfg in self._loaded_files.items():
+                if cfgid.equal_masteruri(request.masteruri):
+                    n = launchcfg.get_node(request.name)
+                    if n is not None:
+                        launch_configs.append(launchcfg)
+        if not launch_configs:
+            result.status.code = NODE_NOT_FOUND
+            result.status.error_msg = "Node '%s' not found" % request.name
+            return None
+        if len(launch_configs) > 1:
+            result.status.code = MULTIPLE_LAUNCHES
+            result.status.error_msg = "Node '%s' found in multiple launch files" % request.name
+            result.launch.extend([lcfg.filename for lcfg in launch_configs])
+            return None
+        result.launch.append(launch_configs[0].filename)
+        return launcher.create_start_config(request.name, launch_configs[0], request.opt_binary, masteruri=request.masteruri, loglevel=request.loglevel, logformat=request.logformat, reload_global_param=request.reload_global_param, cmd_prefix=request.cmd_prefix)
+
+    def _set_start_error(self, result, error, details=''):
+        '''
+        Sets the status of the reply for an exception raised while start of a node.
+        '''
+        if isinstance(error, exceptions.BinarySelectionRequest):
+            result.status.code = MULTIPLE_BINARIES
+            result.status.error_msg = "multiple binaries found for node '%s': %s" % (result.name, error.choices)
+            result.path.extend(error.choices)
+        elif isinstance(error, grpc.RpcError):
+            result.status.code = CONNECTION_ERROR
+            result.status.error_msg = utf8(error)
+        else:
+            result.status.code = ERROR
+            result.status.error_msg = "Error while start node '%s': %s" % (result.name, details if details else utf8(error))
+
     def StartNode(self, request_iterator, context):
         for request in request_iterator:
+            result = lmsg.StartNodeReply(name=request.name)
             try:
-                result = lmsg.StartNodeReply(name=request.name)
-                launch_configs = []
-                if request.opt_launch:
-                    cfgid = CfgId(request.opt_launch, request.masteruri)
-                    if cfgid in self._loaded_files:
-                        launch_configs.append(self._loaded_files[cfgid])
-                if not launch_configs:
-                    # get launch configurations with given node
-                    launch_configs = []
-                    for cfgid, launchcfg in self._loaded_files.items():
-                        if cfgid.equal_masteruri(request.masteruri):
-                            n = launchcfg.get_node(request.name)
-                            if n is not None:
-                                launch_configs.append(launchcfg)
-                if not launch_configs:
-                    result.status.code = NODE_NOT_FOUND
-                    result.status.error_msg = "Node '%s' not found" % request.name
-                    yield result
-                if len(launch_configs) > 1:
-                    result.status.code = MULTIPLE_LAUNCHES
-                    result.status.error_msg = "Node '%s' found in multiple launch files" % request.name
-                    result.launch.extend([lcfg.filename for lcfg in launch_configs])
-                    yield result
-                try:
-                    result.launch.append(launch_configs[0].filename)
-                    startcfg = launcher.create_start_config(request.name, launch_configs[0], request.opt_binary, masteruri=request.masteruri, loglevel=request.loglevel, logformat=request.logformat, reload_global_param=request.reload_global_param, cmd_prefix=request.cmd_prefix)
+                startcfg = self._create_start_config(request, result)
+                if startcfg is not None:
                     launcher.run_node(startcfg)
                     result.status.code = OK
-                    yield result
-                except exceptions.BinarySelectionRequest as bsr:
-                    result.status.code = MULTIPLE_BINARIES
-                    result.status.error_msg = "multiple binaries found for node '%s': %s" % (request.name, bsr.choices)
-                    result.path.extend(bsr.choices)
-                    yield result
-                except grpc.RpcError as conerr:
-                    result.status.code = CONNECTION_ERROR
-                    result.status.error_msg = utf8(conerr)
-                    yield result
-            except exceptions.ResourceNotFound as err_nf:
-                result = lmsg.StartNodeReply(name=request.name)
-                result.status.code = ERROR
-                result.status.error_msg = "Error while start node '%s': %s" % (request.name, utf8(err_nf))
-                yield result
-            except Exception as _errr:
-                result = lmsg.StartNodeReply(name=request.name)
-                result.status.code = ERROR
-                result.status.error_msg = "Error while start node '%s': %s" % (request.name, utf8(traceback.format_exc()))
-                yield result
+            except (exceptions.BinarySelectionRequest, grpc.RpcError, exceptions.ResourceNotFound) as err:
+                self._set_start_error(result, err)
+            except Exception as err:
+                self._set_start_error(result, err, utf8(traceback.format_exc()))
+            yield result
+
+    def StartNodes(self, request, context):
+        results = []
+        startcfgs = []
+        for node in request.nodes:
+            result = lmsg.StartNodeReply(name=node.name)
+            try:
+                startcfg = self._create_start_config(node, result)
+                if startcfg is not None:
+                    results.append((result, len(startcfgs)))
+                    startcfgs.append(startcfg)
+                    continue
+            except (exceptions.BinarySelectionRequest, grpc.RpcError, exceptions.ResourceNotFound) as err:
+                self._set_start_error(result, err)
+            except Exception as err:
+                self._set_start_error(result, err, utf8(traceback.format_exc()))
+            results.append((result, -1))
+        errors = launcher.run_nodes(startcfgs)
+        for result, idx in results:
+            if idx >= 0:
+                if errors[idx] is None:
+                    result.status.code = OK
+                else:
+                    self._set_start_error(result, errors[idx])
+            yield result
 
     def StartStandaloneNode(self, request, context):
         result = lmsg.StartNodeReply(name=request.name)
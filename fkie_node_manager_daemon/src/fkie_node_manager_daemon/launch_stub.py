@@ -242,18 +242,40 @@ class LaunchStub(object):
         '''
         response_stream = self.lm_stub.StartNode(self._gen_node_list([(name, opt_binary, opt_launch, loglevel, logformat, masteruri, reload_global_param, cmd_prefix)]), timeout=settings.GRPC_TIMEOUT)
         for response in response_stream:
-            if response.status.code == 0:
-                pass
-            elif response.status.code == ERROR:
-                raise exceptions.StartException(response.status.error_msg)
-            elif response.status.code == NODE_NOT_FOUND:
-                raise exceptions.StartException(response.status.error_msg)
-            elif response.status.code == MULTIPLE_BINARIES:
-                raise exceptions.BinarySelectionRequest([path for path in response.path], response.status.error_msg)
-            elif response.status.code == MULTIPLE_LAUNCHES:
-                raise exceptions.LaunchSelectionRequest([path for path in response.launch], response.status.error_msg)
-            elif response.status.code == CONNECTION_ERROR:
-                raise exceptions.ConnectionException(response.name, response.status.error_msg)
+            error = self._start_error(response)
+            if error is not None:
+                raise error
+
+    def start_nodes(self, nodes, loglevel='', logformat='', masteruri='', reload_global_param=False, cmd_prefix=''):
+        '''
+        Start a list of nodes. The parameter of all nodes are loaded with one
+        request to the ROS master before the nodes are started.
+
+        :param nodes: the full names of the ros nodes exists in the launch file together with the full name of the launch file to use or an empty string.
+        :type nodes: list((str, str))
+        :param str loglevel: log level
+        :param str cmd_prefix: custom command prefix. It will be prepended before launch prefix.
+        :return: the full name of each node with None on success or the exception
+                 (:class:`exceptions.StartException`, :class:`exceptions.BinarySelectionRequest`, ...)
+        :rtype: list((str, Exception or None))
+        '''
+        request = lmsg.StartNodesRequest()
+        request.nodes.extend(self._gen_node_list([(name, '', opt_launch, loglevel, logformat, masteruri, reload_global_param, cmd_prefix) for name, opt_launch in nodes]))
+        response_stream = self.lm_stub.StartNodes(request, timeout=settings.GRPC_TIMEOUT)
+        return [(response.name, self._start_error(response)) for response in response_stream]
+
+    def _start_error(self, response):
+        if response.status.code == ERROR:
+            return exceptions.StartException(response.status.error_msg)
+        elif response.status.code == NODE_NOT_FOUND:
+            return exceptions.StartException(response.status.error_msg)
+        elif response.status.code == MULTIPLE_BINARIES:
+            return exceptions.BinarySelectionRequest([path for path in response.path], response.status.error_msg)
+        elif response.status.code == MULTIPLE_LAUNCHES:
+            return exceptions.LaunchSelectionRequest([path for path in response.launch], response.status.error_msg)
+        elif response.status.code == CONNECTION_ERROR:
+            return exceptions.ConnectionException(response.name, response.status.error_msg)
+        return None
 
     def start_standalone_node(self, startcfg):
         '''
@@ -39,6 +39,7 @@ import rospy
 import shlex
 import socket
 import sys
+import threading
 import types
 import roslaunch
 try:
@@ -49,12 +50,14 @@ except ImportError:
 from rosgraph.network import get_local_addresses
 from fkie_master_discovery.common import masteruri_from_ros
 from fkie_master_discovery.udp import DiscoverSocket
+from fkie_master_discovery.xmlrpc_pool import server_proxy
 
 from . import host
 from . import exceptions
 from . import remote
 from . import screen
 from . import settings
+from .launch_config import ParamIndex
 from .launch_stub import LaunchStub
 from .common import get_cwd, package_name, interpret_path, isstring, utf8
 
@@ -63,6 +66,9 @@ from .startcfg import StartConfig
 
 STARTED_BINARIES = dict()
 ''':var STARTED_BINARIES: dictionary with nodes and tuple of (paths of started binaries and their last modification time). Used to detect changes on binaries.'''
+PARAM_HASHES = dict()
+''':var PARAM_HASHES: dictionary with masteruri and a dictionary of parameter names and hashes of their last loaded values. Used to skip unchanged parameter.'''
+_PARAM_HASHES_LOCK = threading.Lock()
 
 
 def create_start_config(node, launchcfg, executable='', masteruri=None, loglevel='', logformat='', reload_global_param=False, cmd_prefix=''):
@@ -124,19 +130,15 @@ def create_start_config(node, launchcfg, executable='', masteruri=None, loglevel
             launchcfg.global_param_done.remove(result.masteruri)
             launchcfg.changed = False
     if result.masteruri not in launchcfg.global_param_done:
-        global_params = get_global_params(launchcfg.roscfg)
+        global_params = launchcfg.param_index.get_global_params()
         result.params.update(global_params)
         rospy.loginfo("add global parameter for '%s'" % launchcfg.filename)
         rospy.logdebug("add global parameter:\n  %s", '\n  '.join("%s: %s%s" % (key, utf8(val)[:80], '...' if len(utf8(val)) > 80 else'') for key, val in global_params.items()))
         launchcfg.global_param_done.append(result.masteruri)
     # add params and clear_params
     nodens = "%s%s%s" % (n.namespace, n.name, rospy.names.SEP)
-    for pname, param in launchcfg.roscfg.params.items():
-        if pname.startswith(nodens):
-            result.params[pname] = param.value
-    for cparam in launchcfg.roscfg.clear_params:
-        if cparam.startswith(nodens):
-            result.clear_params.append(cparam)
+    result.params.update(launchcfg.param_index.get_params(nodens))
+    result.clear_params.extend(launchcfg.param_index.get_clear_params(nodens))
     rospy.logdebug("set delete parameter:\n  %s", '\n  '.join(result.clear_params))
     rospy.logdebug("add parameter:\n  %s", '\n  '.join("%s: %s%s" % (key, utf8(val)[:80], '...' if len(utf8(val)) > 80 else '') for key, val in result.params.items()))
     return result
@@ -153,111 +155,183 @@ def run_node(startcfg):
     :see: :meth:`fkie_node_manager.host.is_local`
     '''
     hostname = startcfg.hostname
-    nodename = roslib.names.ns_join(startcfg.namespace, startcfg.name)
     if not hostname or host.is_local(hostname, wait=True):
         # run on local host
-        # interpret arguments with path elements
-        args = []
-        for arg in startcfg.args:
-            new_arg = arg
-            if arg.startswith('$(find'):
-                new_arg = interpret_path(arg)
-                rospy.logdebug("interpret arg '%s' to '%s'" % (arg, new_arg))
-            args.append(new_arg)
-        # set name and namespace of the node
-        if startcfg.name:
-            args.append("__name:=%s" % startcfg.name)
-        if startcfg.namespace:
-            args.append("__ns:=%s" % startcfg.namespace)
-        # add remap arguments
-        for key, val in startcfg.remaps.items():
-            args.append("%s:=%s" % (key, val))
-        cmd_type = startcfg.binary_path
-        # get binary path from package
-        if not cmd_type:
-            try:
-                cmd = roslib.packages.find_node(startcfg.package, startcfg.binary)
-            except (roslib.packages.ROSPkgException, rospkg.ResourceNotFound) as e:
-                # multiple nodes, invalid package
-                rospy.logwarn("resource not found: %s" % utf8(e))
-                raise exceptions.ResourceNotFound(startcfg.package, "resource not found: %s" % utf8(e))
-            if isstring(cmd):
-                cmd = [cmd]
-            if cmd is None or len(cmd) == 0:
-                raise exceptions.StartException('%s in package [%s] not found!' % (startcfg.binary, startcfg.package))
-            if len(cmd) > 1:
-                # Open selection for executables
-                err = 'Multiple executables with same name in package [%s]  found:' % startcfg.package
-                raise exceptions.BinarySelectionRequest(cmd, err)
+        local_start = _create_local_start(startcfg)
+        if local_start[3] is not None:
+            # load params to ROS master
+            _load_parameters(local_start[3], startcfg.params, startcfg.clear_params)
+        _run_local(startcfg, *local_start)
+    else:
+        _run_remote(startcfg)
+
+
+def run_nodes(startcfgs):
+    '''
+    Start a list of nodes. Unlike :meth:`run_node` the parameter of all nodes
+    started on local host are loaded with one request for each ROS master
+    before the nodes are started.
+
+    :param startcfgs: start configurations e.g. returned by :meth:`create_start_config`
+    :type startcfgs: list(:class:`fkie_node_manager_daemon.startcfg.StartConfig`)
+    :return: for each start configuration None on success or the raised exception
+             (:class:`exceptions.StartException`, :class:`exceptions.BinarySelectionRequest`, ...)
+    :rtype: list(Exception or None)
+    '''
+    result = [None] * len(startcfgs)
+    local_starts = []  # tuples of (index, start configuration, local start)
+    masteruris = dict()  # masteruri: [index in local_starts]
+    for idx, startcfg in enumerate(startcfgs):
+        try:
+            hostname = startcfg.hostname
+            if not hostname or host.is_local(hostname, wait=True):
+                local_start = _create_local_start(startcfg)
+                if local_start[3] is not None:
+                    masteruris.setdefault(local_start[3], []).append(len(local_starts))
+                local_starts.append((idx, startcfg, local_start))
             else:
-                cmd_type = cmd[0]
+                _run_remote(startcfg)
+        except Exception as err:
+            result[idx] = err
+    # load the union of the parameter for each ROS master
+    failed = set()
+    for masteruri, starts in masteruris.items():
+        params = dict()
+        clear_params = []
+        for lidx in starts:
+            startcfg = local_starts[lidx][1]
+            params.update(startcfg.params)
+            clear_params.extend(cp for cp in startcfg.clear_params if cp not in clear_params)
         try:
-            global STARTED_BINARIES
-            STARTED_BINARIES[nodename] = (cmd_type, os.path.getmtime(cmd_type))
-        except Exception:
-            pass
-        cwd = get_cwd(startcfg.cwd, cmd_type)
-        # set environment
-        new_env = dict(os.environ)
-        # set display variable to local display
-        if 'DISPLAY' in startcfg.env:
-            if not startcfg.env['DISPLAY'] or startcfg.env['DISPLAY'] == 'remote':
-                del startcfg.env['DISPLAY']
-        #else:
-        #    new_env['DISPLAY'] = ':0'
-        # add environment from launch
-        new_env.update(startcfg.env)
-        if startcfg.namespace:
-            new_env['ROS_NAMESPACE'] = startcfg.namespace
-        # set logging
-        if startcfg.logformat:
-            new_env['ROSCONSOLE_FORMAT'] = '%s' % startcfg.logformat
-        if startcfg.loglevel:
-            new_env['ROSCONSOLE_CONFIG_FILE'] = _rosconsole_cfg_file(startcfg.package, startcfg.loglevel)
-        # handle respawn
-        if startcfg.respawn:
-            if startcfg.respawn_delay > 0:
-                new_env['RESPAWN_DELAY'] = '%d' % startcfg.respawn_delay
-            respawn_params = _get_respawn_params(startcfg.fullname, startcfg.params)
-            if respawn_params['max'] > 0:
-                new_env['RESPAWN_MAX'] = '%d' % respawn_params['max']
-            if respawn_params['min_runtime'] > 0:
-                new_env['RESPAWN_MIN_RUNTIME'] = '%d' % respawn_params['min_runtime']
-            cmd_type = "%s %s %s" % (settings.RESPAWN_SCRIPT, startcfg.prefix, cmd_type)
+            _load_parameters(masteruri, params, clear_params)
+        except Exception as err:
+            for lidx in starts:
+                result[local_starts[lidx][0]] = err
+                failed.add(lidx)
+    for lidx, (idx, startcfg, local_start) in enumerate(local_starts):
+        if lidx not in failed:
+            try:
+                _run_local(startcfg, *local_start)
+            except Exception as err:
+                result[idx] = err
+    return result
+
+
+def _create_local_start(startcfg):
+    '''
+    Creates the command, working directory and environment to run the node on local host.
+
+    :return: the command, the working directory, the environment and the masteruri to load the parameter
+    :rtype: tuple(str, str, dict(str: str), str or None)
+    '''
+    hostname = startcfg.hostname
+    nodename = roslib.names.ns_join(startcfg.namespace, startcfg.name)
+    # interpret arguments with path elements
+    args = []
+    for arg in startcfg.args:
+        new_arg = arg
+        if arg.startswith('$(find'):
+            new_arg = interpret_path(arg)
+            rospy.logdebug("interpret arg '%s' to '%s'" % (arg, new_arg))
+        args.append(new_arg)
+    # set name and namespace of the node
+    if startcfg.name:
+        args.append("__name:=%s" % startcfg.name)
+    if startcfg.namespace:
+        args.append("__ns:=%s" % startcfg.namespace)
+    # add remap arguments
+    for key, val in startcfg.remaps.items():
+        args.append("%s:=%s" % (key, val))
+    cmd_type = startcfg.binary_path
+    # get binary path from package
+    if not cmd_type:
+        try:
+            cmd = roslib.packages.find_node(startcfg.package, startcfg.binary)
+        except (roslib.packages.ROSPkgException, rospkg.ResourceNotFound) as e:
+            # multiple nodes, invalid package
+            rospy.logwarn("resource not found: %s" % utf8(e))
+            raise exceptions.ResourceNotFound(startcfg.package, "resource not found: %s" % utf8(e))
+        if isstring(cmd):
+            cmd = [cmd]
+        if cmd is None or len(cmd) == 0:
+            raise exceptions.StartException('%s in package [%s] not found!' % (startcfg.binary, startcfg.package))
+        if len(cmd) > 1:
+            # Open selection for executables
+            err = 'Multiple executables with same name in package [%s]  found:' % startcfg.package
+            raise exceptions.BinarySelectionRequest(cmd, err)
         else:
-            cmd_type = "%s %s" % (startcfg.prefix, cmd_type)
-        # check for masteruri
-        masteruri = startcfg.masteruri
-        if masteruri is None:
-            masteruri = masteruri_from_ros()
-        if masteruri is not None:
-            if 'ROS_MASTER_URI' not in startcfg.env:
-                new_env['ROS_MASTER_URI'] = masteruri
-            # host in startcfg is a nmduri -> get host name
-            ros_hostname = host.get_ros_hostname(masteruri, hostname)
-            if ros_hostname:
-                addr = socket.gethostbyname(ros_hostname)
-                if addr in set(ip for ip in get_local_addresses()):
-                    rospy.loginfo('set ROS_HOSTNAME to %s' % ros_hostname)
-                    new_env['ROS_HOSTNAME'] = ros_hostname
-            # load params to ROS master
-            _load_parameters(masteruri, startcfg.params, startcfg.clear_params)
-        # start
-        cmd_str = utf8('%s %s %s' % (screen.get_cmd(startcfg.fullname, new_env, list(startcfg.env.keys())), cmd_type, ' '.join(args)))
-        rospy.loginfo("%s (launch_file: '%s', masteruri: %s)" % (cmd_str, startcfg.config_path, masteruri))
-        rospy.logdebug("environment while run node '%s': '%s'" % (cmd_str, new_env))
-        SupervisedPopen(shlex.split(cmd_str), cwd=cwd, env=new_env, object_id="run_node_%s" % startcfg.fullname, description="Run [%s]%s" % (utf8(startcfg.package), utf8(startcfg.binary)))
+            cmd_type = cmd[0]
+    try:
+        global STARTED_BINARIES
+        STARTED_BINARIES[nodename] = (cmd_type, os.path.getmtime(cmd_type))
+    except Exception:
+        pass
+    cwd = get_cwd(startcfg.cwd, cmd_type)
+    # set environment
+    new_env = dict(os.environ)
+    # set display variable to local display
+    if 'DISPLAY' in startcfg.env:
+        if not startcfg.env['DISPLAY'] or startcfg.env['DISPLAY'] == 'remote':
+            del startcfg.env['DISPLAY']
+    #else:
+    #    new_env['DISPLAY'] = ':0'
+    # add environment from launch
+    new_env.update(startcfg.env)
+    if startcfg.namespace:
+        new_env['ROS_NAMESPACE'] = startcfg.namespace
+    # set logging
+    if startcfg.logformat:
+        new_env['ROSCONSOLE_FORMAT'] = '%s' % startcfg.logformat
+    if startcfg.loglevel:
+        new_env['ROSCONSOLE_CONFIG_FILE'] = _rosconsole_cfg_file(startcfg.package, startcfg.loglevel)
+    # handle respawn
+    if startcfg.respawn:
+        if startcfg.respawn_delay > 0:
+            new_env['RESPAWN_DELAY'] = '%d' % startcfg.respawn_delay
+        respawn_params = _get_respawn_params(startcfg.fullname, startcfg.params)
+        if respawn_params['max'] > 0:
+            new_env['RESPAWN_MAX'] = '%d' % respawn_params['max']
+        if respawn_params['min_runtime'] > 0:
+            new_env['RESPAWN_MIN_RUNTIME'] = '%d' % respawn_params['min_runtime']
+        cmd_type = "%s %s %s" % (settings.RESPAWN_SCRIPT, startcfg.prefix, cmd_type)
     else:
-        nmduri = startcfg.nmduri
-        rospy.loginfo("remote run node '%s' at '%s'" % (nodename, nmduri))
-        startcfg.params.update(_params_to_package_path(startcfg.params))
-        startcfg.args = _args_to_package_path(startcfg.args)
-        # run on a remote machine
-        channel = remote.get_insecure_channel(nmduri)
-        if channel is None:
-            raise exceptions.StartException("Unknown launch manager url for host %s to start %s" % (host, startcfg.fullname))
-        lm = LaunchStub(channel)
-        lm.start_standalone_node(startcfg)
+        cmd_type = "%s %s" % (startcfg.prefix, cmd_type)
+    # check for masteruri
+    masteruri = startcfg.masteruri
+    if masteruri is None:
+        masteruri = masteruri_from_ros()
+    if masteruri is not None:
+        if 'ROS_MASTER_URI' not in startcfg.env:
+            new_env['ROS_MASTER_URI'] = masteruri
+        # host in startcfg is a nmduri -> get host name
+        ros_hostname = host.get_ros_hostname(masteruri, hostname)
+        if ros_hostname:
+            addr = socket.gethostbyname(ros_hostname)
+            if addr in set(ip for ip in get_local_addresses()):
+                rospy.loginfo('set ROS_HOSTNAME to %s' % ros_hostname)
+                new_env['ROS_HOSTNAME'] = ros_hostname
+    cmd_str = utf8('%s %s %s' % (screen.get_cmd(startcfg.fullname, new_env, list(startcfg.env.keys())), cmd_type, ' '.join(args)))
+    return cmd_str, cwd, new_env, masteruri
+
+
+def _run_local(startcfg, cmd_str, cwd, new_env, masteruri):
+    rospy.loginfo("%s (launch_file: '%s', masteruri: %s)" % (cmd_str, startcfg.config_path, masteruri))
+    rospy.logdebug("environment while run node '%s': '%s'" % (cmd_str, new_env))
+    SupervisedPopen(shlex.split(cmd_str), cwd=cwd, env=new_env, object_id="run_node_%s" % startcfg.fullname, description="Run [%s]%s" % (utf8(startcfg.package), utf8(startcfg.binary)))
+
+
+def _run_remote(startcfg):
+    nodename = roslib.names.ns_join(startcfg.namespace, startcfg.name)
+    nmduri = startcfg.nmduri
+    rospy.loginfo("remote run node '%s' at '%s'" % (nodename, nmduri))
+    startcfg.params.update(_params_to_package_path(startcfg.params))
+    startcfg.args = _args_to_package_path(startcfg.args)
+    # run on a remote machine
+    channel = remote.get_insecure_channel(nmduri)
+    if channel is None:
+        raise exceptions.StartException("Unknown launch manager url for host %s to start %s" % (host, startcfg.fullname))
+    lm = LaunchStub(channel)
+    lm.start_standalone_node(startcfg)
 
 
 def changed_binaries(nodes):
@@ -317,46 +391,67 @@ def _get_respawn_params(node, params, respawn_delay_value=0):
 
 def _load_parameters(masteruri, params, clear_params):
     """
-    Load parameters onto the parameter server
+    Load parameters onto the parameter server. Parameter with values already
+    loaded by this daemon are requested first and only set if the ROS master
+    holds another value.
     """
-    param_server = xmlrpcclient.ServerProxy(masteruri)
     p = None
     abs_paths = list()  # tuples of (parameter name, old value, new value)
     not_found_packages = list()  # packages names
     param_errors = []
     try:
-        socket.setdefaulttimeout(6 + len(clear_params))
-        # multi-call style xmlrpc
-        param_server_multi = xmlrpcclient.MultiCall(param_server)
-
-        # clear specified parameter namespaces
-        # #2468 unify clear params to prevent error
-        for p in clear_params:
-            param_server_multi.deleteParam(rospy.get_name(), p)
-        r = param_server_multi()
-        for code, msg, _ in r:
-            if code != 1 and not msg.find("is not set"):
-                rospy.logwarn("Failed to clear parameter: %s", msg)
-#          raise StartException("Failed to clear parameter: %s"%(msg))
-
-        # multi-call objects are not reusable
-        socket.setdefaulttimeout(6 + len(params))
-        param_server_multi = xmlrpcclient.MultiCall(param_server)
+        # resolve path elements
+        values = dict()
+        interpreted = dict()
         for pkey, pval in params.items():
             value = pval
-            # resolve path elements
             if isstring(value) and (value.startswith('$')):
-                value = interpret_path(value)
-                rospy.logdebug("interpret parameter '%s' to '%s'" % (value, pval))
-            # add parameter to the multicall
-            param_server_multi.setParam(rospy.get_name(), pkey, value)
+                if value not in interpreted:
+                    interpreted[value] = interpret_path(value)
+                    rospy.logdebug("interpret parameter '%s' to '%s'" % (value, interpreted[value]))
+                value = interpreted[value]
+            values[pkey] = value
             test_ret = _test_value(pkey, value)
             if test_ret:
                 param_errors.extend(test_ret)
-        r = param_server_multi()
-        for code, msg, _ in r:
-            if code != 1:
-                raise exceptions.StartException("Failed to set parameter: %s" % (msg))
+        hashes = dict((pkey, _param_hash(value)) for pkey, value in values.items())
+        with _PARAM_HASHES_LOCK:
+            loaded = PARAM_HASHES.get(masteruri, {})
+            known = [pkey for pkey, phash in hashes.items() if phash is not None and loaded.get(pkey, None) == phash]
+        caller_id = rospy.get_name()
+        with server_proxy(masteruri, timeout=6 + len(clear_params) + len(params)) as param_server:
+            # multi-call style xmlrpc
+            param_server_multi = xmlrpcclient.MultiCall(param_server)
+            # clear specified parameter namespaces
+            # #2468 unify clear params to prevent error
+            for p in clear_params:
+                param_server_multi.deleteParam(caller_id, p)
+            # get the current values of the already loaded parameter, cleared parameter are not set
+            for pkey in known:
+                param_server_multi.getParam(caller_id, pkey)
+            r = list(param_server_multi()) if clear_params or known else []
+            for code, msg, _ in r[:len(clear_params)]:
+                if code != 1 and not msg.find("is not set"):
+                    rospy.logwarn("Failed to clear parameter: %s", msg)
+#          raise StartException("Failed to clear parameter: %s"%(msg))
+            unchanged = set()
+            for pkey, (code, _msg, value) in zip(known, r[len(clear_params):]):
+                if code == 1 and _param_hash(value) == hashes[pkey]:
+                    unchanged.add(pkey)
+            if unchanged:
+                rospy.logdebug("skip %d unchanged parameter" % len(unchanged))
+            # multi-call objects are not reusable
+            param_server_multi = xmlrpcclient.MultiCall(param_server)
+            changed = [pkey for pkey in values.keys() if pkey not in unchanged]
+            for pkey in changed:
+                # add parameter to the multicall
+                param_server_multi.setParam(caller_id, pkey, values[pkey])
+            r = param_server_multi() if changed else []
+            for code, msg, _ in r:
+                if code != 1:
+                    raise exceptions.StartException("Failed to set parameter: %s" % (msg))
+        with _PARAM_HASHES_LOCK:
+            PARAM_HASHES.setdefault(masteruri, {}).update(hashes)
     except roslaunch.core.RLException as e:
         raise exceptions.StartException(e)
     except rospkg.ResourceNotFound as rnf:
@@ -364,11 +459,32 @@ def _load_parameters(masteruri, params, clear_params):
     except Exception as e:
         raise exceptions.StartException("Failed to set parameter. ROS Parameter Server "
                                         "reports: %s\n\n%s" % (e, '\n'.join(param_errors)))
-    finally:
-        socket.setdefaulttimeout(None)
     return abs_paths, not_found_packages
 
 
+def _param_hash(value):
+    '''
+    :return: a hash of the parameter value, equal for values received from the ROS master or None if the value is not hashable
+    :rtype: int or None
+    '''
+    try:
+        return hash(_hashable_value(value))
+    except Exception:
+        return None
+
+
+def _hashable_value(value):
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted((key, _hashable_value(val)) for key, val in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ('list', tuple(_hashable_value(val) for val in value))
+    if isinstance(value, xmlrpcclient.Binary):
+        return ('binary', value.data)
+    if isstring(value):
+        return ('str', value)
+    return (type(value).__name__, value)
+
+
 def _test_value(key, value):
     result = []
     if value is None:
@@ -426,18 +542,4 @@ def get_global_params(roscfg):
     :return: the dictionary with names of the global parameter and their values
     :rtype: dict(str: value type)
     '''
-    result = dict()
-    nodes = []
-    for item in roscfg.resolved_node_names:
-        nodes.append(item)
-    for name, param in roscfg.params.items():
-        nodesparam = False
-        for n in nodes:
-            if name.startswith(n):
-                # load global parameter which has names equal to node names
-                if name != n:
-                    nodesparam = True
-                    break
-        if not nodesparam:
-            result[name] = param.value
-    return result
+    return ParamIndex(roscfg).get_global_params()
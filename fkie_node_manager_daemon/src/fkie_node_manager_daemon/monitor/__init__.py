@@ -43,7 +43,7 @@ from .service import Service
 def grpc_msg(rosmsg):
     try:
         result = mmsg.DiagnosticArray()
-        result.timestamp = rosmsg.header.stamp.secs
+        result.timestamp = rosmsg.header.stamp.to_sec()
         stats = []
         for stat in rosmsg.status:
             ds = mmsg.DiagnosticStatus()
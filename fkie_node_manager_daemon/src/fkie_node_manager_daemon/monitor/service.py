@@ -32,6 +32,7 @@
 
 
 
+from collections import deque, OrderedDict
 import rospy
 import socket
 import threading
@@ -46,10 +47,25 @@ from .net_load import NetLoad
 
 
 class DiagnosticObj(DiagnosticStatus):
+    '''
+    Last received state of a diagnostic status identified by name and hardware id.
+    The previous states are kept in a ring buffer of given length.
 
-    def __init__(self, msg=DiagnosticStatus(), timestamp=0):
+    :param msg: the diagnostic status
+    :type msg: diagnostic_msgs.msg.DiagnosticStatus
+    :param float timestamp: the time the status was received by the daemon
+    :param int history: count of the stored states including the current state
+    '''
+
+    def __init__(self, msg=DiagnosticStatus(), timestamp=0, history=1):
+        self.msg = msg
+        self.timestamp = timestamp
+        self.history = deque([(timestamp, msg)], maxlen=max(1, history))
+
+    def update(self, msg, timestamp):
         self.msg = msg
         self.timestamp = timestamp
+        self.history.append((timestamp, msg))
 
     def __eq__(self, item):
         if isinstance(item, DiagnosticObj):
@@ -72,7 +88,14 @@ class Service:
     def __init__(self, settings):
         self._settings = settings
         self._mutex = threading.RLock()
-        self._diagnostics = []  # DiagnosticObj
+        # (name, hardware_id): DiagnosticObj
+        self._diagnostics = dict()
+        # the same objects ordered by the time of the last update, the last updated object at the end
+        self._diagnostics_by_ts = OrderedDict()
+        # level: set of keys
+        self._diagnostics_by_level = dict()
+        self._last_stamp = 0
+        self.diagnostics_history = settings.param('global/diagnostics_history', 10)
         self.use_diagnostics_agg = settings.param('global/use_diagnostics_agg', False)
         self._sub_diag_agg = None
         self._sub_diag = None
@@ -106,20 +129,41 @@ class Service:
             else:
                 self._sub_diag = rospy.Subscriber('/diagnostics', DiagnosticArray, self._callback_diagnostics)
             self.use_diagnostics_agg = value
+        history = settings.param('global/diagnostics_history', 10)
+        if history != self.diagnostics_history:
+            with self._mutex:
+                for diag_obj in self._diagnostics.values():
+                    diag_obj.history = deque(diag_obj.history, maxlen=max(1, history))
+                self.diagnostics_history = history
+
+    def _next_stamp(self):
+        '''
+        Returns the current time, but always greater than the last returned value.
+        Received states and replies get unique timestamps, so the timestamp of a reply
+        can be used as filter for an incremental query.
+        '''
+        stamp = time.time()
+        if stamp <= self._last_stamp:
+            stamp = self._last_stamp + 0.000001
+        self._last_stamp = stamp
+        return stamp
 
     def _callback_diagnostics(self, msg):
-        # TODO: update diagnostics
         with self._mutex:
-            stamp = msg.header.stamp.to_sec()
+            stamp = self._next_stamp()
             for status in msg.status:
-                try:
-                    idx = self._diagnostics.index(status)
-                    diag_obj = self._diagnostics[idx]
-                    diag_obj.msg = status
-                    diag_obj.timestamp = stamp
-                except Exception:
-                    diag_obj = DiagnosticObj(status, stamp)
-                    self._diagnostics.append(diag_obj)
+                key = (status.name, status.hardware_id)
+                diag_obj = self._diagnostics.get(key, None)
+                if diag_obj is None:
+                    diag_obj = DiagnosticObj(status, stamp, self.diagnostics_history)
+                    self._diagnostics[key] = diag_obj
+                else:
+                    if diag_obj.msg.level != status.level:
+                        self._diagnostics_by_level[diag_obj.msg.level].discard(key)
+                    del self._diagnostics_by_ts[key]
+                    diag_obj.update(status, stamp)
+                self._diagnostics_by_ts[key] = diag_obj
+                self._diagnostics_by_level.setdefault(status.level, set()).add(key)
 
     def get_system_diagnostics(self, filter_level=0, filter_ts=0):
         result = DiagnosticArray()
@@ -133,15 +177,48 @@ class Service:
         return result
 
     def get_diagnostics(self, filter_level=0, filter_ts=0):
+        '''
+        Returns the last states of all diagnostics received after `filter_ts` with level
+        greater or equal `filter_level`. The header stamp of the result is the time of the
+        daemon and can be used as `filter_ts` of the next request to get only changes.
+
+        :param int filter_level: minimal level of the returned states
+        :param float filter_ts: only states received after this time are returned, 0 for all.
+        :rtype: diagnostic_msgs.msg.DiagnosticArray
+        '''
         result = DiagnosticArray()
-        result.header.stamp = rospy.Time.from_sec(time.time())
         with self._mutex:
-            for diag_obj in self._diagnostics:
-                if diag_obj.timestamp >= filter_ts:
+            result.header.stamp = rospy.Time.from_sec(self._next_stamp())
+            if filter_ts > 0:
+                # walk through the updated states only, the newest first
+                found = []
+                for key in reversed(self._diagnostics_by_ts):
+                    diag_obj = self._diagnostics_by_ts[key]
+                    if diag_obj.timestamp <= filter_ts:
+                        break
                     if diag_obj.msg.level >= filter_level:
-                        result.status.append(diag_obj.msg)
+                        found.append(diag_obj.msg)
+                found.reverse()
+                result.status = found
+            elif filter_level > 0:
+                for level, keys in self._diagnostics_by_level.items():
+                    if level >= filter_level:
+                        result.status.extend([self._diagnostics[key].msg for key in keys])
+            else:
+                result.status = [diag_obj.msg for diag_obj in self._diagnostics_by_ts.values()]
         return result
 
+    def get_diagnostic_history(self, name, hardware_id=''):
+        '''
+        :return: the stored states of the diagnostic status with given name and hardware id, the oldest first.
+        :rtype: [(float, diagnostic_msgs.msg.DiagnosticStatus)]
+        '''
+        with self._mutex:
+            diag_obj = self._diagnostics.get((name, hardware_id), None)
+            if diag_obj is not None:
+                return list(diag_obj.history)
+        return []
+
     def stop(self):
         with self._mutex:
             for sensor in self.sensors:
@@ -51,6 +51,15 @@ class MonitorServicer(mgrpc.MonitorServiceServicer):
     def stop(self):
         self._monitor.stop()
 
+    def add_diagnostics(self, diagnostics):
+        '''
+        Adds diagnostics created by the daemon itself, e.g. of the autostart or while load a launch file.
+
+        :param diagnostics: the diagnostics to add
+        :type diagnostics: diagnostic_msgs.msg.DiagnosticArray
+        '''
+        self._monitor._callback_diagnostics(diagnostics)
+
     def GetSystemDiagnostics(self, request, context):
         rosmsg = self._monitor.get_system_diagnostics(request.level, request.timestamp)
         return grpc_msg(rosmsg)
@@ -0,0 +1,268 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2017, Fraunhofer FKIE/CMS, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+
+from concurrent import futures
+import json
+import os
+import stat
+import threading
+import time
+
+import rospy
+
+from .common import utf8
+
+try:
+    from catkin_pkg.package import parse_package
+    CATKIN_SUPPORTED = True
+except ImportError:
+    CATKIN_SUPPORTED = False
+
+MANIFEST_FILE = 'manifest.xml'
+PACKAGE_FILE = 'package.xml'
+
+
+def _is_binary_candidate(name):
+    return name and name[0] != '.' and name not in ['build'] and not name.endswith('.cfg') and not name.endswith('.so')
+
+
+class PackageIndex(object):
+    '''
+    Index of the ROS packages and of the binaries in the package directories.
+    The content of each visited directory is cached with the modification
+    time of the directory. A directory is listed again only if its entries
+    are added, removed or renamed. Package files are parsed again only if
+    they are changed. The index is stored in a file and loaded on the next
+    start of the daemon.
+
+    Changes of the executable flag of existing files do not change the
+    modification time of the directory. The files of the cached directories
+    are therefore checked for the executable flag on each request.
+    '''
+
+    VERSION = 2
+
+    def __init__(self, filename='', max_workers=8):
+        '''
+        :param str filename: the file to store the index. Empty to hold the index in memory only.
+        :param int max_workers: count of threads to scan the package paths.
+        '''
+        self.filename = filename
+        self.max_workers = max_workers
+        self._lock = threading.RLock()
+        self._dirs = {}  # path: [mtime, [dirs], [files]]
+        self._package_files = {}  # path of package.xml: [mtime, size, package name]
+        self._changed = False
+        self.load()
+
+    def clear(self):
+        '''
+        Removes all cached entries. The next request scans all directories.
+        '''
+        with self._lock:
+            self._dirs.clear()
+            self._package_files.clear()
+            self._changed = True
+
+    def load(self):
+        if not self.filename or not os.path.isfile(self.filename):
+            return
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+            if data.get('version', 0) == self.VERSION:
+                with self._lock:
+                    self._dirs = data['dirs']
+                    self._package_files = data['package_files']
+                    self._changed = False
+        except Exception as err:
+            rospy.logwarn("Can not load package index from %s: %s" % (self.filename, utf8(err)))
+
+    def save(self):
+        '''
+        Stores the index if it was changed since last save.
+        '''
+        if not self.filename:
+            return
+        with self._lock:
+            if not self._changed:
+                return
+            data = json.dumps({'version': self.VERSION, 'dirs': self._dirs, 'package_files': self._package_files})
+            self._changed = False
+        try:
+            dirname = os.path.dirname(self.filename)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            tmp_filename = '%s.%d' % (self.filename, os.getpid())
+            with open(tmp_filename, 'w') as f:
+                f.write(data)
+            os.rename(tmp_filename, self.filename)
+        except Exception as err:
+            rospy.logwarn("Can not store package index to %s: %s" % (self.filename, utf8(err)))
+
+    def get_packages(self, root_paths):
+        '''
+        Searches for packages in given paths. The subdirectories of the root
+        paths are scanned in parallel.
+
+        :param [str] root_paths: paths to search for packages, e.g. from ROS_PACKAGE_PATH
+        :return: list of tuples with name and path of the packages. The
+            packages are sorted by root paths.
+        :rtype: [(str, str)]
+        '''
+        result = []
+        pool = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            jobs = []
+            for root in root_paths:
+                entry = self._list_dir(root)
+                if entry is None:
+                    jobs.append([])
+                elif MANIFEST_FILE in entry[2] or PACKAGE_FILE in entry[2]:
+                    jobs.append([pool.submit(self._find_packages, root)])
+                else:
+                    jobs.append([pool.submit(self._find_packages, os.path.join(root, name)) for name in entry[1]])
+            for root_jobs in jobs:
+                packages = {}
+                for job in root_jobs:
+                    packages.update(job.result())
+                result.extend(packages.items())
+        finally:
+            pool.shutdown(wait=True)
+        return result
+
+    def get_binaries(self, path):
+        '''
+        Searches recursively for executable files in given path.
+
+        :param str path: the path of a package
+        :return: list of tuples with path and current modification time of the binaries.
+        :rtype: [(str, float)]
+        '''
+        result = []
+        self._find_binaries(path, result)
+        return result
+
+    def _list_dir(self, path):
+        '''
+        :return: the cached or current content of the directory [mtime, [dirs], [files]]
+            or None if path is not a directory.
+        '''
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            entry = self._dirs.get(path, None)
+            if entry is not None and entry[0] == mtime:
+                return entry
+        if mtime is None or not os.path.isdir(path):
+            with self._lock:
+                if self._dirs.pop(path, None) is not None:
+                    self._changed = True
+            return None
+        dirs = []
+        files = []
+        try:
+            for name in os.listdir(path):
+                if os.path.isdir(os.path.join(path, name)):
+                    dirs.append(name)
+                else:
+                    files.append(name)
+        except OSError:
+            return None
+        # a directory changed in the same second as listed can be changed
+        # again without new modification time, validate on next request.
+        entry = [mtime if time.time() - mtime > 1.0 else -1, sorted(dirs), sorted(files)]
+        with self._lock:
+            self._dirs[path] = entry
+            self._changed = True
+        return entry
+
+    def _find_packages(self, path):
+        entry = self._list_dir(path)
+        if entry is None:
+            return {}
+        if MANIFEST_FILE in entry[2]:
+            return {os.path.basename(path): path}
+        if CATKIN_SUPPORTED and PACKAGE_FILE in entry[2]:
+            name = self._package_name(path)
+            if name:
+                return {name: path}
+            return {}
+        result = {}
+        for name in entry[1]:
+            result.update(self._find_packages(os.path.join(path, name)))
+        return result
+
+    def _package_name(self, path):
+        filename = os.path.join(path, PACKAGE_FILE)
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return ''
+        with self._lock:
+            cached = self._package_files.get(filename, None)
+            if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                return cached[2]
+        try:
+            name = parse_package(path).name
+        except Exception:
+            name = ''
+        with self._lock:
+            self._package_files[filename] = [stat.st_mtime, stat.st_size, name]
+            self._changed = True
+        return name
+
+    def _find_binaries(self, path, result):
+        entry = self._list_dir(path)
+        if entry is None:
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                result.append((path, os.path.getmtime(path)))
+            return
+        for name in entry[1]:
+            if _is_binary_candidate(name):
+                self._find_binaries(os.path.join(path, name), result)
+        for name in entry[2]:
+            if not _is_binary_candidate(name):
+                continue
+            binary = os.path.join(path, name)
+            try:
+                binary_stat = os.stat(binary)
+            except OSError:
+                # removed in the same second as the directory was listed
+                continue
+            if stat.S_ISREG(binary_stat.st_mode) and binary_stat.st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH) and os.access(binary, os.X_OK):
+                result.append((binary, binary_stat.st_mtime))
@@ -60,7 +60,8 @@ class GrpcServer:
         self.server = None
         self.settings_servicer = SettingsServicer()
         self.monitor_servicer = MonitorServicer(self.settings_servicer.settings)
-        self.launch_servicer = LaunchServicer(self.monitor_servicer)
+        self.launch_servicer = LaunchServicer(self.monitor_servicer, self.settings_servicer.settings)
+        self.file_servicer = FileServicer()
         rospy.Service('~start_launch', LoadLaunch, self._rosservice_start_launch)
         rospy.Service('~load_launch', LoadLaunch, self._rosservice_load_launch)
         rospy.Service('~run', Task, self._rosservice_start_node)
@@ -69,6 +70,7 @@ class GrpcServer:
         self.server.stop(3)
         self.launch_servicer = None
         self.monitor_servicer = None
+        self.file_servicer = None
         self.settings_servicer = None
 
     def start(self, url='[::]:12311'):
@@ -89,7 +91,7 @@ class GrpcServer:
             time.sleep(2.)
             insecure_port = self.server.add_insecure_port(url)
         if insecure_port > 0:
-            fgrpc.add_FileServiceServicer_to_server(FileServicer(), self.server)
+            fgrpc.add_FileServiceServicer_to_server(self.file_servicer, self.server)
             lgrpc.add_LaunchServiceServicer_to_server(self.launch_servicer, self.server)
             mgrpc.add_MonitorServiceServicer_to_server(self.monitor_servicer, self.server)
             sgrpc.add_ScreenServiceServicer_to_server(ScreenServicer(), self.server)
@@ -101,6 +103,7 @@ class GrpcServer:
     def shutdown(self):
         self.launch_servicer.stop()
         self.monitor_servicer.stop()
+        self.file_servicer.stop()
         self.server.stop(3)
 
     def load_launch_file(self, path, autostart=False):
@@ -78,6 +78,8 @@ class Settings:
                 'file': {':value': self.filename, ':ro': True},
                 'grpc_timeout': {':value': 15.0, ':type': 'float', ':min': 0, ':default': 15.0, ':hint': "timeout for connection to remote gRPC-server"},
                 'use_diagnostics_agg': {':value': False, ':hint': "subscribes to '/diagnostics_agg' topic instead of '/diagnostics'"},
+                'diagnostics_history': {':value': 10, ':type': 'int', ':min': 1, ':default': 10, ':hint': "count of stored states for each diagnostic status"},
+                'autostart_parallel': {':value': 4, ':type': 'int', ':min': 1, ':default': 4, ':hint': "count of nodes started at the same time while autostart of a launch file"},
                 'reset': {':value': False, ':hint': 'if this flag is set to True the configuration will be reseted'},
             },
             'sysmon':
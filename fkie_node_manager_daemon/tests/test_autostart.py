@@ -0,0 +1,137 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import threading
+import time
+import unittest
+
+from fkie_node_manager_daemon.autostart import Autostart
+
+PKG = 'fkie_node_manager_daemon'
+
+
+class DummyConfig(object):
+
+    def __init__(self):
+        self.masteruri = 'http://localhost:11311/'
+        self.filename = 'dummy.launch'
+
+
+class TestAutostart(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    def _start(self, names, cfg):
+        with self.lock:
+            self.started.extend(names)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.1)
+        with self.lock:
+            self.running -= 1
+        return [None] * len(names)
+
+    def _wait_for(self, autostart, count, timeout=5.):
+        end = time.time() + timeout
+        while len(autostart.latencies) < count and time.time() < end:
+            time.sleep(0.02)
+
+    def _wait_for_finish(self, autostart, timeout=5.):
+        end = time.time() + timeout
+        with autostart._cond:
+            while autostart._reports and time.time() < end:
+                autostart._cond.wait(0.02)
+
+    def test_parallel_start(self):
+        autostart = Autostart(self._start, parallel=3)
+        cfg = DummyConfig()
+        for idx in range(7):
+            autostart.add('/node%d' % idx, cfg)
+        self._wait_for(autostart, 7)
+        autostart.stop()
+        self.assertEqual(len(self.started), 7, "not all nodes started, got: %s" % self.started)
+        self.assertEqual(self.started[0], '/node0', "the first node of the launch file was not started first")
+        self.assertEqual(self.max_running, 3, "wrong count of parallel starts, expected: 3, got: %d" % self.max_running)
+        self.assertEqual(len(autostart.latencies), 7, "latencies not recorded for all nodes")
+
+    def test_delay(self):
+        autostart = Autostart(self._start, parallel=2)
+        cfg = DummyConfig()
+        autostart.add('/delayed', cfg, delay=0.5)
+        autostart.add('/node', cfg)
+        self._wait_for(autostart, 2)
+        autostart.stop()
+        self.assertEqual(self.started, ['/node', '/delayed'], "wrong start order: %s" % self.started)
+        self.assertTrue(autostart.latencies['/delayed'][0] >= 0.5, "node started before the delay: %.3f" % autostart.latencies['/delayed'][0])
+
+    def test_release_launch_file(self):
+        autostart = Autostart(self._start, parallel=2)
+        for idx in range(3):
+            autostart.add('/node%d' % idx, DummyConfig())
+        self._wait_for_finish(autostart)
+        autostart.stop()
+        with autostart._cond:
+            self.assertEqual(autostart._prepared, set(), "launch file not released after all nodes started: %s" % autostart._prepared)
+            self.assertEqual(autostart._inflight, {}, "starting nodes not released: %s" % autostart._inflight)
+            self.assertEqual(len(autostart.latencies), 3, "latencies not recorded for all nodes")
+
+    def test_latencies_limit(self):
+        autostart = Autostart(self._start, parallel=2)
+        autostart.MAX_LATENCIES = 3
+        cfg = DummyConfig()
+        for idx in range(5):
+            autostart.add('/node%d' % idx, cfg)
+        self._wait_for_finish(autostart)
+        autostart.stop()
+        self.assertEqual(len(self.started), 5, "not all nodes started, got: %s" % self.started)
+        self.assertEqual(len(autostart.latencies), 3, "latencies not limited, got: %s" % list(autostart.latencies.keys()))
+
+    def test_stop(self):
+        autostart = Autostart(self._start, parallel=1)
+        cfg = DummyConfig()
+        autostart.add('/delayed', cfg, delay=0.3)
+        autostart.stop()
+        time.sleep(0.5)
+        self.assertEqual(self.started, [], "node started after stop: %s" % self.started)
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestAutostart)
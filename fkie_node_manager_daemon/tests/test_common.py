@@ -189,6 +189,26 @@ class TestCommonLib(unittest.TestCase):
         self.assertEqual(6, file_list[0].line_number, "Wrong line number of first included file, expected: %d, got: %d" % (6, file_list[0].line_number))
         self.assertEqual(10, file_list[2].line_number, "Wrong line number of second included file, expected: %d, got: %d" % (10, file_list[2].line_number))
 
+    def test_include_files_changed(self):
+        path = "%s/include_cache_test.launch" % os.getcwd()
+        try:
+            with open(path, 'w') as launch_file:
+                launch_file.write('<launch>\n<!-- <include file="%s" /> -->\n<include file="%s" />\n</launch>\n' % (self.test_include_file, self.test_include_file))
+            file_list = [file_tuple for file_tuple in find_included_files(path, recursive=False)]
+            self.assertEqual(1, len(file_list), "Count of included files is wrong, expected: %d, got: %d" % (1, len(file_list)))
+            self.assertEqual(3, file_list[0].line_number, "Wrong line number of included file, expected: %d, got: %d" % (3, file_list[0].line_number))
+            # the second call returns the same result
+            file_list = [file_tuple for file_tuple in find_included_files(path, recursive=False)]
+            self.assertEqual(1, len(file_list), "Count of included files is wrong on second call, expected: %d, got: %d" % (1, len(file_list)))
+            # changed file is parsed again
+            with open(path, 'w') as launch_file:
+                launch_file.write('<launch>\n<include file="%s" />\n\n\n<include file="%s" />\n</launch>\n' % (self.test_include_file, self.test_include_file))
+            file_list = [file_tuple for file_tuple in find_included_files(path, recursive=False)]
+            self.assertEqual(2, len(file_list), "Count of included files in changed file is wrong, expected: %d, got: %d" % (2, len(file_list)))
+            self.assertEqual(5, file_list[1].line_number, "Wrong line number of included file, expected: %d, got: %d" % (5, file_list[1].line_number))
+        finally:
+            os.remove(path)
+
 
 if __name__ == '__main__':
     import rosunit
@@ -39,6 +39,7 @@ from grpc.beta._metadata import beta
 
 import fkie_multimaster_msgs.grpc.file_pb2 as fmsg
 from fkie_node_manager_daemon.common import interpret_path
+from fkie_node_manager_daemon.compression import NONE, ZLIB, ZSTD, decompress
 from fkie_node_manager_daemon.file_servicer import FileServicer
 
 PKG = 'fkie_node_manager_daemon'
@@ -72,6 +73,15 @@ class DummyContext(grpc.RpcContext):
         return beta([('user-agent', 'DUMMY for test')])
 
 
+class CodeContext(DummyContext):
+    '''Dummy context which stores the status code.'''
+
+    code = None
+
+    def set_code(self, code):
+        self.code = code
+
+
 class TestFileServiceServicer(unittest.TestCase):
     '''
     '''
@@ -154,6 +164,41 @@ class TestFileServiceServicer(unittest.TestCase):
         self.assertEqual(received_data, test_data, 'wrong returned data in file GetFileContentReply: %s, expected: %s' % (resp.file.data, test_data))
         os.remove(self.test_get_content_path)
 
+    def _get_content(self, fs, chunk_size=0, compression=NONE):
+        received = []
+        offset = 0
+        request = fmsg.GetFileContentRequest(path=self.test_get_content_path, chunk_size=chunk_size, compression=compression)
+        for resp in fs.GetFileContent(request, DummyContext()):
+            self.assertEqual(resp.status.code, fmsg.ReturnStatus.StatusType.Value('OK'), 'wrong status code if path exists')
+            self.assertEqual(resp.file.offset, offset, 'wrong offset of chunk: %d, expected: %d' % (resp.file.offset, offset))
+            data = decompress(resp.file.data, resp.file.compression)
+            self.assertLessEqual(len(data), chunk_size if chunk_size else fs.FILE_CHUNK_SIZE, 'chunk greater than requested chunk size')
+            offset += len(data)
+            received.append(data)
+        return b''.join(received)
+
+    def test_get_content_chunks(self):
+        fs = FileServicer()
+        test_data = b'<launch>\n' + b'  <node name="talker" pkg="rospy_tutorials" type="talker"/>\n' * 1000 + b'</launch>\n'
+        with FileIO(self.test_get_content_path, 'w') as testfile:
+            testfile.write(test_data)
+        for chunk_size, compression in [(0, NONE), (100, NONE), (4096, ZLIB), (4096, ZSTD), (fs.MAX_CHUNK_SIZE * 2, ZLIB)]:
+            received_data = self._get_content(fs, chunk_size, compression)
+            self.assertEqual(received_data, test_data, 'wrong returned data with chunk size %d and compression %d' % (chunk_size, compression))
+
+    def test_get_content_throughput(self):
+        fs = FileServicer()
+        test_data = b''.join([b'%d: 0.123 0.456 0.789 free\n' % i for i in range(200000)])
+        with FileIO(self.test_get_content_path, 'w') as testfile:
+            testfile.write(test_data)
+        # 1024 bytes was the fixed chunk size before the chunk size was negotiated
+        for chunk_size, compression in [(1024, NONE), (0, NONE), (0, ZLIB)]:
+            start = time.time()
+            received_data = self._get_content(fs, chunk_size, compression)
+            duration = max(time.time() - start, 0.000001)
+            self.assertEqual(received_data, test_data, 'wrong returned data with chunk size %d and compression %d' % (chunk_size, compression))
+            print("GetFileContent chunk size %d, compression %d: %.1f MB/s" % (chunk_size if chunk_size else fs.FILE_CHUNK_SIZE, compression, len(test_data) / duration / 1024 / 1024))
+
     def _read_from_list(self, test_data, path):
         data_len = 0
         for l in test_data:
@@ -239,6 +284,28 @@ class TestFileServiceServicer(unittest.TestCase):
         if not os.path.exists(self.test_rename_to_file):
             self.fail('After `rename` the target file does not exists')
 
+    def test_watch_files_limit(self):
+        with FileIO(self.test_get_content_path, 'w') as testfile:
+            testfile.write(b'test content for watched file')
+        fs = FileServicer()
+        request = fmsg.WatchFilesRequest(items=[fmsg.PathObj(path=self.test_get_content_path, mtime=0)])
+        streams = [fs.WatchFiles(request, DummyContext()) for _ in range(FileServicer.MAX_WATCH_STREAMS)]
+        try:
+            for stream in streams:
+                # the changed modification time is reported on start of the stream
+                self.assertEqual(len(next(stream).items), 1, "changed file not reported")
+            context = CodeContext()
+            self.assertEqual(list(fs.WatchFiles(request, context)), [], "too many streams not rejected")
+            self.assertEqual(context.code, grpc.StatusCode.RESOURCE_EXHAUSTED, "wrong code for rejected stream: %s" % context.code)
+            # a closed stream releases its slot
+            streams.pop().close()
+            streams.append(fs.WatchFiles(request, DummyContext()))
+            self.assertEqual(len(next(streams[-1]).items), 1, "stream rejected after close of other stream")
+        finally:
+            for stream in streams:
+                stream.close()
+            fs.stop()
+
 
 if __name__ == '__main__':
     import rosunit
@@ -0,0 +1,143 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from fkie_node_manager_daemon import file_sync
+
+PKG = 'fkie_node_manager_daemon'
+
+
+class TestFileSync(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'config', 'test.yaml')
+        random.seed(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _random_data(self, size):
+        return bytes(bytearray([random.randint(0, 255) for _ in range(size)]))
+
+    def _sync(self, old, new):
+        '''
+        Patches the old content to the new one.
+
+        :return: the size of transferred literal data.
+        '''
+        if old is not None:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            with open(self.path, 'wb') as f:
+                f.write(old)
+        size = len(old) if old is not None else 0
+        block_size = file_sync.block_size_for(size)
+        signatures = file_sync.block_signatures(self.path, block_size) if old is not None else []
+        patcher = file_sync.Patcher(self.path, block_size, 0o640)
+        literal_size = 0
+        for op in file_sync.compute_delta(new, block_size, signatures, size):
+            if isinstance(op, bytes):
+                literal_size += len(op)
+                patcher.add(data=op)
+            else:
+                patcher.add(block=op)
+        patcher.finish(len(new), hashlib.md5(new).digest())
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), new, "wrong content after patch")
+        return literal_size
+
+    def test_roll(self):
+        data = self._random_data(3000)
+        block_size = 700
+        checksum = file_sync.weak_checksum(data[0:block_size])
+        for pos in range(len(data) - block_size):
+            checksum = file_sync.roll(checksum, bytearray(data)[pos], bytearray(data)[pos + block_size], block_size)
+            self.assertEqual(checksum, zlib.adler32(data[pos + 1:pos + 1 + block_size]) & 0xffffffff, "wrong rolled checksum at %d" % (pos + 1))
+
+    def test_delta(self):
+        old = self._random_data(50000)
+        self.assertEqual(self._sync(None, old), len(old), "new file should be sent completely")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640, "wrong mode of created file")
+        self.assertEqual(self._sync(old, old), 0, "literal data for equal files")
+        # inserted and removed bytes shift the following blocks
+        new = old[:1000] + b'inserted' + old[1000:30000] + old[30100:]
+        literal_size = self._sync(old, new)
+        self.assertLess(literal_size, 3 * file_sync.block_size_for(len(old)), "too much literal data: %d" % literal_size)
+        # short last block and small files
+        self._sync(new, new + b'appended')
+        self._sync(b'small', b'smaller')
+        self._sync(b'removed', b'')
+
+    def test_checksum_error(self):
+        patcher = file_sync.Patcher(self.path, 512)
+        patcher.add(data=b'content')
+        self.assertRaises(IOError, patcher.finish, 7, hashlib.md5(b'other').digest())
+        self.assertFalse(os.path.exists(self.path), "file created despite wrong checksum")
+
+    def test_concurrent_patchers(self):
+        patchers = [file_sync.Patcher(self.path, 512) for _ in range(2)]
+        for idx, patcher in enumerate(patchers):
+            patcher.add(data=b'content %d' % idx)
+        self.assertEqual(len(os.listdir(os.path.dirname(self.path))), 2, "temporary files are shared")
+        for idx, patcher in enumerate(patchers):
+            patcher.finish(9, hashlib.md5(b'content %d' % idx).digest())
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'content 1', "wrong content after concurrent patches")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['test.yaml'], "temporary files not removed")
+
+    def test_manifest(self):
+        for name in ['launch/a.launch', 'config/b.yaml', '.git/config', 'config/.hidden']:
+            path = os.path.join(self.tmpdir, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(name)
+        items = file_sync.manifest(self.tmpdir, self.tmpdir)
+        self.assertEqual([item[0] for item in items], ['config/b.yaml', 'launch/a.launch'], "wrong manifest: %s" % items)
+        self.assertEqual(items[0][2], len('config/b.yaml'), "wrong size in manifest")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestFileSync)
@@ -0,0 +1,136 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fkie_node_manager_daemon.file_watcher import FileWatcher
+
+PKG = 'fkie_node_manager_daemon'
+
+
+class TestFileWatcher(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'test.launch')
+        self._write(self.path, '<launch/>')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, path, content):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def _test_changes(self, watcher):
+        try:
+            other = os.path.join(self.tmpdir, 'other.launch')
+            sub = watcher.subscribe([self.path])
+            self.assertEqual(sub.wait(0.3), [], "unexpected changes without modification")
+            self._write(other, '<launch/>')
+            self.assertEqual(sub.wait(0.5 + watcher.poll_interval), [], "not subscribed file reported")
+            # a file replaced by an editor
+            tmp_path = os.path.join(self.tmpdir, '.test.launch.swp')
+            self._write(tmp_path, '<launch><node/></launch>')
+            os.rename(tmp_path, self.path)
+            self._write(self.path, '<launch><node/><node/></launch>')
+            self.assertEqual(sub.wait(2 + watcher.poll_interval), [self.path], "changed file not reported")
+            self.assertEqual(sub.wait(0.5), [], "changes should be reported once")
+            # not existing file is added to the subscription
+            watcher.add_paths(sub, [other + '.new'])
+            self._write(other + '.new', '<launch/>')
+            self.assertEqual(sub.wait(2 + watcher.poll_interval), [other + '.new'], "new file not reported")
+            watcher.unsubscribe(sub)
+            self.assertIsNone(sub.wait(0.1), "closed subscription should return None")
+        finally:
+            watcher.stop()
+
+    def test_inotify(self):
+        watcher = FileWatcher(poll_interval=1.0, debounce=0.2)
+        if not watcher.uses_inotify:
+            watcher.stop()
+            self.skipTest("inotify not available")
+        self._test_changes(watcher)
+
+    def test_polling(self):
+        self._test_changes(FileWatcher(poll_interval=0.2, debounce=0.2, use_inotify=False))
+
+    def test_removed_directory(self):
+        watcher = FileWatcher(poll_interval=0.2, debounce=0.1)
+        try:
+            subdir = os.path.join(self.tmpdir, 'sub')
+            path = os.path.join(subdir, 'test.launch')
+            sub = watcher.subscribe([path])
+            os.mkdir(subdir)
+            self._write(path, '<launch/>')
+            self.assertEqual(sub.wait(2), [path], "file in new directory not reported")
+            shutil.rmtree(subdir)
+            self.assertEqual(sub.wait(2), [path], "removed file not reported")
+            os.mkdir(subdir)
+            self._write(path, '<launch/>')
+            self.assertEqual(sub.wait(2), [path], "file in recreated directory not reported")
+        finally:
+            watcher.stop()
+
+    def test_moved_directory(self):
+        watcher = FileWatcher(poll_interval=0.2, debounce=0.1)
+        try:
+            subdir = os.path.join(self.tmpdir, 'sub')
+            path = os.path.join(subdir, 'test.launch')
+            os.mkdir(subdir)
+            self._write(path, '<launch/>')
+            sub = watcher.subscribe([path])
+            os.rename(subdir, subdir + '.old')
+            self.assertEqual(sub.wait(2), [path], "moved file not reported")
+            if watcher.uses_inotify:
+                with open('/proc/self/fdinfo/%d' % watcher._fd) as fdinfo:
+                    watches = [line for line in fdinfo if line.startswith('inotify')]
+                self.assertEqual(watches, [], "watch of moved directory not removed")
+            self._write(os.path.join(subdir + '.old', 'test.launch'), '<launch><node/></launch>')
+            self.assertEqual(sub.wait(0.5), [], "change in moved directory reported")
+            os.mkdir(subdir)
+            self._write(path, '<launch/>')
+            self.assertEqual(sub.wait(2), [path], "file in recreated directory not reported")
+        finally:
+            watcher.stop()
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestFileWatcher)
@@ -0,0 +1,117 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import unittest
+import roslaunch
+
+from fkie_node_manager_daemon.launch_config import LaunchConfig, ParamIndex
+
+PKG = 'fkie_node_manager_daemon'
+
+LAUNCH = '''<launch>
+  <param name="capability_group" value="root" />
+  <param name="global_value" value="1" />
+  <group ns="robot">
+    <param name="capability_group" value="robot" />
+    <param name="talker" value="equal to node name" />
+    <param name="talker_extra/value" value="2" />
+    <node name="talker" pkg="rospy_tutorials" type="talker" clear_params="true">
+      <param name="rate" value="10" />
+      <param name="nested/value" value="3" />
+      <param name="capability_group" value="node" />
+    </node>
+    <node name="listener" pkg="rospy_tutorials" type="listener" />
+  </group>
+  <node name="other" pkg="rospy_tutorials" type="listener">
+    <param name="nm/associations" value="robot/talker,listener" />
+  </node>
+  <node name="manager" pkg="nodelet" type="nodelet" args="manager" />
+  <node name="camera" pkg="nodelet" type="nodelet" args="load camera/Nodelet manager" />
+</launch>
+'''
+
+
+class TestLaunchConfig(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        roscfg = roslaunch.ROSLaunchConfig()
+        roslaunch.XmlLoader().load_string(LAUNCH, roscfg, verbose=False)
+        self.index = ParamIndex(roscfg)
+
+    def test_node_params(self):
+        params = self.index.get_params('/robot/talker/')
+        self.assertEqual(sorted(params.keys()), ['/robot/talker/capability_group', '/robot/talker/nested/value', '/robot/talker/rate'], "wrong node parameter, got: %s" % params)
+        self.assertEqual(params['/robot/talker/rate'], 10, "wrong parameter value, expected: 10, got: %s" % params['/robot/talker/rate'])
+        self.assertEqual(self.index.get_params('/robot/listener/'), {}, "listener should have no parameter")
+        self.assertEqual(self.index.get_clear_params('/robot/talker/'), ['/robot/talker/'], "wrong clear parameter, got: %s" % self.index.get_clear_params('/robot/talker/'))
+        self.assertEqual(self.index.get_clear_params('/robot/listener/'), [], "listener should have no clear parameter")
+
+    def test_global_params(self):
+        params = self.index.get_global_params()
+        expected = ['/capability_group', '/global_value', '/robot/capability_group', '/robot/talker', '/robot/talker_extra/value']
+        self.assertEqual(sorted(params.keys()), expected, "wrong global parameter, expected: %s, got: %s" % (expected, sorted(params.keys())))
+
+    def test_find_in_ns(self):
+        self.assertEqual(self.index.find_in_ns('/robot/talker', 'capability_group'), '/robot/talker/capability_group')
+        self.assertEqual(self.index.find_in_ns('/robot/listener', 'capability_group'), '/robot/capability_group')
+        self.assertEqual(self.index.find_in_ns('/other', 'capability_group'), '/capability_group')
+        self.assertEqual(self.index.find_in_ns('/other', 'not_exists'), None)
+
+    def test_derived_views(self):
+        path = "%s/launch_config_test.launch" % os.getcwd()
+        with open(path, 'w') as launch_file:
+            launch_file.write(LAUNCH)
+        try:
+            lc = LaunchConfig(path, package=PKG, masteruri='http://localhost:11311/')
+            node = lc.get_node('/robot/talker')
+            self.assertTrue(node is not None and node.name == 'talker' and node.namespace == '/robot/', "node '/robot/talker' not found")
+            self.assertEqual(lc.get_node('/other').name, 'other', "node '/other' not found")
+            self.assertEqual(lc.get_node('/robot/other'), None, "node '/robot/other' should not exist")
+            self.assertEqual(lc.get_nodelets(), {'/manager': ['/camera']}, "wrong nodelets, got: %s" % lc.get_nodelets())
+            self.assertEqual(lc.get_associations(), {'/other': ['/robot/talker', '/listener']}, "wrong associations, got: %s" % lc.get_associations())
+            # the views are recreated after reload
+            nodelets = lc.get_nodelets()
+            self.assertTrue(nodelets is lc.get_nodelets(), "nodelets are not cached")
+            lc.load([])
+            self.assertFalse(nodelets is lc.get_nodelets(), "nodelets are not recreated after reload")
+            self.assertEqual(lc.get_node('/robot/listener').name, 'listener', "node '/robot/listener' not found after reload")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestLaunchConfig)
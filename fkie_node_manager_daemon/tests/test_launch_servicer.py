@@ -36,10 +36,13 @@ import unittest
 import time
 from grpc.beta._metadata import beta
 
+from fkie_node_manager_daemon import exceptions
+from fkie_node_manager_daemon import launcher
 from fkie_node_manager_daemon.common import interpret_path
 import fkie_multimaster_msgs.grpc.launch_pb2 as lmsg
 from fkie_node_manager_daemon.launch_servicer import LaunchServicer
 from fkie_node_manager_daemon.launch_description import RobotDescription, Capability
+from fkie_node_manager_daemon.startcfg import StartConfig
 
 PKG = 'fkie_node_manager_daemon'
 
@@ -197,6 +200,42 @@ class TestLaunchServicer(unittest.TestCase):
         self.assertEqual(len(descriptions[0].capabilities), 0, "wrong count of capabilities in first description, result: %d, expected: %d, description: %s"  % (len(descriptions[0].capabilities), 0, descriptions[0]))
         self.assertEqual(len(descriptions[1].capabilities), 9, "wrong count of capabilities in second description, result: %d, expected: %d, description: %s"  % (len(descriptions[1].capabilities), 9, descriptions[1]))
 
+    def test_start_nodes(self):
+        ls = LaunchServicer(monitor_servicer=None)
+        startcfgs = dict((name, StartConfig('pkg', name[1:])) for name in ['/ok', '/failed', '/remote'])
+
+        def create_start_config(request, result):
+            if request.name == '/not_found':
+                result.status.code = lmsg.ReturnStatus.StatusType.Value('NODE_NOT_FOUND')
+                return None
+            if request.name == '/binaries':
+                raise exceptions.BinarySelectionRequest(['/bin/a', '/bin/b'], 'multiple binaries')
+            if request.name == '/broken':
+                raise Exception('broken launch file')
+            return startcfgs[request.name]
+
+        def run_nodes(cfgs):
+            self.assertEqual(cfgs, [startcfgs['/ok'], startcfgs['/failed'], startcfgs['/remote']], "wrong start configurations passed to run_nodes")
+            return [None, exceptions.StartException('Failed to set parameter'), grpc.RpcError('no connection')]
+
+        ls._create_start_config = create_start_config
+        run_nodes_orig = launcher.run_nodes
+        launcher.run_nodes = run_nodes
+        try:
+            names = ['/ok', '/not_found', '/failed', '/binaries', '/remote', '/broken']
+            replies = list(ls.StartNodes(lmsg.StartNodesRequest(nodes=[lmsg.Node(name=name) for name in names]), DummyContext()))
+        finally:
+            launcher.run_nodes = run_nodes_orig
+        self.assertEqual([reply.name for reply in replies], names, "wrong order or count of replies: %s" % [reply.name for reply in replies])
+        expected = ['OK', 'NODE_NOT_FOUND', 'ERROR', 'MULTIPLE_BINARIES', 'CONNECTION_ERROR', 'ERROR']
+        for reply, code in zip(replies, expected):
+            self.assertEqual(reply.status.code, lmsg.ReturnStatus.StatusType.Value(code),
+                             "wrong status code for %s, result: %d, expected: %d, reported error: %s"
+                             % (reply.name, reply.status.code, lmsg.ReturnStatus.StatusType.Value(code), reply.status.error_msg))
+        self.assertTrue('Failed to set parameter' in replies[2].status.error_msg, "error of run_nodes not reported, got: %s" % replies[2].status.error_msg)
+        self.assertEqual(list(replies[3].path), ['/bin/a', '/bin/b'], "binaries not reported, got: %s" % list(replies[3].path))
+        self.assertTrue('broken launch file' in replies[5].status.error_msg, "error while create the start configuration not reported, got: %s" % replies[5].status.error_msg)
+
 #         launch_manager.test_start_node('/example/test_node')
 
 
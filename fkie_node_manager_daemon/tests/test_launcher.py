@@ -0,0 +1,189 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import threading
+import unittest
+try:
+    from SimpleXMLRPCServer import SimpleXMLRPCServer
+except ImportError:
+    from xmlrpc.server import SimpleXMLRPCServer
+
+from fkie_node_manager_daemon import exceptions
+from fkie_node_manager_daemon import launcher
+from fkie_node_manager_daemon.startcfg import StartConfig
+
+PKG = 'fkie_node_manager_daemon'
+
+
+class FakeMaster(SimpleXMLRPCServer):
+    '''
+    Parameter server of a ROS master which counts the requests and calls.
+    '''
+
+    def __init__(self):
+        SimpleXMLRPCServer.__init__(self, ('127.0.0.1', 0), logRequests=False, allow_none=True)
+        self.params = {}
+        self.requests = 0
+        self.calls = {'setParam': 0, 'getParam': 0, 'deleteParam': 0}
+        self.register_function(self.setParam, 'setParam')
+        self.register_function(self.getParam, 'getParam')
+        self.register_function(self.deleteParam, 'deleteParam')
+        self.register_multicall_functions()
+        self.uri = 'http://127.0.0.1:%d/' % self.server_address[1]
+
+    def _marshaled_dispatch(self, *args, **kwargs):
+        self.requests += 1
+        return SimpleXMLRPCServer._marshaled_dispatch(self, *args, **kwargs)
+
+    def setParam(self, caller_id, key, value):
+        self.calls['setParam'] += 1
+        self.params[key] = value
+        return [1, '', 0]
+
+    def getParam(self, caller_id, key):
+        self.calls['getParam'] += 1
+        if key in self.params:
+            return [1, '', self.params[key]]
+        return [-1, 'Parameter [%s] is not set' % key, 0]
+
+    def deleteParam(self, caller_id, key):
+        self.calls['deleteParam'] += 1
+        ns = key.rstrip('/')
+        keys = [pkey for pkey in self.params if pkey == ns or pkey.startswith(ns + '/')]
+        for pkey in keys:
+            del self.params[pkey]
+        if keys:
+            return [1, '', 0]
+        return [-1, 'Parameter [%s] is not set' % key, 0]
+
+    def reset_counts(self):
+        self.requests = 0
+        for key in self.calls:
+            self.calls[key] = 0
+
+
+class TestLauncher(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        launcher.PARAM_HASHES.clear()
+        self.master = FakeMaster()
+        self.thread = threading.Thread(target=self.master.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.started = []
+        self._create_local_start = launcher._create_local_start
+        self._run_local = launcher._run_local
+        launcher._create_local_start = lambda startcfg: ('cmd %s' % startcfg.fullname, '', {}, startcfg.masteruri)
+        launcher._run_local = lambda startcfg, cmd_str, cwd, new_env, masteruri: self.started.append(startcfg.fullname)
+
+    def tearDown(self):
+        launcher._create_local_start = self._create_local_start
+        launcher._run_local = self._run_local
+        self.master.shutdown()
+        self.master.server_close()
+        launcher.PARAM_HASHES.clear()
+
+    def _startcfg(self, name, params, clear_params=[]):
+        startcfg = StartConfig('pkg', 'binary')
+        startcfg.name = name
+        startcfg.fullname = '/%s' % name
+        startcfg.masteruri = self.master.uri
+        startcfg.params.update(params)
+        startcfg.clear_params.extend(clear_params)
+        return startcfg
+
+    def test_run_nodes(self):
+        startcfgs = [self._startcfg('node%d' % idx, {'/node%d/a' % idx: idx, '/node%d/b' % idx: [idx, 'x'], '/global': 'value'}, ['/node%d/' % idx]) for idx in range(5)]
+        errors = launcher.run_nodes(startcfgs)
+        self.assertEqual(errors, [None] * 5, "errors while start nodes: %s" % errors)
+        self.assertEqual(self.started, ['/node%d' % idx for idx in range(5)], "wrong started nodes: %s" % self.started)
+        self.assertEqual(self.master.calls['setParam'], 11, "wrong count of set parameter, expected: 11, got: %d" % self.master.calls['setParam'])
+        self.assertEqual(self.master.calls['deleteParam'], 5, "wrong count of deleted parameter, expected: 5, got: %d" % self.master.calls['deleteParam'])
+        # one request to clear and one to set the parameter of all nodes
+        self.assertEqual(self.master.requests, 2, "parameter not loaded in one batch, expected 2 requests, got: %d" % self.master.requests)
+        self.assertEqual(self.master.params['/node3/b'], [3, 'x'], "wrong parameter value: %s" % self.master.params['/node3/b'])
+
+    def test_run_nodes_error(self):
+        startcfgs = [self._startcfg('node%d' % idx, {'/node%d/a' % idx: idx}) for idx in range(3)]
+        startcfgs[1].params['/node1/invalid'] = None
+        errors = launcher.run_nodes(startcfgs)
+        self.assertEqual(self.started, [], "nodes started without parameter: %s" % self.started)
+        for err in errors:
+            self.assertTrue(isinstance(err, exceptions.StartException), "wrong error for failed parameter load: %s" % err)
+
+    def test_unchanged_parameter(self):
+        params = {'/node/a': 1, '/node/b': [1, 2.5, 'x'], '/node/c': {'k': True, 'l': [1]}, '/node/d': 'text'}
+        launcher._load_parameters(self.master.uri, params, [])
+        self.assertEqual(self.master.calls['setParam'], 4, "not all parameter set on first load, got: %d" % self.master.calls['setParam'])
+        self.assertEqual(self.master.calls['getParam'], 0, "unknown parameter requested on first load, got: %d" % self.master.calls['getParam'])
+        # unchanged values are requested and not set again
+        self.master.reset_counts()
+        launcher._load_parameters(self.master.uri, params, [])
+        self.assertEqual(self.master.calls['setParam'], 0, "unchanged parameter set again, got: %d" % self.master.calls['setParam'])
+        self.assertEqual(self.master.calls['getParam'], 4, "loaded parameter not requested, got: %d" % self.master.calls['getParam'])
+        self.assertEqual(self.master.requests, 1, "unchanged parameter not requested in one batch, got: %d requests" % self.master.requests)
+
+    def test_changed_parameter(self):
+        params = {'/node/a': 1, '/node/b': 'text'}
+        launcher._load_parameters(self.master.uri, params, [])
+        # changed on the ROS master by other
+        self.master.params['/node/a'] = 5
+        self.master.reset_counts()
+        launcher._load_parameters(self.master.uri, params, [])
+        self.assertEqual(self.master.calls['setParam'], 1, "only the value changed on master should be set, got: %d" % self.master.calls['setParam'])
+        self.assertEqual(self.master.params['/node/a'], 1, "value changed on master not restored, got: %s" % self.master.params['/node/a'])
+        # changed in the launch file
+        params['/node/b'] = 'other'
+        self.master.reset_counts()
+        launcher._load_parameters(self.master.uri, params, [])
+        self.assertEqual(self.master.calls['setParam'], 1, "only the changed value should be set, got: %d" % self.master.calls['setParam'])
+        self.assertEqual(self.master.params['/node/b'], 'other', "changed value not set, got: %s" % self.master.params['/node/b'])
+
+    def test_cleared_parameter(self):
+        params = {'/node/a': 1, '/node/b': 'text', '/other/c': 2}
+        launcher._load_parameters(self.master.uri, params, [])
+        self.master.reset_counts()
+        launcher._load_parameters(self.master.uri, params, ['/node/'])
+        self.assertEqual(self.master.calls['deleteParam'], 1, "clear parameter not deleted, got: %d" % self.master.calls['deleteParam'])
+        self.assertEqual(self.master.calls['setParam'], 2, "cleared parameter not set again, got: %d" % self.master.calls['setParam'])
+        self.assertEqual(sorted(self.master.params.keys()), ['/node/a', '/node/b', '/other/c'], "wrong parameter after clear: %s" % sorted(self.master.params.keys()))
+        # the hashes are per ROS master
+        self.assertEqual(len(launcher.PARAM_HASHES[self.master.uri]), 3, "wrong count of remembered hashes: %s" % launcher.PARAM_HASHES)
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestLauncher)
@@ -0,0 +1,104 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus
+from fkie_node_manager_daemon.monitor.service import Service
+from fkie_node_manager_daemon.settings import Settings
+
+PKG = 'fkie_node_manager_daemon'
+
+
+class TestMonitorService(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.settings = Settings(os.path.join(self.tmpdir, 'settings.yaml'))
+        self.service = Service(self.settings)
+
+    def tearDown(self):
+        self.service.stop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _array(self, *states):
+        msg = DiagnosticArray()
+        for name, hardware_id, level in states:
+            msg.status.append(DiagnosticStatus(level=level, name=name, hardware_id=hardware_id, message='%d' % level))
+        return msg
+
+    def _names(self, msg):
+        return sorted([(status.name, status.hardware_id) for status in msg.status])
+
+    def test_update_by_key(self):
+        self.service._callback_diagnostics(self._array(('/a', 'host1', 0), ('/a', 'host2', 0), ('/b', 'host1', 0)))
+        self.service._callback_diagnostics(self._array(('/a', 'host1', 2)))
+        result = self.service.get_diagnostics()
+        self.assertEqual(self._names(result), [('/a', 'host1'), ('/a', 'host2'), ('/b', 'host1')], "wrong stored diagnostics, got: %s" % self._names(result))
+        warnings = self.service.get_diagnostics(2, 0)
+        self.assertEqual(self._names(warnings), [('/a', 'host1')], "wrong level filter, got: %s" % self._names(warnings))
+        self.service._callback_diagnostics(self._array(('/a', 'host1', 0)))
+        warnings = self.service.get_diagnostics(2, 0)
+        self.assertEqual(len(warnings.status), 0, "level index not updated, got: %s" % self._names(warnings))
+
+    def test_incremental_query(self):
+        self.service._callback_diagnostics(self._array(('/a', 'host1', 0), ('/b', 'host1', 1)))
+        result = self.service.get_diagnostics()
+        self.assertEqual(len(result.status), 2, "wrong count of diagnostics, expected: 2, got: %d" % len(result.status))
+        last_ts = result.header.stamp.to_sec()
+        result = self.service.get_diagnostics(0, last_ts)
+        self.assertEqual(len(result.status), 0, "unchanged diagnostics returned: %s" % self._names(result))
+        self.service._callback_diagnostics(self._array(('/b', 'host1', 2), ('/c', 'host1', 0)))
+        result = self.service.get_diagnostics(0, last_ts)
+        self.assertEqual(self._names(result), [('/b', 'host1'), ('/c', 'host1')], "wrong changed diagnostics, got: %s" % self._names(result))
+        result = self.service.get_diagnostics(2, last_ts)
+        self.assertEqual(self._names(result), [('/b', 'host1')], "wrong changed warnings, got: %s" % self._names(result))
+
+    def test_history(self):
+        self.service.diagnostics_history = 3
+        for level in range(5):
+            self.service._callback_diagnostics(self._array(('/a', 'host1', level % 3)))
+        history = self.service.get_diagnostic_history('/a', 'host1')
+        self.assertEqual([status.message for _ts, status in history], ['2', '0', '1'], "wrong history, got: %s" % history)
+        self.assertEqual(self.service.get_diagnostic_history('/unknown'), [], "history for unknown diagnostic")
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestMonitorService)
@@ -0,0 +1,138 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Fraunhofer nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from fkie_node_manager_daemon.package_index import PackageIndex
+
+PKG = 'fkie_node_manager_daemon'
+
+
+class TestPackageIndex(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmpdir, 'src')
+        self.index_file = os.path.join(self.tmpdir, 'index.json')
+        for name in ['pkg_a', 'group/pkg_b', 'group/pkg_c']:
+            self._create_package(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _create_package(self, name):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.join(path, 'scripts'))
+        with open(os.path.join(path, 'manifest.xml'), 'w') as f:
+            f.write('<package/>')
+        self._create_binary(os.path.join(path, 'scripts', 'node'))
+        with open(os.path.join(path, 'scripts', 'data.txt'), 'w') as f:
+            f.write('data')
+        return path
+
+    def _create_binary(self, path):
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\n')
+        os.chmod(path, 0o755)
+
+    def _set_old_mtimes(self):
+        # the index does not trust directories changed in last second
+        old = time.time() - 10
+        for dirpath, _dirs, _files in os.walk(self.tmpdir):
+            os.utime(dirpath, (old, old))
+
+    def test_packages(self):
+        self._set_old_mtimes()
+        index = PackageIndex(self.index_file)
+        packages = dict(index.get_packages([self.root]))
+        self.assertEqual(sorted(packages.keys()), ['pkg_a', 'pkg_b', 'pkg_c'], "wrong packages found: %s" % packages)
+        self.assertEqual(packages['pkg_b'], os.path.join(self.root, 'group', 'pkg_b'))
+        index.save()
+        # a new package is found by a new index loaded from file
+        self._create_package('group/pkg_d')
+        index = PackageIndex(self.index_file)
+        self.assertGreater(len(index._dirs), 0, "index not loaded from file")
+        packages = dict(index.get_packages([self.root]))
+        self.assertEqual(sorted(packages.keys()), ['pkg_a', 'pkg_b', 'pkg_c', 'pkg_d'], "new package not found: %s" % packages)
+        # removed package
+        shutil.rmtree(os.path.join(self.root, 'pkg_a'))
+        packages = dict(index.get_packages([self.root]))
+        self.assertEqual(sorted(packages.keys()), ['pkg_b', 'pkg_c', 'pkg_d'], "removed package found: %s" % packages)
+        # root path is a package
+        packages = index.get_packages([os.path.join(self.root, 'group', 'pkg_b'), os.path.join(self.tmpdir, 'not_exists')])
+        self.assertEqual(packages, [('pkg_b', os.path.join(self.root, 'group', 'pkg_b'))])
+
+    def test_binaries(self):
+        self._set_old_mtimes()
+        index = PackageIndex()
+        path = os.path.join(self.root, 'pkg_a')
+        binaries = index.get_binaries(path)
+        self.assertEqual([p for p, _mtime in binaries], [os.path.join(path, 'scripts', 'node')], "wrong binaries: %s" % binaries)
+        self.assertEqual(binaries[0][1], os.path.getmtime(binaries[0][0]), "wrong modification time of the binary")
+        self._create_binary(os.path.join(path, 'scripts', 'node2'))
+        self._create_binary(os.path.join(path, 'scripts', 'lib.so'))
+        binaries = index.get_binaries(path)
+        self.assertEqual(sorted([p for p, _mtime in binaries]), [os.path.join(path, 'scripts', 'node'), os.path.join(path, 'scripts', 'node2')], "new binary not found: %s" % binaries)
+        index.clear()
+        self.assertEqual(len(index.get_binaries(path)), 2, "wrong count of binaries after clear")
+
+    def test_executable_flag(self):
+        path = os.path.join(self.root, 'pkg_a')
+        script = os.path.join(path, 'scripts', 'data.txt')
+        self._set_old_mtimes()
+        index = PackageIndex(self.index_file)
+        self.assertEqual(len(index.get_binaries(path)), 1, "not executable file found as binary")
+        index.save()
+        # chmod does not change the modification time of the directory
+        os.chmod(script, 0o755)
+        binaries = [p for p, _mtime in index.get_binaries(path)]
+        self.assertIn(script, binaries, "file made executable not found: %s" % binaries)
+        # the index loaded from file
+        index = PackageIndex(self.index_file)
+        binaries = [p for p, _mtime in index.get_binaries(path)]
+        self.assertIn(script, binaries, "file made executable not found after load: %s" % binaries)
+        os.chmod(script, 0o644)
+        binaries = [p for p, _mtime in index.get_binaries(path)]
+        self.assertNotIn(script, binaries, "not executable file found: %s" % binaries)
+
+
+if __name__ == '__main__':
+    import rosunit
+    rosunit.unitrun(PKG, os.path.basename(__file__), TestPackageIndex)